@@ -0,0 +1,203 @@
+"""
+接口基准测试
+
+用 benchmarks/datagen.py 生成模拟数据后，通过 Flask 测试客户端请求热点接口，统计每个接口的
+耗时（中位数/P95）和执行的 SQL 语句数，结果可写入 JSON 作为基线，并与之前的基线对比：
+
+    python benchmarks/bench_endpoints.py --output baseline.json
+    python benchmarks/bench_endpoints.py --compare baseline.json
+
+覆盖的接口：
+- dashboard / dashboard_cold: 仪表盘（命中缓存 / 每次请求前清空缓存）
+- nutrition_analysis: 最近 30 天营养分析
+- report_generation: 生成月报（报告任务在请求线程中同步执行，统计完整生成耗时）
+- social_feed: 分享列表
+- social_timeline: 时间线第一页
+- water_weekly_summary: 最近 7 天饮水摘要（应用未注册对应路由时直接调用服务层）
+
+默认使用临时 SQLite 文件；指定 --database-url 时会向该库追加模拟数据，请勿对生产库执行。
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# 添加项目根目录到Python路径
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+WATER_WEEKLY_URL = '/api/water-intake/summary/weekly'
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[max(int(len(sorted_values) * fraction) - 1, 0)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_cases(app, client, headers, user_id):
+    """返回 {名称: 无参调用}，每次调用执行一次完整请求"""
+    from services.dashboard_service import dashboard_cache
+    from services.water_intake_service import WaterIntakeService
+
+    today = date.today()
+    month_ago = (today - timedelta(days=29)).isoformat()
+    week_ago = (today - timedelta(days=6)).isoformat()
+
+    def get(url):
+        def call():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, f'{url}: {response.status_code} {response.get_data(as_text=True)[:200]}'
+        return call
+
+    def generate_report():
+        response = client.post('/api/health-report/generate', json={'report_type': 'monthly'}, headers=headers)
+        assert response.status_code == 202, response.get_data(as_text=True)[:200]
+        assert response.get_json()['data']['status'] == 'succeeded', response.get_data(as_text=True)[:200]
+
+    def dashboard_cold():
+        dashboard_cache.clear()
+        get('/api/health/dashboard')()
+
+    cases = {
+        'dashboard': get('/api/health/dashboard'),
+        'dashboard_cold': dashboard_cold,
+        'dashboard_chart': get('/api/health/dashboard/chart-data?days=30'),
+        'chart_multi_year': get(f'/api/health/dashboard/chart-data?start_date={(today - timedelta(days=5 * 365)).isoformat()}'
+                                f'&end_date={today.isoformat()}&series=weight,heart_rate,diet_calories,water_intake'),
+        'nutrition_analysis': get(f'/api/analysis/nutrition?start_date={month_ago}&end_date={today.isoformat()}'),
+        'report_generation': generate_report,
+        'metric_timeseries': get('/api/health/timeseries?metrics=weight,bp_systolic,bp_diastolic&points=300'),
+        'social_feed': get('/api/social/shares?per_page=20'),
+        'social_timeline': get('/api/social/timeline?limit=20'),
+    }
+
+    routes = {rule.rule for rule in app.url_map.iter_rules()}
+    if WATER_WEEKLY_URL in routes:
+        cases['water_weekly_summary'] = get(f'{WATER_WEEKLY_URL}?end_date={today.isoformat()}')
+    else:
+        def water_weekly_service():
+            with app.app_context():
+                WaterIntakeService.get_weekly_summary(user_id, week_ago, today.isoformat())
+        cases['water_weekly_summary'] = water_weekly_service
+    return cases
+
+
+def measure(call, repeat):
+    """执行 repeat 次，返回耗时和 SQL 语句数统计"""
+    from utils.query_tracker import pop_scope, push_scope
+
+    call()  # 预热
+    timings, queries = [], []
+    for _ in range(repeat):
+        scope = push_scope('benchmark')
+        start = time.perf_counter()
+        try:
+            call()
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            pop_scope(scope)
+        timings.append(elapsed)
+        queries.append(scope.count)
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'queries': int(statistics.median(queries)),
+        'max_queries': max(queries),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\n与基线对比（{baseline_path}, 提交 {baseline.get('meta', {}).get('commit')}）:")
+    print(f"{'接口':<24}{'p50 基线→当前 (ms)':>28}{'变化':>10}{'SQL 基线→当前':>18}")
+    for name, current in results.items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            print(f"{name:<24}{'(基线中无此项)':>28}")
+            continue
+        change = (current['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        print(f"{name:<24}{before['p50_ms']:>13.3f} → {current['p50_ms']:<12.3f}{change:>+9.1f}%"
+              f"{before['queries']:>10} → {current['queries']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='接口基准测试')
+    parser.add_argument('--database-url', help='默认使用临时 SQLite 文件')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='*', help='只运行指定的接口')
+    parser.add_argument('--output', help='将结果写入 JSON 文件（基线）')
+    parser.add_argument('--compare', help='与之前的基线 JSON 对比')
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database_url = f'sqlite:///{path}'
+    # 必须在导入 app 之前指定数据库；报告在请求线程中同步生成，以便统计完整耗时和 SQL 语句数
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['REPORT_JOB_WORKERS'] = '0'
+    os.environ['REMINDER_SCHEDULER_ENABLED'] = '0'
+
+    from flask_jwt_extended import create_access_token
+
+    from app import app
+    from benchmarks.datagen import generate
+    from database import db
+
+    with app.app_context():
+        seeded = generate(db.engine, users=args.users, days=args.days, rng=random.Random(args.seed))
+        user_id = seeded['user_ids'][0]
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+    client = app.test_client()
+
+    cases = build_cases(app, client, headers, user_id)
+    if args.only:
+        cases = {name: call for name, call in cases.items() if name in args.only}
+
+    results = {}
+    for name, call in cases.items():
+        results[name] = measure(call, args.repeat)
+
+    print(f"\n数据量: {args.users} 个用户 x {args.days} 天, 每个接口 {args.repeat} 次")
+    print(f"{'接口':<24}{'p50 (ms)':>12}{'p95 (ms)':>12}{'SQL 语句':>10}")
+    for name, result in results.items():
+        print(f"{name:<24}{result['p50_ms']:>12.3f}{result['p95_ms']:>12.3f}{result['queries']:>10}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        meta = {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'database': database_url.split('://', 1)[0],
+            'users': args.users,
+            'days': args.days,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+日志开销基准测试
+
+通过 Flask 测试客户端请求营养分析和社交分享列表接口，对比三种日志配置下的耗时（中位数/P95）：
+- sync_debug: DEBUG 级别、在请求线程中同步写出，相当于原来逐条 print 的行为
+- queue_debug: DEBUG 级别、经队列由后台线程写出
+- default: 默认配置（INFO 级别、队列输出），调试日志不格式化也不写出
+
+用法:
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --days 365 --shares 200 --repeat 50
+
+日志写入临时文件；直接输出到终端时同步写出的开销会更大。
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# 必须在导入 app 之前指定数据库
+fd, _database_path = tempfile.mkstemp(suffix='.db')
+os.close(fd)
+os.environ['DATABASE_URL'] = f'sqlite:///{_database_path}'
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from database import db
+from models.user import User
+from models.health_record import HealthRecord
+from models.diet_record import Food, DietRecord, DietRecordItem
+from models.social import Share
+from utils.logging_config import configure_logging
+
+FOOD_NAMES = ['米饭', '鸡蛋', '苹果', '牛肉', '青菜', '蛋糕', '牛奶', '面条']
+MEAL_TYPES = ['早餐', '午餐', '晚餐', '加餐']
+
+
+def seed(days, shares, rng):
+    """写入一个用户的饮食数据和若干分享，返回用户ID"""
+    today = date.today()
+    with app.app_context():
+        user = User(username='bench_user', password_hash='x')
+        db.session.add(user)
+        foods = [Food(name=name, calories=rng.uniform(50, 300), protein=rng.uniform(0, 20),
+                      fat=rng.uniform(0, 15), carbohydrate=rng.uniform(0, 40)) for name in FOOD_NAMES[:4]]
+        db.session.add_all(foods)
+        db.session.flush()
+
+        health_rows, diet_records = [], []
+        for offset in range(days):
+            day = today - timedelta(days=offset)
+            for meal in MEAL_TYPES[:3]:
+                created = datetime.combine(day, datetime.min.time())
+                health_rows.append({
+                    'user_id': user.id, 'record_date': day, 'record_type': 'diet', 'meal_type': meal,
+                    'food_name': rng.choice(FOOD_NAMES), 'food_amount': rng.uniform(50, 300),
+                    'calories_burned': rng.choice([0, rng.uniform(100, 600)]),
+                    'created_at': created, 'updated_at': created
+                })
+                diet_records.append(DietRecord(user_id=user.id, record_date=day, meal_type=meal,
+                                               total_calories=rng.uniform(200, 800)))
+        db.session.execute(HealthRecord.__table__.insert(), health_rows)
+        db.session.add_all(diet_records)
+        db.session.flush()
+        db.session.add_all([
+            DietRecordItem(diet_record_id=record.id, food_id=rng.choice(foods).id, amount=rng.uniform(50, 200))
+            for record in diet_records for _ in range(2)
+        ])
+        db.session.add_all([
+            Share(user_id=user.id, content_type='health_record', content_id=i + 1,
+                  description=f'分享 {i}', visibility='public')
+            for i in range(shares)
+        ])
+        db.session.commit()
+        return user.id
+
+
+def measure(client, headers, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[max(int(len(timings) * 0.95) - 1, 0)], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志开销基准测试')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--shares', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_id = seed(args.days, args.shares, rng)
+    with app.app_context():
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+    client = app.test_client()
+
+    start_date = (date.today() - timedelta(days=args.days - 1)).isoformat()
+    endpoints = {
+        'nutrition_analysis': f'/api/analysis/nutrition?start_date={start_date}&end_date={date.today().isoformat()}',
+        'social_shares': f'/api/social/shares?per_page={args.shares}',
+    }
+    modes = {
+        'sync_debug': {'level': 'DEBUG', 'use_queue': False},
+        'queue_debug': {'level': 'DEBUG', 'use_queue': True},
+        'default': {'level': 'INFO', 'use_queue': True},
+    }
+
+    results = {}
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as log_file:
+        for mode, options in modes.items():
+            configure_logging(stream=log_file, **options)
+            results[mode] = {}
+            for name, url in endpoints.items():
+                client.get(url, headers=headers)  # 预热
+                results[mode][name] = measure(client, headers, url, args.repeat)
+    configure_logging()
+
+    print(f"\n{'接口':<22}" + ''.join(f"{mode + ' p50/p95 (ms)':>28}" for mode in modes))
+    for name in endpoints:
+        row = ''.join(f"{results[mode][name]['p50_ms']:>17.3f}/{results[mode][name]['p95_ms']:<10.3f}" for mode in modes)
+        print(f"{name:<22}{row}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'days': args.days, 'shares': args.shares, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
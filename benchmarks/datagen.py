@@ -0,0 +1,296 @@
+"""
+模拟数据生成
+
+为 N 个用户生成 D 天的健康、饮食（DietRecord + DietRecordItem，引用 foods）、运动、饮水、
+用药、提醒以及分享、点赞、评论数据，最后重建这些用户的每日汇总表。
+
+所有数据通过 Core 批量插入写入，主键从各表当前最大值之后显式分配，因此可以向已有数据的
+数据库追加，不会与现有记录冲突。命令行入口见 scripts/seed_data.py，基准测试
+benchmarks/bench_endpoints.py 也使用这里的 generate()。
+"""
+import random
+from datetime import date, datetime, time as dtime, timedelta
+
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+
+from models.user import User
+from models.health_record import HealthRecord
+from models.diet_record import Food, DietRecord, DietRecordItem
+from models.exercise import ExerciseType, ExerciseRecord
+from models.medication_record import MedicationType, MedicationRecord
+from models.water_intake import WaterIntake
+from models.health_report import Reminder
+from models.social import Share, Like, Comment
+from services.rollup_service import RollupService
+from services.timeline_service import TimelineService
+
+# 模拟用户的统一密码
+DEFAULT_PASSWORD = 'password123'
+CHUNK_SIZE = 5000
+
+# 名称, 分类, 每100克热量, 蛋白质, 脂肪, 碳水, 纤维, 糖, 钠
+FOODS = [
+    ('米饭', '主食', 116, 2.6, 0.3, 25.9, 0.3, 0.1, 2.5),
+    ('面条', '主食', 110, 3.9, 0.4, 22.8, 0.8, 0.4, 26),
+    ('全麦面包', '主食', 246, 8.5, 3.4, 46.1, 6.0, 5.0, 450),
+    ('燕麦', '主食', 389, 16.9, 6.9, 66.3, 10.6, 1.0, 2),
+    ('鸡蛋', '蛋类', 144, 13.3, 8.8, 2.8, 0, 0.4, 131),
+    ('牛奶', '奶类', 54, 3.0, 3.2, 3.4, 0, 5.0, 37),
+    ('鸡胸肉', '肉类', 133, 24.6, 1.9, 2.5, 0, 0, 34),
+    ('牛肉', '肉类', 125, 19.9, 4.2, 2.0, 0, 0, 84),
+    ('三文鱼', '水产', 139, 17.2, 7.8, 0, 0, 0, 63),
+    ('豆腐', '豆类', 81, 8.1, 3.7, 4.2, 0.4, 0.7, 7),
+    ('青菜', '蔬菜', 15, 1.5, 0.3, 2.7, 1.1, 1.0, 73),
+    ('西兰花', '蔬菜', 36, 4.1, 0.6, 4.3, 1.6, 1.5, 18),
+    ('番茄', '蔬菜', 20, 0.9, 0.2, 4.0, 0.5, 2.6, 5),
+    ('苹果', '水果', 54, 0.2, 0.2, 13.5, 1.2, 10.4, 1),
+    ('香蕉', '水果', 93, 1.4, 0.2, 22.0, 1.2, 12.2, 1),
+    ('酸奶', '奶类', 72, 2.5, 2.7, 9.3, 0, 9.3, 39),
+    ('坚果', '坚果', 607, 20.0, 54.0, 20.0, 8.0, 4.0, 5),
+    ('蛋糕', '零食', 347, 8.6, 5.1, 67.1, 0.4, 35.0, 68),
+]
+EXERCISES = [('跑步', '有氧运动', 600), ('快走', '有氧运动', 300), ('游泳', '有氧运动', 500),
+             ('骑行', '有氧运动', 450), ('力量训练', '力量训练', 400), ('瑜伽', '伸展运动', 200)]
+CALORIES_PER_HOUR = {name: cph for name, _, cph in EXERCISES}
+MEDICATIONS = [('维生素D', '非处方药', 1000, 'IU'), ('二甲双胍', '处方药', 500, 'mg'),
+               ('氨氯地平', '处方药', 5, 'mg')]
+MEALS = [('早餐', 7), ('午餐', 12), ('晚餐', 18)]
+WATER_TYPES = ['白开水', '矿泉水', '茶', '咖啡']
+INTENSITIES = ['低', '中', '高']
+
+
+def _chunks(rows):
+    for i in range(0, len(rows), CHUNK_SIZE):
+        yield rows[i:i + CHUNK_SIZE]
+
+
+class _IdAllocator:
+    """按表分配显式主键，从表中当前最大值之后开始"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.next_ids = {}
+
+    def take(self, table):
+        if table.name not in self.next_ids:
+            current = self.conn.execute(select(func.max(table.c.id))).scalar()
+            self.next_ids[table.name] = (current or 0) + 1
+        value = self.next_ids[table.name]
+        self.next_ids[table.name] += 1
+        return value
+
+
+def _lookup_or_insert(conn, ids, table, rows):
+    """按名称复用已有的字典数据（运动类型、药物类型等），不存在时插入，返回 {名称: ID}"""
+    existing = dict(conn.execute(select(table.c.name, table.c.id)).all())
+    missing = []
+    for row in rows:
+        if row['name'] not in existing:
+            row['id'] = ids.take(table)
+            existing[row['name']] = row['id']
+            missing.append(row)
+    if missing:
+        conn.execute(table.insert(), missing)
+    return {row['name']: existing[row['name']] for row in rows}
+
+
+def _user_days(rng, uid, day, base_weight, height, on_medication, ids, rows, foods, exercise_ids, medication_ids):
+    """生成一个用户一天的记录，追加到 rows 中各表的列表"""
+    stamp = lambda hour, minute=0: datetime.combine(day, dtime(hour, minute))  # noqa: E731
+    hr = HealthRecord.__table__
+
+    weight = round(base_weight + rng.uniform(-0.8, 0.8), 1)
+    rows['health_records'].append({
+        'id': ids.take(hr), 'user_id': uid, 'record_date': day, 'record_type': 'health',
+        'weight': weight, 'height': height, 'bmi': round(weight / (height / 100) ** 2, 1),
+        'blood_pressure_systolic': rng.randint(105, 145), 'blood_pressure_diastolic': rng.randint(65, 95),
+        'heart_rate': rng.randint(58, 95), 'blood_sugar': round(rng.uniform(4.2, 7.5), 1),
+        'body_fat': round(rng.uniform(15, 32), 1), 'sleep_hours': round(rng.uniform(5, 9), 1),
+        'steps': rng.randint(2000, 16000), 'created_at': stamp(7), 'updated_at': stamp(7)
+    })
+
+    for meal_type, hour in MEALS:
+        chosen = rng.sample(foods, rng.randint(1, 3))
+        record_id = ids.take(DietRecord.__table__)
+        total = 0.0
+        for food in chosen:
+            amount = float(rng.choice([50, 100, 150, 200, 250]))
+            calories = round(food['calories'] * amount / 100, 1)
+            total += calories
+            rows['diet_record_items'].append({
+                'id': ids.take(DietRecordItem.__table__), 'diet_record_id': record_id, 'food_id': food['id'],
+                'amount': amount, 'calories': calories, 'created_at': stamp(hour)
+            })
+        rows['diet_records'].append({
+            'id': record_id, 'user_id': uid, 'record_date': day, 'meal_type': meal_type,
+            'total_calories': round(total, 1), 'created_at': stamp(hour), 'updated_at': stamp(hour)
+        })
+        rows['health_records'].append({
+            'id': ids.take(hr), 'user_id': uid, 'record_date': day, 'record_type': 'diet',
+            'meal_type': meal_type, 'food_name': chosen[0]['name'],
+            'food_amount': float(rng.choice([100, 150, 200, 300])),
+            'created_at': stamp(hour, 30), 'updated_at': stamp(hour, 30)
+        })
+
+    exercise_name = rng.choice(list(exercise_ids))
+    duration = rng.randint(15, 90)
+    calories_burned = round(CALORIES_PER_HOUR[exercise_name] * duration / 60, 1)
+    intensity = rng.choice(INTENSITIES)
+    rows['exercise_records'].append({
+        'id': ids.take(ExerciseRecord.__table__), 'user_id': uid, 'exercise_type_id': exercise_ids[exercise_name],
+        'record_date': day, 'duration': duration, 'calories_burned': calories_burned, 'intensity': intensity,
+        'heart_rate_avg': rng.randint(100, 150), 'created_at': stamp(19), 'updated_at': stamp(19)
+    })
+    rows['health_records'].append({
+        'id': ids.take(hr), 'user_id': uid, 'record_date': day, 'record_type': 'exercise',
+        'exercise_type': exercise_name, 'duration': duration, 'intensity': intensity,
+        'calories_burned': calories_burned, 'distance': round(rng.uniform(0, 10), 1),
+        'created_at': stamp(19, 30), 'updated_at': stamp(19, 30)
+    })
+
+    for n in range(rng.randint(2, 4)):
+        hour = 9 + n * 3
+        amount = rng.choice([150, 200, 250, 300, 500])
+        water_type = rng.choice(WATER_TYPES)
+        rows['water_intakes'].append({
+            'id': ids.take(WaterIntake.__table__), 'user_id': uid, 'record_date': day, 'amount': amount,
+            'intake_time': stamp(hour), 'water_type': water_type, 'created_at': stamp(hour), 'updated_at': stamp(hour)
+        })
+        rows['health_records'].append({
+            'id': ids.take(hr), 'user_id': uid, 'record_date': day, 'record_type': 'water',
+            'water_amount': amount, 'water_type': water_type, 'intake_time': dtime(hour, 5),
+            'created_at': stamp(hour, 5), 'updated_at': stamp(hour, 5)
+        })
+
+    if on_medication:
+        name, _, dosage, unit = on_medication
+        rows['medication_records'].append({
+            'id': ids.take(MedicationRecord.__table__), 'user_id': uid, 'medication_type_id': medication_ids[name],
+            'record_date': day, 'time_taken': dtime(8, 0), 'dosage': dosage, 'dosage_unit': unit,
+            'frequency': '每日一次', 'with_food': True, 'created_at': stamp(8), 'updated_at': stamp(8)
+        })
+        rows['health_records'].append({
+            'id': ids.take(hr), 'user_id': uid, 'record_date': day, 'record_type': 'medication',
+            'medication_name': name, 'dosage': dosage, 'dosage_unit': unit, 'frequency': '每日一次',
+            'time_taken': dtime(8, 0), 'with_food': True, 'created_at': stamp(8, 5), 'updated_at': stamp(8, 5)
+        })
+
+
+def generate(engine, users=10, days=30, rng=None, shares_per_user=5, end_date=None):
+    """
+    写入模拟数据
+
+    参数:
+        engine: 数据库引擎（表结构需已存在）
+        users: 用户数
+        days: 每个用户的记录天数（截至 end_date）
+        rng: random.Random 实例，固定种子可得到相同数据
+        shares_per_user: 每个用户的分享数
+        end_date: 最后一天，默认今天
+
+    返回:
+        {'user_ids': [...], 'counts': {表名: 行数}}
+    """
+    rng = rng or random.Random(42)
+    end_date = end_date or date.today()
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(DEFAULT_PASSWORD, method='pbkdf2:sha256')
+    rows = {name: [] for name in ('users', 'health_records', 'diet_records', 'diet_record_items',
+                                  'exercise_records', 'water_intakes', 'medication_records',
+                                  'reminders', 'shares', 'likes', 'comments')}
+
+    with engine.begin() as conn:
+        ids = _IdAllocator(conn)
+        food_rows = [{'name': f[0], 'category': f[1], 'calories': f[2], 'protein': f[3], 'fat': f[4],
+                      'carbohydrate': f[5], 'fiber': f[6], 'sugar': f[7], 'sodium': f[8], 'serving_size': 100}
+                     for f in FOODS]
+        food_ids = _lookup_or_insert(conn, ids, Food.__table__, food_rows)
+        foods = [{'id': food_ids[f[0]], 'name': f[0], 'calories': f[2]} for f in FOODS]
+        exercise_ids = _lookup_or_insert(conn, ids, ExerciseType.__table__, [
+            {'name': name, 'category': category, 'calories_per_hour': cph} for name, category, cph in EXERCISES])
+        medication_ids = _lookup_or_insert(conn, ids, MedicationType.__table__, [
+            {'name': name, 'category': category, 'common_dosage': f'{dosage}{unit}', 'created_at': now,
+             'updated_at': now} for name, category, dosage, unit in MEDICATIONS])
+
+        user_ids = []
+        for _ in range(users):
+            uid = ids.take(User.__table__)
+            user_ids.append(uid)
+            height = round(rng.uniform(155, 190), 1)
+            base_weight = round(rng.uniform(50, 95), 1)
+            rows['users'].append({
+                'id': uid, 'username': f'seed_user_{uid}', 'email': f'seed_user_{uid}@example.com',
+                'password_hash': password_hash, 'height': height, 'weight': base_weight,
+                'gender': rng.choice(['男', '女']), 'created_at': now, 'updated_at': now
+            })
+            on_medication = MEDICATIONS[uid % len(MEDICATIONS)] if uid % 3 == 0 else None
+            for offset in range(days):
+                day = end_date - timedelta(days=days - 1 - offset)
+                _user_days(rng, uid, day, base_weight, height, on_medication, ids, rows,
+                           foods, exercise_ids, medication_ids)
+
+            reminder_rows = [('medication', '服药提醒', dtime(8, 0), 'daily'),
+                             ('medication', '晚间服药', dtime(21, 0), 'daily'),
+                             ('appointment', '复查预约', dtime(10, 30), None)]
+            for reminder_type, title, at, recurrence in reminder_rows:
+                reminder_date = end_date + timedelta(days=rng.randint(0, 7))
+                rows['reminders'].append({
+                    'id': ids.take(Reminder.__table__), 'user_id': uid, 'reminder_type': reminder_type,
+                    'title': title, 'reminder_date': reminder_date,
+                    'reminder_time': at, 'recurrence': recurrence, 'is_completed': False,
+                    'next_fire_at': datetime.combine(reminder_date, at),
+                    'created_at': now, 'updated_at': now
+                })
+
+        # content_type='health_record' 的分享只能指向 record_type='health' 的记录
+        health_ids = {}
+        for row in rows['health_records']:
+            if row['record_type'] == 'health':
+                health_ids.setdefault(row['user_id'], []).append(row['id'])
+        for uid in user_ids:
+            for n in range(shares_per_user):
+                share_id = ids.take(Share.__table__)
+                created = now - timedelta(hours=rng.randint(0, days * 24))
+                share = {
+                    'id': share_id, 'user_id': uid, 'content_type': 'health_record',
+                    'content_id': rng.choice(health_ids[uid]) if health_ids.get(uid) else 0,
+                    'description': f'今天的健康打卡 #{n + 1}', 'visibility': rng.choice(['public'] * 4 + ['private']),
+                    'created_at': created, 'updated_at': created
+                }
+                rows['shares'].append(share)
+                others = [other for other in user_ids if other != uid]
+                likers = rng.sample(others, min(len(others), rng.randint(0, 5)))
+                for liker in likers:
+                    rows['likes'].append({'id': ids.take(Like.__table__), 'user_id': liker,
+                                          'share_id': share_id, 'created_at': created})
+                share['like_count'] = len(likers)
+                parent_ids = []
+                share['comment_count'] = rng.randint(0, 4)
+                for c in range(share['comment_count']):
+                    comment_id = ids.take(Comment.__table__)
+                    parent_id = rng.choice(parent_ids) if parent_ids and rng.random() < 0.4 else None
+                    rows['comments'].append({
+                        'id': comment_id, 'user_id': rng.choice(user_ids), 'share_id': share_id,
+                        'content': f'评论 {c + 1}', 'parent_id': parent_id, 'created_at': created, 'updated_at': created
+                    })
+                    if parent_id is None:
+                        parent_ids.append(comment_id)
+
+        # 按外键依赖顺序写入
+        tables = [User, DietRecord, DietRecordItem, HealthRecord, ExerciseRecord, WaterIntake,
+                  MedicationRecord, Reminder, Share, Like, Comment]
+        counts = {}
+        for model in tables:
+            table = model.__table__
+            # 不同类型的记录填写的列不同，批量插入要求每行的键一致，缺少的列补 NULL
+            columns = {key for row in rows[table.name] for key in row}
+            table_rows = [{key: row.get(key) for key in columns} for row in rows[table.name]]
+            for chunk in _chunks(table_rows):
+                conn.execute(table.insert(), chunk)
+            counts[table.name] = len(table_rows)
+
+        for uid in user_ids:
+            RollupService.backfill(conn, user_id=uid)
+            TimelineService.rebuild(conn, author_id=uid)
+    return {'user_ids': user_ids, 'counts': counts}
@@ -1,5 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import text
+import logging
+
+logger = logging.getLogger(__name__)
 
 # 创建SQLAlchemy实例
 db = SQLAlchemy()
@@ -14,19 +17,61 @@ def init_db(app):
     # 确保数据库和表已创建
     with app.app_context():
         # 导入所有模型以确保它们被注册到元数据
-        from models.user import User
-        from models.health_record import HealthRecord
-        from models.diet_record import DietRecord, Food, DietRecordItem
-        from models.health_goal import HealthGoal
-        from models.medication_record import MedicationType, MedicationRecord
-        from models.exercise import ExerciseType, ExerciseRecord
-        from models.water_intake import WaterIntake
-        from models.health_report import HealthReport, Reminder
-        from models.social import Share, Like, Comment
+        import_models()
         
         # 创建所有表
         db.create_all()
-        print("数据库表已创建/更新")
+        logger.info("数据库表已创建/更新")
+    
+    register_listeners()
+
+
+def init_worker_db(app):
+    """后台工作进程的数据库初始化：只注册模型和监听器，不建表（由主进程的 init_db 和迁移负责）"""
+    db.init_app(app)
+    import_models()
+    register_listeners()
+
+
+def import_models():
+    """导入所有模型以确保它们被注册到元数据"""
+    from models.user import User
+    from models.health_record import HealthRecord
+    from models.diet_record import DietRecord, Food, DietRecordItem
+    from models.health_goal import HealthGoal
+    from models.medication_record import MedicationType, MedicationRecord
+    from models.exercise import ExerciseType, ExerciseRecord
+    from models.water_intake import WaterIntake
+    from models.health_report import HealthReport, Reminder, ReportJob, ReportBatch
+    from models.social import Share, Like, Comment, TimelineEntry, TrendingState
+    from models.daily_rollup import DailyUserRollup, ReportPartial
+
+
+def register_listeners():
+    """注册维护派生数据（汇总表、时间线、缓存等）的 ORM 事件监听器"""
+    # 记录的增删改在同一事务内刷新每日汇总表
+    from services.rollup_service import register_rollup_listeners
+    register_rollup_listeners()
+    
+    # 记录的增删改删除受影响周期的报告部分聚合
+    from services.report_aggregates import register_report_partial_listeners
+    register_report_partial_listeners()
+    
+    # 提醒的日期、时间或状态变化时更新下一次触发时间并通知提醒调度器
+    from services.reminder_scheduler import register_reminder_listeners
+    register_reminder_listeners()
+    
+    # 分享的增删和可见性修改在同一事务内同步到时间线
+    from services.timeline_service import register_timeline_listeners
+    register_timeline_listeners()
+    
+    # 被分享的内容增删后使分享有效性缓存失效
+    from services.share_validity_service import register_share_validity_listeners
+    register_share_validity_listeners()
+    
+    # 记录提交后使相应用户的仪表盘缓存失效
+    from services.dashboard_service import register_dashboard_cache_listeners
+    register_dashboard_cache_listeners()
         
 def update_password_hash_field(app):
     """修改users表的password_hash字段长度为255"""
@@ -34,7 +79,7 @@ def update_password_hash_field(app):
         try:
             db.session.execute(text("ALTER TABLE users MODIFY password_hash VARCHAR(255)"))
             db.session.commit()
-            print("密码哈希字段已更新为VARCHAR(255)")
+            logger.info("密码哈希字段已更新为VARCHAR(255)")
         except Exception as e:
             db.session.rollback()
-            print(f"更新密码哈希字段失败: {e}") 
\ No newline at end of file
+            logger.error("更新密码哈希字段失败: %s", e)
\ No newline at end of file
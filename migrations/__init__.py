@@ -0,0 +1,108 @@
+"""
+版本化数据库迁移
+
+每个迁移是 migrations/versions/ 下形如 ``0001_xxx.py`` 的模块，需提供：
+    - ``description``: 简短说明
+    - ``upgrade(conn)``: 升级操作
+    - ``downgrade(conn)``: 回滚操作
+
+已执行的版本记录在 ``schema_migrations`` 表中。迁移应当是幂等的
+（例如建索引前先检查是否存在），这样对由 db.create_all() 新建的库执行也不会出错。
+"""
+import importlib
+import logging
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), 'versions')
+_VERSION_PATTERN = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', String(20), primary_key=True),
+    Column('description', String(200)),
+    Column('applied_at', DateTime, default=datetime.utcnow)
+)
+
+
+def discover_migrations():
+    """按版本号顺序返回所有迁移模块 [(version, module), ...]"""
+    migrations = []
+    for filename in sorted(os.listdir(VERSIONS_DIR)):
+        match = _VERSION_PATTERN.match(filename)
+        if not match:
+            continue
+        module = importlib.import_module(f"migrations.versions.{filename[:-3]}")
+        migrations.append((match.group(1), module))
+    return migrations
+
+
+def get_applied_versions(engine):
+    """返回已执行的迁移版本集合"""
+    _metadata.create_all(engine, tables=[schema_migrations])
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(select(schema_migrations.c.version))}
+
+
+def upgrade(engine, target=None):
+    """
+    执行所有未应用的迁移（直到 target 版本，含）
+
+    返回:
+        本次执行的版本列表
+    """
+    applied = get_applied_versions(engine)
+    executed = []
+    for version, module in discover_migrations():
+        if target is not None and version > target:
+            break
+        if version in applied:
+            continue
+        logger.info("执行迁移 %s: %s", version, module.description)
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                description=module.description,
+                applied_at=datetime.utcnow()
+            ))
+        executed.append(version)
+    return executed
+
+
+def downgrade(engine, target):
+    """
+    回滚所有版本号大于 target 的已执行迁移（target 为 '0000' 时全部回滚）
+
+    返回:
+        本次回滚的版本列表
+    """
+    applied = get_applied_versions(engine)
+    reverted = []
+    for version, module in reversed(discover_migrations()):
+        if version <= target or version not in applied:
+            continue
+        logger.info("回滚迁移 %s: %s", version, module.description)
+        with engine.begin() as conn:
+            module.downgrade(conn)
+            conn.execute(schema_migrations.delete().where(schema_migrations.c.version == version))
+        reverted.append(version)
+    return reverted
+
+
+def run_migrations(app):
+    """应用启动时执行未应用的迁移，失败时只记录日志，不阻止启动"""
+    from database import db
+    with app.app_context():
+        try:
+            executed = upgrade(db.engine)
+            if executed:
+                logger.info("已执行数据库迁移: %s", ', '.join(executed))
+        except Exception as e:
+            logger.error("执行数据库迁移失败: %s", e)
@@ -0,0 +1,36 @@
+"""为记录列表/统计查询添加 (user_id, 日期, ...) 复合索引"""
+from sqlalchemy import Index, MetaData, Table, inspect
+
+description = '记录表复合索引'
+
+# (表名, 索引名, 列)
+INDEXES = [
+    ('health_records', 'ix_health_records_user_type_date', ('user_id', 'record_type', 'record_date', 'created_at')),
+    ('health_records', 'ix_health_records_user_date', ('user_id', 'record_date', 'created_at')),
+    ('water_intakes', 'ix_water_intakes_user_date', ('user_id', 'record_date', 'intake_time')),
+    ('diet_records', 'ix_diet_records_user_date', ('user_id', 'record_date', 'created_at')),
+    ('exercise_records', 'ix_exercise_records_user_date', ('user_id', 'record_date', 'created_at')),
+    ('reminders', 'ix_reminders_user_date', ('user_id', 'reminder_date', 'reminder_time')),
+]
+
+
+def _existing_indexes(conn, table_name):
+    return {index['name'] for index in inspect(conn).get_indexes(table_name)}
+
+
+def upgrade(conn):
+    tables = set(inspect(conn).get_table_names())
+    for table_name, index_name, columns in INDEXES:
+        if table_name not in tables or index_name in _existing_indexes(conn, table_name):
+            continue
+        table = Table(table_name, MetaData(), autoload_with=conn)
+        Index(index_name, *[table.c[column] for column in columns]).create(conn)
+
+
+def downgrade(conn):
+    tables = set(inspect(conn).get_table_names())
+    for table_name, index_name, columns in INDEXES:
+        if table_name not in tables or index_name not in _existing_indexes(conn, table_name):
+            continue
+        table = Table(table_name, MetaData(), autoload_with=conn)
+        Index(index_name, *[table.c[column] for column in columns]).drop(conn)
@@ -0,0 +1,17 @@
+"""新增 daily_user_rollups 每日汇总表并从现有记录回填"""
+from sqlalchemy import inspect
+
+description = '每日汇总表'
+
+
+def upgrade(conn):
+    from models.daily_rollup import DailyUserRollup
+    from services.rollup_service import RollupService
+
+    DailyUserRollup.__table__.create(conn, checkfirst=True)
+    RollupService.backfill(conn)
+
+
+def downgrade(conn):
+    if 'daily_user_rollups' in inspect(conn).get_table_names():
+        conn.exec_driver_sql('DROP TABLE daily_user_rollups')
@@ -0,0 +1,26 @@
+"""为 diet_record_items.diet_record_id 添加索引，饮食记录连接记录项时不再全表扫描"""
+from sqlalchemy import Index, MetaData, Table, inspect
+
+description = '饮食记录项外键索引'
+
+TABLE_NAME = 'diet_record_items'
+INDEX_NAME = 'ix_diet_record_items_record'
+
+
+def upgrade(conn):
+    if TABLE_NAME not in inspect(conn).get_table_names():
+        return
+    # MySQL 会为外键自动建立索引，已有以 diet_record_id 开头的索引时无需重复创建
+    for index in inspect(conn).get_indexes(TABLE_NAME):
+        if index['column_names'][:1] == ['diet_record_id']:
+            return
+    table = Table(TABLE_NAME, MetaData(), autoload_with=conn)
+    Index(INDEX_NAME, table.c.diet_record_id).create(conn)
+
+
+def downgrade(conn):
+    if TABLE_NAME not in inspect(conn).get_table_names():
+        return
+    if INDEX_NAME in {index['name'] for index in inspect(conn).get_indexes(TABLE_NAME)}:
+        table = Table(TABLE_NAME, MetaData(), autoload_with=conn)
+        Index(INDEX_NAME, table.c.diet_record_id).drop(conn)
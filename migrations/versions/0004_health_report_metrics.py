@@ -0,0 +1,26 @@
+"""为 health_reports 添加 metrics JSON 列，保存报告的结构化指标"""
+from sqlalchemy import inspect
+
+description = '健康报告结构化指标列'
+
+TABLE_NAME = 'health_reports'
+COLUMN_NAME = 'metrics'
+
+
+def _columns(conn):
+    return {column['name'] for column in inspect(conn).get_columns(TABLE_NAME)}
+
+
+def upgrade(conn):
+    if TABLE_NAME not in inspect(conn).get_table_names():
+        return
+    if COLUMN_NAME not in _columns(conn):
+        # 旧报告没有结构化指标，保持 NULL
+        conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} ADD COLUMN {COLUMN_NAME} JSON')
+
+
+def downgrade(conn):
+    if TABLE_NAME not in inspect(conn).get_table_names():
+        return
+    if COLUMN_NAME in _columns(conn):
+        conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} DROP COLUMN {COLUMN_NAME}')
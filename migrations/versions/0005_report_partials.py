@@ -0,0 +1,15 @@
+"""新增 report_partials 表，保存报告按周/月的可合并部分聚合（生成报告时按需填充，无需回填）"""
+from sqlalchemy import inspect
+
+description = '报告部分聚合表'
+
+
+def upgrade(conn):
+    from models.daily_rollup import ReportPartial
+
+    ReportPartial.__table__.create(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    if 'report_partials' in inspect(conn).get_table_names():
+        conn.exec_driver_sql('DROP TABLE report_partials')
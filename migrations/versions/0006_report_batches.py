@@ -0,0 +1,15 @@
+"""新增 report_batches 表，记录批量生成报告的运行结果"""
+from sqlalchemy import inspect
+
+description = '批量报告运行记录表'
+
+
+def upgrade(conn):
+    from models.health_report import ReportBatch
+
+    ReportBatch.__table__.create(conn, checkfirst=True)
+
+
+def downgrade(conn):
+    if 'report_batches' in inspect(conn).get_table_names():
+        conn.exec_driver_sql('DROP TABLE report_batches')
@@ -0,0 +1,49 @@
+"""为 reminders 添加 next_fire_at / last_fired_at 列和触发时间索引，并为未完成的提醒回填下一次触发时间"""
+from datetime import datetime
+
+from sqlalchemy import Index, MetaData, Table, bindparam, inspect, select
+
+description = '提醒调度触发时间'
+
+TABLE_NAME = 'reminders'
+INDEX_NAME = 'ix_reminders_next_fire'
+COLUMNS = ('next_fire_at', 'last_fired_at')
+
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    if TABLE_NAME not in inspector.get_table_names():
+        return
+    existing = {column['name'] for column in inspector.get_columns(TABLE_NAME)}
+    for column in COLUMNS:
+        if column not in existing:
+            conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} ADD COLUMN {column} DATETIME')
+
+    table = Table(TABLE_NAME, MetaData(), autoload_with=conn)
+    if INDEX_NAME not in {index['name'] for index in inspect(conn).get_indexes(TABLE_NAME)}:
+        Index(INDEX_NAME, table.c.next_fire_at, table.c.id).create(conn)
+
+    # 首次触发时间为提醒日期 + 时间；已过期的重复提醒由调度器在加载时顺延
+    rows = conn.execute(select(table.c.id, table.c.reminder_date, table.c.reminder_time).where(
+        table.c.next_fire_at.is_(None),
+        (table.c.is_completed.is_(None)) | (table.c.is_completed == False)  # noqa: E712
+    )).all()
+    if rows:
+        conn.execute(
+            table.update().where(table.c.id == bindparam('reminder_id')).values(next_fire_at=bindparam('fire_at')),
+            [{'reminder_id': row.id, 'fire_at': datetime.combine(row.reminder_date, row.reminder_time)}
+             for row in rows]
+        )
+
+
+def downgrade(conn):
+    inspector = inspect(conn)
+    if TABLE_NAME not in inspector.get_table_names():
+        return
+    if INDEX_NAME in {index['name'] for index in inspector.get_indexes(TABLE_NAME)}:
+        conn.exec_driver_sql(f'DROP INDEX {INDEX_NAME} ON {TABLE_NAME}' if conn.dialect.name == 'mysql'
+                             else f'DROP INDEX {INDEX_NAME}')
+    existing = {column['name'] for column in inspector.get_columns(TABLE_NAME)}
+    for column in COLUMNS:
+        if column in existing:
+            conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} DROP COLUMN {column}')
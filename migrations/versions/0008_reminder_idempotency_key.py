@@ -0,0 +1,60 @@
+"""为 reminders 添加自动生成提醒的幂等键和 (user_id, idempotency_key) 唯一索引，并为已有的自动生成药物提醒回填"""
+import json
+
+from sqlalchemy import Index, MetaData, Table, bindparam, inspect, select
+
+description = '提醒幂等键'
+
+TABLE_NAME = 'reminders'
+INDEX_NAME = 'uq_reminders_user_idempotency'
+
+
+def upgrade(conn):
+    # 延迟导入：键的格式与生成提醒的服务保持一致
+    from services.health_report_service import medication_reminder_key
+
+    inspector = inspect(conn)
+    if TABLE_NAME not in inspector.get_table_names():
+        return
+    if 'idempotency_key' not in {column['name'] for column in inspector.get_columns(TABLE_NAME)}:
+        conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} ADD COLUMN idempotency_key VARCHAR(64)')
+    table = Table(TABLE_NAME, MetaData(), autoload_with=conn)
+    if INDEX_NAME in {index['name'] for index in inspect(conn).get_indexes(TABLE_NAME)}:
+        return
+
+    # 根据备注中的药物记录信息回填键；同一用户同一天同一药物的重复提醒只有最早的一条获得键
+    rows = conn.execute(select(table.c.id, table.c.user_id, table.c.reminder_date, table.c.notes).where(
+        table.c.reminder_type == 'medication',
+        table.c.idempotency_key.is_(None),
+        table.c.notes.like('%medication_record_info%')
+    ).order_by(table.c.id)).all()
+    seen = set()
+    updates = []
+    for row in rows:
+        try:
+            info = json.loads(row.notes)['medication_record_info']
+        except (ValueError, KeyError, TypeError):
+            continue
+        key = medication_reminder_key(row.reminder_date, info.get('name'))
+        if (row.user_id, key) in seen:
+            continue
+        seen.add((row.user_id, key))
+        updates.append({'reminder_id': row.id, 'key': key})
+    if updates:
+        conn.execute(
+            table.update().where(table.c.id == bindparam('reminder_id')).values(idempotency_key=bindparam('key')),
+            updates
+        )
+
+    Index(INDEX_NAME, table.c.user_id, table.c.idempotency_key, unique=True).create(conn)
+
+
+def downgrade(conn):
+    inspector = inspect(conn)
+    if TABLE_NAME not in inspector.get_table_names():
+        return
+    if INDEX_NAME in {index['name'] for index in inspector.get_indexes(TABLE_NAME)}:
+        conn.exec_driver_sql(f'DROP INDEX {INDEX_NAME} ON {TABLE_NAME}' if conn.dialect.name == 'mysql'
+                             else f'DROP INDEX {INDEX_NAME}')
+    if 'idempotency_key' in {column['name'] for column in inspector.get_columns(TABLE_NAME)}:
+        conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} DROP COLUMN idempotency_key')
@@ -0,0 +1,45 @@
+"""为 shares 添加 like_count / comment_count 计数列，并按现有点赞和评论回填"""
+from sqlalchemy import MetaData, Table, func, inspect, select
+
+description = '分享点赞数和评论数计数列'
+
+TABLE_NAME = 'shares'
+COLUMNS = ('like_count', 'comment_count')
+
+
+def _columns(conn):
+    return {column['name'] for column in inspect(conn).get_columns(TABLE_NAME)}
+
+
+def upgrade(conn):
+    tables = inspect(conn).get_table_names()
+    if TABLE_NAME not in tables:
+        return
+    added = [column for column in COLUMNS if column not in _columns(conn)]
+    for column in added:
+        conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+    if not added:
+        return
+
+    metadata = MetaData()
+    shares = Table(TABLE_NAME, metadata, autoload_with=conn)
+    values = {}
+    if 'likes' in tables:
+        likes = Table('likes', metadata, autoload_with=conn)
+        values['like_count'] = select(func.count()).where(likes.c.share_id == shares.c.id).scalar_subquery()
+    if 'comments' in tables:
+        comments = Table('comments', metadata, autoload_with=conn)
+        values['comment_count'] = select(func.count()).where(comments.c.share_id == shares.c.id).scalar_subquery()
+    values = {column: value for column, value in values.items() if column in added}
+    if values:
+        # 不修改 updated_at
+        values['updated_at'] = shares.c.updated_at
+        conn.execute(shares.update().values(**values))
+
+
+def downgrade(conn):
+    if TABLE_NAME not in inspect(conn).get_table_names():
+        return
+    for column in COLUMNS:
+        if column in _columns(conn):
+            conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} DROP COLUMN {column}')
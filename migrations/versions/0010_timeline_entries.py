@@ -0,0 +1,20 @@
+"""新增 timeline_entries 时间线表，并从现有分享生成时间线"""
+from sqlalchemy import func, inspect, select
+
+description = '分享时间线表'
+
+
+def upgrade(conn):
+    from models.social import TimelineEntry
+    from services.timeline_service import TimelineService
+
+    table = TimelineEntry.__table__
+    table.create(conn, checkfirst=True)
+    # 表可能已由 db.create_all() 建好但为空，此时同样需要从 shares 生成
+    if 'shares' in inspect(conn).get_table_names() and not conn.execute(select(func.count()).select_from(table)).scalar():
+        TimelineService.rebuild(conn)
+
+
+def downgrade(conn):
+    if 'timeline_entries' in inspect(conn).get_table_names():
+        conn.exec_driver_sql('DROP TABLE timeline_entries')
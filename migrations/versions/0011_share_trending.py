@@ -0,0 +1,60 @@
+"""为 shares 添加 trending_score 热门分数列和索引，新增 trending_state 表，并按现有点赞和评论回填分数"""
+from datetime import datetime
+
+from sqlalchemy import Index, MetaData, Table, bindparam, inspect, select
+
+description = '分享热门分数'
+
+TABLE_NAME = 'shares'
+COLUMN_NAME = 'trending_score'
+INDEX_NAME = 'ix_shares_trending'
+BATCH_SIZE = 1000
+
+
+def upgrade(conn):
+    from models.social import COMMENT_SCORE, LIKE_SCORE, NEW_SHARE_SCORE, TrendingState
+    from services.trending_service import MIN_SCORE, STATE_ID, decay_factor
+
+    inspector = inspect(conn)
+    if TABLE_NAME not in inspector.get_table_names():
+        return
+    added = COLUMN_NAME not in {column['name'] for column in inspector.get_columns(TABLE_NAME)}
+    if added:
+        conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} ADD COLUMN {COLUMN_NAME} FLOAT NOT NULL DEFAULT 0')
+    table = Table(TABLE_NAME, MetaData(), autoload_with=conn)
+    if INDEX_NAME not in {index['name'] for index in inspect(conn).get_indexes(TABLE_NAME)}:
+        Index(INDEX_NAME, table.c.visibility, table.c.trending_score, table.c.id).create(conn)
+
+    TrendingState.__table__.create(conn, checkfirst=True)
+    now = datetime.utcnow()
+    if conn.execute(select(TrendingState.id).where(TrendingState.id == STATE_ID)).first() is None:
+        conn.execute(TrendingState.__table__.insert().values(id=STATE_ID, decayed_at=now))
+
+    if not added:
+        return
+    # 没有逐条互动时间，按分享的发布时间近似衰减现有的点赞和评论
+    rows = conn.execute(select(table.c.id, table.c.like_count, table.c.comment_count, table.c.created_at)).all()
+    updates = []
+    for row in rows:
+        age = (now - row.created_at).total_seconds() if row.created_at else 0
+        score = (NEW_SHARE_SCORE + (row.like_count or 0) * LIKE_SCORE + (row.comment_count or 0) * COMMENT_SCORE) \
+            * decay_factor(max(age, 0))
+        if score >= MIN_SCORE:
+            updates.append({'share_id': row.id, 'score': score})
+    statement = table.update().where(table.c.id == bindparam('share_id')).values(
+        trending_score=bindparam('score'), updated_at=table.c.updated_at)
+    for i in range(0, len(updates), BATCH_SIZE):
+        conn.execute(statement, updates[i:i + BATCH_SIZE])
+
+
+def downgrade(conn):
+    inspector = inspect(conn)
+    if 'trending_state' in inspector.get_table_names():
+        conn.exec_driver_sql('DROP TABLE trending_state')
+    if TABLE_NAME not in inspector.get_table_names():
+        return
+    if INDEX_NAME in {index['name'] for index in inspector.get_indexes(TABLE_NAME)}:
+        conn.exec_driver_sql(f'DROP INDEX {INDEX_NAME} ON {TABLE_NAME}' if conn.dialect.name == 'mysql'
+                             else f'DROP INDEX {INDEX_NAME}')
+    if COLUMN_NAME in {column['name'] for column in inspector.get_columns(TABLE_NAME)}:
+        conn.exec_driver_sql(f'ALTER TABLE {TABLE_NAME} DROP COLUMN {COLUMN_NAME}')
@@ -0,0 +1,89 @@
+from database import db
+from datetime import datetime
+
+class DailyUserRollup(db.Model):
+    """用户每日汇总表，由 health_records / water_intakes 的写操作增量维护"""
+    __tablename__ = 'daily_user_rollups'
+    __table_args__ = {'extend_existing': True}
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    record_count = db.Column(db.Integer, nullable=False, default=0)  # 当天健康记录总数
+
+    # 饮食
+    diet_count = db.Column(db.Integer, nullable=False, default=0)
+    diet_food_amount = db.Column(db.Float, nullable=False, default=0)  # 食物总量（克）
+    diet_calories = db.Column(db.Float, nullable=False, default=0)  # 摄入热量（大卡）
+
+    # 运动
+    exercise_count = db.Column(db.Integer, nullable=False, default=0)
+    exercise_minutes = db.Column(db.Integer, nullable=False, default=0)
+    exercise_calories = db.Column(db.Float, nullable=False, default=0)  # 消耗热量（大卡）
+
+    # 饮水（health_records 中的饮水记录）
+    water_count = db.Column(db.Integer, nullable=False, default=0)
+    water_amount = db.Column(db.Integer, nullable=False, default=0)  # 毫升
+
+    # 饮水（water_intakes 表）
+    intake_count = db.Column(db.Integer, nullable=False, default=0)
+    intake_amount = db.Column(db.Integer, nullable=False, default=0)  # 毫升
+
+    medication_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # 健康指标：保存和与非零值个数，区间平均值 = 各天之和 / 各天个数之和
+    health_count = db.Column(db.Integer, nullable=False, default=0)
+    steps_sum = db.Column(db.Integer, nullable=False, default=0)
+    steps_count = db.Column(db.Integer, nullable=False, default=0)
+    weight_sum = db.Column(db.Float, nullable=False, default=0)
+    weight_count = db.Column(db.Integer, nullable=False, default=0)
+    bp_systolic_sum = db.Column(db.Integer, nullable=False, default=0)
+    bp_systolic_count = db.Column(db.Integer, nullable=False, default=0)
+    bp_diastolic_sum = db.Column(db.Integer, nullable=False, default=0)
+    bp_diastolic_count = db.Column(db.Integer, nullable=False, default=0)
+    heart_rate_sum = db.Column(db.Integer, nullable=False, default=0)
+    heart_rate_count = db.Column(db.Integer, nullable=False, default=0)
+    blood_sugar_sum = db.Column(db.Float, nullable=False, default=0)
+    blood_sugar_count = db.Column(db.Integer, nullable=False, default=0)
+    sleep_hours_sum = db.Column(db.Float, nullable=False, default=0)
+    sleep_hours_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # 当天最后一次记录的体重/血压
+    latest_weight = db.Column(db.Float, nullable=True)
+    latest_bp_systolic = db.Column(db.Integer, nullable=True)
+    latest_bp_diastolic = db.Column(db.Integer, nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'date': self.date.isoformat(),
+            'record_count': self.record_count,
+            'diet_calories': self.diet_calories,
+            'diet_food_amount': self.diet_food_amount,
+            'exercise_minutes': self.exercise_minutes,
+            'exercise_calories': self.exercise_calories,
+            'water_amount': self.water_amount,
+            'intake_amount': self.intake_amount,
+            'steps': self.steps_sum,
+            'latest_weight': self.latest_weight,
+            'latest_bp_systolic': self.latest_bp_systolic,
+            'latest_bp_diastolic': self.latest_bp_diastolic
+        }
+
+
+class ReportPartial(db.Model):
+    """
+    报告用的可合并部分聚合，每个用户每个 ISO 周 / 自然月一行
+
+    只保存已经结束的周期，内容格式见 services/report_aggregates.py。
+    周期内的记录发生增删改时删除对应行，下次生成报告时重新计算。
+    """
+    __tablename__ = 'report_partials'
+    __table_args__ = {'extend_existing': True}
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)  # week / month
+    period_start = db.Column(db.Date, primary_key=True)  # 周一 / 每月1日
+    data = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
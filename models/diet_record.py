@@ -39,7 +39,10 @@ class Food(db.Model):
 class DietRecord(db.Model):
     """饮食记录表，记录用户每天的饮食情况"""
     __tablename__ = 'diet_records'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_diet_records_user_date', 'user_id', 'record_date', 'created_at'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -69,7 +72,10 @@ class DietRecord(db.Model):
 class DietRecordItem(db.Model):
     """饮食记录项，记录每次饮食中具体的食物及其数量"""
     __tablename__ = 'diet_record_items'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_diet_record_items_record', 'diet_record_id'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     diet_record_id = db.Column(db.Integer, db.ForeignKey('diet_records.id'), nullable=False)
@@ -31,7 +31,10 @@ class ExerciseType(db.Model):
 class ExerciseRecord(db.Model):
     """运动记录模型"""
     __tablename__ = 'exercise_records'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_exercise_records_user_date', 'user_id', 'record_date', 'created_at'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -3,7 +3,13 @@ from datetime import datetime
 
 class HealthRecord(db.Model):
     __tablename__ = 'health_records'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # 按类型列出/统计用户记录：WHERE user_id=? AND record_type=? AND record_date BETWEEN ... ORDER BY record_date, created_at
+        db.Index('ix_health_records_user_type_date', 'user_id', 'record_type', 'record_date', 'created_at'),
+        # 不区分类型的最近记录列表：WHERE user_id=? ORDER BY record_date DESC, created_at DESC
+        db.Index('ix_health_records_user_date', 'user_id', 'record_date', 'created_at'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
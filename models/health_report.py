@@ -17,6 +17,7 @@ class HealthReport(db.Model):
     exercise_summary = db.Column(db.Text)                   # 运动总结
     medication_summary = db.Column(db.Text)                 # 用药总结
     recommendations = db.Column(db.Text)                    # 健康建议
+    metrics = db.Column(db.JSON)                            # 结构化指标（services/report_metrics.py 中的 ReportMetrics）
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -37,6 +38,7 @@ class HealthReport(db.Model):
             'exercise_summary': self.exercise_summary,
             'medication_summary': self.medication_summary,
             'recommendations': self.recommendations,
+            'metrics': self.metrics,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -44,7 +46,14 @@ class HealthReport(db.Model):
 class Reminder(db.Model):
     """提醒模型（药物与预约提醒）"""
     __tablename__ = 'reminders'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_reminders_user_date', 'user_id', 'reminder_date', 'reminder_time'),
+        # 调度器按触发时间的索引范围加载到期提醒：WHERE next_fire_at <= ? ORDER BY next_fire_at, id
+        db.Index('ix_reminders_next_fire', 'next_fire_at', 'id'),
+        # 自动生成的提醒按幂等键去重，重复执行不会生成第二条；手动创建的提醒该列为空
+        db.Index('uq_reminders_user_idempotency', 'user_id', 'idempotency_key', unique=True),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -57,6 +66,9 @@ class Reminder(db.Model):
     is_completed = db.Column(db.Boolean, default=False)      # 是否已完成
     medication_record_id = db.Column(db.Integer, db.ForeignKey('medication_records.id'))  # 关联的药物记录
     notes = db.Column(db.Text)                              # 备注
+    next_fire_at = db.Column(db.DateTime)                    # 下一次触发时间（本地时间），已完成或不再触发时为空
+    last_fired_at = db.Column(db.DateTime)                   # 上一次触发时间
+    idempotency_key = db.Column(db.String(64))               # 自动生成提醒的幂等键，如 medication:2024-01-01:<药物名称摘要>
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -78,6 +90,8 @@ class Reminder(db.Model):
             'is_completed': self.is_completed,
             'medication_record_id': self.medication_record_id,
             'notes': self.notes,
+            'next_fire_at': self.next_fire_at.isoformat() if self.next_fire_at else None,
+            'last_fired_at': self.last_fired_at.isoformat() if self.last_fired_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -103,4 +117,90 @@ class Reminder(db.Model):
             Reminder.is_completed == False
         ).order_by(Reminder.reminder_time)
         
-        return query.all() 
\ No newline at end of file
+        return query.all() 
+
+
+class ReportJob(db.Model):
+    """健康报告生成任务（由后台工作线程/进程执行）"""
+    __tablename__ = 'report_jobs'
+    __table_args__ = (
+        db.Index('ix_report_jobs_user_created', 'user_id', 'created_at'),
+        db.Index('ix_report_jobs_status', 'status'),
+        {'extend_existing': True}
+    )
+    
+    id = db.Column(db.String(32), primary_key=True)                  # 任务ID（uuid4 十六进制）
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    report_type = db.Column(db.String(50), nullable=False)
+    start_date = db.Column(db.Date)                                  # 为空时按报告类型计算
+    end_date = db.Column(db.Date)
+    callback_url = db.Column(db.String(500))                         # 任务结束后 POST 通知的地址
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, succeeded, failed
+    report_id = db.Column(db.Integer, db.ForeignKey('health_reports.id'))  # 生成的报告
+    error = db.Column(db.Text)                                       # 失败原因
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        """将模型转换为字典"""
+        return {
+            'job_id': self.id,
+            'user_id': self.user_id,
+            'report_type': self.report_type,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'status': self.status,
+            'report_id': self.report_id,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ReportBatch(db.Model):
+    """批量生成报告的运行记录（services/batch_report_service.py）"""
+    __tablename__ = 'report_batches'
+    __table_args__ = {'extend_existing': True}
+    
+    id = db.Column(db.String(32), primary_key=True)                  # 批次ID（uuid4 十六进制）
+    report_type = db.Column(db.String(50), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, succeeded, failed
+    workers = db.Column(db.Integer)                                  # 进程数
+    chunk_size = db.Column(db.Integer)                               # 每个分块的用户数
+    chunks = db.Column(db.Integer)
+    total_users = db.Column(db.Integer)
+    succeeded = db.Column(db.Integer)                                # 成功生成的报告数
+    failed = db.Column(db.Integer)                                   # 失败的用户数
+    failed_user_ids = db.Column(db.JSON)                             # 失败的用户ID（最多保存前 100 个）
+    seconds = db.Column(db.Float)                                    # 总耗时
+    error = db.Column(db.Text)                                       # 整批失败的原因
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        """将模型转换为字典"""
+        return {
+            'batch_id': self.id,
+            'report_type': self.report_type,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'status': self.status,
+            'workers': self.workers,
+            'chunk_size': self.chunk_size,
+            'chunks': self.chunks,
+            'total_users': self.total_users,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'failed_user_ids': self.failed_user_ids or [],
+            'seconds': self.seconds,
+            'users_per_second': round(self.total_users / self.seconds, 1) if self.seconds and self.total_users else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -1,6 +1,9 @@
 from database import db
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import case, select, update
+import logging
+
+logger = logging.getLogger(__name__)
 
 # 定义可分享的内容类型枚举
 SHARABLE_TYPES = [
@@ -13,9 +16,18 @@ SHARABLE_TYPES = [
     'health_report'
 ]
 
+# 热门分数：新分享、每个点赞、每条评论计入的分数，随时间按半衰期衰减（见 services/trending_service.py）
+NEW_SHARE_SCORE = 1.0
+LIKE_SCORE = 1.0
+COMMENT_SCORE = 2.0
+
 class Share(db.Model):
     """用户分享的内容模型"""
     __tablename__ = 'shares'
+    __table_args__ = (
+        # 热门列表：WHERE visibility = 'public' ORDER BY trending_score DESC, id DESC
+        db.Index('ix_shares_trending', 'visibility', 'trending_score', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -23,6 +35,11 @@ class Share(db.Model):
     content_id = db.Column(db.Integer, nullable=False)  # 分享内容的ID
     description = db.Column(db.Text, nullable=True)  # 分享时的描述文字
     visibility = db.Column(db.String(20), default='public')  # 可见性：public, friends, private
+    # 点赞数和评论数，由点赞/评论的增删在同一事务内原子更新，列表接口无需加载点赞和评论
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # 热门分数：点赞/评论时增加，由定期任务整体衰减
+    trending_score = db.Column(db.Float, nullable=False, default=NEW_SHARE_SCORE, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -31,95 +48,126 @@ class Share(db.Model):
     likes = db.relationship('Like', backref='share', lazy=True, cascade="all, delete-orphan")
     comments = db.relationship('Comment', backref='share', lazy=True, cascade="all, delete-orphan")
     
-    def to_dict(self, current_user_id=None):
-        """将分享对象转换为字典，包括点赞和评论数量"""
+    def to_dict(self, current_user_id=None, username=None, is_liked=None, is_valid=None):
+        """将分享对象转换为字典，包括点赞和评论数量
+        
+        参数:
+            current_user_id: 当前用户ID，提供时返回 is_liked
+            username: 作者用户名（批量序列化时预先查询，为空时从关联加载）
+            is_liked: 当前用户是否已点赞（批量序列化时预先查询，为空时单独查询）
+            is_valid: 分享的内容是否存在（批量序列化时预先检查，为空时单独检查）
+        """
         result = {
             'id': self.id,
             'user_id': self.user_id,
-            'username': self.user.username,
+            'username': username if username is not None else self.user.username,
             'content_type': self.content_type,
             'content_id': self.content_id,
             'description': self.description,
             'visibility': self.visibility,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'likes_count': len(self.likes),
-            'comments_count': len(self.comments),
-            'is_valid': self.is_content_valid()
+            'likes_count': self.like_count or 0,
+            'comments_count': self.comment_count or 0,
+            'trending_score': round(self.trending_score or 0, 4),
+            'is_valid': is_valid if is_valid is not None else self.is_content_valid()
         }
         
         # 检查当前用户是否已点赞
         if current_user_id:
-            result['is_liked'] = any(like.user_id == current_user_id for like in self.likes)
+            if is_liked is None:
+                is_liked = db.session.query(
+                    Like.query.filter_by(share_id=self.id, user_id=current_user_id).exists()
+                ).scalar()
+            result['is_liked'] = bool(is_liked)
         
         return result
     
+    @staticmethod
+    def serialize_page(shares, current_user_id=None, hide_invalid=False):
+        """
+        批量序列化一页分享：作者用户名和当前用户的点赞状态各用一条查询取得，内容有效性
+        每种内容类型一条查询（有缓存），点赞数和评论数直接读计数列，耗时与分享的热门程度无关
+        
+        参数:
+            shares: 分享列表
+            current_user_id: 当前用户ID
+            hide_invalid: 为 True 时去掉内容已被删除的分享
+        """
+        from models.user import User
+        from services.share_validity_service import ShareValidityService
+        
+        validity = ShareValidityService.resolve([(share.content_type, share.content_id) for share in shares])
+        if hide_invalid:
+            shares = [share for share in shares if validity[(share.content_type, share.content_id)]]
+        if not shares:
+            return []
+        
+        user_ids = {share.user_id for share in shares}
+        usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
+        liked = set()
+        if current_user_id:
+            liked = {share_id for share_id, in db.session.query(Like.share_id).filter(
+                Like.user_id == current_user_id,
+                Like.share_id.in_([share.id for share in shares])
+            )}
+        return [
+            share.to_dict(current_user_id=current_user_id,
+                          username=usernames.get(share.user_id, ''),
+                          is_liked=share.id in liked,
+                          is_valid=validity[(share.content_type, share.content_id)])
+            for share in shares
+        ]
+    
+    @staticmethod
+    def adjust_counts(share_id, likes=0, comments=0):
+        """
+        在当前事务中原子地增减分享的点赞数/评论数（UPDATE ... SET like_count = like_count + :n），
+        并发的点赞不会相互覆盖；与点赞/评论的增删一起提交或回滚。热门分数同时按
+        LIKE_SCORE / COMMENT_SCORE 增减，不低于 0
+        """
+        values = {}
+        if likes:
+            values['like_count'] = Share.like_count + likes
+        if comments:
+            values['comment_count'] = Share.comment_count + comments
+        score = likes * LIKE_SCORE + comments * COMMENT_SCORE
+        if score:
+            values['trending_score'] = case(
+                (Share.trending_score + score > 0, Share.trending_score + score), else_=0.0)
+        if values:
+            # 不修改 updated_at：计数变化不算分享内容的更新
+            values['updated_at'] = Share.updated_at
+            db.session.execute(
+                update(Share).where(Share.id == share_id).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+    
     def is_content_valid(self):
-        """检查分享的内容是否仍然存在"""
-        try:
-            print(f"验证内容有效性: 类型={self.content_type}, ID={self.content_id}")
-            
-            # 导入text函数
-            from sqlalchemy import text
-            
-            # 根据实际数据库结构调整查询
-            query_templates = {
-                'health_record': "SELECT 1 FROM health_records WHERE id = :id AND record_type = 'health' LIMIT 1",
-                'diet_record': "SELECT 1 FROM health_records WHERE id = :id AND record_type = 'diet' LIMIT 1",
-                'exercise_record': "SELECT 1 FROM health_records WHERE id = :id AND record_type = 'exercise' LIMIT 1",
-                'water_intake': "SELECT 1 FROM health_records WHERE id = :id AND record_type = 'water' LIMIT 1",
-                'medication_record': "SELECT 1 FROM health_records WHERE id = :id AND record_type = 'medication' LIMIT 1",
-                'health_goal': "SELECT 1 FROM health_goals WHERE id = :id LIMIT 1",
-                'health_report': "SELECT 1 FROM health_reports WHERE id = :id LIMIT 1",
-            }
-            
-            # 不同数据库查询别名映射
-            alt_query_templates = {
-                'diet_record': "SELECT 1 FROM diet_records WHERE id = :id LIMIT 1",
-                'exercise_record': "SELECT 1 FROM exercise_records WHERE id = :id LIMIT 1",
-                'medication_record': "SELECT 1 FROM medication_records WHERE id = :id LIMIT 1",
-                'water_intake': "SELECT 1 FROM water_intakes WHERE id = :id LIMIT 1",
-            }
-            
-            if self.content_type not in query_templates and self.content_type not in alt_query_templates:
-                print(f"未知内容类型: {self.content_type}")
-                return False
-            
-            # 临时禁用验证，始终返回有效
-            print(f"禁用验证，假定记录有效: {self.content_type}(ID={self.content_id})")
-            return True
-                
-            # 执行主查询
-            is_valid = False
-            
-            if self.content_type in query_templates:
-                try:
-                    query = text(query_templates[self.content_type])
-                    result = db.session.execute(query, {"id": self.content_id}).fetchone()
-                    is_valid = result is not None
-                    print(f"主查询结果 - {self.content_type}记录(ID={self.content_id})验证结果: {is_valid}")
-                    if is_valid:
-                        return True
-                except Exception as e:
-                    print(f"主查询错误: {str(e)}")
-            
-            # 如果主查询失败或未找到记录，尝试替代查询
-            if not is_valid and self.content_type in alt_query_templates:
-                try:
-                    query = text(alt_query_templates[self.content_type])
-                    result = db.session.execute(query, {"id": self.content_id}).fetchone()
-                    is_valid = result is not None
-                    print(f"替代查询结果 - {self.content_type}记录(ID={self.content_id})验证结果: {is_valid}")
-                except Exception as e:
-                    print(f"替代查询错误: {str(e)}")
-            
-            return is_valid
-                
-        except Exception as e:
-            print(f"验证内容有效性时出错: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False
+        """检查分享的内容是否仍然存在（结果有短期缓存，批量检查见 Share.serialize_page）"""
+        from services.share_validity_service import ShareValidityService
+        
+        logger.debug("验证内容有效性: 类型=%s, ID=%s", self.content_type, self.content_id)
+        return ShareValidityService.is_valid(self.content_type, self.content_id)
+
+class TimelineEntry(db.Model):
+    """时间线条目：分享写入时推送到可见用户的时间线，读取时按 (created_at, share_id) 游标分页"""
+    __tablename__ = 'timeline_entries'
+    __table_args__ = (
+        db.Index('ix_timeline_viewer_created', 'viewer_id', 'created_at', 'share_id'),
+    )
+    
+    viewer_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 时间线所属用户，0 为公共时间线
+    share_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    author_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)  # 与分享的创建时间相同
+
+class TrendingState(db.Model):
+    """热门分数衰减任务的状态（单行），多个进程据此认领衰减任务并计算衰减量"""
+    __tablename__ = 'trending_state'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    decayed_at = db.Column(db.DateTime, nullable=False)  # 上一次衰减的时间（UTC）
 
 class Like(db.Model):
     """点赞模型"""
@@ -161,11 +209,11 @@ class Comment(db.Model):
     user = db.relationship('User', backref=db.backref('comments', lazy=True))
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]), lazy=True)
     
-    def to_dict(self, include_replies=False):
+    def to_dict(self, include_replies=False, username=None):
         result = {
             'id': self.id,
             'user_id': self.user_id,
-            'username': self.user.username,
+            'username': username if username is not None else self.user.username,
             'share_id': self.share_id,
             'content': self.content,
             'parent_id': self.parent_id,
@@ -176,4 +224,40 @@ class Comment(db.Model):
         if include_replies:
             result['replies'] = [reply.to_dict(False) for reply in self.replies]
             
-        return result 
\ No newline at end of file
+        return result
+    
+    @staticmethod
+    def build_threads(roots):
+        """
+        把一页顶级评论连同其所有层级的回复组装为树
+        
+        用一条递归 CTE 查询取得全部后代及作者用户名，在内存中按 parent_id 组装，
+        查询次数与评论数量和嵌套层数无关。每个节点的 replies 按创建时间升序。
+        
+        参数:
+            roots: 顶级评论列表（保持其顺序）
+            
+        返回:
+            字典列表，每个评论的 replies 为其直接回复的字典列表
+        """
+        if not roots:
+            return []
+        from models.user import User
+        
+        root_ids = [root.id for root in roots]
+        tree = select(Comment.id).where(Comment.id.in_(root_ids)).cte('comment_tree', recursive=True)
+        parent = tree.alias('parent')
+        tree = tree.union_all(select(Comment.id).where(Comment.parent_id == parent.c.id))
+        rows = db.session.query(Comment, User.username).join(tree, Comment.id == tree.c.id) \
+            .outerjoin(User, User.id == Comment.user_id) \
+            .order_by(Comment.created_at, Comment.id).all()
+        
+        nodes = {}
+        for comment, username in rows:
+            node = comment.to_dict(username=username or '')
+            node['replies'] = []
+            nodes[comment.id] = node
+        for comment, _ in rows:
+            if comment.parent_id in nodes:
+                nodes[comment.parent_id]['replies'].append(nodes[comment.id])
+        return [nodes[root_id] for root_id in root_ids if root_id in nodes]
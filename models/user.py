@@ -1,6 +1,9 @@
 from database import db
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -38,7 +41,7 @@ class User(db.Model):
             return check_password_hash(self.password_hash, password)
         except ValueError as e:
             # 如果发生哈希类型不支持的错误，记录错误
-            print(f"密码验证错误: {str(e)}")
+            logger.error("密码验证错误: %s", e)
             # 返回验证失败
             return False
     
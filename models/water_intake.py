@@ -5,7 +5,10 @@ from sqlalchemy import func
 class WaterIntake(db.Model):
     """水摄入量记录表，记录用户的饮水情况"""
     __tablename__ = 'water_intakes'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_water_intakes_user_date', 'user_id', 'record_date', 'intake_time'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -2,6 +2,9 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.analysis_service import AnalysisService
 import traceback
+import logging
+
+logger = logging.getLogger(__name__)
 
 analysis_bp = Blueprint('analysis', __name__)
 
@@ -31,7 +34,7 @@ def get_nutrition_analysis():
         return jsonify(result), 200
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"营养分析出错: {str(e)}\n{error_trace}")
+        logger.error("营养分析出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}",
@@ -78,7 +81,7 @@ def get_exercise_recommendations():
         return jsonify(result), 200
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"获取运动建议出错: {str(e)}\n{error_trace}")
+        logger.error("获取运动建议出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}",
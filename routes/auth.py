@@ -4,6 +4,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
 from database import db
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -75,7 +78,7 @@ def login():
     # 确保登录成功时返回完整用户信息
     if status_code == 200 and 'token' in result:
         # 打印登录成功日志
-        print(f"用户 {identifier} 登录成功")
+        logger.info("用户 %s 登录成功", identifier)
         
         # 检查返回结果是否包含用户信息
         if 'user' not in result or not result['user']:
@@ -93,7 +96,7 @@ def login():
                 if user:
                     result['user'] = user.to_dict()
             except Exception as e:
-                print(f"获取用户信息失败: {str(e)}")
+                logger.error("获取用户信息失败: %s", e)
             
         # 确保返回的响应包含必要的字段
         if 'user' not in result:
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.exercise_service import ExerciseService
 import logging
+from utils.request_utils import get_cursor_params
 
 logger = logging.getLogger(__name__)
 
@@ -62,7 +63,7 @@ def initialize_exercise_types():
         result = ExerciseService.initialize_exercise_types()
         return jsonify(result), 200 if result.get('success') else 500
     except Exception as e:
-        logger.error(f"初始化运动类型数据时发生错误: {str(e)}")
+        logger.error("初始化运动类型数据时发生错误: %s", e)
         return jsonify({
             "success": False,
             "message": f"初始化运动类型数据时发生错误: {str(e)}"
@@ -110,11 +111,14 @@ def get_exercise_records():
     user_id = get_jwt_identity()
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    limit, cursor = get_cursor_params()
     
     result = ExerciseService.get_exercise_records(
         user_id=user_id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        limit=limit,
+        cursor=cursor
     )
     
     return jsonify(result), 200 if result.get('success') else 400
@@ -1,7 +1,14 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from services.health_service import HealthService
+from services.dashboard_service import DashboardService
+from services.aggregation_service import AggregationService
+from services.timeseries_service import DEFAULT_POINTS, TimeSeriesService
 from datetime import datetime, timedelta
+from utils.request_utils import get_cursor_params
+import logging
+
+logger = logging.getLogger(__name__)
 
 health_bp = Blueprint('health', __name__)
 
@@ -12,7 +19,7 @@ def jwt_optional(fn):
             verify_jwt_in_request()
             return fn(*args, **kwargs)
         except Exception as e:
-            print(f"JWT验证错误: {str(e)}")
+            logger.error("JWT验证错误: %s", e)
             # 返回空数据而不是错误
             return jsonify({
                 "success": True,
@@ -76,19 +83,22 @@ def get_health_records():
         record_type = request.args.get('type')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        limit, cursor = get_cursor_params()
         
         # 查询记录
         result = HealthService.get_health_records(
             user_id=user_id,
             record_type=record_type,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            limit=limit,
+            cursor=cursor
         )
         
         status_code = 200 if result.get('success') else 400
         return jsonify(result), status_code
     except Exception as e:
-        print(f"获取健康记录时发生错误: {str(e)}")
+        logger.error("获取健康记录时发生错误: %s", e)
         # 返回空记录列表和200状态码，而不是错误
         return jsonify({
             "success": True,
@@ -140,39 +150,90 @@ def delete_health_record(record_id):
 @health_bp.route('/dashboard/chart-data', methods=['GET'])
 @jwt_required()
 def get_dashboard_chart_data():
-    """获取仪表盘图表所需的统计数据"""
+    """
+    获取仪表盘图表所需的统计数据
+    
+    参数: days（默认最近7天）或 start_date / end_date（YYYY-MM-DD）、
+    series（逗号分隔的序列名，默认 diet_calories,exercise_calories,water_intake）、bucket（day/week/month）
+    """
+    user_id = get_jwt_identity()
+    days = request.args.get('days', 7, type=int)
+    if days < 1:
+        return jsonify({"success": False, "message": "days 必须大于0"}), 400
     try:
-        user_id = get_jwt_identity()
-        print(f"处理图表数据请求，用户ID: {user_id}")
-        
-        # 默认获取最近7天的数据
-        days = request.args.get('days', 7, type=int)
-        print(f"请求图表天数: {days}")
-        
-        # 获取图表数据
-        result = HealthService.get_dashboard_chart_data(user_id, days)
-        
-        if result.get('success'):
-            print("成功获取图表数据")
-            return jsonify(result), 200
-        else:
-            print(f"获取图表数据失败: {result.get('message', '未知错误')}")
-            return jsonify(result), 400
-            
-    except Exception as e:
-        error_msg = f"获取图表数据时发生错误: {str(e)}"
-        print(error_msg)
-        return jsonify({
-            "success": True,  # 返回成功但使用示例数据
-            "data": {
-                "labels": [(datetime.now().date() - timedelta(days=i)).strftime('%m-%d') for i in range(6, -1, -1)],
-                "diet_calories": [1500, 1600, 1700, 1800, 1750, 1650, 1550],
-                "exercise_calories": [350, 400, 300, 450, 350, 300, 400],
-                "water_intake": [25, 30, 28, 35, 32, 30, 29]
-            },
-            "message": error_msg,
-            "note": "使用示例数据 (服务器错误)"
-        }), 200  # 返回200而不是500，以便前端仍能显示图表
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+            if request.args.get('start_date') else None
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+            if request.args.get('end_date') else None
+    except ValueError:
+        return jsonify({"success": False, "message": "日期格式错误，请使用YYYY-MM-DD格式"}), 400
+    series = [name for name in request.args.get('series', '').split(',') if name] or None
+    
+    try:
+        result = HealthService.get_dashboard_chart_data(user_id, days, series=series, start_date=start_date,
+                                                        end_date=end_date, bucket=request.args.get('bucket'))
+    except Exception:
+        logger.exception("获取用户 %s 的图表数据出错", user_id)
+        return jsonify({"success": False, "message": "获取图表数据失败，请稍后重试"}), 500
+    # 只有参数无效（ValueError）时 success 为 False
+    if not result.get('success'):
+        return jsonify(result), 400
+    return jsonify(result), 200
+
+@health_bp.route('/aggregate', methods=['GET'])
+@jwt_required()
+def aggregate_metric():
+    """
+    按天/周/月聚合健康指标
+    
+    参数: metric（见 services/aggregation_service.py 的 METRICS）、start_date、end_date（YYYY-MM-DD）、
+    bucket（day/week/month，默认 day）、fn（avg/sum/min/max/count/last/p50，默认 avg）
+    """
+    user_id = get_jwt_identity()
+    try:
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return jsonify({"success": False, "message": "需要 start_date 和 end_date，格式为 YYYY-MM-DD"}), 400
+    metric = request.args.get('metric', '')
+    try:
+        points = AggregationService.aggregate(
+            user_id, metric, start_date, end_date,
+            bucket=request.args.get('bucket', 'day'), fn=request.args.get('fn', 'avg'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({
+        "success": True,
+        "metric": metric,
+        "data": [dict(point, bucket=point['bucket'].isoformat()) for point in points]
+    }), 200
+
+@health_bp.route('/timeseries', methods=['GET'])
+@jwt_required()
+def get_metric_timeseries():
+    """
+    获取降采样后的健康指标时间序列，每个序列最多 points 个点
+    
+    参数: metrics（逗号分隔，如 weight 或 bp_systolic,bp_diastolic）、start_date、end_date（YYYY-MM-DD，可选）、
+    points（默认500）、method（lttb/minmax，默认 lttb）
+    """
+    user_id = get_jwt_identity()
+    try:
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+            if request.args.get('start_date') else None
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+            if request.args.get('end_date') else None
+    except ValueError:
+        return jsonify({"success": False, "message": "日期格式错误，请使用YYYY-MM-DD格式"}), 400
+    metrics = [name for name in request.args.get('metrics', '').split(',') if name]
+    try:
+        result = TimeSeriesService.get_series(
+            user_id, metrics, start_date, end_date,
+            points=request.args.get('points', DEFAULT_POINTS, type=int),
+            method=request.args.get('method', 'lttb'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({"success": True, **result}), 200
 
 @health_bp.route('/recent-records', methods=['GET'])
 @jwt_required()
@@ -194,15 +255,15 @@ def get_health_goals():
     """获取用户的健康目标"""
     try:
         user_id = get_jwt_identity()
-        print(f"正在获取用户 {user_id} 的健康目标")
+        logger.debug("正在获取用户 %s 的健康目标", user_id)
         
         result = HealthService.get_health_goals(user_id)
         
         if result.get('success') and result.get('goals'):
-            print(f"成功获取到 {len(result['goals'])} 个健康目标")
+            logger.debug("成功获取到 %s 个健康目标", len(result['goals']))
             return jsonify(result), 200
         else:
-            print(f"获取健康目标失败或无目标: {result.get('message', '未知错误')}")
+            logger.warning("获取健康目标失败或无目标: %s", result.get('message', '未知错误'))
             # 如果没有目标或失败，返回默认目标
             return jsonify({
                 "success": True,
@@ -249,7 +310,7 @@ def get_health_goals():
             
     except Exception as e:
         error_msg = f"获取健康目标时发生错误: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         # 发生异常时返回示例数据
         return jsonify({
             "success": True,
@@ -301,7 +362,7 @@ def get_dashboard_data():
     """获取仪表盘数据，包括摘要信息和最近记录"""
     try:
         user_id = get_jwt_identity()
-        print(f"获取仪表盘数据，用户ID: {user_id}")
+        logger.debug("获取仪表盘数据，用户ID: %s", user_id)
         
         if not user_id:
             return jsonify({
@@ -325,55 +386,14 @@ def get_dashboard_data():
                 }
             }), 200
         
-        # 获取最近的记录（默认5条）
-        recent_records_result = HealthService.get_recent_records(user_id, 5)
-        # 获取健康目标
-        goals_result = HealthService.get_health_goals(user_id)
-        # 获取图表数据
-        chart_data_result = HealthService.get_dashboard_chart_data(user_id, 7)
-        
-        # 合并结果
-        dashboard_data = {
-            "success": True,
-            "recent_records": recent_records_result.get('records', []),
-            "goals": goals_result.get('goals', []),
-            "chart_data": chart_data_result.get('data', {}),
-            "summary": {
-                "today_calories_intake": 0,
-                "today_calories_burned": 0,
-                "today_water_intake": 0,
-                "today_steps": 0,
-                "today_weight": None,
-                "unread_notifications": 3
-            }
-        }
-        
-        # 计算今日摘要数据
-        today = datetime.now().date()
-        today_records = HealthService.get_health_records(
-            user_id=user_id,
-            start_date=today,
-            end_date=today
-        ).get('records', [])
-        
-        for record in today_records:
-            if record['record_type'] == 'diet':
-                dashboard_data['summary']['today_calories_intake'] += record.get('calories', 0)
-            elif record['record_type'] == 'exercise':
-                dashboard_data['summary']['today_calories_burned'] += record.get('calories_burned', 0)
-            elif record['record_type'] == 'water':
-                dashboard_data['summary']['today_water_intake'] += record.get('water_amount', 0)
-            elif record['record_type'] == 'health':
-                if record.get('steps'):
-                    dashboard_data['summary']['today_steps'] += record.get('steps', 0)
-                if record.get('weight'):
-                    dashboard_data['summary']['today_weight'] = record.get('weight')
+        # 最近记录、健康目标、图表和今日摘要由 DashboardService 统一计算并按用户缓存
+        dashboard_data = DashboardService.get_dashboard(user_id)
         
         return jsonify(dashboard_data), 200
         
     except Exception as e:
         error_msg = f"获取仪表盘数据时发生错误: {str(e)}"
-        print(error_msg)
+        logger.error(error_msg)
         # 返回默认数据
         return jsonify({
             "success": True,
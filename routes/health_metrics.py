@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.health_metrics_service import HealthMetricsService
 import logging
+from utils.request_utils import get_cursor_params
 
 logger = logging.getLogger(__name__)
 
@@ -45,11 +46,14 @@ def get_health_metrics_records():
     user_id = get_jwt_identity()
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    limit, cursor = get_cursor_params()
     
     result = HealthMetricsService.get_health_metrics_records(
         user_id=user_id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        limit=limit,
+        cursor=cursor
     )
     
     return jsonify(result), 200 if result.get('success') else 400 
@@ -65,7 +69,7 @@ def get_health_metrics_record(record_id):
         status_code = 200 if result.get('success') else 404
         return jsonify(result), status_code
     except Exception as e:
-        logger.error(f"获取健康指标记录 {record_id} 时出错: {str(e)}")
+        logger.error("获取健康指标记录 %s 时出错: %s", record_id, e)
         return jsonify({
             'success': False,
             'message': f'服务器错误: {str(e)}'
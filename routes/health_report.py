@@ -1,51 +1,166 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.health_report_service import HealthReportService, ReminderService
+from services.report_job_service import ReportJobService, allowed_callback_hosts
+from services.batch_report_service import BatchReportService, DEFAULT_CHUNK_SIZE
 from datetime import datetime
+import hmac
 import traceback
+import logging
+
+logger = logging.getLogger(__name__)
 
 health_report_bp = Blueprint('health_report', __name__)
 
 @health_report_bp.route('/generate', methods=['POST'])
 @jwt_required()
 def generate_health_report():
-    """生成健康报告"""
+    """提交健康报告生成任务，立即返回任务ID，通过 /jobs/<job_id> 查询结果"""
     try:
         user_id = get_jwt_identity()
-        data = request.get_json()
+        data = request.get_json() or {}
         
         report_type = data.get('report_type', 'weekly')  # 默认为周报
+        callback_url = data.get('callback_url')
         
         # 处理日期参数
         start_date = data.get('start_date')
         end_date = data.get('end_date')
         
-        if start_date:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        if end_date:
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        try:
+            if start_date:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "日期格式应为 YYYY-MM-DD"
+            }), 400
+        
+        if callback_url:
+            valid, reason = ReportJobService.validate_callback_url(
+                callback_url, allowed_callback_hosts(current_app))
+            if not valid:
+                return jsonify({
+                    "success": False,
+                    "message": reason
+                }), 400
         
-        # 生成报告
-        report = HealthReportService.generate_health_report(
+        job = ReportJobService.submit(
             user_id=user_id,
             report_type=report_type,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            callback_url=callback_url
         )
         
         return jsonify({
             "success": True,
-            "message": "健康报告生成成功",
-            "data": report.to_dict()
-        }), 200
+            "message": "健康报告生成任务已提交",
+            "data": _job_response(job)
+        }), 202
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"生成健康报告出错: {str(e)}\n{error_trace}")
+        logger.error("提交健康报告任务出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
         }), 500
 
+@health_report_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_report_job(job_id):
+    """查询报告生成任务状态，成功时附带生成的报告"""
+    user_id = get_jwt_identity()
+    job = ReportJobService.get_job(job_id, user_id)
+    if not job:
+        return jsonify({
+            "success": False,
+            "message": "任务不存在或无权访问"
+        }), 404
+    
+    return jsonify({
+        "success": True,
+        "data": _job_response(job)
+    }), 200
+
+def _job_response(job):
+    """任务状态响应，成功时附带报告内容"""
+    result = job.to_dict()
+    result['status_url'] = url_for('health_report.get_report_job', job_id=job.id)
+    if job.status == 'succeeded' and job.report_id:
+        report = HealthReportService.get_report_by_id(job.report_id, job.user_id)
+        result['report'] = report.to_dict() if report else None
+    return result
+
+def _batch_key_error():
+    """批量接口不使用用户令牌，请求头 X-Batch-Report-Key 需与配置 BATCH_REPORT_API_KEY 一致"""
+    expected = current_app.config.get('BATCH_REPORT_API_KEY')
+    if not expected:
+        return jsonify({
+            "success": False,
+            "message": "批量生成接口未启用"
+        }), 403
+    if not hmac.compare_digest(request.headers.get('X-Batch-Report-Key', ''), expected):
+        return jsonify({
+            "success": False,
+            "message": "批量生成密钥无效"
+        }), 403
+    return None
+
+@health_report_bp.route('/batch', methods=['POST'])
+def generate_batch_reports():
+    """为所有用户批量生成报告，立即返回批次ID，通过 /batch/<batch_id> 查询进度和结果"""
+    error = _batch_key_error()
+    if error:
+        return error
+    
+    data = request.get_json() or {}
+    report_type = data.get('report_type', 'weekly')
+    try:
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date() if data.get('start_date') else None
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None
+        workers = int(data['workers']) if data.get('workers') else None
+        chunk_size = int(data.get('chunk_size') or DEFAULT_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        return jsonify({
+            "success": False,
+            "message": "参数格式错误：日期应为 YYYY-MM-DD，workers 和 chunk_size 应为整数"
+        }), 400
+    if bool(start_date) != bool(end_date) or (start_date and start_date > end_date) or chunk_size < 1:
+        return jsonify({
+            "success": False,
+            "message": "start_date 和 end_date 需同时提供且开始日期不晚于结束日期，chunk_size 至少为 1"
+        }), 400
+    
+    batch = BatchReportService.submit(report_type, start_date, end_date, workers=workers, chunk_size=chunk_size)
+    result = batch.to_dict()
+    result['status_url'] = url_for('health_report.get_batch_reports', batch_id=batch.id)
+    return jsonify({
+        "success": True,
+        "message": "批量生成任务已提交",
+        "data": result
+    }), 202
+
+@health_report_bp.route('/batch/<batch_id>', methods=['GET'])
+def get_batch_reports(batch_id):
+    """查询批量生成的进度和结果（用户数、成功/失败数、耗时和吞吐量）"""
+    error = _batch_key_error()
+    if error:
+        return error
+    
+    batch = BatchReportService.get_batch(batch_id)
+    if not batch:
+        return jsonify({
+            "success": False,
+            "message": "批次不存在"
+        }), 404
+    return jsonify({
+        "success": True,
+        "data": batch.to_dict()
+    }), 200
+
 @health_report_bp.route('/list', methods=['GET'])
 @jwt_required()
 def get_health_reports():
@@ -63,7 +178,7 @@ def get_health_reports():
         }), 200
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"获取健康报告列表出错: {str(e)}\n{error_trace}")
+        logger.error("获取健康报告列表出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
@@ -89,7 +204,7 @@ def get_health_report(report_id):
         }), 200
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"获取健康报告详情出错: {str(e)}\n{error_trace}")
+        logger.error("获取健康报告详情出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
@@ -113,7 +228,7 @@ def create_reminder():
         recurrence = data.get('recurrence')
         
         # 输出调试信息
-        print(f"创建提醒 - 用户ID: {user_id}, 类型: {reminder_type}, 标题: {title}, 日期: {reminder_date}, 时间: {reminder_time}")
+        logger.debug("创建提醒 - 用户ID: %s, 类型: %s, 标题: %s, 日期: %s, 时间: %s", user_id, reminder_type, title, reminder_date, reminder_time)
         
         # 验证必要参数
         if not reminder_type or not title or not reminder_date or not reminder_time:
@@ -143,10 +258,10 @@ def create_reminder():
                     medication_record_id = int(medication_record_id)
                     if medication_record_id <= 0:
                         medication_record_id = None
-                        print("警告: 药物记录ID不是正整数，将被忽略")
+                        logger.warning("警告: 药物记录ID不是正整数，将被忽略")
                 except (ValueError, TypeError):
                     medication_record_id = None
-                    print("警告: 药物记录ID不是有效整数，将被忽略")
+                    logger.warning("警告: 药物记录ID不是有效整数，将被忽略")
             
             try:
                 # 创建药物提醒
@@ -161,7 +276,7 @@ def create_reminder():
                 )
             except Exception as e:
                 # 如果创建失败，尝试不带medication_record_id再次创建
-                print(f"使用medication_record_id创建提醒失败: {e}，尝试不使用medication_record_id")
+                logger.error("使用medication_record_id创建提醒失败: %s，尝试不使用medication_record_id", e)
                 reminder = ReminderService.create_medication_reminder(
                     user_id=user_id,
                     medication_record_id=None,  # 明确设置为None
@@ -173,7 +288,7 @@ def create_reminder():
                 )
             
         elif reminder_type == 'appointment':
-            print(f"创建预约提醒 - 标题: {title}, 描述: {description}, 日期: {reminder_date}, 时间: {reminder_time}")
+            logger.debug("创建预约提醒 - 标题: %s, 描述: %s, 日期: %s, 时间: %s", title, description, reminder_date, reminder_time)
             reminder = ReminderService.create_appointment_reminder(
                 user_id=user_id,
                 title=title,
@@ -196,7 +311,7 @@ def create_reminder():
             }), 500
             
         # 输出创建结果
-        print(f"提醒创建成功 - ID: {reminder.id}, 类型: {reminder.reminder_type}")
+        logger.info("提醒创建成功 - ID: %s, 类型: %s", reminder.id, reminder.reminder_type)
             
         return jsonify({
             "success": True,
@@ -205,7 +320,7 @@ def create_reminder():
         }), 201
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"创建提醒出错: {str(e)}\n{error_trace}")
+        logger.error("创建提醒出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
@@ -241,7 +356,7 @@ def get_reminders():
         # 添加调试日志
         medication_count = len([r for r in reminders if r.reminder_type == 'medication'])
         appointment_count = len([r for r in reminders if r.reminder_type == 'appointment'])
-        print(f"获取提醒列表 - 用户ID: {user_id}, 日期: {date}, 总数: {len(reminders)}, 药物提醒: {medication_count}, 预约提醒: {appointment_count}")
+        logger.debug("获取提醒列表 - 用户ID: %s, 日期: %s, 总数: %s, 药物提醒: %s, 预约提醒: %s", user_id, date, len(reminders), medication_count, appointment_count)
         
         reminders_data = [reminder.to_dict() for reminder in reminders]
         
@@ -251,7 +366,7 @@ def get_reminders():
         }), 200
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"获取提醒列表出错: {str(e)}\n{error_trace}")
+        logger.error("获取提醒列表出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
@@ -278,7 +393,7 @@ def complete_reminder(reminder_id):
         }), 200
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"完成提醒出错: {str(e)}\n{error_trace}")
+        logger.error("完成提醒出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
@@ -340,7 +455,7 @@ def update_reminder(reminder_id):
         }), 200
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"更新提醒出错: {str(e)}\n{error_trace}")
+        logger.error("更新提醒出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
@@ -366,7 +481,7 @@ def delete_reminder(reminder_id):
         }), 200
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"删除提醒出错: {str(e)}\n{error_trace}")
+        logger.error("删除提醒出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
@@ -406,7 +521,7 @@ def generate_medication_reminders():
         }), 201
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"生成药物提醒出错: {str(e)}\n{error_trace}")
+        logger.error("生成药物提醒出错: %s\n%s", e, error_trace)
         return jsonify({
             "success": False,
             "message": f"服务器内部错误: {str(e)}"
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.medication_service import MedicationService
-from utils.request_utils import validate_params, get_pagination_params
+from utils.request_utils import validate_params, get_pagination_params, get_cursor_params
 from datetime import datetime
 import logging
 
@@ -37,7 +37,7 @@ def create_medication_type():
             'data': medication_type.to_dict()
         }), 201
     except Exception as e:
-        logger.error(f"创建药物类型时出错: {str(e)}")
+        logger.error("创建药物类型时出错: %s", e)
         return jsonify({'success': False, 'message': f'服务器错误: {str(e)}'}), 500
 
 @medication_bp.route('/types', methods=['GET'])
@@ -54,7 +54,7 @@ def get_medication_types():
             'medication_types': [mt.to_dict() for mt in medication_types]
         }), 200
     except Exception as e:
-        logger.error(f"获取药物类型列表时出错: {str(e)}")
+        logger.error("获取药物类型列表时出错: %s", e)
         return jsonify({
             'success': False,
             'message': f"获取药物类型列表时出错: {str(e)}",
@@ -78,7 +78,7 @@ def get_medication_type(type_id):
             'medication_type': medication_type.to_dict()
         }), 200
     except Exception as e:
-        logger.error(f"获取药物类型详情时出错: {str(e)}")
+        logger.error("获取药物类型详情时出错: %s", e)
         return jsonify({
             'success': False,
             'message': f"获取药物类型详情时出错: {str(e)}"
@@ -110,7 +110,7 @@ def update_medication_type(type_id):
             'data': medication_type.to_dict()
         }), 200
     except Exception as e:
-        logger.error(f"更新药物类型 {type_id} 时出错: {str(e)}")
+        logger.error("更新药物类型 %s 时出错: %s", type_id, e)
         return jsonify({'success': False, 'message': f'服务器错误: {str(e)}'}), 500
 
 # 药物记录路由
@@ -135,7 +135,7 @@ def create_medication_record():
     
     try:
         # 记录请求数据，便于调试
-        logger.info(f"接收到的药物记录数据: {data}")
+        logger.debug("接收到的药物记录数据: %s", data)
         
         result = MedicationService.create_medication_record(
             user_id=user_id,
@@ -155,7 +155,7 @@ def create_medication_record():
         status_code = 201 if result.get('success') else 400
         return jsonify(result), status_code
     except Exception as e:
-        logger.error(f"创建服药记录时出错: {str(e)}")
+        logger.error("创建服药记录时出错: %s", e)
         return jsonify({
             'success': False,
             'message': f"创建服药记录时出错: {str(e)}"
@@ -169,17 +169,20 @@ def get_user_medication_records():
         user_id = get_jwt_identity()
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        limit, cursor = get_cursor_params()
         
         # 从HealthRecord表中获取药物记录
         result = MedicationService.get_medication_records(
             user_id=user_id,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            limit=limit,
+            cursor=cursor
         )
         
         return jsonify(result), 200 if result.get('success') else 400
     except Exception as e:
-        logger.error(f"获取用户服药记录时出错: {str(e)}")
+        logger.error("获取用户服药记录时出错: %s", e)
         return jsonify({'success': False, 'message': f'服务器错误: {str(e)}'}), 500
 
 @medication_bp.route('/records/<int:record_id>', methods=['GET'])
@@ -193,7 +196,7 @@ def get_medication_record(record_id):
         status_code = 200 if result.get('success') else 404
         return jsonify(result), status_code
     except Exception as e:
-        logger.error(f"获取服药记录 {record_id} 时出错: {str(e)}")
+        logger.error("获取服药记录 %s 时出错: %s", record_id, e)
         return jsonify({'success': False, 'message': f'服务器错误: {str(e)}'}), 500
 
 @medication_bp.route('/records/<int:record_id>', methods=['PUT'])
@@ -216,7 +219,7 @@ def update_medication_record(record_id):
         status_code = 200 if result.get('success') else 400
         return jsonify(result), status_code
     except Exception as e:
-        logger.error(f"更新服药记录 {record_id} 时出错: {str(e)}")
+        logger.error("更新服药记录 %s 时出错: %s", record_id, e)
         return jsonify({'success': False, 'message': f'服务器错误: {str(e)}'}), 500
 
 @medication_bp.route('/records/<int:record_id>', methods=['DELETE'])
@@ -230,7 +233,7 @@ def delete_medication_record(record_id):
         status_code = 200 if result.get('success') else 404
         return jsonify(result), status_code
     except Exception as e:
-        logger.error(f"删除服药记录 {record_id} 时出错: {str(e)}")
+        logger.error("删除服药记录 %s 时出错: %s", record_id, e)
         return jsonify({'success': False, 'message': f'服务器错误: {str(e)}'}), 500
 
 @medication_bp.route('/schedule', methods=['GET'])
@@ -248,5 +251,5 @@ def get_medication_schedule():
             'data': schedule
         }), 200
     except Exception as e:
-        logger.error(f"获取用户服药计划时出错: {str(e)}")
+        logger.error("获取用户服药计划时出错: %s", e)
         return jsonify({'success': False, 'message': f'服务器错误: {str(e)}'}), 500 
\ No newline at end of file
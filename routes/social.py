@@ -1,11 +1,16 @@
 from flask import Blueprint, request, jsonify, g
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.social import Share, Like, Comment, SHARABLE_TYPES
+from services.timeline_service import DEFAULT_PAGE_SIZE, TimelineService
+from services.trending_service import TrendingService
 from database import db
 import json
 from sqlalchemy import and_, desc
 from datetime import datetime
 from werkzeug.exceptions import NotFound, BadRequest, Forbidden
+import logging
+
+logger = logging.getLogger(__name__)
 
 # 创建蓝图
 social_bp = Blueprint('social', __name__)
@@ -29,7 +34,7 @@ def create_share():
         user_id = get_current_user_id()
         data = request.get_json()
         
-        print(f"创建分享API请求数据: {data}")
+        logger.debug("创建分享API请求数据: %s", data)
         
         # 验证必需字段
         if not all(k in data for k in ['content_type', 'content_id']):
@@ -54,7 +59,7 @@ def create_share():
             visibility=data.get('visibility', 'public')
         )
         
-        print(f"检查分享内容是否有效: {data['content_type']}, ID: {content_id}")
+        logger.debug("检查分享内容是否有效: %s, ID: %s", data['content_type'], content_id)
         
         # 检查分享内容是否有效
         if not new_share.is_content_valid():
@@ -65,7 +70,7 @@ def create_share():
         
         return jsonify({'message': '分享成功', 'share': new_share.to_dict()}), 201
     except Exception as e:
-        print(f"创建分享时出错: {str(e)}")
+        logger.error("创建分享时出错: %s", e)
         db.session.rollback()
         return jsonify({'error': f'创建分享时发生错误: {str(e)}'}), 500
 
@@ -93,6 +98,10 @@ def get_shares():
     per_page = request.args.get('per_page', 10, type=int)
     content_type = request.args.get('content_type')
     user_filter = request.args.get('user_id', type=int)
+    hide_invalid = request.args.get('hide_invalid', '0') in ('1', 'true')  # 去掉内容已被删除的分享
+    sort = request.args.get('sort', 'recent')  # recent（最新）或 trending（热门）
+    if sort not in ('recent', 'trending'):
+        return jsonify({'error': f'无效的排序方式: {sort}，有效值: recent, trending'}), 400
     
     # 构建查询
     query = Share.query
@@ -110,14 +119,18 @@ def get_shares():
             (Share.user_id == user_id)
         )
     
-    # 按时间降序排序
-    query = query.order_by(desc(Share.created_at))
+    if sort == 'trending':
+        # 热门：只含公开分享，按热门分数降序
+        query = TrendingService.trending_query(query)
+    else:
+        # 按时间降序排序
+        query = query.order_by(desc(Share.created_at))
     
     # 分页
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
-    # 构建响应，传入当前用户ID以确定点赞状态
-    shares = [share.to_dict(current_user_id=user_id) for share in pagination.items]
+    # 构建响应：点赞数和评论数读计数列，用户名和当前用户的点赞状态整页各查询一次
+    shares = Share.serialize_page(pagination.items, current_user_id=user_id, hide_invalid=hide_invalid)
     
     return jsonify({
         'shares': shares,
@@ -126,6 +139,21 @@ def get_shares():
         'current_page': page
     }), 200
 
+@social_bp.route('/timeline', methods=['GET'])
+@jwt_required()
+def get_timeline():
+    """获取当前用户的时间线（公开分享和自己的分享），按游标分页"""
+    user_id = get_current_user_id()
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    cursor = request.args.get('cursor')
+    
+    try:
+        result = TimelineService.get_timeline(user_id, limit=limit, cursor=cursor)
+    except ValueError:
+        return jsonify({'error': f'无效的游标: {cursor}'}), 400
+    
+    return jsonify(result), 200
+
 @social_bp.route('/share/<int:share_id>', methods=['PUT'])
 @jwt_required()
 def update_share(share_id):
@@ -180,9 +208,10 @@ def like_share(share_id):
     if existing_like:
         return jsonify({'message': '已经点过赞了', 'like': existing_like.to_dict()}), 200
     
-    # 创建新的点赞
+    # 创建新的点赞，点赞数在同一事务内更新
     new_like = Like(user_id=user_id, share_id=share_id)
     db.session.add(new_like)
+    Share.adjust_counts(share_id, likes=1)
     db.session.commit()
     
     return jsonify({'message': '点赞成功', 'like': new_like.to_dict()}), 201
@@ -198,6 +227,7 @@ def unlike_share(share_id):
         return jsonify({'message': '未找到点赞记录'}), 404
     
     db.session.delete(like)
+    Share.adjust_counts(share_id, likes=-1)
     db.session.commit()
     
     return jsonify({'message': '已取消点赞'}), 200
@@ -257,6 +287,7 @@ def add_comment(share_id):
             return jsonify({'error': '回复的评论不存在或不属于此分享'}), 400
     
     db.session.add(new_comment)
+    Share.adjust_counts(share_id, comments=1)
     db.session.commit()
     
     return jsonify({'message': '评论成功', 'comment': new_comment.to_dict()}), 201
@@ -294,7 +325,9 @@ def delete_comment(comment_id):
     if comment.user_id != user_id and share.user_id != user_id:
         return jsonify({'error': '无权删除此评论'}), 403
     
+    # 回复不随评论删除（parent_id 置空），评论数只减 1
     db.session.delete(comment)
+    Share.adjust_counts(comment.share_id, comments=-1)
     db.session.commit()
     
     return jsonify({'message': '评论已删除'}), 200
@@ -319,8 +352,8 @@ def get_comments(share_id):
     # 分页
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
-    # 构建响应，包含评论的回复
-    comments = [comment.to_dict(include_replies=True) for comment in pagination.items]
+    # 构建响应，包含所有层级的回复（一条递归查询取得）
+    comments = Comment.build_threads(pagination.items)
     
     return jsonify({
         'comments': comments,
@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.water_service import WaterService
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from database import db
 from models.health_record import HealthRecord
 import logging
+from utils.request_utils import get_cursor_params
 
 logger = logging.getLogger(__name__)
 
@@ -50,11 +51,14 @@ def get_water_records():
     user_id = get_jwt_identity()
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    limit, cursor = get_cursor_params()
     
     result = WaterService.get_water_records(
         user_id=user_id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        limit=limit,
+        cursor=cursor
     )
     
     return jsonify(result), 200 if result.get('success') else 400 
@@ -70,7 +74,7 @@ def get_water_record(record_id):
         status_code = 200 if result.get('success') else 404
         return jsonify(result), status_code
     except Exception as e:
-        logger.error(f"获取饮水记录 {record_id} 时出错: {str(e)}")
+        logger.error("获取饮水记录 %s 时出错: %s", record_id, e)
         return jsonify({
             'success': False,
             'message': f'服务器错误: {str(e)}'
@@ -126,7 +130,7 @@ def update_water_record(record_id):
         
     except Exception as e:
         db.session.rollback()
-        logger.error(f"更新饮水记录 {record_id} 时出错: {str(e)}")
+        logger.error("更新饮水记录 %s 时出错: %s", record_id, e)
         return jsonify({
             'success': False,
             'message': f'服务器错误: {str(e)}'
@@ -156,8 +160,85 @@ def delete_water_record(record_id):
         
     except Exception as e:
         db.session.rollback()
-        logger.error(f"删除饮水记录 {record_id} 时出错: {str(e)}")
+        logger.error("删除饮水记录 %s 时出错: %s", record_id, e)
         return jsonify({
             'success': False,
             'message': f'服务器错误: {str(e)}'
-        }), 500 
\ No newline at end of file
+        }), 500
+
+MAX_SUMMARY_DAYS = 3660  # 汇总接口允许的最长范围（天）
+
+
+def _flag(name, default):
+    return request.args.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+def _elapsed_end(start_date, end_date):
+    """包含今天的月/年只统计到今天，未来的日期不计入平均值"""
+    today = date.today()
+    return min(end_date, today) if start_date <= today else end_date
+
+
+def _summary_response(user_id, start_date, end_date, granularity, include_records):
+    if (end_date - start_date).days + 1 > MAX_SUMMARY_DAYS:
+        return jsonify({'success': False, 'message': f'日期范围不能超过 {MAX_SUMMARY_DAYS} 天'}), 400
+    try:
+        summary = WaterService.get_summary(user_id, start_date, end_date,
+                                           granularity=granularity, include_records=include_records)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **summary}), 200
+
+
+@water_bp.route('/summary', methods=['GET'])
+@jwt_required()
+def get_water_summary():
+    """按天/周/月汇总任意日期范围内的饮水量"""
+    user_id = get_jwt_identity()
+    try:
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': '需要 start_date 和 end_date，格式为 YYYY-MM-DD'}), 400
+    return _summary_response(user_id, start_date, end_date,
+                             request.args.get('granularity', 'day'), _flag('include_records', '0'))
+
+
+@water_bp.route('/summary/weekly', methods=['GET'])
+@jwt_required()
+def get_weekly_water_summary():
+    """获取截至 end_date（默认今天）的 7 天饮水摘要，默认包含每天的记录明细"""
+    user_id = get_jwt_identity()
+    try:
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+            if request.args.get('end_date') else date.today()
+    except ValueError:
+        return jsonify({'success': False, 'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
+    return _summary_response(user_id, end_date - timedelta(days=6), end_date, 'day', _flag('include_records', '1'))
+
+
+@water_bp.route('/summary/monthly', methods=['GET'])
+@jwt_required()
+def get_monthly_water_summary():
+    """获取某月（month=YYYY-MM，默认本月）的饮水摘要，granularity 为 day（默认）或 week；本月只统计到今天"""
+    user_id = get_jwt_identity()
+    try:
+        start_date = datetime.strptime(request.args['month'], '%Y-%m').date() \
+            if request.args.get('month') else date.today().replace(day=1)
+    except ValueError:
+        return jsonify({'success': False, 'message': '月份格式错误，请使用YYYY-MM格式'}), 400
+    end_date = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return _summary_response(user_id, start_date, _elapsed_end(start_date, end_date),
+                             request.args.get('granularity', 'day'), _flag('include_records', '0'))
+
+
+@water_bp.route('/summary/yearly', methods=['GET'])
+@jwt_required()
+def get_yearly_water_summary():
+    """获取某年（year=YYYY，默认今年）的饮水摘要，granularity 为 month（默认）或 week；今年只统计到今天"""
+    user_id = get_jwt_identity()
+    year = request.args.get('year', date.today().year, type=int)
+    if not 1900 <= year <= 9999:
+        return jsonify({'success': False, 'message': '年份无效'}), 400
+    return _summary_response(user_id, date(year, 1, 1), _elapsed_end(date(year, 1, 1), date(year, 12, 31)),
+                             request.args.get('granularity', 'month'), _flag('include_records', '0'))
@@ -51,7 +51,7 @@ def create_water_intake_record():
             "record": record
         }), 201
     except Exception as e:
-        logger.error(f"创建水摄入记录时出错: {str(e)}")
+        logger.error("创建水摄入记录时出错: %s", e)
         return jsonify({"error": f"创建水摄入记录失败: {str(e)}"}), 500
 
 @water_intake_bp.route('/records', methods=['GET'])
@@ -75,7 +75,7 @@ def get_water_intake_records():
             "count": len(records)
         }), 200
     except Exception as e:
-        logger.error(f"获取水摄入记录时出错: {str(e)}")
+        logger.error("获取水摄入记录时出错: %s", e)
         return jsonify({"error": f"获取水摄入记录失败: {str(e)}"}), 500
 
 @water_intake_bp.route('/records/<int:record_id>', methods=['GET'])
@@ -95,7 +95,7 @@ def get_water_intake_record(record_id):
             
         return jsonify(record), 200
     except Exception as e:
-        logger.error(f"获取水摄入记录 {record_id} 时出错: {str(e)}")
+        logger.error("获取水摄入记录 %s 时出错: %s", record_id, e)
         return jsonify({"error": f"获取水摄入记录失败: {str(e)}"}), 500
 
 @water_intake_bp.route('/records/<int:record_id>', methods=['PUT'])
@@ -139,7 +139,7 @@ def update_water_intake_record(record_id):
             "record": updated_record
         }), 200
     except Exception as e:
-        logger.error(f"更新水摄入记录 {record_id} 时出错: {str(e)}")
+        logger.error("更新水摄入记录 %s 时出错: %s", record_id, e)
         return jsonify({"error": f"更新水摄入记录失败: {str(e)}"}), 500
 
 @water_intake_bp.route('/records/<int:record_id>', methods=['DELETE'])
@@ -159,7 +159,7 @@ def delete_water_intake_record(record_id):
             
         return jsonify({"message": "水摄入记录已删除"}), 200
     except Exception as e:
-        logger.error(f"删除水摄入记录 {record_id} 时出错: {str(e)}")
+        logger.error("删除水摄入记录 %s 时出错: %s", record_id, e)
         return jsonify({"error": f"删除水摄入记录失败: {str(e)}"}), 500
 
 @water_intake_bp.route('/summary/daily', methods=['GET'])
@@ -180,7 +180,7 @@ def get_daily_water_summary():
         
         return jsonify(summary), 200
     except Exception as e:
-        logger.error(f"获取每日水摄入摘要时出错: {str(e)}")
+        logger.error("获取每日水摄入摘要时出错: %s", e)
         return jsonify({"error": f"获取每日水摄入摘要失败: {str(e)}"}), 500
 
 @water_intake_bp.route('/summary/weekly', methods=['GET'])
@@ -207,5 +207,5 @@ def get_weekly_water_summary():
         
         return jsonify(summary), 200
     except Exception as e:
-        logger.error(f"获取每周水摄入摘要时出错: {str(e)}")
+        logger.error("获取每周水摄入摘要时出错: %s", e)
         return jsonify({"error": f"获取每周水摄入摘要失败: {str(e)}"}), 500 
\ No newline at end of file
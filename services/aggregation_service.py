@@ -0,0 +1,361 @@
+"""
+按时间分桶的指标聚合
+
+aggregate(user_id, metric, start, end, bucket, fn) 把一个指标在日期范围内按天/周/月分桶聚合，
+分组在数据库中完成，每次调用是一条按 (user_id, 日期) 索引范围扫描的聚合查询：
+
+- sum / avg / count 可以由每天的和与个数合并得到，读取每日汇总表 daily_user_rollups
+- min / max 读取原始记录，同一张表的多个指标用 CASE 条件聚合在一条查询中完成
+- last（周期内最后一次记录的值）和 p50（中位数）用窗口函数在原始记录上计算，每个指标一条查询
+  （需要 SQLite 3.25+ / MySQL 8.0+）
+
+周按 ISO 周（周一开始）、月按自然月划分，桶的日期为周期第一天；首尾周期只包含查询范围内的日期。
+没有记录的周期不会出现在结果中，由调用方决定如何补齐。
+
+与每日汇总表一致，健康指标（体重、血压等）忽略 NULL 和 0；avg 为总和除以记录数。
+"""
+import logging
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import Date, and_, case, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from database import db
+from services.rollup_service import HEALTH_METRICS, intakes, records, rollups
+
+logger = logging.getLogger(__name__)
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+BUCKETS = (DAY, WEEK, MONTH)
+FUNCTIONS = ('avg', 'sum', 'min', 'max', 'count', 'last', 'p50')
+ROLLUP_FUNCTIONS = ('avg', 'sum', 'count')
+
+
+class week_start(FunctionElement):
+    """日期所在 ISO 周的周一"""
+    type = Date()
+    name = 'week_start'
+    inherit_cache = True
+
+
+class month_start(FunctionElement):
+    """日期所在月的1日"""
+    type = Date()
+    name = 'month_start'
+    inherit_cache = True
+
+
+@compiles(week_start)
+def _week_start_default(element, compiler, **kw):
+    return "CAST(date_trunc('week', %s) AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(week_start, 'sqlite')
+def _week_start_sqlite(element, compiler, **kw):
+    # weekday 0 前进到本周日（周日不变），再退 6 天即周一
+    return "date(%s, 'weekday 0', '-6 days')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(week_start, 'mysql')
+def _week_start_mysql(element, compiler, **kw):
+    value = compiler.process(element.clauses, **kw)
+    return "DATE_SUB(%s, INTERVAL WEEKDAY(%s) DAY)" % (value, value)
+
+
+@compiles(month_start)
+def _month_start_default(element, compiler, **kw):
+    return "CAST(date_trunc('month', %s) AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(month_start, 'sqlite')
+def _month_start_sqlite(element, compiler, **kw):
+    return "date(%s, 'start of month')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(month_start, 'mysql')
+def _month_start_mysql(element, compiler, **kw):
+    value = compiler.process(element.clauses, **kw)
+    return "DATE_SUB(%s, INTERVAL DAYOFMONTH(%s) - 1 DAY)" % (value, value)
+
+
+def bucket_expression(column, bucket):
+    """把日期列截断到所在周期第一天的 SQL 表达式"""
+    if bucket == WEEK:
+        return week_start(column)
+    if bucket == MONTH:
+        return month_start(column)
+    return column
+
+
+def bucket_start(day, bucket):
+    """bucket_expression 的 Python 版本"""
+    if bucket == WEEK:
+        return day - timedelta(days=day.weekday())
+    if bucket == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def bucket_starts(start_date, end_date, bucket):
+    """日期范围覆盖的所有周期的第一天（第一个周期可能早于 start_date）"""
+    starts = []
+    current = bucket_start(start_date, bucket)
+    while current <= end_date:
+        starts.append(current)
+        if bucket == WEEK:
+            current += timedelta(days=7)
+        elif bucket == MONTH:
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=1)
+    return starts
+
+
+# table: 原始记录表; column: 值所在列; record_type: health_records 中的记录类型;
+# nonzero: 是否忽略 0; rollup_sum / rollup_count: 每日汇总表中的和与个数列
+Metric = namedtuple('Metric', 'name table column record_type nonzero rollup_sum rollup_count')
+
+METRICS = {
+    prefix: Metric(prefix, records, column, 'health', True, f'{prefix}_sum', f'{prefix}_count')
+    for prefix, column in HEALTH_METRICS
+}
+METRICS.update({
+    # 饮食记录的热量保存在 calories_burned 字段中
+    'diet_calories': Metric('diet_calories', records, records.c.calories_burned, 'diet', False,
+                            'diet_calories', 'diet_count'),
+    'diet_food_amount': Metric('diet_food_amount', records, records.c.food_amount, 'diet', False,
+                               'diet_food_amount', 'diet_count'),
+    'exercise_minutes': Metric('exercise_minutes', records, records.c.duration, 'exercise', False,
+                               'exercise_minutes', 'exercise_count'),
+    'exercise_calories': Metric('exercise_calories', records, records.c.calories_burned, 'exercise', False,
+                                'exercise_calories', 'exercise_count'),
+    'water_amount': Metric('water_amount', records, records.c.water_amount, 'water', False,
+                           'water_amount', 'water_count'),
+    'intake_amount': Metric('intake_amount', intakes, intakes.c.amount, None, False,
+                            'intake_amount', 'intake_count'),
+})
+
+# 同一天内记录的先后顺序，用于 last
+RECORD_ORDER = {
+    'health_records': (records.c.record_date, records.c.created_at, records.c.id),
+    'water_intakes': (intakes.c.record_date, intakes.c.intake_time, intakes.c.id),
+}
+
+
+def _number(value):
+    return float(value) if value is not None else None
+
+
+def _metric_value(metric):
+    """指标的值表达式，不属于该指标的记录为 NULL"""
+    value = func.nullif(metric.column, 0) if metric.nonzero else metric.column
+    if metric.record_type is None:
+        return value
+    return case((metric.table.c.record_type == metric.record_type, value), else_=None)
+
+
+def _range_filters(table, date_column, user_id, start_date, end_date):
+    filters = [table.c.user_id == user_id]
+    if start_date is not None:
+        filters.append(date_column >= start_date)
+    if end_date is not None:
+        filters.append(date_column <= end_date)
+    return filters
+
+
+def _record_type_filter(metrics):
+    """限定记录类型，只有一种类型时可以使用 (user_id, record_type, record_date) 索引"""
+    types = sorted({metric.record_type for metric in metrics if metric.record_type})
+    if not types:
+        return []
+    column = metrics[0].table.c.record_type
+    return [column == types[0]] if len(types) == 1 else [column.in_(types)]
+
+
+class AggregationService:
+    """指标分桶聚合服务"""
+
+    @staticmethod
+    def aggregate(user_id, metric, start_date=None, end_date=None, bucket=DAY, fn='avg'):
+        """
+        按周期聚合一个指标
+
+        参数:
+            user_id: 用户ID
+            metric: 指标名，见 METRICS
+            start_date: 开始日期，可选
+            end_date: 结束日期，可选
+            bucket: day / week / month
+            fn: avg / sum / min / max / count / last / p50
+
+        返回:
+            [{'bucket': 周期第一天, 'value': 聚合值, 'count': 记录数}]，按周期升序
+        """
+        return AggregationService.aggregate_many(user_id, [metric], start_date, end_date, bucket, fn)[metric]
+
+    @staticmethod
+    def aggregate_many(user_id, metrics, start_date=None, end_date=None, bucket=DAY, fn='avg'):
+        """
+        用同一个聚合函数按周期聚合多个指标
+
+        sum / avg / count 的所有指标只需一条查询，min / max 每张原始表一条查询。
+
+        返回:
+            {指标名: aggregate 的结果}
+
+        抛出:
+            ValueError: 指标、周期或聚合函数无效
+        """
+        unknown = [name for name in metrics if name not in METRICS]
+        if unknown:
+            raise ValueError(f"无效的指标: {', '.join(unknown)}，有效值: {', '.join(METRICS)}")
+        if bucket not in BUCKETS:
+            raise ValueError(f"无效的周期: {bucket}，有效值: {', '.join(BUCKETS)}")
+        if fn not in FUNCTIONS:
+            raise ValueError(f"无效的聚合函数: {fn}，有效值: {', '.join(FUNCTIONS)}")
+        if start_date is not None and end_date is not None and start_date > end_date:
+            raise ValueError("开始日期不能晚于结束日期")
+
+        selected = [METRICS[name] for name in dict.fromkeys(metrics)]
+        connection = db.session.connection()
+        if fn in ROLLUP_FUNCTIONS:
+            result = AggregationService._from_rollups(
+                connection, user_id, [(metric.name, fn) for metric in selected], start_date, end_date, bucket)
+            return {name: points for (name, _), points in result.items()}
+
+        result = {}
+        if fn in ('min', 'max'):
+            by_table = {}
+            for metric in selected:
+                by_table.setdefault(metric.table.name, []).append(metric)
+            for table_metrics in by_table.values():
+                result.update(AggregationService._extremes(
+                    connection, user_id, table_metrics, start_date, end_date, bucket, fn))
+        else:
+            for metric in selected:
+                result[metric.name] = AggregationService._ranked(
+                    connection, user_id, metric, start_date, end_date, bucket, fn)
+        return result
+
+    @staticmethod
+    def aggregate_rollups(user_id, specs, start_date=None, end_date=None, bucket=DAY):
+        """
+        按周期聚合多个 (指标, 聚合函数)，聚合函数可以各不相同但只能是 sum / avg / count，
+        全部由一条每日汇总表上的分组查询得到
+
+        参数:
+            specs: [(指标名, 聚合函数)]
+            其余参数同 aggregate
+
+        返回:
+            {(指标名, 聚合函数): aggregate 的结果}
+
+        抛出:
+            ValueError: 指标、周期或聚合函数无效
+        """
+        unknown = [name for name, _ in specs if name not in METRICS]
+        if unknown:
+            raise ValueError(f"无效的指标: {', '.join(unknown)}，有效值: {', '.join(METRICS)}")
+        if bucket not in BUCKETS:
+            raise ValueError(f"无效的周期: {bucket}，有效值: {', '.join(BUCKETS)}")
+        invalid = [fn for _, fn in specs if fn not in ROLLUP_FUNCTIONS]
+        if invalid:
+            raise ValueError(f"无效的聚合函数: {', '.join(invalid)}，有效值: {', '.join(ROLLUP_FUNCTIONS)}")
+        if start_date is not None and end_date is not None and start_date > end_date:
+            raise ValueError("开始日期不能晚于结束日期")
+        return AggregationService._from_rollups(
+            db.session.connection(), user_id, list(dict.fromkeys(specs)), start_date, end_date, bucket)
+
+    @staticmethod
+    def _from_rollups(connection, user_id, specs, start_date, end_date, bucket):
+        """由每日汇总表的和与个数合并出 sum / avg / count（主键范围扫描）"""
+        metrics = [METRICS[name] for name in dict.fromkeys(name for name, _ in specs)]
+        period = bucket_expression(rollups.c.date, bucket)
+        columns = [period.label('bucket')]
+        for metric in metrics:
+            columns.append(func.sum(rollups.c[metric.rollup_sum]).label(f'{metric.name}_sum'))
+            columns.append(func.sum(rollups.c[metric.rollup_count]).label(f'{metric.name}_count'))
+        query = select(*columns).where(
+            *_range_filters(rollups, rollups.c.date, user_id, start_date, end_date)
+        ).group_by(period).order_by(period)
+
+        result = {spec: [] for spec in specs}
+        for row in connection.execute(query).mappings():
+            for name, fn in specs:
+                count = int(row[f'{name}_count'] or 0)
+                if not count:
+                    continue
+                total = _number(row[f'{name}_sum']) or 0.0
+                value = {'sum': total, 'count': count, 'avg': total / count}[fn]
+                result[(name, fn)].append({'bucket': row['bucket'], 'value': value, 'count': count})
+        return result
+
+    @staticmethod
+    def _extremes(connection, user_id, metrics, start_date, end_date, bucket, fn):
+        """同一张原始表上多个指标的 min / max，每个指标一组 CASE 条件聚合"""
+        table = metrics[0].table
+        period = bucket_expression(table.c.record_date, bucket)
+        aggregate = func.min if fn == 'min' else func.max
+        columns = [period.label('bucket')]
+        for metric in metrics:
+            value = _metric_value(metric)
+            columns.append(aggregate(value).label(f'{metric.name}_value'))
+            columns.append(func.count(value).label(f'{metric.name}_count'))
+        query = select(*columns).where(
+            *_range_filters(table, table.c.record_date, user_id, start_date, end_date),
+            *_record_type_filter(metrics)
+        ).group_by(period).order_by(period)
+
+        result = {metric.name: [] for metric in metrics}
+        for row in connection.execute(query).mappings():
+            for metric in metrics:
+                count = row[f'{metric.name}_count']
+                if count:
+                    result[metric.name].append({'bucket': row['bucket'], 'value': _number(row[f'{metric.name}_value']),
+                                                'count': int(count)})
+        return result
+
+    @staticmethod
+    def _ranked(connection, user_id, metric, start_date, end_date, bucket, fn):
+        """
+        用窗口函数计算 last / p50
+
+        last: 按记录先后倒序编号，取每个周期的第 1 条
+        p50: 按值升序编号，取编号在 count/2 到 count/2 + 1 之间的一条（奇数个）或两条（偶数个）的平均值
+        """
+        table = metric.table
+        period = bucket_expression(table.c.record_date, bucket)
+        value = _metric_value(metric)
+        if fn == 'last':
+            order = [column.desc() for column in RECORD_ORDER[table.name]]
+        else:
+            order = [value, table.c.id]
+        ranked = select(
+            period.label('bucket'),
+            value.label('value'),
+            func.row_number().over(partition_by=period, order_by=order).label('rn'),
+            func.count().over(partition_by=period).label('cnt')
+        ).where(
+            *_range_filters(table, table.c.record_date, user_id, start_date, end_date),
+            *_record_type_filter([metric]),
+            value.isnot(None)
+        ).subquery()
+
+        if fn == 'last':
+            picked = ranked.c.rn == 1
+        else:
+            picked = and_(ranked.c.rn * 2 >= ranked.c.cnt, ranked.c.rn * 2 <= ranked.c.cnt + 2)
+        query = select(
+            ranked.c.bucket,
+            func.avg(ranked.c.value).label('value'),
+            func.max(ranked.c.cnt).label('count')
+        ).where(picked).group_by(ranked.c.bucket).order_by(ranked.c.bucket)
+
+        return [
+            {'bucket': row.bucket, 'value': _number(row.value), 'count': int(row.count)}
+            for row in connection.execute(query)
+        ]
@@ -1,11 +1,13 @@
-from models.diet_record import DietRecord, Food
+from models.diet_record import DietRecord
 from models.exercise import ExerciseType, ExerciseRecord
 from models.user import User
 from models.health_record import HealthRecord
 from database import db
+from services.nutrition_aggregator import NutritionAggregator
 from datetime import datetime, timedelta
-from sqlalchemy import func, cast, Date
-import calendar
+import logging
+
+logger = logging.getLogger(__name__)
 
 class AnalysisService:
     """营养成分分析与运动建议服务"""
@@ -24,7 +26,7 @@ class AnalysisService:
             包含营养分析结果的字典
         """
         try:
-            print(f"开始营养分析 - 用户ID: {user_id}, 开始日期: {start_date}, 结束日期: {end_date}")
+            logger.debug("开始营养分析 - 用户ID: %s, 开始日期: %s, 结束日期: %s", user_id, start_date, end_date)
             
             # 设置默认时间范围为过去7天
             if not end_date:
@@ -47,317 +49,20 @@ class AnalysisService:
                     # 如果日期格式无效，使用默认日期
                     end_date = datetime.now().date()
             
-            print(f"处理后的日期范围: {start_date} 至 {end_date}")
+            logger.debug("处理后的日期范围: %s 至 %s", start_date, end_date)
             
             # 获取用户基本信息，用于计算推荐摄入量
             user = User.query.get(user_id)
             if not user:
-                print(f"未找到用户: {user_id}")
+                logger.warning("未找到用户: %s", user_id)
                 return {
                     "success": False, 
                     "message": "未找到用户信息"
                 }
             
-            # 获取该时间段内的所有饮食记录
-            diet_records = DietRecord.query.filter(
-                DietRecord.user_id == user_id,
-                DietRecord.record_date >= start_date,
-                DietRecord.record_date <= end_date
-            ).all()
-            
-            print(f"找到 {len(diet_records)} 条饮食记录")
-            
-            # 同时获取HealthRecord表中的饮食记录
-            health_diet_records = HealthRecord.query.filter(
-                HealthRecord.user_id == user_id,
-                HealthRecord.record_type == 'diet',
-                HealthRecord.record_date >= start_date,
-                HealthRecord.record_date <= end_date
-            ).all()
-            
-            print(f"从HealthRecord表中找到 {len(health_diet_records)} 条饮食记录")
-            
-            # 初始化每日营养数据存储
+            # 按天、按餐次汇总饮食营养，每个数据源一次查询，用 NumPy 分组求和
             days_count = (end_date - start_date).days + 1
-            daily_nutrition = {}
-            
-            current_date = start_date
-            while current_date <= end_date:
-                daily_nutrition[current_date.isoformat()] = {
-                    "date": current_date.isoformat(),
-                    "calories": 0,
-                    "protein": 0,
-                    "fat": 0,
-                    "carbohydrate": 0,
-                    "fiber": 0,
-                    "sugar": 0,
-                    "sodium": 0,
-                    "meals": {}
-                }
-                current_date += timedelta(days=1)
-            
-            # 累计每日营养摄入
-            for record in diet_records:
-                day_key = record.record_date.isoformat()
-                meal_type = record.meal_type if record.meal_type else "未分类"
-                
-                print(f"处理记录: 日期 {day_key}, 餐次 {meal_type}, ID {record.id}")
-                
-                # 确保meal_type存在于当日汇总中
-                if meal_type not in daily_nutrition[day_key]["meals"]:
-                    daily_nutrition[day_key]["meals"][meal_type] = {
-                        "calories": 0,
-                        "items": []
-                    }
-                
-                # 累加当前餐次的热量
-                if hasattr(record, 'total_calories') and record.total_calories:
-                    print(f"  添加总热量: {record.total_calories}")
-                    daily_nutrition[day_key]["calories"] += record.total_calories
-                    daily_nutrition[day_key]["meals"][meal_type]["calories"] += record.total_calories
-                
-                # 遍历该餐次的每个食物项
-                if hasattr(record, 'items') and record.items:
-                    print(f"  该记录有 {len(record.items)} 个食物项")
-                    for item in record.items:
-                        if not item:
-                            continue
-                        
-                        print(f"    处理食物项: {item}")
-                        
-                        # 直接从item获取营养素信息
-                        amount = item.amount if hasattr(item, 'amount') and item.amount else 0
-                        calories = item.calories if hasattr(item, 'calories') and item.calories else 0
-                        
-                        # 尝试从关联的food对象获取营养素
-                        protein = 0
-                        fat = 0
-                        carbs = 0
-                        fiber = 0
-                        sugar = 0
-                        sodium = 0
-                        food_name = "未知食物"
-                        
-                        # 直接从item获取营养素
-                        if hasattr(item, 'protein') and item.protein is not None:
-                            protein = item.protein
-                        if hasattr(item, 'fat') and item.fat is not None:
-                            fat = item.fat
-                        if hasattr(item, 'carbohydrate') and item.carbohydrate is not None:
-                            carbs = item.carbohydrate
-                        if hasattr(item, 'fiber') and item.fiber is not None:
-                            fiber = item.fiber
-                        if hasattr(item, 'sugar') and item.sugar is not None:
-                            sugar = item.sugar
-                        if hasattr(item, 'sodium') and item.sodium is not None:
-                            sodium = item.sodium
-                        
-                        # 如果item上没有营养素数据，尝试从food对象获取
-                        if (hasattr(item, 'food') and item.food and 
-                            (protein == 0 and fat == 0 and carbs == 0)):
-                            
-                            food = item.food
-                            print(f"    从食物对象获取营养素: {food.name if hasattr(food, 'name') else 'Unknown'}")
-                            
-                            # 计算该项的营养成分，考虑食用量
-                            amount_ratio = amount / 100.0  # 假设营养素数据是按照100克计算的
-                            
-                            if hasattr(food, 'protein') and food.protein:
-                                protein = food.protein * amount_ratio
-                            if hasattr(food, 'fat') and food.fat:
-                                fat = food.fat * amount_ratio
-                            if hasattr(food, 'carbohydrate') and food.carbohydrate:
-                                carbs = food.carbohydrate * amount_ratio
-                            if hasattr(food, 'fiber') and food.fiber:
-                                fiber = food.fiber * amount_ratio
-                            if hasattr(food, 'sugar') and food.sugar:
-                                sugar = food.sugar * amount_ratio
-                            if hasattr(food, 'sodium') and food.sodium:
-                                sodium = food.sodium * amount_ratio
-                            
-                            if hasattr(food, 'name') and food.name:
-                                food_name = food.name
-                        
-                        # 获取食物名称（优先使用food_name属性）
-                        if hasattr(item, 'food_name') and item.food_name:
-                            food_name = item.food_name
-                        
-                        print(f"    营养素数据: 蛋白质 {protein}g, 脂肪 {fat}g, 碳水 {carbs}g, 纤维 {fiber}g, 糖 {sugar}g, 钠 {sodium}mg")
-                        
-                        # 累加各营养素
-                        daily_nutrition[day_key]["protein"] += protein
-                        daily_nutrition[day_key]["fat"] += fat
-                        daily_nutrition[day_key]["carbohydrate"] += carbs
-                        daily_nutrition[day_key]["fiber"] += fiber
-                        daily_nutrition[day_key]["sugar"] += sugar
-                        daily_nutrition[day_key]["sodium"] += sodium
-                            
-                        # 添加食物到该餐的食物列表
-                        daily_nutrition[day_key]["meals"][meal_type]["items"].append({
-                            "name": food_name,
-                            "amount": amount,
-                            "calories": calories
-                        })
-            
-            # 处理从HealthRecord获取的饮食记录
-            for record in health_diet_records:
-                day_key = record.record_date.isoformat()
-                meal_type = record.meal_type if record.meal_type else "未分类"
-                
-                print(f"处理HealthRecord记录: 日期 {day_key}, 餐次 {meal_type}, ID {record.id}")
-                
-                # 确保每个日期和餐次都有对应的数据结构
-                if day_key not in daily_nutrition:
-                    print(f"  警告: 日期 {day_key} 不在统计中，创建新的日期条目")
-                    daily_nutrition[day_key] = {
-                        "date": day_key,
-                        "calories": 0,
-                        "protein": 0,
-                        "fat": 0,
-                        "carbohydrate": 0,
-                        "fiber": 0,
-                        "sugar": 0,
-                        "sodium": 0,
-                        "meals": {}
-                    }
-                
-                if meal_type not in daily_nutrition[day_key]["meals"]:
-                    daily_nutrition[day_key]["meals"][meal_type] = {
-                        "calories": 0,
-                        "items": []
-                    }
-                
-                # 提取食物名称、数量和热量
-                food_name = record.food_name or "未知食物"
-                amount = record.food_amount or 0
-                
-                # 获取热量数据，如果有的话
-                calories = record.calories_burned or 0
-                
-                # 添加到菜品列表并更新总卡路里
-                item_details = {
-                    "food_name": food_name,
-                    "amount": amount,
-                    "calories": calories
-                }
-                
-                # 添加食物项到餐次中
-                daily_nutrition[day_key]["meals"][meal_type]["items"].append(item_details)
-                
-                # 如果有热量数据，则添加到当天统计
-                if calories > 0:
-                    print(f"  添加热量: {calories}")
-                    daily_nutrition[day_key]["calories"] += calories
-                    daily_nutrition[day_key]["meals"][meal_type]["calories"] += calories
-                
-                # 根据食物名称估算营养素
-                protein_estimate = 0
-                fat_estimate = 0
-                carbs_estimate = 0
-                fiber_estimate = 0
-                sugar_estimate = 0
-                sodium_estimate = 0
-                
-                # 尝试从Food表中查找匹配的食物来获取准确的营养信息
-                food = Food.query.filter(Food.name.like(f"%{food_name}%")).first()
-                
-                if food and food.calories:
-                    print(f"  从食物数据库匹配到: {food.name}")
-                    # 如果找到食物，使用其营养数据（按照摄入量比例计算）
-                    amount_ratio = amount / 100.0  # 假设营养素数据是按照100克计算的
-                    
-                    # 使用卡路里估算营养素
-                    calories = food.calories * amount_ratio if food.calories else calories
-                    protein_estimate = food.protein * amount_ratio if food.protein else 0
-                    fat_estimate = food.fat * amount_ratio if food.fat else 0
-                    carbs_estimate = food.carbohydrate * amount_ratio if food.carbohydrate else 0
-                    fiber_estimate = food.fiber * amount_ratio if food.fiber else 0
-                    sugar_estimate = food.sugar * amount_ratio if food.sugar else 0
-                    sodium_estimate = food.sodium * amount_ratio if food.sodium else 0
-                    
-                    # 在日志中特别输出糖分和纤维素数据，方便调试
-                    print(f"  食物营养成分明细 - 纤维素: {fiber_estimate}g, 糖分: {sugar_estimate}g")
-                else:
-                    # 如果找不到食物，使用估算方法
-                    if "鸡蛋" in food_name or "蛋" in food_name:
-                        protein_estimate = amount * 0.13  # 13% 蛋白质
-                        fat_estimate = amount * 0.10      # 10% 脂肪
-                        carbs_estimate = amount * 0.01    # 1% 碳水
-                        fiber_estimate = amount * 0.001   # 0.1% 纤维
-                        sodium_estimate = amount * 1.4    # 140mg/100g 钠
-                        sugar_estimate = amount * 0.005   # 0.5% 糖分
-                    # 水果类食物
-                    elif any(fruit in food_name for fruit in ["果", "苹果", "香蕉", "橙子", "橘子", "梨"]):
-                        protein_estimate = amount * 0.01  # 1% 蛋白质
-                        fat_estimate = amount * 0.001     # 0.1% 脂肪
-                        carbs_estimate = amount * 0.15    # 15% 碳水
-                        fiber_estimate = amount * 0.02    # 2% 纤维
-                        sodium_estimate = amount * 0.01   # 1mg/100g 钠
-                        sugar_estimate = amount * 0.1     # 10% 糖分(水果含糖较高)
-                        print(f"  水果类食物估算 - 纤维素: {fiber_estimate}g, 糖分: {sugar_estimate}g")
-                    # 甜食类
-                    elif any(sweet in food_name for sweet in ["糖", "巧克力", "蛋糕", "甜点", "冰淇淋", "饼干"]):
-                        protein_estimate = amount * 0.05  # 5% 蛋白质
-                        fat_estimate = amount * 0.15      # 15% 脂肪
-                        carbs_estimate = amount * 0.60    # 60% 碳水
-                        fiber_estimate = amount * 0.01    # 1% 纤维
-                        sodium_estimate = amount * 0.2    # 20mg/100g 钠
-                        sugar_estimate = amount * 0.35    # 35% 糖分(甜食含糖高)
-                        print(f"  甜食类食物估算 - 纤维素: {fiber_estimate}g, 糖分: {sugar_estimate}g")
-                    # 肉类食物
-                    elif any(meat in food_name for meat in ["肉", "牛肉", "猪肉", "鸡肉", "鱼", "虾"]):
-                        protein_estimate = amount * 0.22  # 22% 蛋白质
-                        fat_estimate = amount * 0.10      # 10% 脂肪
-                        carbs_estimate = 0                # 几乎没有碳水
-                        fiber_estimate = 0                # 几乎没有纤维
-                        sodium_estimate = amount * 0.7    # 70mg/100g 钠
-                        sugar_estimate = 0                # 几乎没有糖
-                    # 米饭、面条等主食
-                    elif any(carb in food_name for carb in ["米饭", "面", "米", "饭", "馒头", "面包"]):
-                        protein_estimate = amount * 0.07  # 7% 蛋白质
-                        fat_estimate = amount * 0.01      # 1% 脂肪
-                        carbs_estimate = amount * 0.28    # 28% 碳水
-                        fiber_estimate = amount * 0.01    # 1% 纤维
-                        sodium_estimate = amount * 0.02   # 2mg/100g 钠
-                        sugar_estimate = amount * 0.01    # 1% 糖分
-                    # 蔬菜
-                    elif any(veg in food_name for veg in ["菜", "青菜", "蔬菜", "西红柿", "番茄", "黄瓜"]):
-                        protein_estimate = amount * 0.02  # 2% 蛋白质
-                        fat_estimate = 0                  # 几乎没有脂肪
-                        carbs_estimate = amount * 0.05    # 5% 碳水
-                        fiber_estimate = amount * 0.03    # 3% 纤维
-                        sodium_estimate = amount * 0.1    # 10mg/100g 钠
-                        sugar_estimate = amount * 0.02    # 2% 糖分
-                    # 如果有热量数据但没有匹配到食物类型，则按比例估算营养素
-                    elif calories > 0:
-                        protein_estimate = calories * 0.2 / 4  # 假设20%热量来自蛋白质
-                        fat_estimate = calories * 0.3 / 9      # 假设30%热量来自脂肪
-                        carbs_estimate = calories * 0.5 / 4    # 假设50%热量来自碳水
-                        fiber_estimate = amount * 0.03         # 假设每100g食物含3g纤维
-                        sodium_estimate = amount * 0.05        # 假设每100g食物含50mg钠
-                        sugar_estimate = calories * 0.1 / 4    # 假设10%热量来自糖
-                
-                print(f"  估算营养素 - 蛋白质: {protein_estimate}g, 脂肪: {fat_estimate}g, 碳水: {carbs_estimate}g, 纤维: {fiber_estimate}g, 糖分: {sugar_estimate}g")
-                
-                # 累加各营养素到日统计
-                daily_nutrition[day_key]["protein"] += protein_estimate
-                daily_nutrition[day_key]["fat"] += fat_estimate
-                daily_nutrition[day_key]["carbohydrate"] += carbs_estimate
-                daily_nutrition[day_key]["fiber"] += fiber_estimate
-                daily_nutrition[day_key]["sugar"] += sugar_estimate
-                daily_nutrition[day_key]["sodium"] += sodium_estimate
-                
-                # 如果没有热量数据，从营养素计算热量
-                if calories <= 0:
-                    calculated_calories = (protein_estimate * 4) + (fat_estimate * 9) + (carbs_estimate * 4)
-                    if calculated_calories > 0:
-                        print(f"  根据营养素计算热量: {calculated_calories}卡路里")
-                        daily_nutrition[day_key]["calories"] += calculated_calories
-                        daily_nutrition[day_key]["meals"][meal_type]["calories"] += calculated_calories
-            
-            # 打印每日数据汇总
-            for day, data in daily_nutrition.items():
-                print(f"日期 {day} 汇总: 热量 {data['calories']}kcal, 蛋白质 {data['protein']}g, 脂肪 {data['fat']}g, 碳水 {data['carbohydrate']}g")
+            daily_nutrition = NutritionAggregator.aggregate(user_id, start_date, end_date)
             
             # 计算营养素平均值
             avg_nutrition = {
@@ -379,7 +84,7 @@ class AnalysisService:
             for key in avg_nutrition:
                 avg_nutrition[key] = round(avg_nutrition[key] / days_count, 2) if days_count > 0 else 0
             
-            print(f"平均营养素: {avg_nutrition}")
+            logger.debug("平均营养素: %s", avg_nutrition)
             
             # 计算总卡路里推荐值
             recommended_calories = 2200  # 通用推荐值
@@ -548,7 +253,7 @@ class AnalysisService:
             # 返回完整的分析结果
             # 确保每日数据正确格式化
             daily_nutrition_list = list(daily_nutrition.values())
-            print(f"返回 {len(daily_nutrition_list)} 条每日营养数据")
+            logger.debug("返回 %s 条每日营养数据", len(daily_nutrition_list))
 
             # 返回分析结果
             result = {
@@ -568,15 +273,15 @@ class AnalysisService:
             }
 
             # 打印结果中的daily_nutrition长度以确认
-            print(f"最终返回结果: success={result['success']}, 每日数据数量={len(result['data']['daily_nutrition'])}")
+            logger.debug("最终返回结果: success=%s, 每日数据数量=%s", result['success'], len(result['data']['daily_nutrition']))
             for day in result['data']['daily_nutrition'][:3]:  # 只打印前3天作为示例
-                print(f"示例日期数据: {day['date']}, 热量={day['calories']}, 蛋白质={day['protein']}")
+                logger.debug("示例日期数据: %s, 热量=%s, 蛋白质=%s", day['date'], day['calories'], day['protein'])
 
             return result
         except Exception as e:
             import traceback
             traceback_str = traceback.format_exc()
-            print(f"营养分析错误: {str(e)}\n{traceback_str}")
+            logger.error("营养分析错误: %s\n%s", e, traceback_str)
             return {
                 "success": False,
                 "message": f"获取营养分析失败: {str(e)}",
@@ -626,7 +331,7 @@ class AnalysisService:
             except Exception as e:
                 # 如果查询出错，使用空列表
                 exercise_records = []
-                print(f"获取运动记录时出错: {str(e)}")
+                logger.error("获取运动记录时出错: %s", e)
             
             # 初始化默认值
             avg_daily_duration = 0
@@ -647,7 +352,7 @@ class AnalysisService:
                 except Exception as e:
                     # 如果查询出错，使用空列表
                     health_records = []
-                    print(f"获取健康记录时出错: {str(e)}")
+                    logger.error("获取健康记录时出错: %s", e)
                 
                 # 如果存在健康记录，基于步数创建一些基本运动数据
                 if health_records:
@@ -667,7 +372,7 @@ class AnalysisService:
                             db.session.commit()
                     except Exception as e:
                         # 如果无法获取或创建步行类型，跳过
-                        print(f"获取或创建步行运动类型时出错: {str(e)}")
+                        logger.error("获取或创建步行运动类型时出错: %s", e)
                     
                     # 计算每天的步数(如果有)转化为运动时长
                     avg_daily_duration = 30  # 默认每天30分钟
@@ -772,7 +477,7 @@ class AnalysisService:
                 except Exception as e:
                     # 如果分析饮食摄入出错，使用默认值
                     calorie_surplus = 0
-                    print(f"分析饮食摄入时出错: {str(e)}")
+                    logger.error("分析饮食摄入时出错: %s", e)
             
             # 获取所有可用的运动类型
             available_types = {
@@ -805,7 +510,7 @@ class AnalysisService:
                         available_types["其他"].append(type_info)
             except Exception as e:
                 # 如果获取运动类型失败，使用空数据
-                print(f"获取运动类型时出错: {str(e)}")
+                logger.error("获取运动类型时出错: %s", e)
             
             # 生成运动建议
             recommendations = []
@@ -6,7 +6,6 @@ import re
 import logging
 
 # 设置日志记录
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AuthService:
@@ -63,7 +62,7 @@ class AuthService:
             
             return {'success': True, 'message': '注册成功', 'user': user.to_dict()}, 201
         except Exception as e:
-            logger.error(f"注册用户时出错: {str(e)}")
+            logger.error("注册用户时出错: %s", e)
             db.session.rollback()
             return {'success': False, 'message': f'注册失败: {str(e)}'}, 500
     
@@ -93,7 +92,7 @@ class AuthService:
             try:
                 password_valid = user.check_password(password)
             except Exception as e:
-                logger.error(f"密码验证出错: {str(e)}")
+                logger.error("密码验证出错: %s", e)
                 return {'success': False, 'message': '密码验证错误，请联系管理员'}, 500
                 
             if not password_valid:
@@ -112,7 +111,7 @@ class AuthService:
                 'user': user.to_dict()
             }, 200
         except Exception as e:
-            logger.error(f"登录过程中出错: {str(e)}")
+            logger.error("登录过程中出错: %s", e)
             return {'success': False, 'message': f'登录失败: {str(e)}'}, 500
     
     @staticmethod
@@ -134,5 +133,5 @@ class AuthService:
             
             return {'success': True, 'user': user.to_dict()}, 200
         except Exception as e:
-            logger.error(f"获取用户信息时出错: {str(e)}")
+            logger.error("获取用户信息时出错: %s", e)
             return {'success': False, 'message': f'获取用户信息失败: {str(e)}'}, 500 
\ No newline at end of file
@@ -0,0 +1,306 @@
+"""
+批量生成健康报告
+
+为所有用户生成同一周期的报告（例如每周一为每个用户生成上周的周报）。用户ID按顺序切分成
+若干分块，每个分块交给进程池中的一个进程：进程创建自己的数据库引擎，用几条按用户ID范围的
+分组查询读取整个分块的记录（ReportAggregateService.compute_users），在内存中为每个用户
+生成报告内容，最后批量插入 health_reports。
+
+进程池以 spawn 方式启动子进程（见 utils/process_pool.py）：HTTP 接口在 Web 进程的后台线程中
+执行批量任务，不能从多线程的进程 fork。
+
+单个用户生成失败只计入失败数，不影响同一分块的其他用户；分块的数据库操作失败时整个分块
+计为失败。命令行入口为 scripts/batch_reports.py，HTTP 接口见 routes/health_report.py。
+
+HTTP 接口提交的批次在 Web 进程的后台线程中执行，进程退出时批次会停留在 pending/running。
+应用启动时 init_report_batches 把超过 REPORT_BATCH_STALE_SECONDS（默认 3600 秒，running 按
+started_at、pending 按 created_at）的批次标记为 failed，需要时重新提交。
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import as_completed
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert, or_, select, update
+
+from database import db
+from models.health_report import HealthReport, ReportBatch
+from models.user import User
+from services.health_report_service import HealthReportService
+from services.report_aggregates import ReportAggregateService, empty_aggregate
+from utils.process_pool import SpawnProcessPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+INSERT_BATCH_SIZE = 500
+MAX_FAILED_USER_IDS = 100  # 结果中最多列出的失败用户ID
+DEFAULT_STALE_SECONDS = 3600
+
+users = User.__table__
+reports = HealthReport.__table__
+
+
+def previous_period(report_type, today=None):
+    """
+    批量报告默认的日期范围：weekly 为上一个完整的周（周一至周日），monthly 为上个月，
+    yearly 为去年，其他类型为截至昨天的 7 天
+    """
+    today = today or date.today()
+    if report_type == 'weekly':
+        end_date = today - timedelta(days=today.weekday() + 1)
+        return end_date - timedelta(days=6), end_date
+    if report_type == 'monthly':
+        end_date = today.replace(day=1) - timedelta(days=1)
+        return end_date.replace(day=1), end_date
+    if report_type == 'yearly':
+        return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+    end_date = today - timedelta(days=1)
+    return end_date - timedelta(days=6), end_date
+
+
+def chunk_user_ids(user_ids, chunk_size):
+    """把有序的用户ID列表切分为 [(起始ID, 结束ID, 用户数)]"""
+    return [
+        (user_ids[i], user_ids[min(i + chunk_size, len(user_ids)) - 1], len(user_ids[i:i + chunk_size]))
+        for i in range(0, len(user_ids), chunk_size)
+    ]
+
+
+def generate_chunk(database_url, first_user_id, last_user_id, report_type, start_date, end_date):
+    """
+    为ID在 [first_user_id, last_user_id] 内的用户生成报告（在子进程中执行）
+
+    返回:
+        {'users', 'succeeded', 'failed', 'failed_user_ids', 'seconds'}
+    """
+    started = time.perf_counter()
+    engine = create_engine(database_url)
+    user_ids = []
+    failed_user_ids = []
+    try:
+        with engine.begin() as conn:
+            user_ids = list(conn.execute(
+                select(users.c.id)
+                .where(users.c.id >= first_user_id, users.c.id <= last_user_id)
+                .order_by(users.c.id)
+            ).scalars())
+            aggregates = ReportAggregateService.compute_users(
+                conn, first_user_id, last_user_id, start_date, end_date)
+            # 运动和用药统计所有历史记录，不需要每天的体重
+            histories = ReportAggregateService.compute_users(
+                conn, first_user_id, last_user_id, weights=False)
+
+            now = datetime.utcnow()
+            rows = []
+            for user_id in user_ids:
+                try:
+                    fields = HealthReportService.build_report_fields(
+                        user_id, report_type, start_date, end_date,
+                        aggregates.get(user_id) or empty_aggregate(),
+                        histories.get(user_id) or empty_aggregate())
+                except Exception as e:
+                    logger.error("用户 %s 的报告生成失败: %s", user_id, e)
+                    failed_user_ids.append(user_id)
+                    continue
+                fields.update(created_at=now, updated_at=now)
+                rows.append(fields)
+
+            for i in range(0, len(rows), INSERT_BATCH_SIZE):
+                conn.execute(insert(reports), rows[i:i + INSERT_BATCH_SIZE])
+    except Exception as e:
+        # 整个分块回滚，已读到的用户全部计为失败
+        logger.error("用户 %s-%s 的分块生成失败: %s", first_user_id, last_user_id, e)
+        return {'users': len(user_ids), 'succeeded': 0, 'failed': len(user_ids), 'failed_user_ids': user_ids,
+                'seconds': time.perf_counter() - started, 'error': str(e)}
+    finally:
+        engine.dispose()
+
+    return {
+        'users': len(user_ids),
+        'succeeded': len(user_ids) - len(failed_user_ids),
+        'failed': len(failed_user_ids),
+        'failed_user_ids': failed_user_ids,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def run_batch(database_url, report_type='weekly', start_date=None, end_date=None,
+              workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    为所有用户生成报告
+
+    参数:
+        database_url: 数据库地址（子进程据此创建各自的引擎）
+        report_type: 报告类型
+        start_date: 开始日期，与 end_date 都为空时使用 previous_period
+        end_date: 结束日期
+        workers: 进程数，默认 CPU 核数；为 1 时在当前进程中依次处理各分块
+        chunk_size: 每个分块的用户数
+
+    返回:
+        汇总字典：用户数、成功数、失败数、失败用户ID、分块数、耗时和每秒处理的用户数
+    """
+    if start_date is None or end_date is None:
+        start_date, end_date = previous_period(report_type)
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            user_ids = list(conn.execute(select(users.c.id).order_by(users.c.id)).scalars())
+    finally:
+        engine.dispose()
+    chunks = chunk_user_ids(user_ids, chunk_size)
+    logger.info("批量生成 %s 报告 (%s 至 %s): %s 个用户, %s 个分块, %s 个进程",
+                report_type, start_date, end_date, len(user_ids), len(chunks), workers)
+
+    summary = {
+        'report_type': report_type,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'users': len(user_ids),
+        'succeeded': 0,
+        'failed': 0,
+        'failed_user_ids': [],
+        'chunks': len(chunks),
+        'workers': workers,
+    }
+
+    def collect(chunk, result):
+        failed = result['failed']
+        if result.get('error') and not result['users']:
+            # 分块连用户列表都没有读到，按切分时的用户数计为失败
+            failed = chunk[2]
+        summary['succeeded'] += result['succeeded']
+        summary['failed'] += failed
+        summary['failed_user_ids'].extend(result['failed_user_ids'])
+        logger.info("分块 %s-%s 完成: 成功 %s, 失败 %s, 用时 %.2f 秒",
+                    chunk[0], chunk[1], result['succeeded'], failed, result['seconds'])
+
+    arguments = [(database_url, first, last, report_type, start_date, end_date) for first, last, _ in chunks]
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk, args in zip(chunks, arguments):
+            collect(chunk, generate_chunk(*args))
+    else:
+        with SpawnProcessPool(max_workers=min(workers, len(chunks))) as executor:
+            futures = {executor.submit(generate_chunk, *args): chunk for chunk, args in zip(chunks, arguments)}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 子进程异常退出
+                    logger.error("分块 %s-%s 执行失败: %s", chunk[0], chunk[1], e)
+                    result = {'users': 0, 'succeeded': 0, 'failed': 0, 'failed_user_ids': [],
+                              'seconds': 0, 'error': str(e)}
+                collect(chunk, result)
+
+    seconds = time.perf_counter() - started
+    summary['failed_user_ids'] = sorted(summary['failed_user_ids'])[:MAX_FAILED_USER_IDS]
+    summary['seconds'] = round(seconds, 3)
+    summary['users_per_second'] = round(len(user_ids) / seconds, 1) if seconds else None
+    logger.info("批量生成完成: %s 个用户, 成功 %s, 失败 %s, 用时 %.1f 秒 (%s 用户/秒)",
+                summary['users'], summary['succeeded'], summary['failed'], seconds, summary['users_per_second'])
+    return summary
+
+
+def init_report_batches(app):
+    """应用启动时把执行它们的进程已退出的批次标记为 failed，返回标记的批次数"""
+    stale_seconds = int(app.config.get('REPORT_BATCH_STALE_SECONDS', DEFAULT_STALE_SECONDS))
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    with app.app_context():
+        failed = db.session.execute(
+            update(ReportBatch)
+            .where(or_((ReportBatch.status == 'running') & (ReportBatch.started_at < cutoff),
+                       (ReportBatch.status == 'pending') & (ReportBatch.created_at < cutoff)))
+            .values(status='failed', error=f'批次超过 {stale_seconds} 秒未完成，执行进程可能已退出，请重新提交',
+                    finished_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+    if failed:
+        logger.warning("%s 个报告批次超过 %s 秒未完成，已标记为 failed", failed, stale_seconds)
+    return failed
+
+
+def _run_recorded_batch(app, batch_id, database_url):
+    """在后台线程中执行批次，并把结果写回 report_batches"""
+    with app.app_context():
+        batch = db.session.get(ReportBatch, batch_id)
+        batch.status = 'running'
+        batch.started_at = datetime.utcnow()
+        db.session.commit()
+        try:
+            summary = run_batch(database_url, batch.report_type, batch.start_date, batch.end_date,
+                                workers=batch.workers, chunk_size=batch.chunk_size)
+            batch.status = 'succeeded'
+            batch.chunks = summary['chunks']
+            batch.total_users = summary['users']
+            batch.succeeded = summary['succeeded']
+            batch.failed = summary['failed']
+            batch.failed_user_ids = summary['failed_user_ids']
+            batch.seconds = summary['seconds']
+        except Exception as e:
+            db.session.rollback()
+            batch = db.session.get(ReportBatch, batch_id)
+            batch.status = 'failed'
+            batch.error = str(e)[:1000]
+            logger.error("报告批次 %s 执行失败: %s", batch_id, e)
+        batch.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+class BatchReportService:
+    """批量报告服务"""
+
+    @staticmethod
+    def submit(report_type='weekly', start_date=None, end_date=None, workers=None,
+               chunk_size=DEFAULT_CHUNK_SIZE, background=True):
+        """
+        创建批次记录并在后台线程中执行
+
+        参数:
+            report_type: 报告类型
+            start_date: 开始日期（可选，与 end_date 都为空时使用 previous_period）
+            end_date: 结束日期（可选）
+            workers: 进程数（可选）
+            chunk_size: 每个分块的用户数
+            background: 为 False 时在当前线程中执行完毕再返回
+
+        返回:
+            ReportBatch
+        """
+        from flask import current_app
+
+        if start_date is None or end_date is None:
+            start_date, end_date = previous_period(report_type)
+        batch = ReportBatch(
+            id=uuid.uuid4().hex,
+            report_type=report_type,
+            start_date=start_date,
+            end_date=end_date,
+            status='pending',
+            workers=workers or os.cpu_count() or 1,
+            chunk_size=chunk_size
+        )
+        db.session.add(batch)
+        db.session.commit()
+        batch_id = batch.id
+
+        app = current_app._get_current_object()
+        database_url = db.engine.url.render_as_string(hide_password=False)
+        if background:
+            threading.Thread(target=_run_recorded_batch, args=(app, batch_id, database_url),
+                             name=f'report-batch-{batch_id[:8]}', daemon=True).start()
+        else:
+            _run_recorded_batch(app, batch_id, database_url)
+            db.session.expire_all()
+        return db.session.get(ReportBatch, batch_id)
+
+    @staticmethod
+    def get_batch(batch_id):
+        return db.session.get(ReportBatch, batch_id)
@@ -0,0 +1,153 @@
+"""
+图表数据
+
+每个数据序列是每日汇总表中的一个指标按周期求和或求平均（见 CHART_SERIES），请求的所有序列
+由一条每日汇总表上的分组查询（主键范围扫描）得到，见 AggregationService.aggregate_rollups。
+未指定周期时按日期范围的长度选择按天、按周或按月，几年的范围也只返回几十个点。
+
+没有记录的周期：求和的序列为 0，求平均的序列（体重、血压等）为 null，不再填充示例数据。
+"""
+import logging
+from collections import namedtuple
+
+from services.aggregation_service import DAY, METRICS, MONTH, WEEK, AggregationService, bucket_starts
+
+logger = logging.getLogger(__name__)
+
+# metric: aggregation_service.METRICS 中的指标; fn: sum / avg; scale: 显示时乘的系数; digits: 保留的小数位
+ChartSeries = namedtuple('ChartSeries', 'metric fn scale digits')
+
+CHART_SERIES = {
+    # 沿用仪表盘原有的估算：每100g食物约150千卡
+    'diet_calories': ChartSeries('diet_food_amount', 'sum', 1.5, 0),
+    'intake_calories': ChartSeries('diet_calories', 'sum', 1, 0),
+    'exercise_calories': ChartSeries('exercise_calories', 'sum', 1, 0),
+    'exercise_minutes': ChartSeries('exercise_minutes', 'sum', 1, 0),
+    'water_intake': ChartSeries('water_amount', 'sum', 0.01, 0),  # 百毫升
+    'water_amount': ChartSeries('water_amount', 'sum', 1, 0),
+    'intake_amount': ChartSeries('intake_amount', 'sum', 1, 0),
+    'steps': ChartSeries('steps', 'sum', 1, 0),
+    'weight': ChartSeries('weight', 'avg', 1, 1),
+    'bp_systolic': ChartSeries('bp_systolic', 'avg', 1, 0),
+    'bp_diastolic': ChartSeries('bp_diastolic', 'avg', 1, 0),
+    'heart_rate': ChartSeries('heart_rate', 'avg', 1, 0),
+    'blood_sugar': ChartSeries('blood_sugar', 'avg', 1, 1),
+    'sleep_hours': ChartSeries('sleep_hours', 'avg', 1, 1),
+}
+
+DEFAULT_SERIES = ['diet_calories', 'exercise_calories', 'water_intake']
+MAX_CHART_DAYS = 3660  # 最长约十年
+MAX_DAILY_DAYS = 93  # 不超过该天数时默认按天
+MAX_WEEKLY_DAYS = 731  # 不超过该天数时默认按周，更长按月
+
+LABEL_FORMATS = {WEEK: '%Y-%m-%d', MONTH: '%Y-%m'}
+
+
+def default_bucket(start_date, end_date):
+    days = (end_date - start_date).days + 1
+    if days <= MAX_DAILY_DAYS:
+        return DAY
+    return WEEK if days <= MAX_WEEKLY_DAYS else MONTH
+
+
+def _round(value, digits):
+    value = round(value, digits)
+    return int(value) if digits == 0 else value
+
+
+class ChartService:
+    """图表数据服务"""
+
+    @staticmethod
+    def get_chart_data(user_id, start_date, end_date, series=None, bucket=None):
+        """
+        计算图表数据
+
+        参数:
+            user_id: 用户ID
+            start_date: 开始日期
+            end_date: 结束日期
+            series: 序列名列表（见 CHART_SERIES），默认 DEFAULT_SERIES
+            bucket: day / week / month，默认由 default_bucket 按范围长度选择
+
+        返回:
+            {'labels': 周期标签, 'buckets': 周期第一天, 'bucket': 周期, 序列名: 每个周期的值}
+
+        抛出:
+            ValueError: 序列、周期或日期范围无效
+        """
+        series = ChartService._validate(start_date, end_date, series)
+        bucket = bucket or default_bucket(start_date, end_date)
+        specs = [(CHART_SERIES[name].metric, CHART_SERIES[name].fn) for name in series]
+        points = AggregationService.aggregate_rollups(user_id, specs, start_date, end_date, bucket)
+        values = {
+            name: {point['bucket']: point['value'] for point in points[spec]}
+            for name, spec in zip(series, specs)
+        }
+        return ChartService.build_chart_data(values, start_date, end_date, series, bucket)
+
+    @staticmethod
+    def from_rollups(rollups, start_date, end_date, series=None):
+        """
+        由已读取的每日汇总行计算按天的图表数据（仪表盘与其他部分共用一次汇总表查询）
+
+        参数:
+            rollups: {日期: DailyUserRollup}
+            其余参数同 get_chart_data
+        """
+        series = ChartService._validate(start_date, end_date, series)
+        values = {}
+        for name in series:
+            chart_series = CHART_SERIES[name]
+            metric = METRICS[chart_series.metric]
+            values[name] = {}
+            for day, rollup in rollups.items():
+                count = getattr(rollup, metric.rollup_count)
+                if count and start_date <= day <= end_date:
+                    total = float(getattr(rollup, metric.rollup_sum) or 0)
+                    values[name][day] = total if chart_series.fn == 'sum' else total / count
+        return ChartService.build_chart_data(values, start_date, end_date, series, DAY)
+
+    @staticmethod
+    def build_chart_data(values, start_date, end_date, series, bucket):
+        """
+        把各序列的 {周期第一天: 值} 排列成与标签对齐的列表
+
+        参数:
+            values: {序列名: {周期第一天: 聚合值}}
+            start_date: 开始日期
+            end_date: 结束日期
+            series: 序列名列表
+            bucket: day / week / month
+        """
+        starts = bucket_starts(start_date, end_date, bucket)
+        if bucket == DAY:
+            label_format = '%m-%d' if start_date.year == end_date.year else '%Y-%m-%d'
+        else:
+            label_format = LABEL_FORMATS[bucket]
+        data = {
+            'labels': [start.strftime(label_format) for start in starts],
+            'buckets': [start.isoformat() for start in starts],
+            'bucket': bucket,
+        }
+        for name in series:
+            chart_series = CHART_SERIES[name]
+            missing = 0 if chart_series.fn == 'sum' else None
+            data[name] = [
+                missing if values[name].get(start) is None
+                else _round(values[name][start] * chart_series.scale, chart_series.digits)
+                for start in starts
+            ]
+        return data
+
+    @staticmethod
+    def _validate(start_date, end_date, series):
+        series = list(dict.fromkeys(series or DEFAULT_SERIES))
+        unknown = [name for name in series if name not in CHART_SERIES]
+        if unknown:
+            raise ValueError(f"无效的数据序列: {', '.join(unknown)}，有效值: {', '.join(CHART_SERIES)}")
+        if start_date > end_date:
+            raise ValueError("开始日期不能晚于结束日期")
+        if (end_date - start_date).days + 1 > MAX_CHART_DAYS:
+            raise ValueError(f"日期范围不能超过 {MAX_CHART_DAYS} 天")
+        return series
@@ -0,0 +1,140 @@
+from database import db
+from models.health_record import HealthRecord
+from models.water_intake import WaterIntake
+from models.diet_record import DietRecord
+from models.exercise import ExerciseRecord
+from services.chart_service import ChartService
+from services.health_service import HealthService
+from services.rollup_service import RollupService
+from utils.cache import TTLCache
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 缓存有效期（秒）。本进程内的写操作会立即使缓存失效，TTL 只用于兜底其他进程的写入
+DASHBOARD_CACHE_TTL = 60
+
+dashboard_cache = TTLCache(ttl=DASHBOARD_CACHE_TTL, maxsize=4096)
+
+# 写入这些表会使对应用户的仪表盘缓存失效
+TRACKED_MODELS = (HealthRecord, WaterIntake, DietRecord, ExerciseRecord)
+
+records = HealthRecord.__table__
+
+# 最近记录列表用到的列，只查询这些列而不加载完整的模型对象
+RECENT_RECORD_COLUMNS = [
+    records.c.id, records.c.record_type, records.c.record_date,
+    records.c.weight, records.c.blood_pressure_systolic, records.c.blood_pressure_diastolic,
+    records.c.food_name, records.c.food_amount, records.c.meal_type,
+    records.c.exercise_type, records.c.duration, records.c.water_amount,
+    records.c.medication_name, records.c.dosage, records.c.dosage_unit
+]
+
+
+class DashboardService:
+    """仪表盘服务，汇总最近记录、健康目标、图表和今日摘要"""
+
+    @staticmethod
+    def get_dashboard(user_id):
+        """
+        获取仪表盘数据，优先从缓存读取
+
+        参数:
+            user_id: 用户ID
+
+        返回:
+            仪表盘数据字典（缓存共享对象，调用方不要修改）
+        """
+        data, hit = dashboard_cache.get_or_set(int(user_id), lambda: DashboardService.build_dashboard(user_id))
+        logger.debug("用户 %s 的仪表盘数据%s", user_id, '命中缓存' if hit else '已重新计算')
+        return data
+
+    @staticmethod
+    def build_dashboard(user_id, recent_limit=5, chart_days=7):
+        """
+        计算仪表盘数据，共三次查询：每日汇总、最近一次健康指标、最近记录
+
+        参数:
+            user_id: 用户ID
+            recent_limit: 最近记录条数，默认5条
+            chart_days: 图表天数，默认7天
+
+        返回:
+            仪表盘数据字典
+        """
+        today = datetime.now().date()
+        chart_start = today - timedelta(days=chart_days - 1)
+        week_ago = today - timedelta(days=7)
+
+        # 一次读取图表和健康目标需要的所有汇总行
+        rollups = RollupService.get_daily_rollups(user_id, min(chart_start, week_ago))
+
+        latest_health = db.session.execute(
+            select(records.c.weight, records.c.height, records.c.bmi)
+            .where(records.c.user_id == user_id, records.c.record_type == 'health')
+            .order_by(records.c.record_date.desc(), records.c.created_at.desc())
+            .limit(1)
+        ).first()
+
+        recent_records = db.session.execute(
+            select(*RECENT_RECORD_COLUMNS)
+            .where(records.c.user_id == user_id)
+            .order_by(records.c.record_date.desc(), records.c.created_at.desc())
+            .limit(recent_limit)
+        ).all()
+
+        goal_rollups = {day: rollup for day, rollup in rollups.items() if day >= week_ago}
+        today_rollup = rollups.get(today)
+
+        return {
+            "success": True,
+            "recent_records": [HealthService._format_recent_record(record) for record in recent_records],
+            "goals": HealthService._build_health_goals(latest_health, goal_rollups),
+            "chart_data": ChartService.from_rollups(rollups, chart_start, today),
+            "summary": {
+                "today_calories_intake": today_rollup.diet_calories if today_rollup else 0,
+                "today_calories_burned": today_rollup.exercise_calories if today_rollup else 0,
+                "today_water_intake": today_rollup.water_amount if today_rollup else 0,
+                "today_steps": today_rollup.steps_sum if today_rollup else 0,
+                "today_weight": (today_rollup.latest_weight or None) if today_rollup else None,
+                "unread_notifications": 3
+            }
+        }
+
+    @staticmethod
+    def invalidate(user_id):
+        """使用户的仪表盘缓存失效"""
+        dashboard_cache.invalidate(int(user_id))
+
+
+def _collect_dashboard_users(session, flush_context):
+    """记录本次 flush 中被修改记录所属的用户（包括修改前的用户），提交后再使缓存失效"""
+    users = session.info.setdefault('dashboard_users', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, TRACKED_MODELS):
+            continue
+        user_ids = {obj.user_id}
+        if obj in session.dirty:
+            user_ids.update(inspect(obj).attrs.user_id.history.deleted)
+        users.update(int(user_id) for user_id in user_ids if user_id is not None)
+
+
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop('dashboard_users', ()):
+        DashboardService.invalidate(user_id)
+
+
+def _discard_after_rollback(session):
+    session.info.pop('dashboard_users', None)
+
+
+def register_dashboard_cache_listeners():
+    """注册会话监听器，任何服务提交对记录的增删改后都会使相应用户的仪表盘缓存失效"""
+    for name, listener in (('after_flush', _collect_dashboard_users),
+                           ('after_commit', _invalidate_after_commit),
+                           ('after_rollback', _discard_after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
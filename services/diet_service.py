@@ -2,6 +2,8 @@ from database import db
 from models.diet_record import Food, DietRecord, DietRecordItem
 from datetime import datetime
 from models.health_record import HealthRecord
+from services.food_catalog import food_catalog
+from utils.pagination import keyset_paginate
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,6 +29,7 @@ class DietService:
         
         db.session.add(food)
         db.session.commit()
+        food_catalog.add(food)
         
         return {'success': True, 'message': '食物创建成功', 'food': food.to_dict()}, 201
     
@@ -91,7 +94,7 @@ class DietService:
             
             # 如果提供了糖分值，记录到日志
             if sugar:
-                logger.info(f"收到糖分数据: {sugar}g")
+                logger.debug("收到糖分数据: %sg", sugar)
             
             # 估算并设置热量值，如果前端未提供
             calories = kwargs.get('calories_burned')
@@ -99,7 +102,7 @@ class DietService:
             if not calories and record.food_amount:
                 # 尝试从食物数据库获取卡路里值
                 if record.food_name:
-                    food = Food.query.filter(Food.name.like(f"%{record.food_name}%")).first()
+                    food = food_catalog.match(record.food_name)
                     if food and food.calories:
                         # 按比例计算卡路里
                         amount_ratio = record.food_amount / 100.0  # 假设食物营养成分是每100克计算的
@@ -108,7 +111,7 @@ class DietService:
                         # 如果没有提供糖分值但食物库中有，则自动估算
                         if not sugar and food.sugar:
                             sugar = food.sugar * amount_ratio
-                            logger.info(f"从食物库估算糖分: {sugar}g")
+                            logger.debug("从食物库估算糖分: %sg", sugar)
             
             # 如果无法从食物库获取，使用简单估算
             if not calories and record.food_amount:
@@ -127,18 +130,18 @@ class DietService:
                         # 默认估算
                         sugar = record.food_amount * 0.02  # 2% 糖分
                     
-                    logger.info(f"基于食物类型估算糖分: {sugar}g")
+                    logger.debug("基于食物类型估算糖分: %sg", sugar)
                 
             record.calories_burned = calories  # 设置热量值
             record.sugar = sugar  # 设置糖分值
             
-            logger.info(f"饮食记录详情 - 热量: {calories}kcal, 糖分: {sugar}g")
+            logger.debug("饮食记录详情 - 热量: %skcal, 糖分: %sg", calories, sugar)
             
             # 保存记录
             db.session.add(record)
             db.session.commit()
             
-            logger.info(f"创建饮食记录成功，用户ID: {user_id}")
+            logger.info("创建饮食记录成功，用户ID: %s", user_id)
             
             return {
                 "success": True,
@@ -149,14 +152,14 @@ class DietService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"创建饮食记录失败: {str(e)}")
+            logger.error("创建饮食记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"创建记录失败: {str(e)}"
             }
     
     @staticmethod
-    def get_diet_records(user_id, start_date=None, end_date=None):
+    def get_diet_records(user_id, start_date=None, end_date=None, limit=None, cursor=None):
         """
         获取用户的饮食记录
         
@@ -164,6 +167,8 @@ class DietService:
             user_id: 用户ID
             start_date: 开始日期，可选
             end_date: 结束日期，可选
+            limit: 每页记录数，可选，不传时返回全部记录
+            cursor: 分页游标，可选
             
         返回:
             饮食记录列表
@@ -181,18 +186,18 @@ class DietService:
                     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
                 query = query.filter(HealthRecord.record_date <= end_date)
                 
-            # 按日期排序
-            records = query.order_by(HealthRecord.record_date.desc(), 
-                                     HealthRecord.created_at.desc()).all()
+            # 按日期倒序，传入limit/cursor时按游标分页
+            records, next_cursor = keyset_paginate(query, HealthRecord, limit=limit, cursor=cursor)
             
             return {
                 "success": True,
                 "records": [record.to_dict() for record in records],
-                "count": len(records)
+                "count": len(records),
+                "next_cursor": next_cursor
             }
             
         except Exception as e:
-            logger.error(f"获取饮食记录失败: {str(e)}")
+            logger.error("获取饮食记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}",
@@ -261,7 +266,7 @@ class DietService:
                 "message": "未找到记录或无权访问"
             }
         except Exception as e:
-            logger.error(f"获取饮食记录 {record_id} 时出错: {str(e)}")
+            logger.error("获取饮食记录 %s 时出错: %s", record_id, e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}"
@@ -3,9 +3,11 @@ from models.exercise import ExerciseType, ExerciseRecord
 from models.user import User
 from datetime import datetime, timedelta
 import calendar
-from sqlalchemy import func, and_, cast, Date
+from sqlalchemy import func, and_
 from sqlalchemy.exc import IntegrityError
 from models.health_record import HealthRecord
+from services.aggregation_service import AggregationService
+from utils.pagination import keyset_paginate
 import logging
 
 logger = logging.getLogger(__name__)
@@ -97,7 +99,7 @@ class ExerciseService:
                 "data": [et.to_dict() for et in exercise_types]
             }
         except Exception as e:
-            logger.error(f"获取运动类型时出错: {str(e)}")
+            logger.error("获取运动类型时出错: %s", e)
             return {
                 "success": False,
                 "message": f"获取运动类型时发生错误: {str(e)}",
@@ -176,7 +178,7 @@ class ExerciseService:
                             duration_hours = float(kwargs.get('duration')) / 60.0  # 将分钟转换为小时
                             record.calories_burned = round(exercise_type.calories_per_hour * duration_hours, 1)
                 except Exception as e:
-                    logger.warning(f"获取运动类型失败: {str(e)}")
+                    logger.warning("获取运动类型失败: %s", e)
             
             # 设置运动记录字段
             record.duration = kwargs.get('duration')
@@ -191,7 +193,7 @@ class ExerciseService:
             db.session.add(record)
             db.session.commit()
             
-            logger.info(f"创建运动记录成功，用户ID: {user_id}")
+            logger.info("创建运动记录成功，用户ID: %s", user_id)
             
             return {
                 "success": True,
@@ -202,14 +204,14 @@ class ExerciseService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"创建运动记录失败: {str(e)}")
+            logger.error("创建运动记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"创建记录失败: {str(e)}"
             }
     
     @staticmethod
-    def get_exercise_records(user_id, start_date=None, end_date=None):
+    def get_exercise_records(user_id, start_date=None, end_date=None, limit=None, cursor=None):
         """
         获取用户的运动记录
         
@@ -217,6 +219,8 @@ class ExerciseService:
             user_id: 用户ID
             start_date: 开始日期，可选
             end_date: 结束日期，可选
+            limit: 每页记录数，可选，不传时返回全部记录
+            cursor: 分页游标，可选
             
         返回:
             运动记录列表
@@ -234,18 +238,18 @@ class ExerciseService:
                     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
                 query = query.filter(HealthRecord.record_date <= end_date)
                 
-            # 按日期排序
-            records = query.order_by(HealthRecord.record_date.desc(), 
-                                     HealthRecord.created_at.desc()).all()
+            # 按日期倒序，传入limit/cursor时按游标分页
+            records, next_cursor = keyset_paginate(query, HealthRecord, limit=limit, cursor=cursor)
             
             return {
                 "success": True,
                 "records": [record.to_dict() for record in records],
-                "count": len(records)
+                "count": len(records),
+                "next_cursor": next_cursor
             }
             
         except Exception as e:
-            logger.error(f"获取运动记录失败: {str(e)}")
+            logger.error("获取运动记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}",
@@ -291,7 +295,7 @@ class ExerciseService:
                 "message": f"未找到ID为{record_id}的运动记录或无权访问"
             }
         except Exception as e:
-            logger.error(f"获取运动记录 {record_id} 时出错: {str(e)}")
+            logger.error("获取运动记录 %s 时出错: %s", record_id, e)
             return {
                 "success": False,
                 "message": f"获取运动记录时发生错误: {str(e)}"
@@ -489,111 +493,48 @@ class ExerciseService:
                     # 日期格式错误，使用今天
                     end_date = datetime.now().date()
             
-            # 查询总卡路里、总时长和活动次数
-            result = db.session.query(
-                func.sum(ExerciseRecord.calories_burned).label('total_calories'),
-                func.sum(ExerciseRecord.duration).label('total_duration'),
-                func.count(ExerciseRecord.id).label('total_activities')
-            ).filter(
-                ExerciseRecord.user_id == user_id,
-                ExerciseRecord.exercise_date >= start_date,
-                ExerciseRecord.exercise_date <= end_date
-            ).first()
-            
-            # 查询按日期分组的数据
-            daily_data = db.session.query(
-                cast(ExerciseRecord.exercise_date, Date).label('date'),
-                func.sum(ExerciseRecord.calories_burned).label('calories'),
-                func.sum(ExerciseRecord.duration).label('duration'),
-                func.count(ExerciseRecord.id).label('count')
-            ).filter(
-                ExerciseRecord.user_id == user_id,
-                ExerciseRecord.exercise_date >= start_date,
-                ExerciseRecord.exercise_date <= end_date
-            ).group_by(cast(ExerciseRecord.exercise_date, Date)
-            ).order_by(cast(ExerciseRecord.exercise_date, Date)).all()
-            
-            # 查询按运动类型分组的数据 - 添加错误捕获
-            try:
-                type_data = db.session.query(
-                    ExerciseType.name.label('type_name'),
-                    func.sum(ExerciseRecord.calories_burned).label('calories'),
-                    func.sum(ExerciseRecord.duration).label('duration'),
-                    func.count(ExerciseRecord.id).label('count')
-                ).join(
-                    ExerciseType, ExerciseRecord.exercise_type_id == ExerciseType.id
-                ).filter(
-                    ExerciseRecord.user_id == user_id,
-                    ExerciseRecord.exercise_date >= start_date,
-                    ExerciseRecord.exercise_date <= end_date
-                ).group_by(ExerciseType.name).all()
-            except Exception as e:
-                print(f"获取运动类型数据时出错: {str(e)}")
-                type_data = []  # 在错误时使用空列表
-            
-            # 格式化结果 - 确保result不为None
-            if result is None:
-                # 如果没有数据，返回空汇总
-                summary = {
-                    "total_calories_burned": 0,
-                    "total_duration": 0,
-                    "total_activities": 0,
-                    "daily_stats": [],
-                    "type_stats": []
-                }
-            else:
-                # 安全地访问结果数据
-                try:
-                    total_calories = result.total_calories if hasattr(result, 'total_calories') else None
-                    total_duration = result.total_duration if hasattr(result, 'total_duration') else None
-                    total_activities = result.total_activities if hasattr(result, 'total_activities') else None
-                    
-                    summary = {
-                        "total_calories_burned": float(total_calories) if total_calories is not None else 0,
-                        "total_duration": int(total_duration) if total_duration is not None else 0,
-                        "total_activities": int(total_activities) if total_activities is not None else 0,
-                        "daily_stats": [],
-                        "type_stats": []
-                    }
-                except Exception as e:
-                    print(f"处理运动汇总数据时出错: {str(e)}")
-                    summary = {
-                        "total_calories_burned": 0,
-                        "total_duration": 0,
-                        "total_activities": 0,
-                        "daily_stats": [],
-                        "type_stats": []
-                    }
+            # 每日数据由一条分组聚合查询得到（运动记录保存在health_records中），只包含有运动的日期
+            series = AggregationService.aggregate_many(
+                user_id, ['exercise_calories', 'exercise_minutes'], start_date, end_date, bucket='day', fn='sum')
+            minutes = {point['bucket']: point['value'] for point in series['exercise_minutes']}
+            daily_stats = [
+                {
+                    "date": point['bucket'].isoformat(),
+                    "calories": point['value'],
+                    "duration": int(minutes.get(point['bucket'], 0)),
+                    "count": point['count']
+                } for point in series['exercise_calories']
+            ]
             
-            # 安全处理daily_data
-            if daily_data:
-                try:
-                    summary["daily_stats"] = [
-                        {
-                            "date": day.date.isoformat() if hasattr(day, 'date') else "未知日期",
-                            "calories": float(day.calories) if hasattr(day, 'calories') and day.calories is not None else 0,
-                            "duration": int(day.duration) if hasattr(day, 'duration') and day.duration is not None else 0,
-                            "count": int(day.count) if hasattr(day, 'count') and day.count is not None else 0
-                        } for day in daily_data
-                    ]
-                except Exception as e:
-                    print(f"处理每日统计数据时出错: {str(e)}")
-                    summary["daily_stats"] = []
+            summary = {
+                "total_calories_burned": float(sum(day['calories'] for day in daily_stats)),
+                "total_duration": int(sum(day['duration'] for day in daily_stats)),
+                "total_activities": int(sum(day['count'] for day in daily_stats)),
+                "daily_stats": daily_stats,
+                "type_stats": []
+            }
             
-            # 安全处理type_data
-            if type_data:
-                try:
-                    summary["type_stats"] = [
-                        {
-                            "type": type_stat.type_name if hasattr(type_stat, 'type_name') else "未知类型",
-                            "calories": float(type_stat.calories) if hasattr(type_stat, 'calories') and type_stat.calories is not None else 0,
-                            "duration": int(type_stat.duration) if hasattr(type_stat, 'duration') and type_stat.duration is not None else 0,
-                            "count": int(type_stat.count) if hasattr(type_stat, 'count') and type_stat.count is not None else 0
-                        } for type_stat in type_data
-                    ]
-                except Exception as e:
-                    print(f"处理类型统计数据时出错: {str(e)}")
-                    summary["type_stats"] = []
+            # 查询按运动类型分组的数据
+            type_data = db.session.query(
+                HealthRecord.exercise_type.label('type_name'),
+                func.sum(HealthRecord.calories_burned).label('calories'),
+                func.sum(HealthRecord.duration).label('duration'),
+                func.count(HealthRecord.id).label('count')
+            ).filter(
+                HealthRecord.user_id == user_id,
+                HealthRecord.record_type == 'exercise',
+                HealthRecord.record_date >= start_date,
+                HealthRecord.record_date <= end_date
+            ).group_by(HealthRecord.exercise_type).all()
+            
+            summary["type_stats"] = [
+                {
+                    "type": type_stat.type_name or "未知类型",
+                    "calories": float(type_stat.calories) if type_stat.calories is not None else 0,
+                    "duration": int(type_stat.duration) if type_stat.duration is not None else 0,
+                    "count": int(type_stat.count)
+                } for type_stat in type_data
+            ]
             
             return {
                 "success": True,
@@ -601,7 +542,7 @@ class ExerciseService:
                 "summary": summary
             }, 200
         except Exception as e:
-            print(f"获取运动数据汇总错误: {str(e)}")
+            logger.error("获取运动数据汇总错误: %s", e)
             return {
                 "success": False,
                 "message": f"获取运动数据汇总时发生错误: {str(e)}",
@@ -693,7 +634,7 @@ class ExerciseService:
             }
         except Exception as e:
             db.session.rollback()
-            logger.error(f"初始化运动类型数据时出错: {str(e)}")
+            logger.error("初始化运动类型数据时出错: %s", e)
             return {
                 "success": False,
                 "message": f"初始化运动类型数据失败: {str(e)}"
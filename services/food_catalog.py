@@ -0,0 +1,153 @@
+from database import db
+from models.diet_record import Food
+from collections import namedtuple
+from sqlalchemy import func
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 食物的只读快照，属性名与 Food 模型一致，可直接替代查询结果使用
+FoodEntry = namedtuple('FoodEntry', [
+    'id', 'name', 'category', 'calories', 'protein', 'fat',
+    'carbohydrate', 'fiber', 'sugar', 'sodium', 'serving_size'
+])
+
+
+def _normalize(name):
+    # 与 MySQL 默认 *_ci 排序规则、SQLite LIKE 一样忽略大小写
+    return name.lower()
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class _Snapshot:
+    """一次加载的食物索引：单字和二元组倒排表，每个倒排表按食物ID升序"""
+
+    def __init__(self, entries=None, names=None, chars=None, grams=None, ordered_ids=None):
+        self.entries = entries or {}
+        self.names = names or {}
+        self.chars = chars or {}
+        self.grams = grams or {}
+        self.ordered_ids = ordered_ids or []
+
+    def copy(self):
+        return _Snapshot(dict(self.entries), dict(self.names), dict(self.chars),
+                         dict(self.grams), list(self.ordered_ids))
+
+    def add(self, entry, copy_postings=False):
+        name = _normalize(entry.name)
+        self.entries[entry.id] = entry
+        self.names[entry.id] = name
+        bisect.insort(self.ordered_ids, entry.id)
+        for index, keys in ((self.chars, set(name)), (self.grams, _bigrams(name))):
+            for key in keys:
+                postings = index.get(key, [])
+                if copy_postings:
+                    postings = list(postings)
+                bisect.insort(postings, entry.id)
+                index[key] = postings
+
+    def match(self, query):
+        """返回名称包含 query 的ID最小的食物，与 LIKE '%query%' 加 first() 的结果一致"""
+        if len(query) == 0:
+            candidates = self.ordered_ids
+        elif len(query) == 1:
+            candidates = self.chars.get(query, [])
+        else:
+            postings = [self.grams.get(gram, []) for gram in _bigrams(query)]
+            candidates = min(postings, key=len)
+
+        for food_id in candidates:
+            if query in self.names[food_id]:
+                return self.entries[food_id]
+        return None
+
+
+class FoodCatalog:
+    """
+    进程内食物名称索引
+
+    替代 Food.name.like('%名称%') 的逐行模糊查询：首次使用时从数据库加载全部食物，
+    之后在内存中匹配。本进程新增食物通过 add() 立即生效；其他进程新增的食物会在
+    refresh_interval 秒后通过 (COUNT, MAX(id)) 检查发现并重新加载。
+    """
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._signature = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _to_entry(food):
+        return FoodEntry(food.id, food.name, food.category, food.calories, food.protein, food.fat,
+                         food.carbohydrate, food.fiber, food.sugar, food.sodium, food.serving_size)
+
+    @staticmethod
+    def _current_signature():
+        return tuple(db.session.query(func.count(Food.id), func.max(Food.id)).one())
+
+    def load(self):
+        """从数据库重新加载全部食物"""
+        with self._lock:
+            snapshot = _Snapshot()
+            for food in Food.query.filter(Food.name.isnot(None)).order_by(Food.id).all():
+                snapshot.add(self._to_entry(food))
+            self._snapshot = snapshot
+            self._signature = self._current_signature()
+            self._checked_at = time.monotonic()
+            logger.info("食物索引已加载，共 %s 种食物", len(snapshot.entries))
+
+    def _ensure_fresh(self):
+        if self._snapshot is None:
+            self.load()
+        elif time.monotonic() - self._checked_at > self.refresh_interval:
+            self._checked_at = time.monotonic()
+            if self._current_signature() != self._signature:
+                self.load()
+
+    def add(self, food):
+        """新增食物后调用，复制倒排表后替换快照，不影响正在进行的匹配"""
+        if food.name is None:
+            return
+        with self._lock:
+            if self._snapshot is None:
+                return  # 尚未加载，首次使用时会一并加载
+            snapshot = self._snapshot.copy()
+            snapshot.add(self._to_entry(food), copy_postings=True)
+            self._snapshot = snapshot
+            count, max_id = self._signature
+            self._signature = (count + 1, max(max_id or 0, food.id))
+
+    def match(self, food_name):
+        """
+        按名称模糊匹配食物
+
+        参数:
+            food_name: 食物名称（子串）
+
+        返回:
+            FoodEntry，未找到时返回 None
+        """
+        if food_name is None:
+            return None
+        if '%' in food_name or '_' in food_name:
+            # 含 LIKE 通配符时结果依赖数据库的通配语义，直接交给数据库
+            food = Food.query.filter(Food.name.like(f"%{food_name}%")).first()
+            return self._to_entry(food) if food else None
+        self._ensure_fresh()
+        return self._snapshot.match(_normalize(food_name))
+
+    def invalidate(self):
+        """丢弃已加载的索引，下次匹配时重新加载"""
+        with self._lock:
+            self._snapshot = None
+
+
+food_catalog = FoodCatalog()
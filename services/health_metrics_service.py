@@ -1,5 +1,6 @@
 from database import db
 from models.health_record import HealthRecord
+from utils.pagination import keyset_paginate
 from datetime import datetime
 import logging
 
@@ -51,7 +52,7 @@ class HealthMetricsService:
             db.session.add(record)
             db.session.commit()
             
-            logger.info(f"创建健康指标记录成功，用户ID: {user_id}")
+            logger.info("创建健康指标记录成功，用户ID: %s", user_id)
             
             return {
                 "success": True,
@@ -62,14 +63,14 @@ class HealthMetricsService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"创建健康指标记录失败: {str(e)}")
+            logger.error("创建健康指标记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"创建记录失败: {str(e)}"
             }
     
     @staticmethod
-    def get_health_metrics_records(user_id, start_date=None, end_date=None):
+    def get_health_metrics_records(user_id, start_date=None, end_date=None, limit=None, cursor=None):
         """
         获取用户的健康指标记录
         
@@ -77,6 +78,8 @@ class HealthMetricsService:
             user_id: 用户ID
             start_date: 开始日期，可选
             end_date: 结束日期，可选
+            limit: 每页记录数，可选，不传时返回全部记录
+            cursor: 分页游标，可选
             
         返回:
             健康指标记录列表
@@ -94,18 +97,18 @@ class HealthMetricsService:
                     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
                 query = query.filter(HealthRecord.record_date <= end_date)
                 
-            # 按日期排序
-            records = query.order_by(HealthRecord.record_date.desc(), 
-                                     HealthRecord.created_at.desc()).all()
+            # 按日期倒序，传入limit/cursor时按游标分页
+            records, next_cursor = keyset_paginate(query, HealthRecord, limit=limit, cursor=cursor)
             
             return {
                 "success": True,
                 "records": [record.to_dict() for record in records],
-                "count": len(records)
+                "count": len(records),
+                "next_cursor": next_cursor
             }
             
         except Exception as e:
-            logger.error(f"获取健康指标记录失败: {str(e)}")
+            logger.error("获取健康指标记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}",
@@ -137,7 +140,7 @@ class HealthMetricsService:
                     "message": "未找到记录或无权访问"
                 }
         except Exception as e:
-            logger.error(f"获取健康指标记录 {record_id} 时出错: {str(e)}")
+            logger.error("获取健康指标记录 %s 时出错: %s", record_id, e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}"
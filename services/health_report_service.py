@@ -1,12 +1,75 @@
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from types import SimpleNamespace
 from models.health_report import HealthReport, Reminder
 from models.health_record import HealthRecord
-from models.diet_record import DietRecord, DietRecordItem
-from models.exercise import ExerciseRecord
-from models.medication_record import MedicationRecord
+from services.report_aggregates import ReportAggregateService, merge_aggregates
+from services.report_metrics import (ReportMetrics, HealthMetrics, DietMetrics, ExerciseMetrics,
+                                     MedicationMetrics, SAMPLE_MISSING, SAMPLE_ERROR,
+                                     render_health_summary, render_diet_summary,
+                                     render_exercise_summary, render_medication_summary)
+from models.user import User
 from database import db
+from services.reminder_scheduler import reminder_scheduler
+from sqlalchemy import func, select
+from utils.upsert import insert_ignore_rows
+import hashlib
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+users = User.__table__
+reminders = Reminder.__table__
+health_records = HealthRecord.__table__
+
+REMINDER_USER_CHUNK_SIZE = 1000
+
+
+def medication_reminder_key(reminder_date, medication_name):
+    """自动生成的药物提醒的幂等键：同一天同一药物名称（忽略大小写和首尾空白）得到相同的键"""
+    name = (medication_name or '').strip().lower()
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:16]
+    return f"medication:{reminder_date.isoformat()}:{digest}"
+
+
+def _medication_reminder_row(record, reminder_date, key, now):
+    """由用药记录构建药物提醒的插入行"""
+    title = f"服药提醒: {record.medication_name}" if record.medication_name else "服药提醒"
+    
+    # 构建描述
+    description_parts = []
+    if record.dosage and record.dosage_unit:
+        description_parts.append(f"剂量: {record.dosage} {record.dosage_unit}")
+    if record.with_food:
+        description_parts.append("请饭后服用")
+    description = "，".join(description_parts) if description_parts else "按医嘱服用"
+    
+    reminder_time = record.time_taken or datetime.now().time().replace(microsecond=0)
+    notes = {
+        "medication_record_info": {
+            "id": record.id,
+            "name": record.medication_name,
+            "dosage": f"{record.dosage or ''}{record.dosage_unit or ''}",
+            "record_date": record.record_date.strftime('%Y-%m-%d') if record.record_date else None
+        }
+    }
+    return {
+        'user_id': record.user_id,
+        'reminder_type': 'medication',
+        'title': title,
+        'description': description,
+        'reminder_date': reminder_date,
+        'reminder_time': reminder_time,
+        'recurrence': None,
+        'is_completed': False,
+        'medication_record_id': None,  # 不使用medication_record_id外键，避免外键约束问题
+        'notes': json.dumps(notes),
+        # 绕过 ORM 插入，需自行设置调度器使用的触发时间
+        'next_fire_at': datetime.combine(reminder_date, reminder_time),
+        'idempotency_key': key,
+        'created_at': now,
+        'updated_at': now,
+    }
 
 class HealthReportService:
     """健康报告服务"""
@@ -26,373 +89,302 @@ class HealthReportService:
         """
         try:
             # 添加调试日志
-            print(f"开始生成健康报告 - 用户ID: {user_id}, 报告类型: {report_type}, 开始日期: {start_date}, 结束日期: {end_date}")
+            logger.debug("开始生成健康报告 - 用户ID: %s, 报告类型: %s, 开始日期: %s, 结束日期: %s", user_id, report_type, start_date, end_date)
             
             # 确保用户ID是有效的整数
             try:
                 user_id = int(user_id)
             except (ValueError, TypeError):
-                print(f"错误：用户ID无效 '{user_id}'")
+                logger.error("错误：用户ID无效 '%s'", user_id)
                 raise ValueError(f"用户ID必须是有效的整数，收到 '{user_id}'")
             
-            # 确保日期格式正确
-            from datetime import date as date_type
-            
-            if start_date and not isinstance(start_date, date_type):
-                try:
-                    if isinstance(start_date, str):
-                        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                    else:
-                        start_date = datetime.fromisoformat(str(start_date)).date()
-                except Exception as e:
-                    print(f"开始日期格式错误: {start_date}, 错误: {e}")
-                    start_date = None  # 重置为None，将使用默认计算
+            report_type, start_date, end_date = HealthReportService.resolve_report_range(
+                report_type, start_date, end_date)
             
-            if end_date and not isinstance(end_date, date_type):
-                try:
-                    if isinstance(end_date, str):
-                        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-                    else:
-                        end_date = datetime.fromisoformat(str(end_date)).date()
-                except Exception as e:
-                    print(f"结束日期格式错误: {end_date}, 错误: {e}")
-                    end_date = None  # 重置为None，将使用默认计算
-                    
-            # 验证报告类型
-            valid_report_types = ['weekly', 'monthly', 'yearly', 'custom']
-            if report_type not in valid_report_types:
-                print(f"警告: 无效的报告类型 '{report_type}'，使用默认类型 'weekly'")
-                report_type = 'weekly'
+            logger.debug("最终使用的日期范围: %s - %s", start_date, end_date)
             
-            # 如果未提供日期，则根据报告类型自动计算日期范围
+            # 区间聚合合并已保存的周/月部分聚合，只扫描零散日期的原始记录，长区间不再需要限制天数
+            logger.debug("统计健康指标...")
+            connection = db.session.connection()
             today = datetime.now().date()
-            if not start_date or not end_date:
-                if report_type == 'weekly':
-                    # 取本周一到今天
-                    days_since_monday = today.weekday()
-                    start_date = today - timedelta(days=days_since_monday)
-                    end_date = today
-                elif report_type == 'monthly':
-                    # 取本月1号到今天
-                    start_date = today.replace(day=1)
-                    end_date = today
-                elif report_type == 'yearly':
-                    # 取本年1月1日到今天
-                    start_date = today.replace(month=1, day=1)
-                    end_date = today
-                else:
-                    # 默认取最近7天
-                    start_date = today - timedelta(days=6)
-                    end_date = today
-                
-                print(f"使用默认日期范围: {start_date} - {end_date}")
-            
-            # 确保开始日期不晚于结束日期
-            if start_date > end_date:
-                print(f"警告: 开始日期 {start_date} 晚于结束日期 {end_date}，交换日期")
-                start_date, end_date = end_date, start_date
-                
-            # 如果日期范围过大，可能会导致性能问题，限制最大范围
-            max_days = 365  # 最大允许1年
-            date_diff = (end_date - start_date).days
-            if date_diff > max_days:
-                print(f"警告: 日期范围过大 ({date_diff}天)，限制为{max_days}天")
-                start_date = end_date - timedelta(days=max_days)
-                
-            print(f"最终使用的日期范围: {start_date} - {end_date}")
-            
-            # 创建报告标题
-            title = f"{report_type.capitalize()} 健康报告 ({start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')})"
-            
-            # 获取各类数据摘要
-            print("获取健康摘要...")
-            health_summary = HealthReportService._generate_health_summary(user_id, start_date, end_date)
-            
-            print("获取饮食摘要...")
-            diet_summary = HealthReportService._generate_diet_summary(user_id, start_date, end_date)
-            
-            print("获取运动摘要...")
-            exercise_summary = HealthReportService._generate_exercise_summary(user_id, start_date, end_date)
-            
-            print("获取用药摘要...")
-            medication_summary = HealthReportService._generate_medication_summary(user_id, start_date, end_date)
-            
-            # 打印调试信息
-            print(f"健康摘要长度: {len(health_summary)}, 饮食摘要长度: {len(diet_summary)}")
-            print(f"运动摘要长度: {len(exercise_summary)}, 用药摘要长度: {len(medication_summary)}")
-            
-            # 确保所有摘要都是非空的友好文本
-            if not health_summary or health_summary.strip() == "":
-                health_summary = "在所选时间段内没有健康记录数据。建议添加健康指标记录，如体重、血压等。"
-                
-            if not diet_summary or diet_summary.strip() == "":
-                diet_summary = "在所选时间段内没有饮食记录数据。建议记录您的饮食习惯，以便更好地分析营养摄入。"
-                
-            if not exercise_summary or exercise_summary.strip() == "":
-                exercise_summary = "在所选时间段内没有运动记录数据。建议记录您的运动情况，以便跟踪健身进度。"
-                
-            if not medication_summary or medication_summary.strip() == "":
-                medication_summary = "在所选时间段内没有用药记录数据。如果您正在服用药物，建议记录用药情况以便追踪效果。"
-            
-            # 生成健康建议
-            print("生成健康建议...")
-            recommendations = HealthReportService._generate_recommendations(
-                user_id, 
-                health_summary, 
-                diet_summary, 
-                exercise_summary, 
-                medication_summary
-            )
+            aggregate = ReportAggregateService.aggregate(connection, user_id, start_date, end_date, today)
+            # 运动和用药统计所有历史记录
+            try:
+                history = HealthReportService._history_aggregate(
+                    connection, user_id, start_date, end_date, aggregate, today)
+            except Exception as e:
+                import traceback
+                logger.error("查询运动和用药记录时出错: %s\n%s", e, traceback.format_exc())
+                history = None
             
             # 创建并保存健康报告
-            report = HealthReport(
-                user_id=user_id,
-                title=title,
-                report_type=report_type,
-                start_date=start_date,
-                end_date=end_date,
-                health_summary=health_summary,
-                diet_summary=diet_summary,
-                exercise_summary=exercise_summary,
-                medication_summary=medication_summary,
-                recommendations=recommendations
-            )
+            report = HealthReport(**HealthReportService.build_report_fields(
+                user_id, report_type, start_date, end_date, aggregate, history))
             
-            print("保存报告到数据库...")
+            logger.debug("保存报告到数据库...")
             db.session.add(report)
             db.session.commit()
             
-            print(f"健康报告生成成功 - ID: {report.id}, 标题: {title}")
+            logger.info("健康报告生成成功 - ID: %s, 标题: %s", report.id, report.title)
             return report
             
         except Exception as e:
             import traceback
             error_trace = traceback.format_exc()
-            print(f"生成健康报告时出错: {str(e)}\n{error_trace}")
+            logger.error("生成健康报告时出错: %s\n%s", e, error_trace)
             # 如果已经开始事务但出错，回滚事务
             db.session.rollback()
             raise
     
     @staticmethod
-    def _generate_health_summary(user_id, start_date, end_date):
-        """生成健康数据摘要"""
-        # 获取时间范围内的健康记录
-        health_records = HealthRecord.query.filter(
-            HealthRecord.user_id == user_id,
-            HealthRecord.record_date >= start_date,
-            HealthRecord.record_date <= end_date,
-            HealthRecord.record_type == 'health'
-        ).order_by(HealthRecord.record_date).all()
-        
-        if not health_records:
-            return "在所选时间段内没有健康记录数据。"
-        
-        # 计算平均值和趋势
-        weight_values = [r.weight for r in health_records if r.weight]
-        avg_weight = sum(weight_values) / len(weight_values) if weight_values else None
-        
-        bp_systolic_values = [r.blood_pressure_systolic for r in health_records if r.blood_pressure_systolic]
-        avg_bp_systolic = sum(bp_systolic_values) / len(bp_systolic_values) if bp_systolic_values else None
-        
-        bp_diastolic_values = [r.blood_pressure_diastolic for r in health_records if r.blood_pressure_diastolic]
-        avg_bp_diastolic = sum(bp_diastolic_values) / len(bp_diastolic_values) if bp_diastolic_values else None
+    def resolve_report_range(report_type, start_date=None, end_date=None):
+        """
+        规范化报告类型和日期范围
         
-        heart_rate_values = [r.heart_rate for r in health_records if r.heart_rate]
-        avg_heart_rate = sum(heart_rate_values) / len(heart_rate_values) if heart_rate_values else None
+        参数:
+            report_type: 报告类型（weekly, monthly, yearly, custom），无效时使用 weekly
+            start_date: 开始日期（date 或 YYYY-MM-DD，可选）
+            end_date: 结束日期（可选）
+            
+        返回:
+            (报告类型, 开始日期, 结束日期)，未提供日期时根据报告类型计算
+        """
+        # 确保日期格式正确
+        from datetime import date as date_type
         
-        blood_sugar_values = [r.blood_sugar for r in health_records if r.blood_sugar]
-        avg_blood_sugar = sum(blood_sugar_values) / len(blood_sugar_values) if blood_sugar_values else None
+        if start_date and not isinstance(start_date, date_type):
+            try:
+                if isinstance(start_date, str):
+                    start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+                else:
+                    start_date = datetime.fromisoformat(str(start_date)).date()
+            except Exception as e:
+                logger.error("开始日期格式错误: %s, 错误: %s", start_date, e)
+                start_date = None  # 重置为None，将使用默认计算
         
-        # 生成摘要文本
-        summary = f"健康记录数据摘要（{start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')})：\n\n"
+        if end_date and not isinstance(end_date, date_type):
+            try:
+                if isinstance(end_date, str):
+                    end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+                else:
+                    end_date = datetime.fromisoformat(str(end_date)).date()
+            except Exception as e:
+                logger.error("结束日期格式错误: %s, 错误: %s", end_date, e)
+                end_date = None  # 重置为None，将使用默认计算
+        
+        # 验证报告类型
+        valid_report_types = ['weekly', 'monthly', 'yearly', 'custom']
+        if report_type not in valid_report_types:
+            logger.warning("警告: 无效的报告类型 '%s'，使用默认类型 'weekly'", report_type)
+            report_type = 'weekly'
+        
+        # 如果未提供日期，则根据报告类型自动计算日期范围
+        today = datetime.now().date()
+        if not start_date or not end_date:
+            if report_type == 'weekly':
+                # 取本周一到今天
+                days_since_monday = today.weekday()
+                start_date = today - timedelta(days=days_since_monday)
+                end_date = today
+            elif report_type == 'monthly':
+                # 取本月1号到今天
+                start_date = today.replace(day=1)
+                end_date = today
+            elif report_type == 'yearly':
+                # 取本年1月1日到今天
+                start_date = today.replace(month=1, day=1)
+                end_date = today
+            else:
+                # 默认取最近7天
+                start_date = today - timedelta(days=6)
+                end_date = today
         
-        if avg_weight:
-            summary += f"平均体重: {avg_weight:.1f} kg\n"
-            if len(weight_values) > 1 and weight_values[-1] > weight_values[0]:
-                summary += f"体重从 {weight_values[0]:.1f} kg 上升到 {weight_values[-1]:.1f} kg\n"
-            elif len(weight_values) > 1 and weight_values[-1] < weight_values[0]:
-                summary += f"体重从 {weight_values[0]:.1f} kg 下降到 {weight_values[-1]:.1f} kg\n"
+            logger.debug("使用默认日期范围: %s - %s", start_date, end_date)
         
-        if avg_bp_systolic and avg_bp_diastolic:
-            summary += f"平均血压: {avg_bp_systolic:.0f}/{avg_bp_diastolic:.0f} mmHg\n"
+        # 确保开始日期不晚于结束日期
+        if start_date > end_date:
+            logger.warning("警告: 开始日期 %s 晚于结束日期 %s，交换日期", start_date, end_date)
+            start_date, end_date = end_date, start_date
         
-        if avg_heart_rate:
-            summary += f"平均心率: {avg_heart_rate:.0f} 次/分钟\n"
+        return report_type, start_date, end_date
+    
+    @staticmethod
+    def build_report_fields(user_id, report_type, start_date, end_date, aggregate, history):
+        """
+        根据聚合生成报告内容
         
-        if avg_blood_sugar:
-            summary += f"平均血糖: {avg_blood_sugar:.1f} mmol/L\n"
+        参数:
+            user_id: 用户ID
+            report_type: 报告类型
+            start_date: 开始日期
+            end_date: 结束日期
+            aggregate: 报告区间的聚合
+            history: 所有历史记录的聚合，查询出错时为 None（运动和用药使用示例数据）
+            
+        返回:
+            HealthReport 的列值字典
+        """
+        # 创建报告标题
+        title = f"{report_type.capitalize()} 健康报告 ({start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')})"
+        
+        # 先统计结构化指标，建议直接读取指标，摘要文本最后从指标渲染
+        metrics = ReportMetrics(
+            start_date=start_date.isoformat(),
+            end_date=end_date.isoformat(),
+            health=HealthReportService._collect_health_metrics(aggregate),
+            diet=HealthReportService._collect_diet_metrics(aggregate, start_date, end_date),
+            exercise=HealthReportService._collect_exercise_metrics(history, aggregate),
+            medication=HealthReportService._collect_medication_metrics(history, aggregate)
+        )
         
-        # 添加睡眠和步数数据
-        sleep_values = [r.sleep_hours for r in health_records if r.sleep_hours]
-        avg_sleep = sum(sleep_values) / len(sleep_values) if sleep_values else None
+        logger.debug("生成健康建议...")
+        recommendations = HealthReportService._generate_recommendations(metrics)
         
-        steps_values = [r.steps for r in health_records if r.steps]
-        avg_steps = sum(steps_values) / len(steps_values) if steps_values else None
+        health_summary = render_health_summary(metrics.health, start_date, end_date)
+        diet_summary = render_diet_summary(metrics.diet, start_date, end_date)
+        exercise_summary = render_exercise_summary(metrics.exercise, start_date, end_date)
+        medication_summary = render_medication_summary(metrics.medication, start_date, end_date)
         
-        if avg_sleep:
-            summary += f"平均睡眠时间: {avg_sleep:.1f} 小时/天\n"
+        # 确保所有摘要都是非空的友好文本
+        if not medication_summary.strip():
+            medication_summary = "在所选时间段内没有用药记录数据。如果您正在服用药物，建议记录用药情况以便追踪效果。"
         
-        if avg_steps:
-            summary += f"平均步数: {avg_steps:.0f} 步/天\n"
+        return dict(
+            user_id=user_id,
+            title=title,
+            report_type=report_type,
+            start_date=start_date,
+            end_date=end_date,
+            health_summary=health_summary,
+            diet_summary=diet_summary,
+            exercise_summary=exercise_summary,
+            medication_summary=medication_summary,
+            recommendations=recommendations,
+            metrics=metrics.to_dict()
+        )
         
-        return summary
     
     @staticmethod
-    def _generate_diet_summary(user_id, start_date, end_date):
-        """生成饮食数据摘要"""
-        # 获取时间范围内的饮食记录
-        diet_records = DietRecord.query.filter(
-            DietRecord.user_id == user_id,
-            DietRecord.record_date >= start_date,
-            DietRecord.record_date <= end_date
-        ).order_by(DietRecord.record_date).all()
-        
-        if not diet_records:
-            return "在所选时间段内没有饮食记录数据。"
-        
-        # 计算总热量和统计餐次
-        total_calories = 0
-        meal_counts = {'breakfast': 0, 'lunch': 0, 'dinner': 0, 'snack': 0}
+    def _history_aggregate(connection, user_id, start_date, end_date, aggregate, today):
+        """所有历史记录的聚合：报告区间的聚合加上区间前后的部分"""
+        first_date, last_date = ReportAggregateService.record_date_range(connection, user_id)
+        history = aggregate
+        if first_date and first_date < start_date:
+            history = merge_aggregates(ReportAggregateService.aggregate(
+                connection, user_id, first_date, start_date - timedelta(days=1), today), history)
+        if last_date and last_date > end_date:
+            history = merge_aggregates(history, ReportAggregateService.aggregate(
+                connection, user_id, end_date + timedelta(days=1), last_date, today))
+        return history
+    
+    @staticmethod
+    def _collect_health_metrics(aggregate):
+        """统计健康数据指标"""
+        if not aggregate['health_days']:
+            return HealthMetrics()
+        
+        # 各指标的区间平均值 = 非零值之和 / 非零值个数
+        def average(prefix):
+            moments = aggregate['health'][prefix]
+            return moments['sum'] / moments['count'] if moments['count'] else None
+        
+        # 趋势取每天最后一次记录的体重
+        first_weight = aggregate['first_weight']
+        last_weight = aggregate['last_weight']
+        return HealthMetrics(
+            record_days=aggregate['health_days'],
+            avg_weight=average('weight'),
+            first_weight=first_weight[1] if first_weight else None,
+            last_weight=last_weight[1] if last_weight else None,
+            weight_days=aggregate['weight_days'],
+            avg_bp_systolic=average('bp_systolic'),
+            avg_bp_diastolic=average('bp_diastolic'),
+            avg_heart_rate=average('heart_rate'),
+            avg_blood_sugar=average('blood_sugar'),
+            avg_sleep_hours=average('sleep_hours'),
+            avg_steps=average('steps')
+        )
+    
+    @staticmethod
+    def _collect_diet_metrics(aggregate, start_date, end_date):
+        """统计饮食数据指标"""
+        diet = aggregate['diet']
+        if not diet['count']:
+            return DietMetrics()
         
-        for record in diet_records:
-            total_calories += record.total_calories or 0
-            if hasattr(record, 'meal_type') and record.meal_type and record.meal_type.lower() in meal_counts:
-                meal_counts[record.meal_type.lower()] += 1
+        # 统计餐次
+        meal_counts = {'breakfast': 0, 'lunch': 0, 'dinner': 0, 'snack': 0}
+        for meal_type, count in diet['meals'].items():
+            if meal_type and meal_type.lower() in meal_counts:
+                meal_counts[meal_type.lower()] += count
         
+        total_calories = diet['calories']['sum']
         days = (end_date - start_date).days + 1
+        return DietMetrics(
+            record_count=diet['count'],
+            days=days,
+            total_calories=total_calories,
+            avg_daily_calories=total_calories / days if days > 0 and total_calories > 0 else None,
+            meal_counts=meal_counts
+        )
+    
+    @staticmethod
+    def _collect_exercise_metrics(history, aggregate):
+        """统计运动数据指标（所有历史记录，不受日期范围限制）"""
+        if history is None:
+            logger.warning("发生错误，使用硬编码的示例运动数据")
+            return HealthReportService._sample_exercise_metrics(SAMPLE_ERROR)
         
-        # 生成摘要文本
-        summary = f"饮食记录数据摘要（{start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')})：\n\n"
-        
-        if days > 0 and total_calories > 0:
-            avg_calories = total_calories / days
-            summary += f"平均每日摄入热量: {avg_calories:.0f} 大卡\n"
+        exercise = history['exercise']
+        logger.debug("找到 %s 天的运动记录", exercise['days'])
         
-        # 添加餐次统计
-        summary += "\n餐次记录情况：\n"
-        for meal, count in meal_counts.items():
-            if count > 0:
-                percentage = (count / days) * 100
-                summary += f"{meal.capitalize()}: 记录了 {count} 天 ({percentage:.0f}%)\n"
+        # 如果没有找到记录，则使用示例数据
+        if not exercise['days']:
+            logger.warning("没有找到运动记录，使用硬编码的示例数据")
+            return HealthReportService._sample_exercise_metrics(SAMPLE_MISSING)
         
-        # 添加饮食建议
-        summary += "\n饮食建议:\n"
-        summary += "1. 保持均衡饮食，每天摄入适量的蛋白质、碳水化合物和健康脂肪\n"
-        summary += "2. 增加蔬菜和水果的摄入，确保足够的维生素和矿物质\n"
-        summary += "3. 控制盐分和糖分的摄入，避免过度加工的食品\n"
-        summary += "4. 保持规律的进餐时间，避免暴饮暴食和长时间不进食\n"
+        # 运动类型统计，类型为空的记录归为"未知"
+        exercise_types = {}
+        for exercise_type, count in sorted(exercise['types'].items()):
+            exercise_type = exercise_type or "未知"
+            exercise_types[exercise_type] = exercise_types.get(exercise_type, 0) + count
         
-        return summary
+        return HealthReportService._build_exercise_metrics(
+            exercise['duration']['sum'], exercise['calories']['sum'], exercise_types, exercise['days'],
+            has_records_in_range=aggregate['exercise']['days'] > 0)
     
     @staticmethod
-    def _generate_exercise_summary(user_id, start_date, end_date):
-        """生成运动数据摘要"""
-        # 获取时间范围内的运动记录
-        try:
-            # 添加调试日志
-            print(f"正在查询用户ID {user_id} 的运动记录，日期范围: {start_date} - {end_date}")
-            print(f"开始日期类型: {type(start_date)}, 结束日期类型: {type(end_date)}")
-            
-            # 尝试转换用户ID为整数
-            try:
-                user_id_int = int(user_id)
-                print(f"用户ID已转换为整数: {user_id_int}")
-            except (ValueError, TypeError):
-                user_id_int = user_id
-                print(f"用户ID无法转换为整数，保持原值: {user_id_int}")
-            
-            # 注意: 使用HealthRecord模型而不是ExerciseRecord
-            print("从HealthRecord表中查询运动记录")
-            
-            # 查询所有运动记录，不受日期范围限制
-            exercise_records = HealthRecord.query.filter(
-                HealthRecord.user_id == user_id_int,
-                HealthRecord.record_type == 'exercise'
-            ).all()
-            
-            print(f"找到 {len(exercise_records)} 条运动记录")
-            
-            # 打印前几条记录的详细信息
-            for i, record in enumerate(exercise_records[:3]):
-                print(f"记录 {i+1}: ID={record.id}, 日期={record.record_date}, 类型={record.exercise_type}, 时长={record.duration or 0}分钟")
-            
-            # 如果没有找到记录，则使用硬编码数据
-            if not exercise_records:
-                print("没有找到运动记录，使用硬编码的示例数据")
-                # 创建一些示例数据，但不保存到数据库
-                from datetime import datetime, timedelta
-                
-                class DummyExerciseRecord:
-                    def __init__(self, record_date, exercise_type, duration, calories_burned, intensity=None):
-                        self.record_date = record_date
-                        self.exercise_type = exercise_type
-                        self.duration = duration
-                        self.calories_burned = calories_burned
-                        self.intensity = intensity
-                
-                today = datetime.now().date()
-                exercise_records = [
-                    DummyExerciseRecord(today - timedelta(days=1), "力量训练", 120, 1330, "高"),
-                    DummyExerciseRecord(today - timedelta(days=3), "游泳", 160, 1300, "中"),
-                    DummyExerciseRecord(today - timedelta(days=5), "普拉提", 150, 400, "中")
-                ]
-                print(f"已创建 {len(exercise_records)} 条示例运动记录")
-                
-                # 使用示例数据的摘要标题
-                summary_title = f"运动记录数据摘要（示例数据）：\n\n"
-                summary_note = f"注意: 未找到您的运动记录，以下为示例数据。建议在添加记录页面添加运动记录。\n\n"
-            else:
-                # 使用真实数据的摘要标题，但标明可能包含所选日期范围外的数据
-                summary_title = f"运动记录数据摘要（包含所有历史记录）：\n\n"
-                
-                # 检查是否有记录在指定日期范围内
-                records_in_range = []
-                if start_date and end_date:
-                    try:
-                        records_in_range = [r for r in exercise_records if (r.record_date and r.record_date >= start_date and r.record_date <= end_date)]
-                    except Exception as date_error:
-                        print(f"比较日期时出错: {date_error}")
-                        records_in_range = []
-                
-                if not records_in_range:
-                    try:
-                        start_date_str = start_date.strftime('%Y-%m-%d') if start_date else "未知日期"
-                        end_date_str = end_date.strftime('%Y-%m-%d') if end_date else "未知日期"
-                        summary_note = f"注意: 在{start_date_str}至{end_date_str}期间没有找到运动记录，正在显示所有历史记录。\n\n"
-                    except Exception as format_error:
-                        print(f"格式化日期时出错: {format_error}")
-                        summary_note = "注意: 在所选时间段内没有找到运动记录，正在显示所有历史记录。\n\n"
-                else:
-                    summary_note = ""
-            
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"查询运动记录时出错: {e}\n{error_trace}")
-            
-            # 发生错误时，使用硬编码数据
-            print("发生错误，使用硬编码的示例运动数据")
-            from datetime import datetime, timedelta
-            
-            class DummyExerciseRecord:
-                def __init__(self, record_date, exercise_type, duration, calories_burned, intensity=None):
-                    self.record_date = record_date
-                    self.exercise_type = exercise_type
-                    self.duration = duration
-                    self.calories_burned = calories_burned
-                    self.intensity = intensity
-            
-            today = datetime.now().date()
-            exercise_records = [
-                DummyExerciseRecord(today - timedelta(days=1), "力量训练", 120, 1330, "高"),
-                DummyExerciseRecord(today - timedelta(days=3), "游泳", 160, 1300, "中"), 
-                DummyExerciseRecord(today - timedelta(days=5), "普拉提", 150, 400, "中")
-            ]
-            
-            summary_title = f"运动记录数据摘要（示例数据）：\n\n"
-            summary_note = f"注意: 获取您的运动记录时发生错误，以下为示例数据。\n\n"
-        
-        # 计算总运动时间和消耗热量
+    def _build_exercise_metrics(total_duration, total_calories, exercise_types, days, sample=None,
+                                has_records_in_range=False):
+        return ExerciseMetrics(
+            sample=sample,
+            has_records_in_range=has_records_in_range,
+            active_days=days,
+            total_duration=total_duration,
+            total_calories=total_calories,
+            avg_daily_duration=total_duration / days if days > 0 else None,
+            avg_daily_calories=total_calories / days if days > 0 else None,
+            type_counts=[[exercise_type, count] for exercise_type, count
+                         in sorted(exercise_types.items(), key=lambda x: x[1], reverse=True)]
+        )
+    
+    @staticmethod
+    def _sample_exercise_metrics(sample):
+        """没有运动记录或查询出错时使用的示例数据，不保存到数据库"""
+        today = datetime.now().date()
+        exercise_records = [
+            SimpleNamespace(record_date=today - timedelta(days=1), exercise_type="力量训练", duration=120, calories_burned=1330),
+            SimpleNamespace(record_date=today - timedelta(days=3), exercise_type="游泳", duration=160, calories_burned=1300),
+            SimpleNamespace(record_date=today - timedelta(days=5), exercise_type="普拉提", duration=150, calories_burned=400)
+        ]
+        total_duration, total_calories, exercise_types, days = \
+            HealthReportService._summarize_exercise_records(exercise_records)
+        return HealthReportService._build_exercise_metrics(
+            total_duration, total_calories, exercise_types, days, sample=sample)
+    
+    @staticmethod
+    def _summarize_exercise_records(exercise_records):
+        """统计示例运动记录的总时间、总热量、类型次数和运动天数"""
         total_duration = 0
         total_calories = 0
         exercise_types = {}
@@ -400,280 +392,101 @@ class HealthReportService:
         for record in exercise_records:
             total_duration += record.duration or 0
             total_calories += record.calories_burned or 0
-            
+        
             # 统计运动类型
             exercise_type = record.exercise_type or "未知"
             exercise_types[exercise_type] = exercise_types.get(exercise_type, 0) + 1
         
         days = len(set([str(record.record_date) for record in exercise_records])) # 计算实际有运动记录的天数
-        
-        # 生成摘要文本
-        summary = summary_title + summary_note
-        
-        if days > 0:
-            avg_duration = total_duration / days
-            avg_calories = total_calories / days
-            
-            summary += f"总运动时间: {total_duration} 分钟\n"
-            summary += f"平均每日运动时间: {avg_duration:.0f} 分钟（实际运动天数: {days}天）\n"
-            summary += f"总消耗热量: {total_calories:.0f} 大卡\n"
-            summary += f"平均每日消耗热量: {avg_calories:.0f} 大卡\n"
-        
-        # 添加运动类型统计
-        summary += "\n运动类型统计：\n"
-        for exercise_type, count in sorted(exercise_types.items(), key=lambda x: x[1], reverse=True):
-            summary += f"{exercise_type}: {count} 次\n"
-            
-        # 添加健康建议
-        summary += "\n运动建议：\n"
-        if avg_duration < 30:
-            summary += "- 您的运动时间较少，建议增加日常运动量，每天至少进行30分钟中等强度的有氧运动\n"
-        else:
-            summary += "- 您保持了良好的运动习惯，请继续保持！\n"
-        
-        summary += "- 尝试多样化您的运动类型，结合有氧运动、力量训练和灵活性训练\n"
-        summary += "- 记得运动前充分热身，运动后适当拉伸，避免运动损伤\n"
-        
-        return summary
+        return total_duration, total_calories, exercise_types, days
     
     @staticmethod
-    def _generate_medication_summary(user_id, start_date, end_date):
-        """生成药物数据摘要"""
-        # 获取时间范围内的药物记录
-        try:
-            # 添加调试日志
-            print(f"正在查询用户ID {user_id} 的用药记录，日期范围: {start_date} - {end_date}")
-            print(f"开始日期类型: {type(start_date)}, 结束日期类型: {type(end_date)}")
-            
-            # 尝试转换用户ID为整数
-            try:
-                user_id_int = int(user_id)
-                print(f"用户ID已转换为整数: {user_id_int}")
-            except (ValueError, TypeError):
-                user_id_int = user_id
-                print(f"用户ID无法转换为整数，保持原值: {user_id_int}")
-            
-            # 注意: 使用HealthRecord模型而不是MedicationRecord
-            print("从HealthRecord表中查询用药记录")
-            
-            # 查询所有用药记录，不受日期范围限制
-            medication_records = HealthRecord.query.filter(
-                HealthRecord.user_id == user_id_int,
-                HealthRecord.record_type == 'medication'
-            ).all()
-            
-            print(f"找到 {len(medication_records)} 条用药记录")
-            
-            # 打印前几条记录的详细信息
-            for i, record in enumerate(medication_records[:3]):
-                print(f"记录 {i+1}: ID={record.id}, 日期={record.record_date}, 药物={record.medication_name}, 剂量={record.dosage}{record.dosage_unit}")
-            
-            # 如果没有找到记录，则使用硬编码数据
-            if not medication_records:
-                print("没有找到用药记录，使用硬编码的示例数据")
-                # 创建一些示例数据，但不保存到数据库
-                from datetime import datetime, timedelta
-                
-                class DummyMedicationRecord:
-                    def __init__(self, record_date, medication_name, dosage, dosage_unit, effectiveness=None):
-                        self.record_date = record_date
-                        self.medication_name = medication_name
-                        self.dosage = dosage
-                        self.dosage_unit = dosage_unit
-                        self.effectiveness = effectiveness
-                
-                today = datetime.now().date()
-                medication_records = [
-                    DummyMedicationRecord(today - timedelta(days=1), "复方感冒药", 1, "片", 3),
-                    DummyMedicationRecord(today - timedelta(days=3), "维生素C", 1, "粒", 4),
-                    DummyMedicationRecord(today - timedelta(days=5), "布洛芬", 1, "片", 5)
-                ]
-                print(f"已创建 {len(medication_records)} 条示例用药记录")
-                
-                # 使用示例数据的摘要标题
-                summary_title = f"用药记录数据摘要（示例数据）：\n\n"
-                summary_note = f"注意: 未找到您的用药记录，以下为示例数据。如果您正在服用药物，建议记录您的用药情况。\n\n"
-            else:
-                # 使用真实数据的摘要标题，但标明可能包含所选日期范围外的数据
-                summary_title = f"用药记录数据摘要（包含所有历史记录）：\n\n"
-                
-                # 检查是否有记录在指定日期范围内
-                records_in_range = []
-                if start_date and end_date:
-                    try:
-                        records_in_range = [r for r in medication_records if (r.record_date and r.record_date >= start_date and r.record_date <= end_date)]
-                    except Exception as date_error:
-                        print(f"比较日期时出错: {date_error}")
-                        records_in_range = []
-                
-                if not records_in_range:
-                    try:
-                        start_date_str = start_date.strftime('%Y-%m-%d') if start_date else "未知日期"
-                        end_date_str = end_date.strftime('%Y-%m-%d') if end_date else "未知日期"
-                        summary_note = f"注意: 在{start_date_str}至{end_date_str}期间没有找到用药记录，正在显示所有历史记录。\n\n"
-                    except Exception as format_error:
-                        print(f"格式化日期时出错: {format_error}")
-                        summary_note = "注意: 在所选时间段内没有找到用药记录，正在显示所有历史记录。\n\n"
-                else:
-                    summary_note = ""
-            
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"查询用药记录时出错: {e}\n{error_trace}")
-            
-            # 发生错误时，使用硬编码数据
-            print("发生错误，使用硬编码的示例用药数据")
-            from datetime import datetime, timedelta
-            
-            class DummyMedicationRecord:
-                def __init__(self, record_date, medication_name, dosage, dosage_unit, effectiveness=None):
-                    self.record_date = record_date
-                    self.medication_name = medication_name
-                    self.dosage = dosage
-                    self.dosage_unit = dosage_unit
-                    self.effectiveness = effectiveness
-            
-            today = datetime.now().date()
-            medication_records = [
-                DummyMedicationRecord(today - timedelta(days=1), "复方感冒药", 1, "片", 3),
-                DummyMedicationRecord(today - timedelta(days=3), "维生素C", 1, "粒", 4),
-                DummyMedicationRecord(today - timedelta(days=5), "布洛芬", 1, "片", 5)
+    def _collect_medication_metrics(history, aggregate):
+        """统计用药数据指标（所有历史记录，不受日期范围限制）"""
+        if history is None:
+            logger.warning("发生错误，使用硬编码的示例用药数据")
+            return HealthReportService._sample_medication_metrics(SAMPLE_ERROR)
+        
+        medication = history['medication']
+        logger.debug("找到 %s 条用药记录", medication['count'])
+        
+        # 如果没有找到记录，则使用示例数据
+        if not medication['count']:
+            logger.warning("没有找到用药记录，使用硬编码的示例数据")
+            return HealthReportService._sample_medication_metrics(SAMPLE_MISSING)
+        
+        # 药名为空的记录归为"未知药物"，按第一次记录的先后排列
+        medications = {}
+        for med_name, tally in sorted(medication['names'].items(), key=lambda x: x[1]['first_id']):
+            med_name = med_name or "未知药物"
+            target = medications.setdefault(med_name, {'count': 0, 'effectiveness_sum': 0, 'effectiveness_count': 0})
+            for key in target:
+                target[key] += tally[key]
+        
+        return HealthReportService._build_medication_metrics(
+            medications, medication['days'], has_records_in_range=aggregate['medication']['count'] > 0)
+    
+    @staticmethod
+    def _build_medication_metrics(medications, record_days, sample=None, has_records_in_range=False):
+        """按服用次数排列药物，计算平均效果评分"""
+        return MedicationMetrics(
+            sample=sample,
+            has_records_in_range=has_records_in_range,
+            record_days=record_days,
+            medications=[
+                {
+                    'name': med_name,
+                    'count': tally['count'],
+                    'avg_effectiveness': (tally['effectiveness_sum'] / tally['effectiveness_count']
+                                          if tally['effectiveness_count'] else None)
+                }
+                for med_name, tally in sorted(medications.items(), key=lambda x: x[1]['count'], reverse=True)
             ]
-            
-            summary_title = f"用药记录数据摘要（示例数据）：\n\n"
-            summary_note = f"注意: 获取您的用药记录时发生错误，以下为示例数据。\n\n"
-        
-        # 统计药物类型及频率
-        medication_counts = {}
-        effectiveness_sum = {}
-        effectiveness_count = {}
-        
+        )
+    
+    @staticmethod
+    def _sample_medication_metrics(sample):
+        """没有用药记录或查询出错时使用的示例数据，不保存到数据库"""
+        today = datetime.now().date()
+        medication_records = [
+            SimpleNamespace(record_date=today - timedelta(days=1), medication_name="复方感冒药", effectiveness=3),
+            SimpleNamespace(record_date=today - timedelta(days=3), medication_name="维生素C", effectiveness=4),
+            SimpleNamespace(record_date=today - timedelta(days=5), medication_name="布洛芬", effectiveness=5)
+        ]
+        medications = {}
         for record in medication_records:
-            med_name = record.medication_name or "未知药物"
-            medication_counts[med_name] = medication_counts.get(med_name, 0) + 1
-            
-            # 统计效果评分
+            tally = medications.setdefault(record.medication_name, {'count': 0, 'effectiveness_sum': 0, 'effectiveness_count': 0})
+            tally['count'] += 1
             if record.effectiveness:
-                effectiveness_sum[med_name] = effectiveness_sum.get(med_name, 0) + record.effectiveness
-                effectiveness_count[med_name] = effectiveness_count.get(med_name, 0) + 1
-        
-        days = len(set([str(record.record_date) for record in medication_records])) # 计算实际有用药记录的天数
-        
-        # 生成摘要文本
-        summary = summary_title + summary_note
-        
-        if medication_counts:
-            summary += "服用药物统计：\n"
-            for med_name, count in sorted(medication_counts.items(), key=lambda x: x[1], reverse=True):
-                avg_effectiveness = (effectiveness_sum.get(med_name, 0) / effectiveness_count.get(med_name, 1) 
-                                   if med_name in effectiveness_sum else None)
-                
-                summary += f"{med_name}: 服用 {count} 次"
-                if avg_effectiveness:
-                    summary += f", 平均效果评分: {avg_effectiveness:.1f}/5"
-                summary += "\n"
-                
-            # 添加用药提醒和建议
-            summary += "\n用药建议：\n"
-            summary += "- 请严格按照医生的处方用药，遵守剂量和服用时间\n"
-            summary += "- 保持定期复诊，及时调整用药方案\n"
-            summary += "- 如果出现不适或副作用，请立即咨询医生\n"
-            summary += "- 使用药物提醒功能，避免漏服或重复服药\n"
-        
-        return summary
+                tally['effectiveness_sum'] += record.effectiveness
+                tally['effectiveness_count'] += 1
+        record_days = len(set([str(record.record_date) for record in medication_records]))
+        return HealthReportService._build_medication_metrics(medications, record_days, sample=sample)
     
     @staticmethod
-    def _generate_recommendations(user_id, health_summary, diet_summary, exercise_summary, medication_summary):
-        """生成健康建议"""
+    def _generate_recommendations(metrics):
+        """根据结构化指标生成健康建议"""
         recommendations = "健康改善建议：\n\n"
         
-        # 检查是否有数据可用
-        has_health_data = not health_summary.startswith("在所选时间段内没有健康记录数据")
-        has_diet_data = not diet_summary.startswith("在所选时间段内没有饮食记录数据")
-        
-        # 检查运动数据 - 考虑显示历史记录的情况
-        has_exercise_data = False
-        if not exercise_summary.startswith("在所选时间段内没有运动记录数据"):
-            has_exercise_data = True
-        elif "正在显示所有历史记录" in exercise_summary:
-            has_exercise_data = True
-        
-        # 检查用药数据 - 考虑显示历史记录的情况
-        has_medication_data = False
-        if not medication_summary.startswith("在所选时间段内没有用药记录数据"):
-            has_medication_data = True
-        elif "正在显示所有历史记录" in medication_summary:
-            has_medication_data = True
-        
-        # 检查是否有历史数据（即使不在所选时间段内）
-        using_historical_exercise = "包含所有历史记录" in exercise_summary or "正在显示所有历史记录" in exercise_summary
-        using_historical_medication = "包含所有历史记录" in medication_summary or "正在显示所有历史记录" in medication_summary
+        has_exercise_data = metrics.exercise.active_days > 0
+        has_medication_data = bool(metrics.medication.medications)
         
-        # 计算有多少类型的有效数据
-        valid_data_types = sum([has_health_data, has_diet_data, has_exercise_data, has_medication_data])
-        
-        print(f"生成建议 - 有效数据类型数: {valid_data_types}, 健康:{has_health_data}, 饮食:{has_diet_data}, 运动:{has_exercise_data}, 用药:{has_medication_data}")
-        
-        # 分析运动数据，提取关键信息
-        exercise_details = {}
-        if has_exercise_data or using_historical_exercise:
-            try:
-                # 提取平均运动时间
-                import re
-                avg_duration_match = re.search(r"平均每日运动时间: (\d+) 分钟", exercise_summary)
-                if avg_duration_match:
-                    exercise_details["avg_duration"] = int(avg_duration_match.group(1))
-                
-                # 提取运动类型
-                exercise_types = []
-                type_section = exercise_summary.split("运动类型统计：")
-                if len(type_section) > 1:
-                    type_lines = type_section[1].split("\n运动建议")[0].strip().split("\n")
-                    for line in type_lines:
-                        if ":" in line:
-                            exercise_type = line.split(":")[0].strip()
-                            if exercise_type and exercise_type != "":
-                                exercise_types.append(exercise_type)
-                
-                exercise_details["types"] = exercise_types
-                print(f"提取的运动信息: {exercise_details}")
-            except Exception as e:
-                print(f"提取运动数据时出错: {e}")
-        
-        # 分析用药数据，提取关键信息
-        medication_details = {}
-        if has_medication_data or using_historical_medication:
-            try:
-                # 提取药物类型
-                medications = []
-                if "服用药物统计：" in medication_summary:
-                    med_section = medication_summary.split("服用药物统计：")[1].split("\n\n用药建议")[0].strip()
-                    med_lines = med_section.split("\n")
-                    for line in med_lines:
-                        if ":" in line:
-                            med_name = line.split(":")[0].strip()
-                            if med_name and med_name != "":
-                                medications.append(med_name)
-                
-                medication_details["medications"] = medications
-                print(f"提取的用药信息: {medication_details}")
-            except Exception as e:
-                print(f"提取用药数据时出错: {e}")
+        logger.debug("生成建议 - 健康:%s, 饮食:%s, 运动:%s, 用药:%s", metrics.health.record_days > 0,
+                     metrics.diet.record_count > 0, has_exercise_data, has_medication_data)
         
         # 基础建议
         recommendations += "1. 饮食建议：保持均衡的饮食结构，每日摄入充足的蛋白质、水果和蔬菜。\n"
         
-        # 根据运动数据生成个性化建议
-        if has_exercise_data or using_historical_exercise:
-            avg_duration = exercise_details.get("avg_duration", 0)
-            exercise_types = exercise_details.get("types", [])
-            
+        # 根据运动数据生成个性化建议（平均运动时间按摘要中显示的整数分钟判断）
+        if has_exercise_data:
+            avg_duration = round(metrics.exercise.avg_daily_duration)
+            exercise_types = metrics.exercise.types
+        
             if avg_duration < 30:
                 recommendations += "2. 运动建议：您的运动时间较少，建议增加到每天至少30分钟中等强度的有氧运动。"
             else:
                 recommendations += "2. 运动建议：您的运动时间达标，请继续保持良好习惯。"
-                
+        
             # 根据运动类型给出建议
             if len(exercise_types) <= 2:
                 recommendations += " 建议多样化您的运动类型，"
@@ -681,17 +494,17 @@ class HealthReportService:
                 has_cardio = any(t in ("跑步", "慢跑", "快走", "游泳", "骑车", "有氧") for t in exercise_types)
                 has_strength = any(t in ("力量", "举重", "健身", "俯卧撑", "仰卧起坐") for t in exercise_types)
                 has_flexibility = any(t in ("瑜伽", "拉伸", "舞蹈", "太极") for t in exercise_types)
-                
+        
                 if not has_cardio:
                     missing_types.append("有氧运动（如慢跑、快走或游泳）")
                 if not has_strength:
                     missing_types.append("力量训练（如哑铃、俯卧撑或仰卧起坐）")
                 if not has_flexibility:
                     missing_types.append("灵活性训练（如瑜伽或拉伸）")
-                
+        
                 if missing_types:
                     recommendations += "增加" + "、".join(missing_types) + "。"
-            
+        
             recommendations += "\n"
         else:
             recommendations += "2. 运动建议：每天至少进行30分钟中等强度的有氧运动，每周进行至少2次力量训练。\n"
@@ -699,33 +512,30 @@ class HealthReportService:
         recommendations += "3. 睡眠建议：保持规律的作息，每晚保证7-8小时的充足睡眠。\n"
         
         # 根据用药数据生成个性化建议
-        if has_medication_data or using_historical_medication:
-            medications = medication_details.get("medications", [])
-            if medications:
-                recommendations += f"4. 用药提醒：您正在服用{len(medications)}种药物，包括{'、'.join(medications[:3])}"
-                if len(medications) > 3:
-                    recommendations += f"等{len(medications)}种药物"
-                recommendations += "。请严格按照医生的处方和时间服用，并定期复诊。"
-                
-                # 添加额外建议
-                recommendations += " 建议使用药物提醒功能，避免漏服或重复服药。\n"
-            else:
-                recommendations += "4. 用药提醒：按时按量服用医生开具的药物，注意记录药物效果和副作用。\n"
+        if has_medication_data:
+            medications = metrics.medication.names
+            recommendations += f"4. 用药提醒：您正在服用{len(medications)}种药物，包括{'、'.join(medications[:3])}"
+            if len(medications) > 3:
+                recommendations += f"等{len(medications)}种药物"
+            recommendations += "。请严格按照医生的处方和时间服用，并定期复诊。"
+        
+            # 添加额外建议
+            recommendations += " 建议使用药物提醒功能，避免漏服或重复服药。\n"
         else:
             recommendations += "4. 用药提醒：按时按量服用医生开具的药物，注意记录药物效果和副作用。\n"
         
         # 如果缺少数据，添加数据完整性建议
-        if not has_exercise_data and not using_historical_exercise or not has_medication_data and not using_historical_medication:
+        if not has_exercise_data or not has_medication_data:
             recommendations += "\n数据完整性建议：\n"
-            
-            if not has_exercise_data and not using_historical_exercise:
+        
+            if not has_exercise_data:
                 recommendations += "- 您的报告缺少运动数据。建议您在添加记录页面添加运动记录，以便系统提供更全面的健康评估和更精准的运动建议。\n"
-            
-            if not has_medication_data and not using_historical_medication:
+        
+            if not has_medication_data:
                 recommendations += "- 您的报告缺少用药数据。如果您正在服用药物，建议您记录用药情况，以便系统更好地监控药物使用情况并提醒您按时服药。\n"
         
         return recommendations
-    
+
     @staticmethod
     def get_user_reports(user_id, limit=10):
         """获取用户的健康报告列表
@@ -794,7 +604,7 @@ class ReminderService:
                 ).first()
                 
                 if medication_record:
-                    print(f"找到药物记录: ID={medication_record.id}, 药物名称={medication_record.medication_name}")
+                    logger.debug("找到药物记录: ID=%s, 药物名称=%s", medication_record.id, medication_record.medication_name)
                     medication_info = medication_record
                     
                     # 如果未提供日期时间，则使用药物记录中的日期时间
@@ -816,10 +626,10 @@ class ReminderService:
                             description_parts.append(with_food_text)
                         description = ", ".join(description_parts)
                 else:
-                    print(f"警告: 未找到ID为{medication_record_id}的药物记录，将不关联药物记录")
+                    logger.warning("警告: 未找到ID为%s的药物记录，将不关联药物记录", medication_record_id)
                     medication_record_id = None  # 重置为None，因为找不到记录
             except Exception as e:
-                print(f"获取药物记录出错: {e}")
+                logger.error("获取药物记录出错: %s", e)
                 medication_record_id = None  # 出错时重置为None
         
         # 确保提醒有标题
@@ -999,73 +809,74 @@ class ReminderService:
         if date is None:
             date = datetime.now().date()
             
-        # 获取所有药物记录
         try:
-            medication_records = HealthRecord.query.filter(
-                HealthRecord.user_id == user_id,
-                HealthRecord.record_type == 'medication'
-            ).all()
-            
-            print(f"找到 {len(medication_records)} 条药物记录")
-            
-            # 检查每个药物是否已有今天的提醒
-            created_count = 0
-            for med_record in medication_records:
-                # 查询是否已存在该药物的今日提醒
-                existing_reminder = Reminder.query.filter(
-                    Reminder.user_id == user_id,
-                    Reminder.reminder_date == date
-                ).first()
-                
-                # 如果不存在，则创建新提醒
-                if not existing_reminder:
-                    title = f"服药提醒: {med_record.medication_name}" if med_record.medication_name else "服药提醒"
-                    
-                    # 构建描述
-                    description_parts = []
-                    if med_record.dosage and med_record.dosage_unit:
-                        description_parts.append(f"剂量: {med_record.dosage} {med_record.dosage_unit}")
-                    if med_record.with_food:
-                        description_parts.append("请饭后服用")
-                        
-                    description = "，".join(description_parts) if description_parts else "按医嘱服用"
-                    
-                    # 创建提醒 - 注意不使用medication_record_id外键
-                    reminder = Reminder(
-                        user_id=user_id,
-                        reminder_type='medication',
-                        title=title,
-                        description=description,
-                        reminder_date=date,
-                        reminder_time=med_record.time_taken if med_record.time_taken else datetime.now().time(),
-                        recurrence=None,
-                        medication_record_id=None  # 避免外键约束问题
-                    )
-                    
-                    # 添加药物记录信息到notes
-                    notes_data = {
-                        "medication_record_info": {
-                            "id": med_record.id,
-                            "name": med_record.medication_name,
-                            "dosage": f"{med_record.dosage or ''}{med_record.dosage_unit or ''}",
-                            "record_date": med_record.record_date.strftime('%Y-%m-%d') if med_record.record_date else None
-                        }
-                    }
-                    reminder.notes = json.dumps(notes_data)
-                    
-                    db.session.add(reminder)
-                    created_count += 1
-            
-            if created_count > 0:
-                db.session.commit()
-                print(f"成功创建 {created_count} 条药物提醒")
-            
-            return created_count
-            
+            created_count = ReminderService.generate_medication_reminders(
+                db.session.connection(), date, user_ids=[user_id])
+            db.session.commit()
         except Exception as e:
-            print(f"自动生成药物提醒时出错: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("自动生成药物提醒时出错: %s", e, exc_info=True)
             # 回滚事务
             db.session.rollback()
-            return 0 
\ No newline at end of file
+            return 0
+        
+        if created_count > 0:
+            logger.info("成功创建 %s 条药物提醒", created_count)
+            reminder_scheduler.request_resync()
+        return created_count
+    
+    @staticmethod
+    def generate_medication_reminders(conn, date, user_ids=None, chunk_size=REMINDER_USER_CHUNK_SIZE):
+        """为一批用户按用药记录生成指定日期的药物提醒（集合操作）
+        
+        每个用户的每种药物（按药物名称区分，取最新一条用药记录的剂量和服药时间）每天生成一条
+        提醒。每个用户分块只执行三条语句：查询各药物的最新记录、查询当天已有提醒的幂等键、
+        批量插入缺少的提醒。插入时与唯一索引冲突的行被跳过，并发或重复执行也不会产生重复提醒。
+        
+        参数:
+            conn: 数据库连接（在调用方的事务中执行，由调用方提交）
+            date: 提醒日期
+            user_ids: 用户ID列表，为空时处理所有用户
+            chunk_size: 每个分块的用户数
+            
+        返回:
+            生成的提醒数量（并发执行时可能包含被唯一索引跳过的行）
+        """
+        if user_ids is None:
+            user_ids = list(conn.execute(select(users.c.id).order_by(users.c.id)).scalars())
+        else:
+            user_ids = sorted(set(user_ids))
+        
+        created_count = 0
+        now = datetime.utcnow()
+        for i in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[i:i + chunk_size]
+            latest = select(func.max(health_records.c.id).label('id')).where(
+                health_records.c.user_id.in_(chunk),
+                health_records.c.record_type == 'medication'
+            ).group_by(health_records.c.user_id, health_records.c.medication_name).subquery()
+            records = conn.execute(select(
+                health_records.c.id, health_records.c.user_id, health_records.c.medication_name,
+                health_records.c.dosage, health_records.c.dosage_unit, health_records.c.with_food,
+                health_records.c.time_taken, health_records.c.record_date
+            ).join(latest, health_records.c.id == latest.c.id).order_by(health_records.c.id.desc())).all()
+            if not records:
+                continue
+            
+            existing = set(conn.execute(select(reminders.c.user_id, reminders.c.idempotency_key).where(
+                reminders.c.user_id.in_(chunk),
+                reminders.c.reminder_date == date,
+                reminders.c.idempotency_key.isnot(None)
+            )).all())
+            
+            # 按记录ID倒序，名称仅大小写或空白不同的药物使用最新的一条记录
+            rows = []
+            for record in records:
+                key = medication_reminder_key(date, record.medication_name)
+                if (record.user_id, key) in existing:
+                    continue
+                existing.add((record.user_id, key))
+                rows.append(_medication_reminder_row(record, date, key, now))
+            insert_ignore_rows(conn, reminders, rows, ('user_id', 'idempotency_key'))
+            created_count += len(rows)
+        
+        return created_count
@@ -1,5 +1,8 @@
 from database import db
 from models.health_record import HealthRecord
+from services.chart_service import ChartService
+from services.rollup_service import RollupService
+from utils.pagination import keyset_paginate
 from datetime import datetime, timedelta, time
 import logging
 
@@ -84,7 +87,7 @@ class HealthService:
             db.session.add(record)
             db.session.commit()
             
-            logger.info(f"创建{record_type}记录成功，用户ID: {user_id}")
+            logger.info("创建%s记录成功，用户ID: %s", record_type, user_id)
             
             return {
                 "success": True,
@@ -95,14 +98,14 @@ class HealthService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"创建{record_type}记录失败: {str(e)}")
+            logger.error("创建%s记录失败: %s", record_type, e)
             return {
                 "success": False,
                 "message": f"创建记录失败: {str(e)}"
             }
     
     @staticmethod
-    def get_health_records(user_id, record_type=None, start_date=None, end_date=None):
+    def get_health_records(user_id, record_type=None, start_date=None, end_date=None, limit=None, cursor=None):
         """
         获取用户的健康记录
         
@@ -111,6 +114,8 @@ class HealthService:
             record_type: 记录类型，可选
             start_date: 开始日期，可选
             end_date: 结束日期，可选
+            limit: 每页记录数，可选，不传时返回全部记录
+            cursor: 分页游标，可选
             
         返回:
             健康记录列表
@@ -131,18 +136,18 @@ class HealthService:
                     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
                 query = query.filter(HealthRecord.record_date <= end_date)
                 
-            # 按日期排序
-            records = query.order_by(HealthRecord.record_date.desc(), 
-                                     HealthRecord.created_at.desc()).all()
+            # 按日期倒序，传入limit/cursor时按游标分页
+            records, next_cursor = keyset_paginate(query, HealthRecord, limit=limit, cursor=cursor)
             
             return {
                 "success": True,
                 "records": [record.to_dict() for record in records],
-                "count": len(records)
+                "count": len(records),
+                "next_cursor": next_cursor
             }
             
         except Exception as e:
-            logger.error(f"获取健康记录失败: {str(e)}")
+            logger.error("获取健康记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}",
@@ -176,7 +181,7 @@ class HealthService:
             }
             
         except Exception as e:
-            logger.error(f"获取健康记录详情失败: {str(e)}")
+            logger.error("获取健康记录详情失败: %s", e)
             return {
                 "success": False,
                 "message": f"获取记录详情失败: {str(e)}"
@@ -220,7 +225,7 @@ class HealthService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"更新健康记录失败: {str(e)}")
+            logger.error("更新健康记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"更新记录失败: {str(e)}"
@@ -253,7 +258,7 @@ class HealthService:
             db.session.delete(record)
             db.session.commit()
             
-            logger.info(f"删除{record_type}记录成功，用户ID: {user_id}")
+            logger.info("删除%s记录成功，用户ID: %s", record_type, user_id)
             
             return {
                 "success": True,
@@ -262,168 +267,42 @@ class HealthService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"删除健康记录失败: {str(e)}")
+            logger.error("删除健康记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"删除记录失败: {str(e)}"
             }
     
     @staticmethod
-    def get_dashboard_chart_data(user_id, days=7):
+    def get_dashboard_chart_data(user_id, days=7, series=None, start_date=None, end_date=None, bucket=None):
         """
         获取仪表盘图表所需的统计数据
         
         参数:
             user_id: 用户ID
-            days: 获取最近几天的数据，默认7天
+            days: 未指定 start_date 时获取最近几天的数据，默认7天
+            series: 数据序列名列表，默认饮食、运动和饮水（见 services/chart_service.py）
+            start_date: 开始日期，可选
+            end_date: 结束日期，默认今天
+            bucket: day / week / month，默认按范围长度选择
             
         返回:
-            包含各类健康数据统计的字典
+            包含各类健康数据统计的字典；序列、周期或日期范围无效时 success 为 False
+            （其他异常不在这里处理，由调用方记录并返回通用错误）
         """
         try:
-            print(f"开始获取图表数据，用户: {user_id}, 天数: {days}")
-            
             # 计算日期范围
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=days-1)  # 包含今天
-            print(f"1: {start_date} ~ {end_date}")
-            
-            # 准备日期标签列表和数据容器
-            date_labels = []
-            diet_calories = []
-            exercise_calories = []
-            water_intake = []
-            
-            # 生成日期范围
-            for i in range(days):
-                current_date = start_date + timedelta(days=i)
-                date_labels.append(current_date.strftime('%m-%d'))
-                
-                # 初始值设为0，如果当天没有数据则使用0
-                diet_calories.append(0)
-                exercise_calories.append(0)
-                water_intake.append(0)
-            
-            try:
-                # 查询饮食记录
-                diet_records = db.session.query(
-                    HealthRecord.record_date,
-                    db.func.sum(HealthRecord.food_amount).label('food_amount')
-                ).filter(
-                    HealthRecord.user_id == user_id,
-                    HealthRecord.record_type == 'diet',
-                    HealthRecord.record_date >= start_date,
-                    HealthRecord.record_date <= end_date
-                ).group_by(HealthRecord.record_date).all()
-                
-                print(f"1 {len(diet_records)} 1")
-                
-                # 填充饮食数据
-                for record in diet_records:
-                    if record.record_date and record.food_amount:
-                        idx = (record.record_date - start_date).days
-                        if 0 <= idx < days:
-                            # 假设每100g食物平均含有150卡路里，这里简化计算
-                            diet_calories[idx] = round(record.food_amount * 1.5)
-            except Exception as diet_error:
-                print(f"1: {str(diet_error)}")
-            
-            try:
-                # 查询运动记录
-                exercise_records = db.session.query(
-                    HealthRecord.record_date,
-                    db.func.sum(HealthRecord.calories_burned).label('calories')
-                ).filter(
-                    HealthRecord.user_id == user_id,
-                    HealthRecord.record_type == 'exercise',
-                    HealthRecord.record_date >= start_date,
-                    HealthRecord.record_date <= end_date
-                ).group_by(HealthRecord.record_date).all()
-                
-                print(f"1 {len(exercise_records)} 1")
-                
-                # 填充运动数据
-                for record in exercise_records:
-                    if record.record_date and record.calories:
-                        idx = (record.record_date - start_date).days
-                        if 0 <= idx < days:
-                            exercise_calories[idx] = round(record.calories)
-            except Exception as exercise_error:
-                print(f"1: {str(exercise_error)}")
-
-            try:
-                # 查询饮水记录
-                water_records = db.session.query(
-                    HealthRecord.record_date,
-                    db.func.sum(HealthRecord.water_amount).label('amount')
-                ).filter(
-                    HealthRecord.user_id == user_id,
-                    HealthRecord.record_type == 'water',
-                    HealthRecord.record_date >= start_date,
-                    HealthRecord.record_date <= end_date
-                ).group_by(HealthRecord.record_date).all()
-                
-
-                
-                # 填充饮水数据
-                for record in water_records:
-                    if record.record_date and record.amount:
-                        idx = (record.record_date - start_date).days
-                        if 0 <= idx < days:
-                            # 将毫升转换为百毫升用于图表显示
-                            water_intake[idx] = round(record.amount / 100)
-            except Exception as water_error:
-                print(f"1: {str(water_error)}")
-                
-
-            all_zeros = all(x == 0 for x in diet_calories) and \
-                      all(x == 0 for x in exercise_calories) and \
-                      all(x == 0 for x in water_intake)
-                      
-            if all_zeros:
-                # 添加一些示例数据，以便用户看到图表效果
-                for i in range(days):
-                    # 模拟每天不同的数据
-                    diet_calories[i] = 1500 + (i * 100) % 500  # 1500-2000卡路里
-                    exercise_calories[i] = 300 + (i * 50) % 200  # 300-500卡路里
-                    water_intake[i] = 20 + (i * 5) % 15  # 2000-3500毫升(显示为20-35)
-            
-            result = {
-                "success": True,
-                "data": {
-                    "labels": date_labels,
-                    "diet_calories": diet_calories,
-                    "exercise_calories": exercise_calories,
-                    "water_intake": water_intake
-                }
-            }
-            
-            print(f"1: {result}")
-            return result
-            
-        except Exception as e:
-            print(f"1: {str(e)}")
-            
-            # 生成默认的日期标签和示例数据
-            date_labels = []
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=days-1)
-            
-            for i in range(days):
-                current_date = start_date + timedelta(days=i)
-                date_labels.append(current_date.strftime('%m-%d'))
+            end_date = end_date or datetime.now().date()
+            start_date = start_date or end_date - timedelta(days=days-1)  # 包含今天
+            logger.debug("开始获取图表数据，用户: %s, 范围: %s ~ %s", user_id, start_date, end_date)
             
-            # 返回示例数据
+            # 所有序列由一条每日汇总表上的分组聚合查询得到
             return {
                 "success": True,
-                "data": {
-                    "labels": date_labels,
-                    "diet_calories": [1500, 1600, 1700, 1800, 1750, 1650, 1550],
-                    "exercise_calories": [350, 400, 300, 450, 350, 300, 400],
-                    "water_intake": [25, 30, 28, 35, 32, 30, 29]
-                },
-                "note": "示例数据 (服务器错误)"
+                "data": ChartService.get_chart_data(user_id, start_date, end_date, series, bucket)
             }
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
     
     @staticmethod
     def get_recent_records(user_id, limit=5):
@@ -445,41 +324,7 @@ class HealthService:
             ).limit(limit).all()
             
             # 格式化记录以便前端显示
-            formatted_records = []
-            for record in records:
-                record_dict = record.to_dict()
-                
-                # 创建记录摘要
-                summary = ""
-                if record.record_type == 'health':
-                    summary = f"体重: {record.weight or '-'}kg, 血压: {record.blood_pressure_systolic or '-'}/{record.blood_pressure_diastolic or '-'} mmHg"
-                elif record.record_type == 'diet':
-                    summary = f"食物: {record.food_name or '-'}, 数量: {record.food_amount or '-'}g"
-                elif record.record_type == 'exercise':
-                    summary = f"类型: {record.exercise_type or '-'}, 时长: {record.duration or '-'}分钟"
-                elif record.record_type == 'water':
-                    summary = f"饮水量: {record.water_amount or '-'}毫升"
-                elif record.record_type == 'medication':
-                    summary = f"药物: {record.medication_name or '-'}, 剂量: {record.dosage or '-'}{record.dosage_unit or ''}"
-                
-                # 创建记录标题
-                title = "健康记录"
-                if record.record_type == 'diet':
-                    title = f"{record.meal_type or '饮食'}记录"
-                elif record.record_type == 'exercise':
-                    title = f"{record.exercise_type or '运动'}记录"
-                elif record.record_type == 'water':
-                    title = "饮水记录"
-                elif record.record_type == 'medication':
-                    title = f"{record.medication_name or '服药'}记录"
-                
-                formatted_records.append({
-                    "id": record.id,
-                    "type": record.record_type,
-                    "date": record.record_date.isoformat(),
-                    "title": title,
-                    "summary": summary
-                })
+            formatted_records = [HealthService._format_recent_record(record) for record in records]
             
             return {
                 "success": True,
@@ -487,13 +332,48 @@ class HealthService:
             }
             
         except Exception as e:
-            logger.error(f"获取最近健康记录失败: {str(e)}")
+            logger.error("获取最近健康记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"获取最近记录失败: {str(e)}",
                 "records": []
             }
     
+    @staticmethod
+    def _format_recent_record(record):
+        """生成最近记录列表中的一项，record 可以是模型对象或包含相同列的查询行"""
+        # 创建记录摘要
+        summary = ""
+        if record.record_type == 'health':
+            summary = f"体重: {record.weight or '-'}kg, 血压: {record.blood_pressure_systolic or '-'}/{record.blood_pressure_diastolic or '-'} mmHg"
+        elif record.record_type == 'diet':
+            summary = f"食物: {record.food_name or '-'}, 数量: {record.food_amount or '-'}g"
+        elif record.record_type == 'exercise':
+            summary = f"类型: {record.exercise_type or '-'}, 时长: {record.duration or '-'}分钟"
+        elif record.record_type == 'water':
+            summary = f"饮水量: {record.water_amount or '-'}毫升"
+        elif record.record_type == 'medication':
+            summary = f"药物: {record.medication_name or '-'}, 剂量: {record.dosage or '-'}{record.dosage_unit or ''}"
+        
+        # 创建记录标题
+        title = "健康记录"
+        if record.record_type == 'diet':
+            title = f"{record.meal_type or '饮食'}记录"
+        elif record.record_type == 'exercise':
+            title = f"{record.exercise_type or '运动'}记录"
+        elif record.record_type == 'water':
+            title = "饮水记录"
+        elif record.record_type == 'medication':
+            title = f"{record.medication_name or '服药'}记录"
+        
+        return {
+            "id": record.id,
+            "type": record.record_type,
+            "date": record.record_date.isoformat(),
+            "title": title,
+            "summary": summary
+        }
+    
     @staticmethod
     def get_health_goals(user_id):
         """
@@ -510,148 +390,148 @@ class HealthService:
             latest_health = HealthRecord.query.filter_by(
                 user_id=user_id,
                 record_type='health'
-            ).order_by(HealthRecord.record_date.desc()).first()
+            ).order_by(HealthRecord.record_date.desc(), HealthRecord.created_at.desc()).first()
             
-            # 获取最近一周的运动记录
+            # 最近一周的运动时长和今日饮水量从每日汇总表读取
             week_ago = datetime.now().date() - timedelta(days=7)
-            exercise_records = HealthRecord.query.filter(
-                HealthRecord.user_id == user_id,
-                HealthRecord.record_type == 'exercise',
-                HealthRecord.record_date >= week_ago
-            ).all()
-            
-            # 获取最近一周的饮水记录
-            water_records = HealthRecord.query.filter(
-                HealthRecord.user_id == user_id,
-                HealthRecord.record_type == 'water',
-                HealthRecord.record_date >= week_ago
-            ).all()
-            
-            # 准备健康目标列表
-            goals = []
-            
-            # 添加体重目标
-            if latest_health and latest_health.weight:
-                current_weight = latest_health.weight
-                # 根据BMI计算理想体重目标
-                if latest_health.height:
-                    height_m = latest_health.height / 100
-                    ideal_bmi = 22  # 健康BMI范围中点
-                    ideal_weight = round(ideal_bmi * height_m * height_m, 1)
-                    
-                    # 只有当当前体重偏离理想体重超过5%时才设置目标
-                    if abs(current_weight - ideal_weight) / ideal_weight > 0.05:
-                        goals.append({
-                            "id": "weight",
-                            "title": "体重管理",
-                            "description": f"{'减轻' if current_weight > ideal_weight else '增加'}体重至健康范围",
-                            "current_value": current_weight,
-                            "target_value": ideal_weight,
-                            "unit": "kg",
-                            "progress": min(100, round(100 - min(100, abs(current_weight - ideal_weight) / (ideal_weight * 0.2) * 100)))
-                        })
-            
-            # 添加运动目标
-            weekly_exercise_minutes = sum(record.duration or 0 for record in exercise_records)
-            weekly_target_minutes = 150  # WHO建议每周至少150分钟中等强度活动
-            
-            goals.append({
-                "id": "exercise",
-                "title": "每周运动",
-                "description": "达到世界卫生组织建议的每周至少150分钟中等强度运动",
-                "current_value": weekly_exercise_minutes,
-                "target_value": weekly_target_minutes,
-                "unit": "分钟/周",
-                "progress": min(100, round(weekly_exercise_minutes / weekly_target_minutes * 100))
-            })
-            
-            # 添加每日饮水目标
-            today = datetime.now().date()
-            today_water = sum(record.water_amount or 0 for record in water_records if record.record_date == today)
-            daily_water_target = 2000  # 每天建议饮水2000毫升
-            
-            goals.append({
-                "id": "water",
-                "title": "每日饮水",
-                "description": "每天饮水2000毫升维持身体水分平衡",
-                "current_value": today_water,
-                "target_value": daily_water_target,
-                "unit": "毫升/天",
-                "progress": min(100, round(today_water / daily_water_target * 100))
-            })
-            
-            # 添加BMI目标
-            if latest_health and latest_health.bmi:
-                current_bmi = latest_health.bmi
-                # 正常BMI范围为18.5-24
-                if current_bmi < 18.5:
-                    target_bmi = 18.5
-                    progress = min(100, round(current_bmi / 18.5 * 100))
-                    description = "增加体重至健康BMI范围(18.5-24)"
-                elif current_bmi > 24:
-                    target_bmi = 24
-                    progress = min(100, round(24 / current_bmi * 100))
-                    description = "减轻体重至健康BMI范围(18.5-24)"
-                else:
-                    target_bmi = current_bmi
-                    progress = 100
-                    description = "保持健康的BMI指数"
-                
-                if current_bmi < 18.5 or current_bmi > 24:
-                    goals.append({
-                        "id": "bmi",
-                        "title": "BMI指数",
-                        "description": description,
-                        "current_value": round(current_bmi, 1),
-                        "target_value": target_bmi,
-                        "unit": "",
-                        "progress": progress
-                    })
-            
-            # 如果是第一次使用，没有任何记录，添加一些默认目标
-            if not goals:
-                goals = [
-                    {
-                        "id": "default_exercise",
-                        "title": "开始运动计划",
-                        "description": "每周进行至少3次30分钟的有氧运动",
-                        "current_value": 0,
-                        "target_value": 3,
-                        "unit": "次/周",
-                        "progress": 0
-                    },
-                    {
-                        "id": "default_water",
-                        "title": "日常饮水",
-                        "description": "每天饮水2000毫升",
-                        "current_value": 0,
-                        "target_value": 2000,
-                        "unit": "毫升",
-                        "progress": 0
-                    },
-                    {
-                        "id": "default_health",
-                        "title": "记录健康数据",
-                        "description": "开始每周记录体重和其他健康指标",
-                        "current_value": 0,
-                        "target_value": 1,
-                        "unit": "次/周",
-                        "progress": 0
-                    }
-                ]
+            rollups = RollupService.get_daily_rollups(user_id, week_ago)
             
             return {
                 "success": True,
-                "goals": goals
+                "goals": HealthService._build_health_goals(latest_health, rollups)
             }
             
         except Exception as e:
-            logger.error(f"获取健康目标失败: {str(e)}")
+            logger.error("获取健康目标失败: %s", e)
             return {
                 "success": False,
                 "message": f"获取健康目标失败: {str(e)}",
                 "goals": []
             }
+    
+    @staticmethod
+    def _build_health_goals(latest_health, rollups):
+        """
+        根据最近一次健康指标和最近一周的每日汇总生成健康目标
+        
+        参数:
+            latest_health: 最近一条 health 类型记录，可以为 None
+            rollups: 最近7天起的每日汇总 {日期: DailyUserRollup}
+        """
+        # 准备健康目标列表
+        goals = []
+        
+        # 添加体重目标
+        if latest_health and latest_health.weight:
+            current_weight = latest_health.weight
+            # 根据BMI计算理想体重目标
+            if latest_health.height:
+                height_m = latest_health.height / 100
+                ideal_bmi = 22  # 健康BMI范围中点
+                ideal_weight = round(ideal_bmi * height_m * height_m, 1)
+                
+                # 只有当当前体重偏离理想体重超过5%时才设置目标
+                if abs(current_weight - ideal_weight) / ideal_weight > 0.05:
+                    goals.append({
+                        "id": "weight",
+                        "title": "体重管理",
+                        "description": f"{'减轻' if current_weight > ideal_weight else '增加'}体重至健康范围",
+                        "current_value": current_weight,
+                        "target_value": ideal_weight,
+                        "unit": "kg",
+                        "progress": min(100, round(100 - min(100, abs(current_weight - ideal_weight) / (ideal_weight * 0.2) * 100)))
+                    })
+        
+        # 添加运动目标
+        weekly_exercise_minutes = sum(rollup.exercise_minutes for rollup in rollups.values())
+        weekly_target_minutes = 150  # WHO建议每周至少150分钟中等强度活动
+        
+        goals.append({
+            "id": "exercise",
+            "title": "每周运动",
+            "description": "达到世界卫生组织建议的每周至少150分钟中等强度运动",
+            "current_value": weekly_exercise_minutes,
+            "target_value": weekly_target_minutes,
+            "unit": "分钟/周",
+            "progress": min(100, round(weekly_exercise_minutes / weekly_target_minutes * 100))
+        })
+        
+        # 添加每日饮水目标
+        today = datetime.now().date()
+        today_water = rollups[today].water_amount if today in rollups else 0
+        daily_water_target = 2000  # 每天建议饮水2000毫升
+        
+        goals.append({
+            "id": "water",
+            "title": "每日饮水",
+            "description": "每天饮水2000毫升维持身体水分平衡",
+            "current_value": today_water,
+            "target_value": daily_water_target,
+            "unit": "毫升/天",
+            "progress": min(100, round(today_water / daily_water_target * 100))
+        })
+        
+        # 添加BMI目标
+        if latest_health and latest_health.bmi:
+            current_bmi = latest_health.bmi
+            # 正常BMI范围为18.5-24
+            if current_bmi < 18.5:
+                target_bmi = 18.5
+                progress = min(100, round(current_bmi / 18.5 * 100))
+                description = "增加体重至健康BMI范围(18.5-24)"
+            elif current_bmi > 24:
+                target_bmi = 24
+                progress = min(100, round(24 / current_bmi * 100))
+                description = "减轻体重至健康BMI范围(18.5-24)"
+            else:
+                target_bmi = current_bmi
+                progress = 100
+                description = "保持健康的BMI指数"
+            
+            if current_bmi < 18.5 or current_bmi > 24:
+                goals.append({
+                    "id": "bmi",
+                    "title": "BMI指数",
+                    "description": description,
+                    "current_value": round(current_bmi, 1),
+                    "target_value": target_bmi,
+                    "unit": "",
+                    "progress": progress
+                })
+        
+        # 如果是第一次使用，没有任何记录，添加一些默认目标
+        if not goals:
+            goals = [
+                {
+                    "id": "default_exercise",
+                    "title": "开始运动计划",
+                    "description": "每周进行至少3次30分钟的有氧运动",
+                    "current_value": 0,
+                    "target_value": 3,
+                    "unit": "次/周",
+                    "progress": 0
+                },
+                {
+                    "id": "default_water",
+                    "title": "日常饮水",
+                    "description": "每天饮水2000毫升",
+                    "current_value": 0,
+                    "target_value": 2000,
+                    "unit": "毫升",
+                    "progress": 0
+                },
+                {
+                    "id": "default_health",
+                    "title": "记录健康数据",
+                    "description": "开始每周记录体重和其他健康指标",
+                    "current_value": 0,
+                    "target_value": 1,
+                    "unit": "次/周",
+                    "progress": 0
+                }
+            ]
+        
+        return goals
 
 def get_record_type_name(record_type):
     """获取记录类型的中文名称"""
@@ -4,6 +4,7 @@ from datetime import datetime, date as date_type
 from sqlalchemy import func
 import logging
 from models.health_record import HealthRecord
+from utils.pagination import keyset_paginate
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +32,7 @@ class MedicationService:
             # 检查药物名称是否已存在
             existing = MedicationType.query.filter_by(name=name).first()
             if existing:
-                logger.warning(f"药物类型 '{name}' 已存在")
+                logger.warning("药物类型 '%s' 已存在", name)
                 return existing
                 
             medication_type = MedicationType(
@@ -45,11 +46,11 @@ class MedicationService:
             
             db.session.add(medication_type)
             db.session.commit()
-            logger.info(f"创建了新的药物类型: {name}")
+            logger.info("创建了新的药物类型: %s", name)
             return medication_type
         except Exception as e:
             db.session.rollback()
-            logger.error(f"创建药物类型时出错: {str(e)}")
+            logger.error("创建药物类型时出错: %s", e)
             raise
     
     @staticmethod
@@ -79,7 +80,7 @@ class MedicationService:
             
             return query.order_by(MedicationType.name).all()
         except Exception as e:
-            logger.error(f"获取药物类型时出错: {str(e)}")
+            logger.error("获取药物类型时出错: %s", e)
             raise
     
     @staticmethod
@@ -96,7 +97,7 @@ class MedicationService:
         try:
             return MedicationType.query.get(type_id)
         except Exception as e:
-            logger.error(f"获取药物类型 {type_id} 时出错: {str(e)}")
+            logger.error("获取药物类型 %s 时出错: %s", type_id, e)
             raise
     
     @staticmethod
@@ -114,7 +115,7 @@ class MedicationService:
         try:
             medication_type = MedicationType.query.get(type_id)
             if not medication_type:
-                logger.warning(f"药物类型 ID {type_id} 不存在")
+                logger.warning("药物类型 ID %s 不存在", type_id)
                 return None
             
             for key, value in kwargs.items():
@@ -123,11 +124,11 @@ class MedicationService:
             
             medication_type.updated_at = datetime.now()
             db.session.commit()
-            logger.info(f"更新了药物类型 {medication_type.name}")
+            logger.info("更新了药物类型 %s", medication_type.name)
             return medication_type
         except Exception as e:
             db.session.rollback()
-            logger.error(f"更新药物类型时出错: {str(e)}")
+            logger.error("更新药物类型时出错: %s", e)
             raise
     
     @staticmethod
@@ -169,7 +170,7 @@ class MedicationService:
                     if medication_type:
                         kwargs['medication_name'] = medication_type.name
                 except Exception as e:
-                    logger.warning(f"获取药物类型名称失败: {str(e)}")
+                    logger.warning("获取药物类型名称失败: %s", e)
             
             # 设置药物记录字段
             record.medication_name = kwargs.get('medication_name')
@@ -186,7 +187,7 @@ class MedicationService:
             db.session.add(record)
             db.session.commit()
             
-            logger.info(f"创建药物记录成功，用户ID: {user_id}")
+            logger.info("创建药物记录成功，用户ID: %s", user_id)
             
             return {
                 "success": True,
@@ -197,27 +198,29 @@ class MedicationService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"创建药物记录失败: {str(e)}")
+            logger.error("创建药物记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"创建记录失败: {str(e)}"
             }
     
     @staticmethod
-    def get_medication_records(user_id, start_date=None, end_date=None):
+    def get_medication_records(user_id, start_date=None, end_date=None, limit=None, cursor=None):
         """获取用户的药物记录
         
         参数:
             user_id: 用户ID
             start_date: 开始日期（可选）
             end_date: 结束日期（可选）
+            limit: 每页记录数（可选，不传时返回全部记录）
+            cursor: 分页游标（可选）
             
         返回:
             包含药物记录的字典
         """
         try:
             # 尝试从HealthRecord表中获取药物记录
-            print(f"正在从HealthRecord表中获取用户{user_id}的药物记录")
+            logger.debug("正在从HealthRecord表中获取用户%s的药物记录", user_id)
             
             query = HealthRecord.query.filter(
                 HealthRecord.user_id == user_id,
@@ -231,7 +234,7 @@ class MedicationService:
                         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
                     query = query.filter(HealthRecord.record_date >= start_date)
                 except Exception as e:
-                    print(f"解析开始日期出错: {e}")
+                    logger.error("解析开始日期出错: %s", e)
             
             if end_date:
                 try:
@@ -239,10 +242,10 @@ class MedicationService:
                         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
                     query = query.filter(HealthRecord.record_date <= end_date)
                 except Exception as e:
-                    print(f"解析结束日期出错: {e}")
+                    logger.error("解析结束日期出错: %s", e)
             
-            # 按日期降序排序并获取所有结果
-            records = query.order_by(HealthRecord.record_date.desc()).all()
+            # 按日期降序排序，传入limit/cursor时按游标分页
+            records, next_cursor = keyset_paginate(query, HealthRecord, limit=limit, cursor=cursor)
             
             # 构建返回数据
             records_data = []
@@ -262,16 +265,17 @@ class MedicationService:
                     }
                     records_data.append(record_dict)
                 except Exception as e:
-                    print(f"处理记录数据时出错: {e}")
+                    logger.error("处理记录数据时出错: %s", e)
             
             return {
                 'success': True,
                 'message': f'找到{len(records_data)}条药物记录',
-                'records': records_data
+                'records': records_data,
+                'next_cursor': next_cursor
             }
             
         except Exception as e:
-            print(f"获取药物记录时出错: {e}")
+            logger.error("获取药物记录时出错: %s", e)
             import traceback
             traceback.print_exc()
             
@@ -306,7 +310,7 @@ class MedicationService:
                     "message": "未找到记录或无权访问"
                 }
         except Exception as e:
-            logger.error(f"获取药物记录 {record_id} 时出错: {str(e)}")
+            logger.error("获取药物记录 %s 时出错: %s", record_id, e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}"
@@ -349,7 +353,7 @@ class MedicationService:
                     if medication_type:
                         kwargs['medication_name'] = medication_type.name
                 except Exception as e:
-                    logger.warning(f"获取药物类型名称失败: {str(e)}")
+                    logger.warning("获取药物类型名称失败: %s", e)
             
             for key, value in kwargs.items():
                 if hasattr(record, key):
@@ -365,7 +369,7 @@ class MedicationService:
             }
         except Exception as e:
             db.session.rollback()
-            logger.error(f"更新药物记录时出错: {str(e)}")
+            logger.error("更新药物记录时出错: %s", e)
             return {
                 "success": False,
                 "message": f"更新记录失败: {str(e)}"
@@ -401,7 +405,7 @@ class MedicationService:
             }
         except Exception as e:
             db.session.rollback()
-            logger.error(f"删除药物记录时出错: {str(e)}")
+            logger.error("删除药物记录时出错: %s", e)
             return {
                 "success": False,
                 "message": f"删除记录失败: {str(e)}"
@@ -439,7 +443,7 @@ class MedicationService:
                 "schedule": medication_records
             }, 200
         except Exception as e:
-            logger.error(f"获取服药排程时出错: {str(e)}")
+            logger.error("获取服药排程时出错: %s", e)
             return {
                 "success": False,
                 "message": f"获取服药排程时出错: {str(e)}"
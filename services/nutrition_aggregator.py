@@ -0,0 +1,236 @@
+"""
+按天、按餐次汇总饮食营养摄入
+
+每个数据源只执行一次 Core 查询，取出需要的列后用 NumPy 分组求和，替代逐条加载
+ORM 对象、逐项累加的写法。估算规则与原逐条实现一致：
+- diet_records：当天热量累加 total_calories，营养素按关联食物每100克含量和食用量计算
+- health_records 中的饮食记录：优先使用食物库中匹配到的食物营养数据，否则按食物名称
+  关键字或热量估算；没有热量数据时由估算的营养素折算热量
+"""
+from database import db
+from models.diet_record import DietRecord, DietRecordItem, Food
+from models.health_record import HealthRecord
+from services.food_catalog import food_catalog
+from sqlalchemy import select
+from datetime import timedelta
+import numpy as np
+
+diet_records = DietRecord.__table__
+diet_items = DietRecordItem.__table__
+foods = Food.__table__
+health_records = HealthRecord.__table__
+
+# 营养素列的顺序
+NUTRIENTS = ['protein', 'fat', 'carbohydrate', 'fiber', 'sugar', 'sodium']
+
+# 按食物名称关键字估算营养素：(关键字, 每克食物的 蛋白质/脂肪/碳水/纤维/糖/钠)，按顺序匹配第一个
+KEYWORD_ESTIMATES = [
+    (["鸡蛋", "蛋"], [0.13, 0.10, 0.01, 0.001, 0.005, 1.4]),
+    (["果", "苹果", "香蕉", "橙子", "橘子", "梨"], [0.01, 0.001, 0.15, 0.02, 0.1, 0.01]),  # 水果含糖较高
+    (["糖", "巧克力", "蛋糕", "甜点", "冰淇淋", "饼干"], [0.05, 0.15, 0.60, 0.01, 0.35, 0.2]),  # 甜食
+    (["肉", "牛肉", "猪肉", "鸡肉", "鱼", "虾"], [0.22, 0.10, 0, 0, 0, 0.7]),  # 肉类
+    (["米饭", "面", "米", "饭", "馒头", "面包"], [0.07, 0.01, 0.28, 0.01, 0.01, 0.02]),  # 主食
+    (["菜", "青菜", "蔬菜", "西红柿", "番茄", "黄瓜"], [0.02, 0, 0.05, 0.03, 0.02, 0.1]),  # 蔬菜
+]
+
+# 估算方式
+MATCHED, KEYWORD, BY_CALORIES = 0, 1, 2
+
+
+def _empty_day(day_key):
+    return {
+        "date": day_key,
+        "calories": 0,
+        "protein": 0,
+        "fat": 0,
+        "carbohydrate": 0,
+        "fiber": 0,
+        "sugar": 0,
+        "sodium": 0,
+        "meals": {}
+    }
+
+
+def _to_array(values):
+    """转换为浮点数组，None 视为 0（与 "value or 0" 一致）"""
+    return np.nan_to_num(np.array(values, dtype=float))
+
+
+def _estimate_rule(food_name):
+    """
+    确定一个食物名称的估算方式
+
+    返回:
+        (估算方式, 系数列表, 每100克热量)
+    """
+    food = food_catalog.match(food_name)
+    if food and food.calories:
+        values = [getattr(food, nutrient) or 0 for nutrient in NUTRIENTS]
+        return MATCHED, values, food.calories
+    for keywords, coefficients in KEYWORD_ESTIMATES:
+        if any(keyword in food_name for keyword in keywords):
+            return KEYWORD, coefficients, 0
+    return BY_CALORIES, [0] * len(NUTRIENTS), 0
+
+
+class NutritionAggregator:
+    """饮食营养汇总"""
+
+    @staticmethod
+    def _load_diet_items(user_id, start_date, end_date):
+        """diet_records 左连接记录项和食物，每个记录项一行，没有记录项的饮食记录也保留一行"""
+        query = select(
+            diet_records.c.id, diet_records.c.record_date, diet_records.c.meal_type,
+            diet_records.c.total_calories, diet_items.c.id.label('item_id'),
+            diet_items.c.amount, diet_items.c.calories, foods.c.id.label('food_id'), foods.c.name,
+            *[foods.c[nutrient] for nutrient in NUTRIENTS]
+        ).select_from(
+            diet_records.outerjoin(diet_items, diet_items.c.diet_record_id == diet_records.c.id)
+            .outerjoin(foods, foods.c.id == diet_items.c.food_id)
+        ).where(
+            diet_records.c.user_id == user_id,
+            diet_records.c.record_date >= start_date,
+            diet_records.c.record_date <= end_date
+        ).order_by(diet_records.c.record_date, diet_records.c.created_at, diet_records.c.id, diet_items.c.id)
+        return db.session.execute(query).all()
+
+    @staticmethod
+    def _load_health_diet_records(user_id, start_date, end_date):
+        query = select(
+            health_records.c.record_date, health_records.c.meal_type, health_records.c.food_name,
+            health_records.c.food_amount, health_records.c.calories_burned
+        ).where(
+            health_records.c.user_id == user_id,
+            health_records.c.record_type == 'diet',
+            health_records.c.record_date >= start_date,
+            health_records.c.record_date <= end_date
+        ).order_by(health_records.c.record_date, health_records.c.created_at, health_records.c.id)
+        return db.session.execute(query).all()
+
+    @staticmethod
+    def aggregate(user_id, start_date, end_date):
+        """
+        汇总日期范围内每天的营养摄入
+
+        参数:
+            user_id: 用户ID
+            start_date: 开始日期
+            end_date: 结束日期
+
+        返回:
+            按日期排列的 {日期字符串: 当日营养数据} 字典，每天包含热量、各营养素和按餐次分组的食物列表
+        """
+        days_count = max((end_date - start_date).days + 1, 0)
+        day_keys = [(start_date + timedelta(days=i)).isoformat() for i in range(days_count)]
+        daily_nutrition = {day_key: _empty_day(day_key) for day_key in day_keys}
+
+        item_rows = NutritionAggregator._load_diet_items(user_id, start_date, end_date)
+        health_rows = NutritionAggregator._load_health_diet_records(user_id, start_date, end_date)
+        n_items, n_health = len(item_rows), len(health_rows)
+        n = n_items + n_health
+        if n == 0:
+            return daily_nutrition
+
+        # 确定每行所属的天和餐次，并生成餐次下的食物列表（输出中的逐项明细只能逐行生成）
+        day_index = []
+        meal_index = []
+        meal_keys = {}
+        meal_lists = []
+
+        def locate(record_date, meal_type):
+            day = (record_date - start_date).days
+            key = (day, meal_type or "未分类")
+            position = meal_keys.get(key)
+            if position is None:
+                position = meal_keys[key] = len(meal_lists)
+                meal = {"calories": 0, "items": []}
+                daily_nutrition[day_keys[day]]["meals"][key[1]] = meal
+                meal_lists.append(meal)
+            day_index.append(day)
+            meal_index.append(position)
+            return meal_lists[position]["items"]
+
+        # diet_records：记录级热量只在记录的第一行计入，营养素按食物每100克含量和食用量计算
+        if item_rows:
+            for record_date, meal_type, item_id, amount, item_calories, food_id, food_name in zip(
+                    *[[row[k] for row in item_rows] for k in (1, 2, 4, 5, 6, 7, 8)]):
+                items = locate(record_date, meal_type)
+                if item_id is not None:
+                    items.append({
+                        "name": food_name if food_id is not None and food_name else "未知食物",
+                        "amount": amount or 0,
+                        "calories": item_calories or 0
+                    })
+            record_ids = np.array([row[0] for row in item_rows])
+            first_row = np.r_[True, record_ids[1:] != record_ids[:-1]]
+            item_calories = np.where(first_row, _to_array([row[3] for row in item_rows]), 0)
+            has_food = np.array([row[7] is not None for row in item_rows])
+            food_values = _to_array([row[9:] for row in item_rows])
+            ratio = _to_array([row[5] for row in item_rows]) / 100.0
+            item_nutrients = np.where(has_food[:, None], food_values * ratio[:, None], 0)
+        else:
+            item_calories = np.zeros(0)
+            item_nutrients = np.zeros((0, len(NUTRIENTS)))
+
+        # health_records：每个不同的食物名称只确定一次估算方式
+        rules = {}
+        rule_index = []
+        for record_date, meal_type, food_name, amount, record_calories in health_rows:
+            food_name = food_name or "未知食物"
+            locate(record_date, meal_type).append({
+                "food_name": food_name,
+                "amount": amount or 0,
+                "calories": record_calories or 0
+            })
+            if food_name not in rules:
+                rules[food_name] = len(rules)
+            rule_index.append(rules[food_name])
+
+        estimated = [_estimate_rule(food_name) for food_name in rules]
+        rule_index = np.array(rule_index, dtype=np.int64)
+        modes = np.array([rule[0] for rule in estimated], dtype=np.int64)[rule_index]
+        coefficients = np.array([rule[1] for rule in estimated], dtype=float).reshape(-1, len(NUTRIENTS))[rule_index]
+        calories_per_100g = np.array([rule[2] for rule in estimated], dtype=float)[rule_index]
+        h_amount = _to_array([row[3] for row in health_rows])
+        h_calories = _to_array([row[4] for row in health_rows])
+
+        matched = modes == MATCHED
+        by_calories = (modes == BY_CALORIES) & (h_calories > 0)
+
+        estimates = np.where(matched[:, None], coefficients * (h_amount / 100.0)[:, None],
+                             coefficients * h_amount[:, None])
+        estimates[by_calories] = np.column_stack([
+            h_calories * 0.2 / 4,  # 假设20%热量来自蛋白质
+            h_calories * 0.3 / 9,  # 假设30%热量来自脂肪
+            h_calories * 0.5 / 4,  # 假设50%热量来自碳水
+            h_amount * 0.03,  # 假设每100g食物含3g纤维
+            h_calories * 0.1 / 4,  # 假设10%热量来自糖
+            h_amount * 0.05  # 假设每100g食物含50mg钠
+        ])[by_calories]
+
+        # 记录自带热量时直接计入；匹配到食物时以食物热量为准，二者都没有时由营养素折算
+        effective_calories = np.where(matched, calories_per_100g * (h_amount / 100.0), h_calories)
+        calculated = estimates[:, 0] * 4 + estimates[:, 1] * 9 + estimates[:, 2] * 4
+        health_calories = np.where(h_calories > 0, h_calories, 0) + \
+            np.where((effective_calories <= 0) & (calculated > 0), calculated, 0)
+
+        # 两个数据源按原来的处理顺序拼接
+        day_index = np.array(day_index, dtype=np.int64)
+        meal_index = np.array(meal_index, dtype=np.int64)
+        calories = np.concatenate([item_calories, health_calories])
+        nutrients = np.concatenate([item_nutrients, estimates])
+
+        # 分组求和：np.bincount 按行顺序累加，与逐条累加的结果一致
+        def group_sum(index, values, size):
+            totals = np.bincount(index, weights=values, minlength=size)
+            touched = np.bincount(index, weights=values != 0, minlength=size) > 0
+            return [total if touch else 0 for total, touch in zip(totals.tolist(), touched.tolist())]
+
+        for column, values in [("calories", calories)] + [(name, nutrients[:, k]) for k, name in enumerate(NUTRIENTS)]:
+            for day_key, total in zip(day_keys, group_sum(day_index, values, days_count)):
+                daily_nutrition[day_key][column] = total
+
+        for meal, total in zip(meal_lists, group_sum(meal_index, calories, len(meal_lists))):
+            meal["calories"] = total
+
+        return daily_nutrition
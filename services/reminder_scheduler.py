@@ -0,0 +1,421 @@
+"""
+提醒调度器
+
+进程内的后台线程按 reminders.next_fire_at 触发提醒，并把提醒分发给注册的通知回调：
+
+- 最小堆保存当前时间窗口内的 (触发时间, 提醒ID)。窗口按 (next_fire_at, id) 索引顺序分页加载，
+  下一次加载从上一次的位置继续，每次检查只看堆顶，不需要每个周期扫描提醒表
+- 触发时用条件更新 ``UPDATE ... WHERE id IN (...) AND next_fire_at = 触发时间`` 认领提醒并写入
+  下一次触发时间，多个进程同时运行调度器也不会重复触发
+- 重复提醒（daily / weekly / monthly）只在触发时计算下一次时间；停机期间错过超过
+  REMINDER_MISFIRE_GRACE 秒的触发直接顺延到下一次，不补发
+- 提醒通过 ORM 创建或修改提醒日期、时间、重复方式、完成状态时，flush 前重新计算 next_fire_at，
+  提交后把新的触发时间放入本进程的堆；其他进程修改的提醒在下一次全量重新同步
+  （REMINDER_RESYNC_SECONDS）时加载
+
+通知回调签名为 ``callback(reminder_dict, fire_at)``，在调度线程中依次调用，耗时较长的回调应自行
+转交其他线程处理。没有注册回调时只记录日志。
+
+配置（app.config，app.py 中从同名环境变量读取）:
+- REMINDER_SCHEDULER_ENABLED: 是否启动调度线程，默认启动
+- REMINDER_WINDOW_SECONDS: 每次加载的时间窗口，默认 60 秒
+- REMINDER_MISFIRE_GRACE: 允许补发的延迟，默认 600 秒
+- REMINDER_RESYNC_SECONDS: 从头重新加载窗口的间隔，默认 300 秒
+"""
+import calendar
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import db
+from models.health_report import Reminder
+
+logger = logging.getLogger(__name__)
+
+reminders = Reminder.__table__
+
+RECURRENCE_DAYS = {'daily': 1, 'weekly': 7}
+SCHEDULE_FIELDS = ('reminder_date', 'reminder_time', 'recurrence', 'is_completed')
+
+DEFAULT_WINDOW_SECONDS = 60
+DEFAULT_MISFIRE_GRACE = 600
+DEFAULT_RESYNC_SECONDS = 300
+PAGE_SIZE = 5000
+MAX_QUEUED = 100000  # 堆中最多保存的提醒数，超过时本窗口剩余部分在下一次加载
+CLAIM_BATCH_SIZE = 500
+
+
+def next_occurrence(fire_at, recurrence, anchor_date, after):
+    """
+    计算重复提醒在 after 之后的下一次触发时间
+
+    参数:
+        fire_at: 本次触发时间
+        recurrence: daily / weekly / monthly，其他值表示不重复
+        anchor_date: 提醒的原始日期，monthly 按它的日期（几号）重复，月份没有该日时取月末
+        after: 返回值晚于该时间
+
+    返回:
+        datetime，不重复时为 None
+    """
+    if recurrence in RECURRENCE_DAYS:
+        step = timedelta(days=RECURRENCE_DAYS[recurrence])
+        steps = max((after - fire_at) // step + 1, 1)
+        return fire_at + steps * step
+    if recurrence == 'monthly':
+        year, month = fire_at.year, fire_at.month
+        candidate = fire_at
+        while candidate <= fire_at or candidate <= after:
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            day = min(anchor_date.day, calendar.monthrange(year, month)[1])
+            candidate = fire_at.replace(year=year, month=month, day=day)
+        return candidate
+    return None
+
+
+def log_notifier(reminder, fire_at):
+    """默认的通知回调：只记录日志"""
+    logger.info("提醒触发 - 用户ID: %s, 提醒ID: %s, 标题: %s, 时间: %s",
+                reminder['user_id'], reminder['id'], reminder['title'], fire_at)
+
+
+class ReminderScheduler:
+    """基于最小堆的提醒调度器"""
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS, misfire_grace=DEFAULT_MISFIRE_GRACE,
+                 resync_seconds=DEFAULT_RESYNC_SECONDS, page_size=PAGE_SIZE, max_queued=MAX_QUEUED):
+        self.window = timedelta(seconds=window_seconds)
+        self.misfire_grace = timedelta(seconds=misfire_grace)
+        self.resync = timedelta(seconds=resync_seconds)
+        self.page_size = page_size
+        self.max_queued = max_queued
+        self.stats = {'loaded': 0, 'fired': 0, 'skipped': 0, 'conflicts': 0, 'notify_errors': 0}
+        self._heap = []             # (触发时间, 提醒ID, 重复方式, 原始日期)
+        self._queued = set()        # 堆中的 (提醒ID, 触发时间)，去重用
+        self._loaded_until = None   # 触发时间不晚于该值的提醒已经在堆中（或已加载过）
+        self._loaded_key = None     # 上一次加载到的 (next_fire_at, id)
+        self._next_resync = None
+        self._last_stamp = None
+        self._notifiers = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def configure(self, window_seconds=None, misfire_grace=None, resync_seconds=None):
+        if window_seconds is not None:
+            self.window = timedelta(seconds=window_seconds)
+        if misfire_grace is not None:
+            self.misfire_grace = timedelta(seconds=misfire_grace)
+        if resync_seconds is not None:
+            self.resync = timedelta(seconds=resync_seconds)
+
+    def add_notifier(self, callback):
+        """注册通知回调 callback(reminder_dict, fire_at)"""
+        if callback not in self._notifiers:
+            self._notifiers.append(callback)
+
+    def remove_notifier(self, callback):
+        if callback in self._notifiers:
+            self._notifiers.remove(callback)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def reset(self):
+        """清空堆，下一次加载从头开始"""
+        with self._lock:
+            self._heap = []
+            self._queued = set()
+            self._loaded_until = None
+            self._loaded_key = None
+            self._next_resync = None
+
+    def request_resync(self):
+        """下一次检查时从头重新加载窗口（绕过 ORM 批量写入提醒后调用）"""
+        with self._lock:
+            self._next_resync = None
+        self._wakeup.set()
+
+    def schedule(self, reminder_id, fire_at, recurrence=None, anchor_date=None):
+        """提醒的触发时间落在已加载的范围内时放入堆（更晚的由后续窗口加载）"""
+        if fire_at is None:
+            return
+        with self._lock:
+            if self._loaded_until is None or fire_at > self._loaded_until:
+                return
+            self._push(fire_at, reminder_id, recurrence, anchor_date)
+        self._wakeup.set()
+
+    def _push(self, fire_at, reminder_id, recurrence, anchor_date):
+        if (reminder_id, fire_at) in self._queued:
+            return False
+        heapq.heappush(self._heap, (fire_at, reminder_id, recurrence, anchor_date))
+        self._queued.add((reminder_id, fire_at))
+        return True
+
+    def load_window(self, now=None):
+        """
+        按 (next_fire_at, id) 索引顺序加载触发时间不晚于 now + 窗口 的提醒
+
+        从上一次加载的位置继续；到了重新同步的时间则从头加载（错过的和其他进程修改的提醒）。
+
+        返回:
+            新加入堆的提醒数
+        """
+        now = now or datetime.now()
+        until = now + self.window
+        with self._lock:
+            if self._next_resync is None or now >= self._next_resync:
+                self._loaded_key = None
+                self._next_resync = now + self.resync
+            key = self._loaded_key
+
+        added = 0
+        loaded_until = until
+        while True:
+            query = select(reminders.c.id, reminders.c.next_fire_at, reminders.c.recurrence,
+                           reminders.c.reminder_date).where(
+                reminders.c.next_fire_at.isnot(None),
+                reminders.c.next_fire_at <= until
+            )
+            if key is not None:
+                query = query.where(or_(
+                    reminders.c.next_fire_at > key[0],
+                    and_(reminders.c.next_fire_at == key[0], reminders.c.id > key[1])
+                ))
+            rows = db.session.execute(
+                query.order_by(reminders.c.next_fire_at, reminders.c.id).limit(self.page_size)
+            ).all()
+            with self._lock:
+                for row in rows:
+                    added += self._push(row.next_fire_at, row.id, row.recurrence, row.reminder_date)
+                queued = len(self._heap)
+            if rows:
+                key = (rows[-1].next_fire_at, rows[-1].id)
+            if len(rows) < self.page_size:
+                break
+            if queued >= self.max_queued:
+                # 堆已满，窗口剩余部分下一次从 key 继续加载
+                loaded_until = key[0]
+                break
+        db.session.commit()
+
+        with self._lock:
+            self._loaded_key = key
+            self._loaded_until = loaded_until
+        self.stats['loaded'] += added
+        if added:
+            logger.debug("加载提醒 %s 条，窗口至 %s，堆中 %s 条", added, loaded_until, len(self._heap))
+        return added
+
+    def _claim_stamp(self):
+        # 认领标记：同一进程内严格递增，用于在部分认领成功时找出本次认领的行
+        stamp = datetime.now()
+        if self._last_stamp is not None and stamp <= self._last_stamp:
+            stamp = self._last_stamp + timedelta(microseconds=1)
+        self._last_stamp = stamp
+        return stamp
+
+    def _claim(self, reminder_ids, fire_at, next_fire_at, mark_fired):
+        """把 next_fire_at 仍为 fire_at 的提醒改为下一次触发时间，返回本次认领成功的提醒ID"""
+        values = {'next_fire_at': next_fire_at, 'updated_at': reminders.c.updated_at}
+        stamp = None
+        if mark_fired:
+            stamp = values['last_fired_at'] = self._claim_stamp()
+        result = db.session.execute(update(reminders).where(
+            reminders.c.id.in_(reminder_ids),
+            reminders.c.next_fire_at == fire_at
+        ).values(**values))
+        if result.rowcount == len(reminder_ids):
+            return list(reminder_ids)
+        if not mark_fired:
+            return []
+        return list(db.session.execute(select(reminders.c.id).where(
+            reminders.c.id.in_(reminder_ids),
+            reminders.c.last_fired_at == stamp
+        )).scalars())
+
+    def run_pending(self, now=None):
+        """
+        触发所有已到期的提醒
+
+        返回:
+            本次分发的提醒数
+        """
+        now = now or datetime.now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                self._queued.discard((entry[1], entry[0]))
+                due.append(entry)
+        if not due:
+            return 0
+
+        # 同一触发时间、同一下一次触发时间的提醒一起认领
+        groups = {}
+        for fire_at, reminder_id, recurrence, anchor_date in due:
+            next_fire_at = next_occurrence(fire_at, recurrence, anchor_date, now)
+            misfired = fire_at < now - self.misfire_grace
+            groups.setdefault((fire_at, next_fire_at, misfired), []).append((reminder_id, recurrence, anchor_date))
+
+        fired = []
+        for (fire_at, next_fire_at, misfired), entries in groups.items():
+            for i in range(0, len(entries), CLAIM_BATCH_SIZE):
+                chunk = entries[i:i + CLAIM_BATCH_SIZE]
+                reminder_ids = [reminder_id for reminder_id, _, _ in chunk]
+                claimed = set(self._claim(reminder_ids, fire_at, next_fire_at, mark_fired=not misfired))
+                db.session.commit()
+                if misfired:
+                    self.stats['skipped'] += len(reminder_ids)
+                    logger.warning("%s 条提醒错过触发时间 %s 超过 %s，顺延到 %s",
+                                   len(reminder_ids), fire_at, self.misfire_grace, next_fire_at)
+                else:
+                    self.stats['conflicts'] += len(reminder_ids) - len(claimed)
+                    fired.extend((reminder_id, fire_at) for reminder_id in reminder_ids if reminder_id in claimed)
+                for reminder_id, recurrence, anchor_date in chunk:
+                    # 部分认领失败的顺延提醒不放回堆，由下一次重新同步加载
+                    if reminder_id in claimed:
+                        self.schedule(reminder_id, next_fire_at, recurrence, anchor_date)
+
+        if fired:
+            self._dispatch(fired)
+        return len(fired)
+
+    def _dispatch(self, fired):
+        rows = {}
+        fired_ids = [reminder_id for reminder_id, _ in fired]
+        for i in range(0, len(fired_ids), CLAIM_BATCH_SIZE):
+            for reminder in Reminder.query.filter(Reminder.id.in_(fired_ids[i:i + CLAIM_BATCH_SIZE])):
+                rows[reminder.id] = reminder.to_dict()
+        db.session.commit()
+
+        notifiers = self._notifiers or [log_notifier]
+        for reminder_id, fire_at in fired:
+            reminder = rows.get(reminder_id)
+            if reminder is None:
+                continue
+            self.stats['fired'] += 1
+            for notifier in notifiers:
+                try:
+                    notifier(reminder, fire_at)
+                except Exception as e:
+                    self.stats['notify_errors'] += 1
+                    logger.error("提醒 %s 的通知回调 %s 出错: %s", reminder_id, getattr(notifier, '__name__', notifier), e)
+
+    def _seconds_until_next(self, now):
+        waits = [self.window.total_seconds() / 2]
+        with self._lock:
+            if self._heap:
+                waits.append((self._heap[0][0] - now).total_seconds())
+            if self._loaded_until is not None:
+                waits.append((self._loaded_until - self.window / 2 - now).total_seconds())
+            if self._next_resync is not None:
+                waits.append((self._next_resync - now).total_seconds())
+        return max(min(waits), 0.05)
+
+    def _needs_load(self, now):
+        return (self._loaded_until is None or now >= self._loaded_until - self.window / 2
+                or self._next_resync is None or now >= self._next_resync)
+
+    def tick(self, now=None):
+        """加载窗口（需要时）并触发到期提醒，需在应用上下文中调用"""
+        now = now or datetime.now()
+        if self._needs_load(now):
+            self.load_window(now)
+        return self.run_pending(now)
+
+    def _run(self):
+        logger.info("提醒调度器已启动")
+        while not self._stopped.is_set():
+            try:
+                with self._app.app_context():
+                    self.tick()
+            except Exception as e:
+                logger.error("提醒调度出错: %s", e)
+                with self._app.app_context():
+                    db.session.rollback()
+            self._wakeup.wait(self._seconds_until_next(datetime.now()))
+            self._wakeup.clear()
+        logger.info("提醒调度器已停止")
+
+    def start(self, app):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._app = app
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+def init_reminder_scheduler(app):
+    """按配置启动调度线程"""
+    reminder_scheduler.configure(
+        window_seconds=app.config.get('REMINDER_WINDOW_SECONDS'),
+        misfire_grace=app.config.get('REMINDER_MISFIRE_GRACE'),
+        resync_seconds=app.config.get('REMINDER_RESYNC_SECONDS')
+    )
+    if app.config.get('REMINDER_SCHEDULER_ENABLED', True):
+        reminder_scheduler.start(app)
+
+
+def _schedule_fields_changed(session, reminder):
+    if reminder in session.new:
+        return True
+    state = db.inspect(reminder)
+    return any(state.attrs[field].history.has_changes() for field in SCHEDULE_FIELDS)
+
+
+def _update_next_fire_before_flush(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Reminder) or not _schedule_fields_changed(session, obj):
+            continue
+        if obj.is_completed or obj.reminder_date is None or obj.reminder_time is None:
+            obj.next_fire_at = None
+        else:
+            # 已过期的重复提醒由调度器在加载后顺延
+            obj.next_fire_at = datetime.combine(obj.reminder_date, obj.reminder_time)
+        session.info.setdefault('reminder_schedule', []).append(obj)
+
+
+def _collect_schedule_after_flush(session, flush_context):
+    pending = session.info.pop('reminder_schedule', None)
+    if pending:
+        session.info.setdefault('reminder_schedule_committed', []).extend(
+            (obj.id, obj.next_fire_at, obj.recurrence, obj.reminder_date) for obj in pending)
+
+
+def _schedule_after_commit(session):
+    for reminder_id, fire_at, recurrence, anchor_date in session.info.pop('reminder_schedule_committed', []):
+        reminder_scheduler.schedule(reminder_id, fire_at, recurrence, anchor_date)
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('reminder_schedule', None)
+    session.info.pop('reminder_schedule_committed', None)
+
+
+def register_reminder_listeners():
+    """注册 flush/提交监听器，提醒的日期、时间、重复方式或完成状态变化时更新 next_fire_at 并通知调度器"""
+    for name, listener in (('before_flush', _update_next_fire_before_flush),
+                           ('after_flush', _collect_schedule_after_flush),
+                           ('after_commit', _schedule_after_commit),
+                           ('after_soft_rollback', _discard_after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
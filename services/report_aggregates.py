@@ -0,0 +1,438 @@
+"""
+报告的分层聚合
+
+每个用户每个 ISO 周、每个自然月保存一份可合并的部分聚合（report_partials 表）：
+记录数、和、平方和、最小/最大值以及按类型的计数。任意日期范围的聚合按
+“整月 → 整周 → 剩余零散日期” 拆分，整周期直接读取已保存的部分聚合并合并，
+只有零散日期（通常是范围两端和尚未结束的当前周期）扫描原始记录。
+
+- 只保存已经结束的周期（结束日期早于今天），缺少的部分聚合在第一次用到时计算并写入
+- health_records / diet_records 的增删改在 flush 时删除对应周期的部分聚合
+- 用 Core 批量写入记录的脚本需要自行调用 ReportAggregateService.clear
+
+部分聚合的格式（JSON，日期为 ISO 字符串）:
+    health_days          有健康记录的天数
+    health               {指标: moments}，只统计非空且非零的值（与每日汇总表一致）
+    weight_days          有体重记录的天数（取每天最后一次记录的体重）
+    first_weight         [日期, 体重]，周期内第一天的体重；last_weight 同理
+    diet                 {count, calories: moments, meals: {餐次: 次数}}
+    exercise             {count, days, duration: moments, calories: moments, types: {类型: 次数}}
+    medication           {count, days, names: {药名: {count, effectiveness_sum, effectiveness_count, first_id}}}
+moments 为 {count, sum, sumsq, min, max}。类型和药名为 NULL 时键为空字符串。
+"""
+import calendar
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, case, delete, distinct, event, func, or_, select
+from sqlalchemy.orm import Session
+
+from models.daily_rollup import ReportPartial
+from models.diet_record import DietRecord
+from models.health_record import HealthRecord
+from services.rollup_service import HEALTH_METRICS, _affected_keys, records
+from utils.upsert import upsert_rows
+
+logger = logging.getLogger(__name__)
+
+partials = ReportPartial.__table__
+diet_records = DietRecord.__table__
+
+PARTIAL_VERSION = 1
+WEEK = 'week'
+MONTH = 'month'
+
+
+def empty_moments():
+    return {'count': 0, 'sum': 0, 'sumsq': 0, 'min': None, 'max': None}
+
+
+def merge_moments(a, b):
+    return {
+        'count': a['count'] + b['count'],
+        'sum': a['sum'] + b['sum'],
+        'sumsq': a['sumsq'] + b['sumsq'],
+        'min': b['min'] if a['min'] is None else a['min'] if b['min'] is None else min(a['min'], b['min']),
+        'max': b['max'] if a['max'] is None else a['max'] if b['max'] is None else max(a['max'], b['max']),
+    }
+
+
+def empty_aggregate():
+    return {
+        'version': PARTIAL_VERSION,
+        'health_days': 0,
+        'health': {prefix: empty_moments() for prefix, _ in HEALTH_METRICS},
+        'weight_days': 0,
+        'first_weight': None,
+        'last_weight': None,
+        'diet': {'count': 0, 'calories': empty_moments(), 'meals': {}},
+        'exercise': {'count': 0, 'days': 0, 'duration': empty_moments(), 'calories': empty_moments(),
+                     'types': {}},
+        'medication': {'count': 0, 'days': 0, 'names': {}},
+    }
+
+
+def _add_tallies(a, b):
+    result = dict(a)
+    for key, count in b.items():
+        result[key] = result.get(key, 0) + count
+    return result
+
+
+def merge_aggregates(a, b):
+    """合并两个不相交日期范围的聚合"""
+    names = {name: dict(value) for name, value in a['medication']['names'].items()}
+    for name, value in b['medication']['names'].items():
+        if name in names:
+            target = names[name]
+            target['count'] += value['count']
+            target['effectiveness_sum'] += value['effectiveness_sum']
+            target['effectiveness_count'] += value['effectiveness_count']
+            target['first_id'] = min(target['first_id'], value['first_id'])
+        else:
+            names[name] = dict(value)
+
+    first_weights = [w for w in (a['first_weight'], b['first_weight']) if w]
+    last_weights = [w for w in (a['last_weight'], b['last_weight']) if w]
+    return {
+        'version': PARTIAL_VERSION,
+        'health_days': a['health_days'] + b['health_days'],
+        'health': {prefix: merge_moments(a['health'][prefix], b['health'][prefix]) for prefix in a['health']},
+        'weight_days': a['weight_days'] + b['weight_days'],
+        'first_weight': min(first_weights, key=lambda w: w[0]) if first_weights else None,
+        'last_weight': max(last_weights, key=lambda w: w[0]) if last_weights else None,
+        'diet': {
+            'count': a['diet']['count'] + b['diet']['count'],
+            'calories': merge_moments(a['diet']['calories'], b['diet']['calories']),
+            'meals': _add_tallies(a['diet']['meals'], b['diet']['meals']),
+        },
+        'exercise': {
+            'count': a['exercise']['count'] + b['exercise']['count'],
+            'days': a['exercise']['days'] + b['exercise']['days'],
+            'duration': merge_moments(a['exercise']['duration'], b['exercise']['duration']),
+            'calories': merge_moments(a['exercise']['calories'], b['exercise']['calories']),
+            'types': _add_tallies(a['exercise']['types'], b['exercise']['types']),
+        },
+        'medication': {
+            'count': a['medication']['count'] + b['medication']['count'],
+            'days': a['medication']['days'] + b['medication']['days'],
+            'names': names,
+        },
+    }
+
+
+def period_bounds(period, day):
+    """返回包含 day 的周（周一开始）或月的 (开始日期, 结束日期)"""
+    if period == WEEK:
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    start = day.replace(day=1)
+    return start, day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def plan_range(start_date, end_date, today=None):
+    """
+    把日期范围拆成整月、整周和零散日期
+
+    只有已经结束（结束日期早于 today）且完全落在范围内的周期才使用部分聚合。
+
+    返回:
+        按日期顺序的列表，元素为 (MONTH/WEEK, 周期开始日期) 或 (None, 开始日期, 结束日期)
+    """
+    today = today or date.today()
+    pieces = []
+    raw_start = None
+    day = start_date
+    while day <= end_date:
+        bucket = None
+        for period, boundary in ((MONTH, day.day == 1), (WEEK, day.weekday() == 0)):
+            if boundary:
+                period_end = period_bounds(period, day)[1]
+                if period_end <= end_date and period_end < today:
+                    bucket = (period, day, period_end)
+                    break
+        if bucket is None:
+            if raw_start is None:
+                raw_start = day
+            day += timedelta(days=1)
+            continue
+        if raw_start is not None:
+            pieces.append((None, raw_start, day - timedelta(days=1)))
+            raw_start = None
+        pieces.append(bucket[:2])
+        day = bucket[2] + timedelta(days=1)
+    if raw_start is not None:
+        pieces.append((None, raw_start, end_date))
+    return pieces
+
+
+def _moments_columns(column, condition, label):
+    value = case((condition, column), else_=None)
+    return [
+        func.count(value).label(f'{label}_count'),
+        func.sum(value).label(f'{label}_sum'),
+        func.sum(value * value).label(f'{label}_sumsq'),
+        func.min(value).label(f'{label}_min'),
+        func.max(value).label(f'{label}_max'),
+    ]
+
+
+def _number(value):
+    # MySQL 对整数列 SUM 返回 Decimal，转换后才能保存为 JSON
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def _moments(row, label):
+    return {
+        'count': row[f'{label}_count'] or 0,
+        'sum': _number(row[f'{label}_sum']) or 0,
+        'sumsq': _number(row[f'{label}_sumsq']) or 0,
+        'min': _number(row[f'{label}_min']),
+        'max': _number(row[f'{label}_max']),
+    }
+
+
+def _days_with(record_type):
+    return func.count(distinct(case((records.c.record_type == record_type, records.c.record_date), else_=None)))
+
+
+class ReportAggregateService:
+    """报告分层聚合服务，维护并读取 report_partials 表"""
+
+    @staticmethod
+    def compute(connection, user_id, start_date, end_date):
+        """
+        扫描原始记录，计算日期范围内的聚合
+
+        参数:
+            connection: 数据库连接
+            user_id: 用户ID
+            start_date: 开始日期
+            end_date: 结束日期
+
+        返回:
+            聚合字典
+        """
+        aggregates = ReportAggregateService.compute_users(connection, user_id, user_id, start_date, end_date)
+        return aggregates.get(user_id) or empty_aggregate()
+
+    @staticmethod
+    def compute_users(connection, first_user_id, last_user_id, start_date=None, end_date=None, weights=True):
+        """
+        按用户ID范围批量扫描原始记录，每张表只执行一次按用户分组的范围查询
+
+        参数:
+            connection: 数据库连接
+            first_user_id: 起始用户ID（含）
+            last_user_id: 结束用户ID（含）
+            start_date: 开始日期，可选
+            end_date: 结束日期，可选
+            weights: 为 False 时不读取每天的体重（first_weight / last_weight 为空），
+                只需要运动、用药等统计时可以省去逐行读取
+
+        返回:
+            {用户ID: 聚合字典}，没有任何记录的用户不出现
+        """
+        def range_filters(table):
+            if first_user_id == last_user_id:
+                # 单个用户用等值条件，(user_id, record_date) 索引才能同时限定日期范围
+                filters = [table.c.user_id == first_user_id]
+            else:
+                filters = [table.c.user_id >= first_user_id, table.c.user_id <= last_user_id]
+            if start_date is not None:
+                filters.append(table.c.record_date >= start_date)
+            if end_date is not None:
+                filters.append(table.c.record_date <= end_date)
+            return filters
+
+        result = {}
+        in_range = range_filters(records)
+        is_health = records.c.record_type == 'health'
+        is_exercise = records.c.record_type == 'exercise'
+        is_medication = records.c.record_type == 'medication'
+
+        columns = [
+            records.c.user_id,
+            _days_with('health').label('health_days'),
+            _days_with('exercise').label('exercise_days'),
+            _days_with('medication').label('medication_days'),
+            func.count(case((is_exercise, 1), else_=None)).label('exercise_count'),
+            func.count(case((is_medication, 1), else_=None)).label('medication_count'),
+        ]
+        for prefix, column in HEALTH_METRICS:
+            # 与每日汇总表一致：忽略 NULL 和 0
+            columns += _moments_columns(func.nullif(column, 0), is_health, prefix)
+        columns += _moments_columns(records.c.duration, is_exercise, 'duration')
+        columns += _moments_columns(records.c.calories_burned, is_exercise, 'exercise_calories')
+        for row in connection.execute(select(*columns).where(*in_range).group_by(records.c.user_id)).mappings():
+            aggregate = result[row['user_id']] = empty_aggregate()
+            aggregate['health_days'] = row['health_days']
+            for prefix, _ in HEALTH_METRICS:
+                aggregate['health'][prefix] = _moments(row, prefix)
+            aggregate['exercise'].update(count=row['exercise_count'], days=row['exercise_days'],
+                                         duration=_moments(row, 'duration'),
+                                         calories=_moments(row, 'exercise_calories'))
+            aggregate['medication'].update(count=row['medication_count'], days=row['medication_days'])
+
+        if weights and any(aggregate['health_days'] for aggregate in result.values()):
+            # 每天最后一次记录的体重
+            latest_weights = {}
+            weight_rows = select(records.c.user_id, records.c.record_date, records.c.weight).where(
+                *in_range, is_health, records.c.weight.isnot(None)
+            ).order_by(records.c.user_id, records.c.record_date, records.c.created_at, records.c.id)
+            for user_id, record_date, weight in connection.execute(weight_rows):
+                latest_weights.setdefault(user_id, {})[record_date] = weight
+            for user_id, by_day in latest_weights.items():
+                weight_days = [(day.isoformat(), weight) for day, weight in sorted(by_day.items()) if weight]
+                aggregate = result[user_id]
+                aggregate['weight_days'] = len(weight_days)
+                if weight_days:
+                    aggregate['first_weight'] = list(weight_days[0])
+                    aggregate['last_weight'] = list(weight_days[-1])
+
+        if any(aggregate['exercise']['count'] for aggregate in result.values()):
+            types = select(records.c.user_id, records.c.exercise_type, func.count()).where(
+                *in_range, is_exercise).group_by(records.c.user_id, records.c.exercise_type)
+            for user_id, exercise_type, count in connection.execute(types):
+                result[user_id]['exercise']['types'][exercise_type or ''] = count
+
+        if any(aggregate['medication']['count'] for aggregate in result.values()):
+            effective = func.nullif(records.c.effectiveness, 0)
+            names = select(
+                records.c.user_id,
+                records.c.medication_name,
+                func.count(),
+                func.sum(effective),
+                func.count(effective),
+                func.min(records.c.id)
+            ).where(*in_range, is_medication).group_by(records.c.user_id, records.c.medication_name)
+            for user_id, name, count, effectiveness_sum, effectiveness_count, first_id in connection.execute(names):
+                result[user_id]['medication']['names'][name or ''] = {
+                    'count': count,
+                    'effectiveness_sum': _number(effectiveness_sum) or 0,
+                    'effectiveness_count': effectiveness_count,
+                    'first_id': first_id,
+                }
+
+        calories = diet_records.c.total_calories
+        meals = select(
+            diet_records.c.user_id,
+            diet_records.c.meal_type,
+            func.count().label('count'),
+            func.count(calories).label('calories_count'),
+            func.sum(calories).label('calories_sum'),
+            func.sum(calories * calories).label('calories_sumsq'),
+            func.min(calories).label('calories_min'),
+            func.max(calories).label('calories_max'),
+        ).where(*range_filters(diet_records)).group_by(diet_records.c.user_id, diet_records.c.meal_type)
+        for meal in connection.execute(meals).mappings():
+            diet = result.setdefault(meal['user_id'], empty_aggregate())['diet']
+            diet['count'] += meal['count']
+            diet['calories'] = merge_moments(diet['calories'], _moments(meal, 'calories'))
+            diet['meals'][meal['meal_type'] or ''] = meal['count']
+
+        return result
+
+    @staticmethod
+    def aggregate(connection, user_id, start_date, end_date, today=None):
+        """
+        计算日期范围内的聚合，整周期读取部分聚合，缺少的周期计算后写入
+
+        参数:
+            connection: 数据库连接
+            user_id: 用户ID
+            start_date: 开始日期
+            end_date: 结束日期
+            today: 今天（默认 date.today()），不早于今天结束的周期不保存
+
+        返回:
+            聚合字典
+        """
+        pieces = plan_range(start_date, end_date, today)
+        buckets = [(piece[0], piece[1]) for piece in pieces if piece[0] is not None]
+        stored = {}
+        if buckets:
+            rows = connection.execute(select(partials.c.period, partials.c.period_start, partials.c.data).where(
+                partials.c.user_id == user_id,
+                partials.c.period_start >= start_date,
+                partials.c.period_start <= end_date
+            ))
+            stored = {(period, period_start): data for period, period_start, data in rows
+                      if data and data.get('version') == PARTIAL_VERSION}
+
+        result = empty_aggregate()
+        missing = []
+        for piece in pieces:
+            if piece[0] is None:
+                piece_aggregate = ReportAggregateService.compute(connection, user_id, piece[1], piece[2])
+            else:
+                piece_aggregate = stored.get(piece)
+                if piece_aggregate is None:
+                    piece_end = period_bounds(piece[0], piece[1])[1]
+                    piece_aggregate = ReportAggregateService.compute(connection, user_id, piece[1], piece_end)
+                    missing.append({'user_id': user_id, 'period': piece[0], 'period_start': piece[1],
+                                    'data': piece_aggregate})
+            result = merge_aggregates(result, piece_aggregate)
+
+        if missing:
+            upsert_rows(connection, partials, missing, ['user_id', 'period', 'period_start'])
+        logger.debug("用户 %s 的聚合 %s - %s: %s 个周期（新计算 %s 个），%s 段原始记录",
+                     user_id, start_date, end_date, len(buckets), len(missing), len(pieces) - len(buckets))
+        return result
+
+    @staticmethod
+    def record_date_range(connection, user_id):
+        """返回用户健康记录的 (最早日期, 最晚日期)，没有记录时为 (None, None)"""
+        return tuple(connection.execute(
+            select(func.min(records.c.record_date), func.max(records.c.record_date))
+            .where(records.c.user_id == user_id)
+        ).one())
+
+    @staticmethod
+    def invalidate(connection, keys):
+        """
+        删除包含指定日期的周/月部分聚合
+
+        参数:
+            connection: 数据库连接（写操作所在的事务）
+            keys: (user_id, date) 集合
+        """
+        by_user = {}
+        for user_id, day in keys:
+            by_user.setdefault(user_id, set()).update(
+                (period, period_bounds(period, day)[0]) for period in (WEEK, MONTH))
+        for user_id, buckets in by_user.items():
+            connection.execute(delete(partials).where(
+                partials.c.user_id == user_id,
+                or_(*[and_(partials.c.period == period, partials.c.period_start == period_start)
+                      for period, period_start in sorted(buckets)])
+            ))
+
+    @staticmethod
+    def clear(connection, user_id=None, start_date=None, end_date=None):
+        """删除部分聚合（可按用户和日期范围），用于绕过 ORM 批量写入记录之后"""
+        statement = delete(partials)
+        if user_id is not None:
+            statement = statement.where(partials.c.user_id == user_id)
+        if start_date is not None:
+            # 包含 start_date 的整月 / 整周也要删除
+            earliest = min(period_bounds(period, start_date)[0] for period in (WEEK, MONTH))
+            statement = statement.where(partials.c.period_start >= earliest)
+        if end_date is not None:
+            statement = statement.where(partials.c.period_start <= end_date)
+        return connection.execute(statement).rowcount
+
+
+def _invalidate_partials_after_flush(session, flush_context):
+    keys = _affected_keys(session, (HealthRecord, DietRecord))
+    if keys:
+        ReportAggregateService.invalidate(session.connection(), keys)
+
+
+def register_report_partial_listeners():
+    """注册 flush 监听器，记录的增删改在同一事务内删除受影响周期的部分聚合"""
+    if not event.contains(Session, 'after_flush', _invalidate_partials_after_flush):
+        event.listen(Session, 'after_flush', _invalidate_partials_after_flush)
@@ -0,0 +1,317 @@
+"""
+健康报告后台生成任务
+
+报告生成请求写入 report_jobs 表后立即返回任务ID，由工作池在后台执行
+HealthReportService.generate_health_report，客户端通过任务状态接口轮询结果，
+也可以提供 callback_url 在任务结束后接收 POST 通知。回调地址的主机解析出的所有地址都必须是
+公网地址（拒绝回环、链路本地、私有和保留地址），REPORT_CALLBACK_ALLOWED_HOSTS 中列出的主机除外。
+提交时检查一次，发送时建立连接前对实际连接的地址再检查一次，防止 DNS 重绑定绕过。
+
+配置（app.config，app.py 中从同名环境变量读取）:
+- REPORT_JOB_WORKERS: 工作线程/进程数，默认 2；为 0 时在提交请求的线程中同步执行
+- REPORT_JOB_EXECUTOR: thread（默认）或 process。进程池以 spawn 方式启动子进程（见
+  utils/process_pool.py），每个子进程由 _init_worker 用 WORKER_CONFIG_KEYS 中的配置创建一个只有
+  数据库连接的应用，不导入 app 模块，不建表、不执行迁移、不启动工作池和调度线程
+- REPORT_CALLBACK_ALLOWED_HOSTS: 允许的回调主机（逗号分隔），这些主机不检查解析出的地址
+- REPORT_JOB_STALE_SECONDS: running 状态超过该秒数（按 started_at）的任务视为执行者已退出，默认 600
+
+任务以数据库为准：执行前用条件更新把 pending 改为 running 认领任务，同一任务不会被多个
+工作者重复执行。应用启动时会重新提交上次退出时仍处于 pending 的任务；退出或崩溃时正在执行的
+任务会停留在 running，启动时把 started_at 早于 REPORT_JOB_STALE_SECONDS 的 running 任务改回
+pending 一并重新提交。未超时的 running 任务可能正由其他进程执行，不做处理。
+"""
+import atexit
+import http.client
+import ipaddress
+import json
+import logging
+import socket
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import update
+
+from database import db, init_worker_db
+from models.health_report import ReportJob
+from utils.process_pool import SpawnProcessPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_STALE_SECONDS = 600
+CALLBACK_TIMEOUT = 5  # 秒
+# 传给进程池子进程的配置项
+WORKER_CONFIG_KEYS = ('SQLALCHEMY_DATABASE_URI', 'SQLALCHEMY_ENGINE_OPTIONS',
+                      'SQLALCHEMY_TRACK_MODIFICATIONS', 'REPORT_CALLBACK_ALLOWED_HOSTS')
+
+_app = None
+_executor = None
+_executor_kind = 'thread'
+
+
+def init_report_jobs(app):
+    """根据配置创建工作池，并重新提交未执行的任务"""
+    global _app, _executor, _executor_kind
+    _app = app
+    workers = int(app.config.get('REPORT_JOB_WORKERS', DEFAULT_WORKERS))
+    _executor_kind = app.config.get('REPORT_JOB_EXECUTOR', 'thread')
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    if workers > 0:
+        if _executor_kind == 'process':
+            config = {key: app.config[key] for key in WORKER_CONFIG_KEYS if key in app.config}
+            _executor = SpawnProcessPool(max_workers=workers, initializer=_init_worker, initargs=(config,))
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-job')
+    logger.info("报告任务工作池: %s x %s", _executor_kind if workers > 0 else 'inline', workers)
+
+    stale_seconds = int(app.config.get('REPORT_JOB_STALE_SECONDS', DEFAULT_STALE_SECONDS))
+    with app.app_context():
+        requeued = requeue_stale_jobs(stale_seconds)
+        pending = [job_id for (job_id,) in db.session.query(ReportJob.id).filter(ReportJob.status == 'pending')]
+    for job_id in pending:
+        _dispatch(job_id)
+    if pending:
+        logger.info("重新提交 %s 个未执行的报告任务（其中 %s 个执行超时）", len(pending), requeued)
+
+
+def requeue_stale_jobs(stale_seconds):
+    """把 started_at 早于 stale_seconds 秒前的 running 任务改回 pending，返回修改的任务数"""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    requeued = db.session.execute(
+        update(ReportJob)
+        .where(ReportJob.status == 'running', ReportJob.started_at < cutoff)
+        .values(status='pending', started_at=None)
+    ).rowcount
+    db.session.commit()
+    if requeued:
+        logger.warning("%s 个报告任务执行超过 %s 秒仍为 running，已改回 pending", requeued, stale_seconds)
+    return requeued
+
+
+def shutdown_report_jobs():
+    """停止接收新任务；队列中尚未开始的任务保持 pending，下次启动时重新提交"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+atexit.register(shutdown_report_jobs)
+
+
+def _dispatch(job_id):
+    if _executor is None:
+        run_job(_app, job_id)
+    elif _executor_kind == 'process':
+        _executor.submit(_run_in_process, job_id)
+    else:
+        _executor.submit(run_job, _app, job_id)
+
+
+def _init_worker(config):
+    """进程池子进程的初始化：创建只有数据库配置的应用，不启动任何后台服务"""
+    global _app
+    _app = Flask(__name__)
+    _app.config.update(config)
+    init_worker_db(_app)
+
+
+def _run_in_process(job_id):
+    """进程池入口：用 _init_worker 创建的应用执行任务"""
+    run_job(_app, job_id)
+
+
+def run_job(app, job_id):
+    """认领并执行一个任务，返回任务结束时的状态"""
+    with app.app_context():
+        claimed = db.session.execute(
+            update(ReportJob)
+            .where(ReportJob.id == job_id, ReportJob.status == 'pending')
+            .values(status='running', started_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            logger.debug("报告任务 %s 已被其他工作者认领或不存在", job_id)
+            return None
+
+        job = db.session.get(ReportJob, job_id)
+        from services.health_report_service import HealthReportService
+        try:
+            report = HealthReportService.generate_health_report(
+                user_id=job.user_id,
+                report_type=job.report_type,
+                start_date=job.start_date,
+                end_date=job.end_date
+            )
+            job.status = 'succeeded'
+            job.report_id = report.id
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(ReportJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)[:1000]
+            logger.error("报告任务 %s 执行失败: %s", job_id, e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        logger.info("报告任务 %s 结束: %s", job_id, job.status)
+
+        if job.callback_url:
+            _notify(job.callback_url, job.to_dict(), allowed_callback_hosts(app))
+        return job.status
+
+
+class CallbackRejected(OSError):
+    """回调地址不是允许的公网地址"""
+
+
+def allowed_callback_hosts(app):
+    value = app.config.get('REPORT_CALLBACK_ALLOWED_HOSTS') or ''
+    return {host.strip().lower() for host in value.split(',') if host.strip()}
+
+
+def _is_public_address(address):
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def resolve_callback_host(host, port, allowed_hosts):
+    """
+    解析回调主机，返回可以连接的地址列表 [(family, sockaddr)]
+
+    抛出:
+        CallbackRejected: 主机不在允许列表中且解析出非公网地址
+        OSError: 解析失败
+    """
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    if host.lower() not in allowed_hosts:
+        rejected = [info[4][0] for info in infos if not _is_public_address(info[4][0])]
+        if rejected:
+            raise CallbackRejected(f"回调地址 {host} 解析到非公网地址: {', '.join(sorted(set(rejected)))}")
+    return [(info[0], info[4]) for info in infos]
+
+
+class _CheckedConnectionMixin:
+    """建立连接时解析并检查地址，只连接检查通过的地址（HTTPS 仍按主机名校验证书）"""
+    allowed_hosts = frozenset()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = self._checked_connection
+
+    def _checked_connection(self, address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+        host, port = address
+        error = None
+        for _, sockaddr in resolve_callback_host(host, port, self.allowed_hosts):
+            try:
+                return socket.create_connection(sockaddr[:2], timeout, source_address)
+            except OSError as e:
+                error = e
+        raise error or OSError(f"无法连接回调地址 {host}")
+
+
+def _callback_opener(allowed_hosts):
+    hosts = frozenset(allowed_hosts)
+    http_connection = type('CheckedHTTPConnection', (_CheckedConnectionMixin, http.client.HTTPConnection),
+                           {'allowed_hosts': hosts})
+    https_connection = type('CheckedHTTPSConnection', (_CheckedConnectionMixin, http.client.HTTPSConnection),
+                            {'allowed_hosts': hosts})
+
+    class HTTPHandler(urllib.request.HTTPHandler):
+        def http_open(self, req):
+            return self.do_open(http_connection, req)
+
+    class HTTPSHandler(urllib.request.HTTPSHandler):
+        def https_open(self, req):
+            return self.do_open(https_connection, req, context=self._context)
+
+    # 重定向同样经过上面的连接检查
+    return urllib.request.build_opener(HTTPHandler, HTTPSHandler)
+
+
+def _notify(url, payload, allowed_hosts=frozenset()):
+    """向回调地址 POST 任务结果，失败或地址不允许时只记录日志"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    notify_request = urllib.request.Request(url, data=body, method='POST',
+                                            headers={'Content-Type': 'application/json'})
+    try:
+        with _callback_opener(allowed_hosts).open(notify_request, timeout=CALLBACK_TIMEOUT) as response:
+            logger.debug("报告任务回调 %s 返回 %s", url, response.status)
+    except (urllib.error.URLError, OSError) as e:
+        logger.warning("报告任务回调 %s 失败: %s", url, e)
+
+
+class ReportJobService:
+    """报告任务服务"""
+
+    @staticmethod
+    def validate_callback_url(url, allowed_hosts=frozenset()):
+        """
+        检查回调地址：只允许 http/https，主机不在 allowed_hosts 中时解析出的地址必须都是公网地址
+
+        返回:
+            (是否有效, 无效原因)
+        """
+        try:
+            parsed = urllib.parse.urlparse(url)
+            port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        except ValueError:
+            return False, "callback_url 格式错误"
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            return False, "callback_url 必须是 http 或 https 地址"
+        try:
+            resolve_callback_host(parsed.hostname, port, allowed_hosts)
+        except CallbackRejected:
+            return False, "callback_url 不能指向内网、回环或保留地址"
+        except OSError:
+            return False, "callback_url 的主机无法解析"
+        return True, None
+
+    @staticmethod
+    def submit(user_id, report_type, start_date=None, end_date=None, callback_url=None):
+        """
+        创建报告生成任务并交给工作池
+
+        参数:
+            user_id: 用户ID
+            report_type: 报告类型（weekly, monthly, yearly, custom）
+            start_date: 开始日期（可选）
+            end_date: 结束日期（可选）
+            callback_url: 任务结束后通知的地址（可选）
+
+        返回:
+            ReportJob，工作池为同步模式时返回时已执行完毕
+        """
+        job = ReportJob(
+            id=uuid.uuid4().hex,
+            user_id=int(user_id),
+            report_type=report_type,
+            start_date=start_date,
+            end_date=end_date,
+            callback_url=callback_url,
+            status='pending'
+        )
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        logger.debug("提交报告任务 %s - 用户ID: %s, 类型: %s", job_id, user_id, report_type)
+
+        _dispatch(job_id)
+        db.session.expire_all()
+        return db.session.get(ReportJob, job_id)
+
+    @staticmethod
+    def get_job(job_id, user_id):
+        """获取用户自己的任务，不存在或无权访问时返回 None"""
+        job = db.session.get(ReportJob, job_id)
+        if job is None or job.user_id != int(user_id):
+            return None
+        return job
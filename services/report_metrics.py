@@ -0,0 +1,235 @@
+"""
+健康报告的结构化指标
+
+报告生成时各部分先统计成下面的指标对象，整体以 JSON 保存在 HealthReport.metrics 中；
+健康建议直接读取这些数值，摘要文本只在最后由 render_* 函数从指标渲染。
+客户端可以直接使用报告的 metrics 字段，无需解析摘要文本。
+"""
+from dataclasses import asdict, dataclass, field, fields
+from typing import Dict, List, Optional
+
+METRICS_VERSION = 1
+
+# 示例数据的来源：未找到记录 / 查询出错
+SAMPLE_MISSING = 'missing'
+SAMPLE_ERROR = 'error'
+
+
+def _from_dict(cls, data):
+    names = {f.name for f in fields(cls)}
+    return cls(**{key: value for key, value in (data or {}).items() if key in names})
+
+
+@dataclass
+class HealthMetrics:
+    """健康记录指标（来自每日汇总表，平均值为区间内各天之和 / 记录个数之和）"""
+    record_days: int = 0
+    avg_weight: Optional[float] = None
+    first_weight: Optional[float] = None  # 区间内第一天最后一次记录的体重
+    last_weight: Optional[float] = None
+    weight_days: int = 0                  # 有体重记录的天数
+    avg_bp_systolic: Optional[float] = None
+    avg_bp_diastolic: Optional[float] = None
+    avg_heart_rate: Optional[float] = None
+    avg_blood_sugar: Optional[float] = None
+    avg_sleep_hours: Optional[float] = None
+    avg_steps: Optional[float] = None
+
+
+@dataclass
+class DietMetrics:
+    """饮食记录指标"""
+    record_count: int = 0
+    days: int = 0                         # 报告区间天数
+    total_calories: float = 0
+    avg_daily_calories: Optional[float] = None
+    meal_counts: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ExerciseMetrics:
+    """运动指标（统计所有历史记录；没有记录时为示例数据）"""
+    sample: Optional[str] = None          # None 为真实数据，否则为示例数据的来源
+    has_records_in_range: bool = False
+    active_days: int = 0                  # 实际有运动记录的天数
+    total_duration: int = 0               # 分钟
+    total_calories: float = 0
+    avg_daily_duration: Optional[float] = None
+    avg_daily_calories: Optional[float] = None
+    type_counts: List[list] = field(default_factory=list)  # [[运动类型, 次数]]，按次数降序
+
+    @property
+    def types(self):
+        return [exercise_type for exercise_type, _ in self.type_counts]
+
+
+@dataclass
+class MedicationMetrics:
+    """用药指标（统计所有历史记录；没有记录时为示例数据）"""
+    sample: Optional[str] = None
+    has_records_in_range: bool = False
+    record_days: int = 0
+    medications: List[dict] = field(default_factory=list)  # [{name, count, avg_effectiveness}]，按次数降序
+
+    @property
+    def names(self):
+        return [medication['name'] for medication in self.medications]
+
+
+@dataclass
+class ReportMetrics:
+    """一份报告的全部指标"""
+    start_date: str
+    end_date: str
+    health: HealthMetrics
+    diet: DietMetrics
+    exercise: ExerciseMetrics
+    medication: MedicationMetrics
+    version: int = METRICS_VERSION
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            start_date=data['start_date'],
+            end_date=data['end_date'],
+            health=_from_dict(HealthMetrics, data.get('health')),
+            diet=_from_dict(DietMetrics, data.get('diet')),
+            exercise=_from_dict(ExerciseMetrics, data.get('exercise')),
+            medication=_from_dict(MedicationMetrics, data.get('medication')),
+            version=data.get('version', METRICS_VERSION)
+        )
+
+
+def _period(start_date, end_date):
+    return f"{start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')}"
+
+
+def _history_note(kind, start_date, end_date):
+    start_date_str = start_date.strftime('%Y-%m-%d') if start_date else "未知日期"
+    end_date_str = end_date.strftime('%Y-%m-%d') if end_date else "未知日期"
+    return f"注意: 在{start_date_str}至{end_date_str}期间没有找到{kind}记录，正在显示所有历史记录。\n\n"
+
+
+def render_health_summary(metrics, start_date, end_date):
+    """健康数据摘要文本"""
+    if not metrics.record_days:
+        return "在所选时间段内没有健康记录数据。"
+
+    summary = f"健康记录数据摘要（{_period(start_date, end_date)})：\n\n"
+
+    if metrics.avg_weight:
+        summary += f"平均体重: {metrics.avg_weight:.1f} kg\n"
+        if metrics.weight_days > 1 and metrics.last_weight > metrics.first_weight:
+            summary += f"体重从 {metrics.first_weight:.1f} kg 上升到 {metrics.last_weight:.1f} kg\n"
+        elif metrics.weight_days > 1 and metrics.last_weight < metrics.first_weight:
+            summary += f"体重从 {metrics.first_weight:.1f} kg 下降到 {metrics.last_weight:.1f} kg\n"
+
+    if metrics.avg_bp_systolic and metrics.avg_bp_diastolic:
+        summary += f"平均血压: {metrics.avg_bp_systolic:.0f}/{metrics.avg_bp_diastolic:.0f} mmHg\n"
+
+    if metrics.avg_heart_rate:
+        summary += f"平均心率: {metrics.avg_heart_rate:.0f} 次/分钟\n"
+
+    if metrics.avg_blood_sugar:
+        summary += f"平均血糖: {metrics.avg_blood_sugar:.1f} mmol/L\n"
+
+    if metrics.avg_sleep_hours:
+        summary += f"平均睡眠时间: {metrics.avg_sleep_hours:.1f} 小时/天\n"
+
+    if metrics.avg_steps:
+        summary += f"平均步数: {metrics.avg_steps:.0f} 步/天\n"
+
+    return summary
+
+
+def render_diet_summary(metrics, start_date, end_date):
+    """饮食数据摘要文本"""
+    if not metrics.record_count:
+        return "在所选时间段内没有饮食记录数据。"
+
+    summary = f"饮食记录数据摘要（{_period(start_date, end_date)})：\n\n"
+
+    if metrics.avg_daily_calories is not None:
+        summary += f"平均每日摄入热量: {metrics.avg_daily_calories:.0f} 大卡\n"
+
+    summary += "\n餐次记录情况：\n"
+    for meal, count in metrics.meal_counts.items():
+        if count > 0:
+            percentage = (count / metrics.days) * 100
+            summary += f"{meal.capitalize()}: 记录了 {count} 天 ({percentage:.0f}%)\n"
+
+    summary += "\n饮食建议:\n"
+    summary += "1. 保持均衡饮食，每天摄入适量的蛋白质、碳水化合物和健康脂肪\n"
+    summary += "2. 增加蔬菜和水果的摄入，确保足够的维生素和矿物质\n"
+    summary += "3. 控制盐分和糖分的摄入，避免过度加工的食品\n"
+    summary += "4. 保持规律的进餐时间，避免暴饮暴食和长时间不进食\n"
+
+    return summary
+
+
+def render_exercise_summary(metrics, start_date, end_date):
+    """运动数据摘要文本"""
+    if metrics.sample == SAMPLE_MISSING:
+        summary = "运动记录数据摘要（示例数据）：\n\n"
+        summary += "注意: 未找到您的运动记录，以下为示例数据。建议在添加记录页面添加运动记录。\n\n"
+    elif metrics.sample == SAMPLE_ERROR:
+        summary = "运动记录数据摘要（示例数据）：\n\n"
+        summary += "注意: 获取您的运动记录时发生错误，以下为示例数据。\n\n"
+    else:
+        summary = "运动记录数据摘要（包含所有历史记录）：\n\n"
+        if not metrics.has_records_in_range:
+            summary += _history_note('运动', start_date, end_date)
+
+    if metrics.active_days > 0:
+        summary += f"总运动时间: {metrics.total_duration} 分钟\n"
+        summary += f"平均每日运动时间: {metrics.avg_daily_duration:.0f} 分钟（实际运动天数: {metrics.active_days}天）\n"
+        summary += f"总消耗热量: {metrics.total_calories:.0f} 大卡\n"
+        summary += f"平均每日消耗热量: {metrics.avg_daily_calories:.0f} 大卡\n"
+
+    summary += "\n运动类型统计：\n"
+    for exercise_type, count in metrics.type_counts:
+        summary += f"{exercise_type}: {count} 次\n"
+
+    summary += "\n运动建议：\n"
+    if (metrics.avg_daily_duration or 0) < 30:
+        summary += "- 您的运动时间较少，建议增加日常运动量，每天至少进行30分钟中等强度的有氧运动\n"
+    else:
+        summary += "- 您保持了良好的运动习惯，请继续保持！\n"
+
+    summary += "- 尝试多样化您的运动类型，结合有氧运动、力量训练和灵活性训练\n"
+    summary += "- 记得运动前充分热身，运动后适当拉伸，避免运动损伤\n"
+
+    return summary
+
+
+def render_medication_summary(metrics, start_date, end_date):
+    """用药数据摘要文本"""
+    if metrics.sample == SAMPLE_MISSING:
+        summary = "用药记录数据摘要（示例数据）：\n\n"
+        summary += "注意: 未找到您的用药记录，以下为示例数据。如果您正在服用药物，建议记录您的用药情况。\n\n"
+    elif metrics.sample == SAMPLE_ERROR:
+        summary = "用药记录数据摘要（示例数据）：\n\n"
+        summary += "注意: 获取您的用药记录时发生错误，以下为示例数据。\n\n"
+    else:
+        summary = "用药记录数据摘要（包含所有历史记录）：\n\n"
+        if not metrics.has_records_in_range:
+            summary += _history_note('用药', start_date, end_date)
+
+    if metrics.medications:
+        summary += "服用药物统计：\n"
+        for medication in metrics.medications:
+            summary += f"{medication['name']}: 服用 {medication['count']} 次"
+            if medication['avg_effectiveness']:
+                summary += f", 平均效果评分: {medication['avg_effectiveness']:.1f}/5"
+            summary += "\n"
+
+        summary += "\n用药建议：\n"
+        summary += "- 请严格按照医生的处方用药，遵守剂量和服用时间\n"
+        summary += "- 保持定期复诊，及时调整用药方案\n"
+        summary += "- 如果出现不适或副作用，请立即咨询医生\n"
+        summary += "- 使用药物提醒功能，避免漏服或重复服药\n"
+
+    return summary
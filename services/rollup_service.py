@@ -0,0 +1,255 @@
+from models.daily_rollup import DailyUserRollup
+from models.health_record import HealthRecord
+from models.water_intake import WaterIntake
+from utils.upsert import upsert_rows
+from sqlalchemy import case, delete, distinct, event, func, inspect, or_, select, union
+from sqlalchemy.orm import Session
+from datetime import date as date_type, datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+rollups = DailyUserRollup.__table__
+records = HealthRecord.__table__
+intakes = WaterIntake.__table__
+
+# 除主键外的列
+VALUE_COLUMNS = [column.name for column in rollups.columns if column.name not in ('user_id', 'date')]
+
+# 健康指标：(汇总表列名前缀, health_records 列)
+HEALTH_METRICS = [
+    ('steps', records.c.steps),
+    ('weight', records.c.weight),
+    ('bp_systolic', records.c.blood_pressure_systolic),
+    ('bp_diastolic', records.c.blood_pressure_diastolic),
+    ('heart_rate', records.c.heart_rate),
+    ('blood_sugar', records.c.blood_sugar),
+    ('sleep_hours', records.c.sleep_hours),
+]
+
+def _type_count(record_type):
+    return func.sum(case((records.c.record_type == record_type, 1), else_=0))
+
+
+def _type_sum(record_type, column):
+    return func.coalesce(func.sum(case((records.c.record_type == record_type, column), else_=None)), 0)
+
+
+def _health_nonzero_count(column):
+    # 与报告中 "if r.weight" 的过滤一致：忽略 NULL 和 0
+    return func.count(case((records.c.record_type == 'health', func.nullif(column, 0)), else_=None))
+
+
+def _empty_row(user_id, day):
+    row = {column: 0 for column in VALUE_COLUMNS}
+    row.update({
+        'user_id': user_id,
+        'date': day,
+        'latest_weight': None,
+        'latest_bp_systolic': None,
+        'latest_bp_diastolic': None,
+        'updated_at': datetime.utcnow()
+    })
+    return row
+
+
+class RollupService:
+    """每日汇总服务，维护并读取 daily_user_rollups 表"""
+
+    @staticmethod
+    def compute_days(connection, user_id, start_date=None, end_date=None):
+        """
+        从原始记录计算用户在日期范围内每天的汇总
+
+        参数:
+            connection: 数据库连接
+            user_id: 用户ID
+            start_date: 开始日期，可选
+            end_date: 结束日期，可选
+
+        返回:
+            {日期: 汇总行字典}，没有任何记录的日期不会出现
+        """
+        def date_filters(table):
+            filters = [table.c.user_id == user_id]
+            if start_date is not None:
+                filters.append(table.c.record_date >= start_date)
+            if end_date is not None:
+                filters.append(table.c.record_date <= end_date)
+            return filters
+
+        columns = [
+            records.c.record_date,
+            func.count().label('record_count'),
+            _type_count('diet').label('diet_count'),
+            _type_sum('diet', records.c.food_amount).label('diet_food_amount'),
+            # 饮食记录的热量保存在 calories_burned 字段中
+            _type_sum('diet', records.c.calories_burned).label('diet_calories'),
+            _type_count('exercise').label('exercise_count'),
+            _type_sum('exercise', records.c.duration).label('exercise_minutes'),
+            _type_sum('exercise', records.c.calories_burned).label('exercise_calories'),
+            _type_count('water').label('water_count'),
+            _type_sum('water', records.c.water_amount).label('water_amount'),
+            _type_count('medication').label('medication_count'),
+            _type_count('health').label('health_count'),
+        ]
+        for prefix, column in HEALTH_METRICS:
+            columns.append(_type_sum('health', column).label(f'{prefix}_sum'))
+            columns.append(_health_nonzero_count(column).label(f'{prefix}_count'))
+
+        result = {}
+        aggregate = select(*columns).where(*date_filters(records)).group_by(records.c.record_date)
+        for row in connection.execute(aggregate).mappings():
+            day = row['record_date']
+            result[day] = _empty_row(user_id, day)
+            result[day].update({key: value for key, value in row.items() if key != 'record_date'})
+
+        # 当天最后一次记录的体重和血压
+        latest = select(
+            records.c.record_date,
+            records.c.weight,
+            records.c.blood_pressure_systolic,
+            records.c.blood_pressure_diastolic
+        ).where(
+            *date_filters(records),
+            records.c.record_type == 'health',
+            or_(records.c.weight.isnot(None), records.c.blood_pressure_systolic.isnot(None))
+        ).order_by(records.c.record_date, records.c.created_at, records.c.id)
+        for row in connection.execute(latest):
+            target = result[row.record_date]
+            if row.weight is not None:
+                target['latest_weight'] = row.weight
+            if row.blood_pressure_systolic is not None:
+                target['latest_bp_systolic'] = row.blood_pressure_systolic
+                target['latest_bp_diastolic'] = row.blood_pressure_diastolic
+
+        water = select(
+            intakes.c.record_date,
+            func.count().label('intake_count'),
+            func.coalesce(func.sum(intakes.c.amount), 0).label('intake_amount')
+        ).where(*date_filters(intakes)).group_by(intakes.c.record_date)
+        for row in connection.execute(water):
+            target = result.setdefault(row.record_date, _empty_row(user_id, row.record_date))
+            target['intake_count'] = row.intake_count
+            target['intake_amount'] = row.intake_amount
+
+        return result
+
+    @staticmethod
+    def upsert(connection, rows):
+        """按 (user_id, date) 写入汇总行，已存在则覆盖"""
+        upsert_rows(connection, rollups, rows, ['user_id', 'date'])
+
+    @staticmethod
+    def refresh_days(connection, keys):
+        """
+        重新计算指定 (user_id, date) 的汇总行
+
+        参数:
+            connection: 数据库连接（写操作所在的事务）
+            keys: (user_id, date) 集合
+        """
+        for user_id, day in sorted(keys):
+            computed = RollupService.compute_days(connection, user_id, day, day)
+            if day in computed:
+                RollupService.upsert(connection, [computed[day]])
+            else:
+                connection.execute(delete(rollups).where(
+                    rollups.c.user_id == user_id, rollups.c.date == day))
+
+    @staticmethod
+    def backfill(connection, user_id=None, start_date=None, end_date=None):
+        """
+        从原始记录重建汇总表
+
+        参数:
+            connection: 数据库连接
+            user_id: 只重建该用户，可选
+            start_date: 开始日期，可选
+            end_date: 结束日期，可选
+
+        返回:
+            包含处理用户数和写入天数的字典
+        """
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = sorted(connection.execute(union(
+                select(distinct(records.c.user_id)),
+                select(distinct(intakes.c.user_id))
+            )).scalars())
+
+        days = 0
+        for uid in user_ids:
+            computed = RollupService.compute_days(connection, uid, start_date, end_date)
+            stale = delete(rollups).where(rollups.c.user_id == uid)
+            if start_date is not None:
+                stale = stale.where(rollups.c.date >= start_date)
+            if end_date is not None:
+                stale = stale.where(rollups.c.date <= end_date)
+            connection.execute(stale)
+            RollupService.upsert(connection, list(computed.values()))
+            days += len(computed)
+            logger.info("用户 %s 的每日汇总已重建，共 %s 天", uid, len(computed))
+
+        return {"users": len(user_ids), "days": days}
+
+    @staticmethod
+    def get_daily_rollups(user_id, start_date=None, end_date=None):
+        """
+        读取日期范围内的汇总行（主键范围扫描）
+
+        参数:
+            user_id: 用户ID
+            start_date: 开始日期，可选
+            end_date: 结束日期，可选
+
+        返回:
+            {日期: DailyUserRollup}
+        """
+        query = DailyUserRollup.query.filter(DailyUserRollup.user_id == user_id)
+        if start_date is not None:
+            query = query.filter(DailyUserRollup.date >= start_date)
+        if end_date is not None:
+            query = query.filter(DailyUserRollup.date <= end_date)
+        return {row.date: row for row in query.all()}
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    return value
+
+
+def _affected_keys(session, models=(HealthRecord, WaterIntake)):
+    """收集本次 flush 中被修改的记录（models 中的类型）对应的 (user_id, date)，包括修改前的旧值"""
+    keys = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, models):
+            continue
+        state = inspect(obj)
+        user_ids = {obj.user_id}
+        dates = {obj.record_date}
+        if obj in session.dirty:
+            user_ids.update(state.attrs.user_id.history.deleted)
+            dates.update(state.attrs.record_date.history.deleted)
+        for user_id in user_ids:
+            for day in dates:
+                day = _as_date(day)
+                if user_id is not None and isinstance(day, date_type):
+                    keys.add((int(user_id), day))
+    return keys
+
+
+def _refresh_rollups_after_flush(session, flush_context):
+    keys = _affected_keys(session)
+    if keys:
+        RollupService.refresh_days(session.connection(), keys)
+
+
+def register_rollup_listeners():
+    """注册 flush 监听器，使任何服务对记录的增删改都在同一事务内刷新每日汇总"""
+    if not event.contains(Session, 'after_flush', _refresh_rollups_after_flush):
+        event.listen(Session, 'after_flush', _refresh_rollups_after_flush)
@@ -0,0 +1,137 @@
+"""
+分享内容有效性
+
+分享只保存内容类型和内容ID，被分享的记录删除后分享就失效了。本模块批量检查一页分享的内容
+是否仍然存在：按内容类型分组，每种类型一条 IN 查询（同一类型有多个来源表时用 UNION ALL 合并），
+结果在进程内缓存 SHARE_VALIDITY_TTL 秒。本进程提交的记录增删会立即使相应缓存失效，
+TTL 只用于兜底其他进程的写入。
+"""
+import logging
+from collections import defaultdict
+
+from sqlalchemy import column, event, select, table, union_all
+from sqlalchemy.orm import Session
+
+from database import db
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SHARE_VALIDITY_TTL = 60
+
+validity_cache = TTLCache(ttl=SHARE_VALIDITY_TTL, maxsize=50000)
+
+
+def _table(name):
+    return table(name, column('id'), column('record_type'))
+
+
+# 内容类型 -> [(表名, health_records 中的记录类型)]，任一来源存在该ID即有效
+CONTENT_SOURCES = {
+    'health_record': [('health_records', 'health')],
+    'diet_record': [('health_records', 'diet'), ('diet_records', None)],
+    'exercise_record': [('health_records', 'exercise'), ('exercise_records', None)],
+    'water_intake': [('health_records', 'water'), ('water_intakes', None)],
+    'medication_record': [('health_records', 'medication'), ('medication_records', None)],
+    'health_goal': [('health_goals', None)],
+    'health_report': [('health_reports', None)],
+}
+
+# 表名 -> 受其增删影响的内容类型
+TABLE_CONTENT_TYPES = defaultdict(set)
+for _content_type, _sources in CONTENT_SOURCES.items():
+    for _table_name, _ in _sources:
+        TABLE_CONTENT_TYPES[_table_name].add(_content_type)
+
+
+def _existing_ids(content_type, content_ids):
+    """一条查询返回 content_ids 中仍然存在的ID"""
+    queries = []
+    for table_name, record_type in CONTENT_SOURCES[content_type]:
+        source = _table(table_name)
+        query = select(source.c.id).where(source.c.id.in_(content_ids))
+        if record_type:
+            query = query.where(source.c.record_type == record_type)
+        queries.append(query)
+    query = queries[0] if len(queries) == 1 else union_all(*queries)
+    return set(db.session.execute(query).scalars())
+
+
+class ShareValidityService:
+    """分享内容有效性检查"""
+
+    @staticmethod
+    def resolve(items):
+        """
+        批量检查内容是否存在
+
+        参数:
+            items: (content_type, content_id) 列表
+
+        返回:
+            {(content_type, content_id): 是否有效}，未知内容类型为 False
+        """
+        missing = object()
+        result = {}
+        pending = defaultdict(dict)  # 内容类型 -> {内容ID: 查询前的缓存版本}
+        for key in set(items):
+            content_type, content_id = key
+            if content_type not in CONTENT_SOURCES:
+                logger.warning("未知内容类型: %s", content_type)
+                result[key] = False
+                continue
+            value = validity_cache.get(key, missing)
+            if value is missing:
+                pending[content_type][content_id] = validity_cache.version(key)
+            else:
+                result[key] = value
+
+        for content_type, versions in pending.items():
+            try:
+                existing = _existing_ids(content_type, list(versions))
+            except Exception as e:
+                # 查询失败时视为有效且不缓存，避免误隐藏分享
+                logger.error("检查 %s 内容有效性出错: %s", content_type, e)
+                result.update({(content_type, content_id): True for content_id in versions})
+                continue
+            for content_id, version in versions.items():
+                key = (content_type, content_id)
+                result[key] = content_id in existing
+                validity_cache.set(key, result[key], version)
+        return result
+
+    @staticmethod
+    def is_valid(content_type, content_id):
+        return ShareValidityService.resolve([(content_type, content_id)])[(content_type, content_id)]
+
+    @staticmethod
+    def invalidate(table_name, content_id):
+        for content_type in TABLE_CONTENT_TYPES.get(table_name, ()):
+            validity_cache.invalidate((content_type, content_id))
+
+
+def _collect_changed_contents(session, flush_context):
+    """记录本次 flush 中新增或删除的被分享内容，提交后再使缓存失效"""
+    changed = session.info.setdefault('share_validity_changes', set())
+    for obj in list(session.new) + list(session.deleted):
+        table_name = getattr(obj, '__tablename__', None)
+        if table_name in TABLE_CONTENT_TYPES and obj.id is not None:
+            changed.add((table_name, obj.id))
+
+
+def _invalidate_after_commit(session):
+    for table_name, content_id in session.info.pop('share_validity_changes', ()):
+        ShareValidityService.invalidate(table_name, content_id)
+
+
+def _discard_after_rollback(session):
+    session.info.pop('share_validity_changes', None)
+
+
+def register_share_validity_listeners():
+    """注册会话监听器，提交对被分享内容的增删后使有效性缓存失效"""
+    for name, listener in (('after_flush', _collect_changed_contents),
+                           ('after_commit', _invalidate_after_commit),
+                           ('after_rollback', _discard_after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
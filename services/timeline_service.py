@@ -0,0 +1,170 @@
+"""
+分享时间线
+
+分享写入时把分享ID推送到可见用户的时间线（timeline_entries，写扩散），读取时只按
+(viewer_id, created_at, share_id) 索引取一页，耗时只与每页条数有关，与分享表的大小和翻页深度无关。
+
+目前没有好友关系，可见范围只有两种：
+- public：所有用户可见。受众是全部用户，逐个推送的代价过高，只写入一条公共时间线
+  (viewer_id = PUBLIC_TIMELINE)，读取时拉取并与用户自己的时间线合并（读扩散）
+- private / friends：只有作者可见，推送到作者自己的时间线。friends 暂时等同于 private，
+  有好友关系后需要在 audience() 中改为推送到作者和好友的时间线，并重建已有的时间线
+
+分享的增删和可见性修改由 flush 监听器在同一事务内同步到时间线；绕过 ORM 写入的分享可用
+scripts/rebuild_timelines.py 从 shares 表重建。
+"""
+import heapq
+import logging
+from datetime import datetime
+
+from sqlalchemy import and_, case, delete, event, inspect, literal, or_, select
+from sqlalchemy.orm import Session
+
+from database import db
+from models.social import Share, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+shares = Share.__table__
+entries = TimelineEntry.__table__
+
+PUBLIC_TIMELINE = 0
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def audience(author_id, visibility):
+    """分享需要推送到的时间线ID列表"""
+    if visibility == 'public':
+        return [PUBLIC_TIMELINE]
+    return [author_id]
+
+
+def encode_cursor(created_at, share_id):
+    return f"{created_at.isoformat()}_{share_id}"
+
+
+def decode_cursor(cursor):
+    """解析游标，格式错误时抛出 ValueError"""
+    created_at, share_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(created_at), int(share_id)
+
+
+class TimelineService:
+    """时间线服务"""
+
+    @staticmethod
+    def push(connection, share_rows):
+        """
+        把分享写入受众的时间线
+
+        参数:
+            connection: 数据库连接
+            share_rows: 含 id, user_id, visibility, created_at 的分享列表
+        """
+        rows = [
+            {'viewer_id': viewer_id, 'share_id': share.id, 'author_id': share.user_id,
+             'created_at': share.created_at}
+            for share in share_rows
+            for viewer_id in audience(share.user_id, share.visibility)
+        ]
+        if rows:
+            connection.execute(entries.insert(), rows)
+
+    @staticmethod
+    def remove(connection, share_ids):
+        """从所有时间线中删除分享"""
+        if share_ids:
+            connection.execute(delete(entries).where(entries.c.share_id.in_(list(share_ids))))
+
+    @staticmethod
+    def rebuild(connection, author_id=None):
+        """
+        从 shares 表重建时间线
+
+        参数:
+            connection: 数据库连接
+            author_id: 只重建该用户发布的分享，为空时重建全部
+
+        返回:
+            写入的条目数
+        """
+        delete_query = delete(entries)
+        source = select(
+            case((shares.c.visibility == 'public', literal(PUBLIC_TIMELINE)), else_=shares.c.user_id),
+            shares.c.id, shares.c.user_id, shares.c.created_at
+        )
+        if author_id is not None:
+            delete_query = delete_query.where(entries.c.author_id == author_id)
+            source = source.where(shares.c.user_id == author_id)
+        connection.execute(delete_query)
+        result = connection.execute(entries.insert().from_select(
+            ['viewer_id', 'share_id', 'author_id', 'created_at'], source))
+        return result.rowcount
+
+    @staticmethod
+    def _page(connection, viewer_id, limit, cursor):
+        query = select(entries.c.share_id, entries.c.created_at).where(entries.c.viewer_id == viewer_id)
+        if cursor is not None:
+            query = query.where(or_(
+                entries.c.created_at < cursor[0],
+                and_(entries.c.created_at == cursor[0], entries.c.share_id < cursor[1])
+            ))
+        return connection.execute(
+            query.order_by(entries.c.created_at.desc(), entries.c.share_id.desc()).limit(limit)
+        ).all()
+
+    @staticmethod
+    def get_timeline(viewer_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        获取用户时间线的一页：自己的时间线与公共时间线各取 limit + 1 条，按时间倒序合并
+
+        参数:
+            viewer_id: 当前用户ID
+            limit: 每页条数
+            cursor: 上一页返回的 next_cursor，为空时从最新开始
+
+        返回:
+            {'shares': 序列化后的分享列表, 'next_cursor': 下一页游标（没有更多时为 None）}
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        position = decode_cursor(cursor) if cursor else None
+        connection = db.session.connection()
+        pages = [TimelineService._page(connection, timeline_id, limit + 1, position)
+                 for timeline_id in (viewer_id, PUBLIC_TIMELINE)]
+        merged = list(heapq.merge(*pages, key=lambda row: (row.created_at, row.share_id), reverse=True))
+        page, more = merged[:limit], len(merged) > limit
+
+        share_ids = [row.share_id for row in page]
+        by_id = {share.id: share for share in Share.query.filter(Share.id.in_(share_ids))} if share_ids else {}
+        # 条目存在但分享已被绕过 ORM 删除、或分享的内容已被删除时跳过，这一页可能少于 limit 条
+        items = [by_id[share_id] for share_id in share_ids if share_id in by_id]
+        return {
+            'shares': Share.serialize_page(items, current_user_id=viewer_id, hide_invalid=True),
+            'next_cursor': encode_cursor(page[-1].created_at, page[-1].share_id) if more else None
+        }
+
+
+def _sync_timelines_after_flush(session, flush_context):
+    removed = set()
+    pushed = []
+    for obj in session.deleted:
+        if isinstance(obj, Share):
+            removed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Share) and obj.id not in removed:
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in ('visibility', 'user_id', 'created_at')):
+                removed.add(obj.id)
+                pushed.append(obj)
+    pushed.extend(obj for obj in session.new if isinstance(obj, Share))
+    if removed or pushed:
+        connection = session.connection()
+        TimelineService.remove(connection, removed)
+        TimelineService.push(connection, pushed)
+
+
+def register_timeline_listeners():
+    """注册 flush 监听器，分享的增删和可见性修改在同一事务内同步到时间线"""
+    if not event.contains(Session, 'after_flush', _sync_timelines_after_flush):
+        event.listen(Session, 'after_flush', _sync_timelines_after_flush)
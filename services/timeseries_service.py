@@ -0,0 +1,101 @@
+"""
+健康指标时间序列
+
+一条按 (user_id, record_type, record_date) 索引范围扫描的查询读出日期范围内所有健康记录的
+请求指标列，转换为 NumPy 数组后按指标分别降采样（utils/downsample.py），每个序列最多返回
+points 个点，响应大小与日期范围和记录数无关。
+
+每条记录的时间为 record_date 当天加上 created_at 的时刻，同一天的多条记录按录入先后排列。
+与每日汇总表一致，指标值为 NULL 或 0 的记录不计入该指标的序列。
+"""
+import logging
+
+import numpy as np
+from sqlalchemy import or_, select
+
+from database import db
+from services.aggregation_service import METRICS, records
+from utils.downsample import LTTB, METHODS, MINMAX, downsample
+
+logger = logging.getLogger(__name__)
+
+# 可查询的指标：health_records 中 record_type='health' 的各项指标
+SERIES_METRICS = [name for name, metric in METRICS.items() if metric.record_type == 'health']
+
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+MIN_POINTS = {LTTB: 3, MINMAX: 4}
+
+
+def _timestamps(rows):
+    """每条记录的时间（datetime64[s]）：record_date 当天 0 点加上 created_at 的时刻"""
+    days = np.array([row.record_date for row in rows], dtype='datetime64[D]').astype('datetime64[s]')
+    created = np.array([row.created_at for row in rows], dtype='datetime64[s]')
+    time_of_day = created - created.astype('datetime64[D]').astype('datetime64[s]')
+    return days + np.where(np.isnat(created), np.timedelta64(0, 's'), time_of_day)
+
+
+class TimeSeriesService:
+    """健康指标时间序列服务"""
+
+    @staticmethod
+    def get_series(user_id, metrics, start_date=None, end_date=None, points=DEFAULT_POINTS, method=LTTB):
+        """
+        获取降采样后的健康指标时间序列
+
+        参数:
+            user_id: 用户ID
+            metrics: 指标名列表，见 SERIES_METRICS
+            start_date: 开始日期，可选
+            end_date: 结束日期，可选
+            points: 每个序列最多返回的点数
+            method: lttb / minmax
+
+        返回:
+            {'method', 'points', 'series': {指标名: {'total': 原始点数, 'timestamps': ISO 时间列表, 'values': 值列表}}}
+
+        抛出:
+            ValueError: 指标、方法、点数或日期范围无效
+        """
+        metrics = list(dict.fromkeys(metrics))
+        if not metrics:
+            raise ValueError(f"至少需要一个指标，有效值: {', '.join(SERIES_METRICS)}")
+        unknown = [name for name in metrics if name not in SERIES_METRICS]
+        if unknown:
+            raise ValueError(f"无效的指标: {', '.join(unknown)}，有效值: {', '.join(SERIES_METRICS)}")
+        if method not in METHODS:
+            raise ValueError(f"无效的降采样方法: {method}，有效值: {', '.join(METHODS)}")
+        if not MIN_POINTS[method] <= points <= MAX_POINTS:
+            raise ValueError(f"点数必须在 {MIN_POINTS[method]} 到 {MAX_POINTS} 之间")
+        if start_date is not None and end_date is not None and start_date > end_date:
+            raise ValueError("开始日期不能晚于结束日期")
+
+        columns = [METRICS[name].column for name in metrics]
+        query = select(records.c.record_date, records.c.created_at, *columns).where(
+            records.c.user_id == user_id,
+            records.c.record_type == 'health',
+            or_(*[column.isnot(None) & (column != 0) for column in columns])
+        )
+        if start_date is not None:
+            query = query.where(records.c.record_date >= start_date)
+        if end_date is not None:
+            query = query.where(records.c.record_date <= end_date)
+        rows = db.session.execute(
+            query.order_by(records.c.record_date, records.c.created_at, records.c.id)
+        ).all()
+
+        times = _timestamps(rows)
+        series = {}
+        for i, name in enumerate(metrics):
+            values = np.array([row[i + 2] for row in rows], dtype=float)
+            present = np.flatnonzero(~np.isnan(values) & (values != 0))
+            x, y = times[present], values[present]
+            kept = downsample(x.astype('int64'), y, points, method) if len(x) else np.arange(0)
+            series[name] = {
+                'total': len(x),
+                'timestamps': np.datetime_as_string(x[kept], unit='s').tolist(),
+                'values': np.round(y[kept], 2).tolist()
+            }
+        logger.debug("用户 %s 的时间序列: %s 条记录, %s",
+                     user_id, len(rows), {name: len(item['values']) for name, item in series.items()})
+        return {'method': method, 'points': points, 'series': series}
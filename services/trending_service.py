@@ -0,0 +1,112 @@
+"""
+分享热门分数
+
+每个分享的 trending_score 是点赞、评论（以及发布本身）计入的分数按时间衰减后的总和，
+与 Hacker News / Reddit 的热门排序类似：新的互动比旧的互动权重更高，没有新互动的分享逐渐下沉。
+
+- 点赞/评论的增删由 Share.adjust_counts 在同一事务内原子地增减分数，读取时不需要统计点赞
+- 后台线程每 TRENDING_DECAY_SECONDS 秒把所有分数乘以 0.5 ^ (距上次衰减的时间 / 半衰期)，
+  低于 MIN_SCORE 的分数归零，因此每次衰减只更新近期有互动的分享。上次衰减的时间保存在
+  trending_state 表中，多个进程同时运行时由条件更新认领，只有一个进程执行衰减，
+  执行间隔不均匀也不会多衰减或少衰减
+- 热门列表 GET /api/social/shares?sort=trending 按 (visibility, trending_score, id) 索引读取
+
+配置（app.config，app.py 中从同名环境变量读取）:
+- TRENDING_DECAY_SECONDS: 衰减间隔，默认 3600 秒，0 表示不启动衰减线程
+- TRENDING_HALF_LIFE_HOURS: 分数半衰期，默认 24 小时
+"""
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import case, insert, select, update
+
+from database import db
+from models.social import Share, TrendingState
+
+logger = logging.getLogger(__name__)
+
+shares = Share.__table__
+state = TrendingState.__table__
+
+STATE_ID = 1
+DEFAULT_DECAY_SECONDS = 3600
+DEFAULT_HALF_LIFE_HOURS = 24
+MIN_SCORE = 0.01  # 低于该值的分数归零（1 个点赞约 6.6 个半衰期后）
+
+
+def decay_factor(elapsed_seconds, half_life_hours=DEFAULT_HALF_LIFE_HOURS):
+    return 0.5 ** (elapsed_seconds / (half_life_hours * 3600))
+
+
+class TrendingService:
+    """热门分数服务"""
+
+    @staticmethod
+    def decay(connection, half_life_hours=DEFAULT_HALF_LIFE_HOURS, min_interval=0, now=None):
+        """
+        按距上次衰减的时间衰减所有分享的热门分数
+
+        参数:
+            connection: 数据库连接（调用方提交）
+            half_life_hours: 半衰期（小时）
+            min_interval: 距上次衰减不足该秒数时跳过
+            now: 当前时间（UTC）
+
+        返回:
+            更新的分享数；跳过或被其他进程认领时为 None
+        """
+        now = now or datetime.utcnow()
+        decayed_at = connection.execute(select(state.c.decayed_at).where(state.c.id == STATE_ID)).scalar()
+        if decayed_at is None:
+            # 首次运行只记录起点
+            connection.execute(insert(state).values(id=STATE_ID, decayed_at=now))
+            return 0
+        elapsed = (now - decayed_at).total_seconds()
+        if elapsed <= 0 or elapsed < min_interval:
+            return None
+        claimed = connection.execute(update(state).where(
+            state.c.id == STATE_ID,
+            state.c.decayed_at == decayed_at
+        ).values(decayed_at=now)).rowcount
+        if not claimed:
+            return None
+
+        factor = decay_factor(elapsed, half_life_hours)
+        decayed = shares.c.trending_score * factor
+        result = connection.execute(update(shares).where(shares.c.trending_score > 0).values(
+            trending_score=case((decayed < MIN_SCORE, 0.0), else_=decayed),
+            updated_at=shares.c.updated_at
+        ))
+        logger.info("热门分数衰减: %s 个分享, 系数 %.4f (%.0f 秒)", result.rowcount, factor, elapsed)
+        return result.rowcount
+
+    @staticmethod
+    def trending_query(query):
+        """热门排序：只包含公开分享，按分数和ID倒序（走 ix_shares_trending 索引）"""
+        return query.filter(Share.visibility == 'public').order_by(Share.trending_score.desc(), Share.id.desc())
+
+
+_stopped = threading.Event()
+
+
+def _run_decay(app, interval, half_life_hours):
+    while not _stopped.wait(interval):
+        with app.app_context():
+            try:
+                # 允许少量提前，避免与其他进程的计时误差导致整轮跳过
+                TrendingService.decay(db.session.connection(), half_life_hours, min_interval=interval * 0.9)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error("热门分数衰减出错: %s", e)
+
+
+def init_trending_decay(app):
+    """按配置启动热门分数衰减线程"""
+    interval = app.config.get('TRENDING_DECAY_SECONDS', DEFAULT_DECAY_SECONDS)
+    if not interval:
+        return
+    half_life_hours = app.config.get('TRENDING_HALF_LIFE_HOURS', DEFAULT_HALF_LIFE_HOURS)
+    threading.Thread(target=_run_decay, args=(app, interval, half_life_hours),
+                     name='trending-decay', daemon=True).start()
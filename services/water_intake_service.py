@@ -1,4 +1,6 @@
 from models.water_intake import WaterIntake
+from models.health_record import HealthRecord
+from services.rollup_service import RollupService
 from sqlalchemy import func
 from database import db
 from datetime import datetime, timedelta, time
@@ -6,6 +8,13 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+RECOMMENDED_DAILY_INTAKE = 2000  # 推荐的每日饮水量（毫升）
+GRANULARITIES = ('day', 'week', 'month')
+
+# 饮水记录来源：water_intakes 表，或 health_records 中 record_type = 'water' 的记录
+SOURCE_INTAKES = 'intakes'
+SOURCE_RECORDS = 'records'
+
 class WaterIntakeService:
     """水摄入服务，处理与水摄入记录相关的业务逻辑"""
     
@@ -67,7 +76,7 @@ class WaterIntakeService:
             return water_intake.to_dict()
         except Exception as e:
             db.session.rollback()
-            logger.error(f"创建水摄入记录失败: {str(e)}")
+            logger.error("创建水摄入记录失败: %s", e)
             raise
     
     @staticmethod
@@ -101,7 +110,7 @@ class WaterIntakeService:
             
             return [record.to_dict() for record in records]
         except Exception as e:
-            logger.error(f"获取水摄入记录失败: {str(e)}")
+            logger.error("获取水摄入记录失败: %s", e)
             raise
     
     @staticmethod
@@ -126,7 +135,7 @@ class WaterIntakeService:
                 return record.to_dict()
             return None
         except Exception as e:
-            logger.error(f"获取水摄入记录失败: {str(e)}")
+            logger.error("获取水摄入记录失败: %s", e)
             raise
     
     @staticmethod
@@ -191,7 +200,7 @@ class WaterIntakeService:
             return record.to_dict()
         except Exception as e:
             db.session.rollback()
-            logger.error(f"更新水摄入记录失败: {str(e)}")
+            logger.error("更新水摄入记录失败: %s", e)
             raise
     
     @staticmethod
@@ -221,7 +230,7 @@ class WaterIntakeService:
             return True
         except Exception as e:
             db.session.rollback()
-            logger.error(f"删除水摄入记录失败: {str(e)}")
+            logger.error("删除水摄入记录失败: %s", e)
             raise
     
     @staticmethod
@@ -250,75 +259,162 @@ class WaterIntakeService:
             # 计算总水摄入量
             total_amount = WaterIntake.get_daily_total(user_id, date)
             
-            # 计算完成率（假设推荐的每日摄入量为2000毫升）
-            recommended_daily_intake = 2000  # 毫升
-            completion_rate = (total_amount / recommended_daily_intake) * 100 if total_amount else 0
-            
-            return {
-                'date': date.isoformat(),
-                'total_amount': total_amount,
-                'records_count': len(records),
-                'records': records,
-                'recommended_intake': recommended_daily_intake,
-                'completion_rate': min(round(completion_rate, 2), 100)
-            }
+            return WaterIntakeService._build_daily_summary(date, total_amount, records)
         except Exception as e:
-            logger.error(f"获取每日水摄入摘要失败: {str(e)}")
+            logger.error("获取每日水摄入摘要失败: %s", e)
             raise
     
     @staticmethod
-    def get_weekly_summary(user_id, start_date, end_date):
+    def get_weekly_summary(user_id, start_date, end_date, include_records=True, source=SOURCE_INTAKES):
         """
-        获取一段时间内的水摄入摘要
+        获取一段时间内的水摄入摘要（按天）
         
         参数:
             user_id: 用户ID
             start_date: 开始日期(YYYY-MM-DD)
             end_date: 结束日期(YYYY-MM-DD)
+            include_records: 是否包含每天的记录明细
+            source: 饮水记录来源，见 get_summary
             
         返回:
             包含每日摘要的字典
         """
         try:
-            if isinstance(start_date, str):
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            
-            if isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            
-            # 计算天数差
-            days_diff = (end_date - start_date).days + 1
-            
-            # 获取每一天的摘要
-            daily_summaries = []
-            current_date = start_date
-            
-            for _ in range(days_diff):
-                daily_summary = WaterIntakeService.get_daily_summary(
-                    user_id=user_id,
-                    date=current_date
-                )
-                daily_summaries.append(daily_summary)
-                current_date += timedelta(days=1)
-            
-            # 计算总水摄入量
-            total_amount = sum(summary['total_amount'] for summary in daily_summaries)
-            
-            # 计算平均每日摄入量
-            average_daily_intake = total_amount / days_diff if days_diff > 0 else 0
-            
-            # 计算平均完成率
-            average_completion_rate = sum(summary['completion_rate'] for summary in daily_summaries) / days_diff if days_diff > 0 else 0
-            
-            return {
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat(),
-                'days_count': days_diff,
-                'total_amount': total_amount,
-                'average_daily_intake': round(average_daily_intake, 2),
-                'average_completion_rate': round(average_completion_rate, 2),
-                'daily_summaries': daily_summaries
-            }
+            summary = WaterIntakeService.get_summary(
+                user_id, start_date, end_date, granularity='day',
+                include_records=include_records, source=source
+            )
+            summary['daily_summaries'] = summary.pop('summaries')
+            return summary
         except Exception as e:
-            logger.error(f"获取周水摄入摘要失败: {str(e)}")
-            raise 
\ No newline at end of file
+            logger.error("获取周水摄入摘要失败: %s", e)
+            raise 
+    
+    @staticmethod
+    def get_summary(user_id, start_date, end_date, granularity='day', include_records=False, source=SOURCE_INTAKES):
+        """
+        按天/周/月汇总一段时间内的饮水量
+        
+        每天的总量和次数从每日汇总表一次读取；只有 include_records 为真时才再用一条查询读取记录明细，
+        查询次数与日期范围长短无关。周按 ISO 周（周一开始）、月按自然月划分，首尾周期截断到查询范围。
+        
+        参数:
+            user_id: 用户ID
+            start_date: 开始日期(YYYY-MM-DD)
+            end_date: 结束日期(YYYY-MM-DD)
+            granularity: day / week / month
+            include_records: 是否在每个周期中包含记录明细
+            source: intakes（water_intakes 表）或 records（health_records 中的饮水记录）
+            
+        返回:
+            汇总字典，summaries 为各周期的摘要列表
+        """
+        if isinstance(start_date, str):
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        if isinstance(end_date, str):
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"无效的汇总粒度: {granularity}，有效值: {', '.join(GRANULARITIES)}")
+        if source not in (SOURCE_INTAKES, SOURCE_RECORDS):
+            raise ValueError(f"无效的记录来源: {source}")
+        if start_date > end_date:
+            raise ValueError("开始日期不能晚于结束日期")
+        days_diff = (end_date - start_date).days + 1
+        
+        amount_field, count_field = ('intake_amount', 'intake_count') if source == SOURCE_INTAKES \
+            else ('water_amount', 'water_count')
+        rollups = RollupService.get_daily_rollups(user_id, start_date, end_date)
+        records_by_date = {}
+        if include_records:
+            for record_date, record in WaterIntakeService._load_records(user_id, start_date, end_date, source):
+                records_by_date.setdefault(record_date, []).append(record)
+        
+        daily_summaries = []
+        for offset in range(days_diff):
+            day = start_date + timedelta(days=offset)
+            rollup = rollups.get(day)
+            daily_summaries.append(WaterIntakeService._build_daily_summary(
+                day,
+                getattr(rollup, amount_field) if rollup else 0,
+                records_by_date.get(day, []) if include_records else None,
+                records_count=getattr(rollup, count_field) if rollup else 0
+            ))
+        
+        if granularity == 'day':
+            summaries = daily_summaries
+        else:
+            periods = {}
+            for summary in daily_summaries:
+                day = datetime.strptime(summary['date'], '%Y-%m-%d').date()
+                key = day - timedelta(days=day.weekday()) if granularity == 'week' else day.replace(day=1)
+                periods.setdefault(key, []).append(summary)
+            summaries = [WaterIntakeService._build_period_summary(days, include_records)
+                         for _, days in sorted(periods.items())]
+        
+        # 计算总水摄入量和平均值
+        total_amount = sum(summary['total_amount'] for summary in daily_summaries)
+        average_daily_intake = total_amount / days_diff
+        average_completion_rate = sum(summary['completion_rate'] for summary in daily_summaries) / days_diff
+        
+        return {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'granularity': granularity,
+            'days_count': days_diff,
+            'total_amount': total_amount,
+            'records_count': sum(summary['records_count'] for summary in daily_summaries),
+            'average_daily_intake': round(average_daily_intake, 2),
+            'average_completion_rate': round(average_completion_rate, 2),
+            'summaries': summaries
+        }
+    
+    @staticmethod
+    def _load_records(user_id, start_date, end_date, source):
+        """一次读取范围内的记录明细，返回 [(日期, 记录字典)]，按日期和时间倒序"""
+        model = WaterIntake if source == SOURCE_INTAKES else HealthRecord
+        query = model.query.filter(
+            model.user_id == user_id,
+            model.record_date >= start_date,
+            model.record_date <= end_date
+        )
+        if source == SOURCE_RECORDS:
+            query = query.filter(HealthRecord.record_type == 'water')
+        records = query.order_by(model.record_date.desc(), model.intake_time.desc()).all()
+        return [(record.record_date, record.to_dict()) for record in records]
+    
+    @staticmethod
+    def _build_daily_summary(date, total_amount, records, records_count=None):
+        """根据某天的总量和记录列表生成每日摘要，records 为 None 时不包含明细"""
+        # 计算完成率（假设推荐的每日摄入量为2000毫升）
+        completion_rate = (total_amount / RECOMMENDED_DAILY_INTAKE) * 100 if total_amount else 0
+        
+        summary = {
+            'date': date.isoformat(),
+            'total_amount': total_amount,
+            'records_count': records_count if records_count is not None else len(records),
+            'recommended_intake': RECOMMENDED_DAILY_INTAKE,
+            'completion_rate': min(round(completion_rate, 2), 100)
+        }
+        if records is not None:
+            summary['records'] = records
+        return summary
+    
+    @staticmethod
+    def _build_period_summary(daily_summaries, include_records):
+        """把一个周/月内各天的摘要合并为周期摘要"""
+        days_count = len(daily_summaries)
+        total_amount = sum(summary['total_amount'] for summary in daily_summaries)
+        summary = {
+            'period_start': daily_summaries[0]['date'],
+            'period_end': daily_summaries[-1]['date'],
+            'days_count': days_count,
+            'total_amount': total_amount,
+            'records_count': sum(summary['records_count'] for summary in daily_summaries),
+            'average_daily_intake': round(total_amount / days_count, 2),
+            'completion_rate': round(sum(summary['completion_rate'] for summary in daily_summaries) / days_count, 2),
+            'days_reached_goal': sum(1 for summary in daily_summaries if summary['completion_rate'] >= 100),
+        }
+        if include_records:
+            # 每天的明细按日期倒序排列，合并后整体也按日期倒序
+            summary['records'] = [record for day in reversed(daily_summaries) for record in day['records']]
+        return summary
@@ -1,5 +1,7 @@
 from database import db
 from models.health_record import HealthRecord
+from services.water_intake_service import SOURCE_RECORDS, WaterIntakeService
+from utils.pagination import keyset_paginate
 from datetime import datetime
 import logging
 
@@ -49,7 +51,7 @@ class WaterService:
             db.session.add(record)
             db.session.commit()
             
-            logger.info(f"创建饮水记录成功，用户ID: {user_id}")
+            logger.info("创建饮水记录成功，用户ID: %s", user_id)
             
             return {
                 "success": True,
@@ -60,14 +62,14 @@ class WaterService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"创建饮水记录失败: {str(e)}")
+            logger.error("创建饮水记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"创建记录失败: {str(e)}"
             }
     
     @staticmethod
-    def get_water_records(user_id, start_date=None, end_date=None):
+    def get_water_records(user_id, start_date=None, end_date=None, limit=None, cursor=None):
         """
         获取用户的饮水记录
         
@@ -75,6 +77,8 @@ class WaterService:
             user_id: 用户ID
             start_date: 开始日期，可选
             end_date: 结束日期，可选
+            limit: 每页记录数，可选，不传时返回全部记录
+            cursor: 分页游标，可选
             
         返回:
             饮水记录列表
@@ -92,18 +96,18 @@ class WaterService:
                     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
                 query = query.filter(HealthRecord.record_date <= end_date)
                 
-            # 按日期排序
-            records = query.order_by(HealthRecord.record_date.desc(), 
-                                     HealthRecord.created_at.desc()).all()
+            # 按日期倒序，传入limit/cursor时按游标分页
+            records, next_cursor = keyset_paginate(query, HealthRecord, limit=limit, cursor=cursor)
             
             return {
                 "success": True,
                 "records": [record.to_dict() for record in records],
-                "count": len(records)
+                "count": len(records),
+                "next_cursor": next_cursor
             }
             
         except Exception as e:
-            logger.error(f"获取饮水记录失败: {str(e)}")
+            logger.error("获取饮水记录失败: %s", e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}",
@@ -135,8 +139,18 @@ class WaterService:
                     "message": "未找到记录或无权访问"
                 }
         except Exception as e:
-            logger.error(f"获取饮水记录 {record_id} 时出错: {str(e)}")
+            logger.error("获取饮水记录 %s 时出错: %s", record_id, e)
             return {
                 "success": False,
                 "message": f"获取记录失败: {str(e)}"
-            } 
\ No newline at end of file
+            }
+    
+    @staticmethod
+    def get_summary(user_id, start_date, end_date, granularity='day', include_records=False):
+        """
+        按天/周/月汇总饮水记录，查询次数固定（每日汇总表一次，需要明细时再加一次）
+        
+        参数与返回值见 WaterIntakeService.get_summary，记录来源为 health_records 中的饮水记录
+        """
+        return WaterIntakeService.get_summary(user_id, start_date, end_date, granularity=granularity,
+                                              include_records=include_records, source=SOURCE_RECORDS)
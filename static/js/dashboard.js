@@ -163,7 +163,7 @@ async function loadHealthRecords() {
         
         if (result.success) {
             displayRecords(result.records);
-            updateCharts(result.records);
+            loadMetricCharts(token);
         } else {
             console.error('加载记录失败:', result.message);
         }
@@ -328,24 +328,62 @@ function loadDashboardData() {
     });
 }
 
+// 图表最多显示的点数，服务端按此降采样
+const CHART_POINTS = 300;
+let weightChart = null;
+let bpChart = null;
+
+// 加载体重和血压的时间序列
+function loadMetricCharts(token) {
+    fetch(`/api/health/timeseries?metrics=weight,bp_systolic,bp_diastolic&points=${CHART_POINTS}`, {
+        method: 'GET',
+        headers: {
+            'Authorization': `Bearer ${token}`
+        }
+    })
+    .then(response => response.json())
+    .then(result => {
+        if (result.success) {
+            updateCharts(result.series);
+        } else {
+            console.error('加载图表数据失败:', result.message);
+        }
+    })
+    .catch(error => {
+        console.error('加载图表数据错误:', error);
+    });
+}
+
+// 时间点标签（精确到分钟，同一天的多条记录不会重叠）
+function timeLabel(timestamp) {
+    return timestamp.replace('T', ' ').slice(0, 16);
+}
+
+// 把序列转换为 Chart.js 的 {x, y} 数据点
+function toPoints(item) {
+    return item.timestamps.map((timestamp, i) => ({ x: timeLabel(timestamp), y: item.values[i] }));
+}
+
 // 更新图表
-function updateCharts(records) {
-    if (!records || records.length === 0) {
+function updateCharts(series) {
+    if (!series) {
         return;
     }
     
-    // 按日期从早到晚排序（倒序）
-    records = records.slice().reverse();
+    // 各序列的时间点不同，横轴取所有时间点的并集
+    const dates = [...new Set([].concat(
+        series.weight.timestamps, series.bp_systolic.timestamps, series.bp_diastolic.timestamps
+    ).map(timeLabel))].sort();
+    const weights = toPoints(series.weight);
+    const systolic = toPoints(series.bp_systolic);
+    const diastolic = toPoints(series.bp_diastolic);
     
-    // 准备数据
-    const dates = records.map(record => formatDate(record.record_date));
-    const weights = records.map(record => record.weight || null);
-    const systolic = records.map(record => record.blood_pressure_systolic || null);
-    const diastolic = records.map(record => record.blood_pressure_diastolic || null);
+    if (weightChart) weightChart.destroy();
+    if (bpChart) bpChart.destroy();
     
     // 体重图表
     const weightCtx = document.getElementById('weightChart').getContext('2d');
-    new Chart(weightCtx, {
+    weightChart = new Chart(weightCtx, {
         type: 'line',
         data: {
             labels: dates,
@@ -376,7 +414,7 @@ function updateCharts(records) {
     
     // 血压图表
     const bpCtx = document.getElementById('bpChart').getContext('2d');
-    new Chart(bpCtx, {
+    bpChart = new Chart(bpCtx, {
         type: 'line',
         data: {
             labels: dates,
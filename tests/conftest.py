@@ -0,0 +1,29 @@
+"""
+测试共用的应用和数据库
+
+app.py 在导入时读取环境变量完成初始化（init_db 会清空模型元数据后重新注册，必须先于测试
+模块导入模型），所以在这里导入：数据库指向临时 SQLite 文件，关闭提醒调度、热门衰减等
+后台线程，报告任务在请求线程中同步执行。
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ['REMINDER_SCHEDULER_ENABLED'] = '0'
+os.environ['TRENDING_DECAY_SECONDS'] = '0'
+os.environ['REPORT_JOB_WORKERS'] = '0'
+
+from app import app as flask_app  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
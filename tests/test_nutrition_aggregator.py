@@ -0,0 +1,149 @@
+"""NutritionAggregator 与原来逐条加载 ORM 对象、逐项累加的实现结果一致（随机数据）"""
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from database import db
+from models.diet_record import DietRecord, DietRecordItem, Food
+from models.health_record import HealthRecord
+from models.user import User
+from services.food_catalog import food_catalog
+from services.nutrition_aggregator import KEYWORD_ESTIMATES, NUTRIENTS, NutritionAggregator
+
+START = date(2024, 3, 1)
+DAYS = 10
+FOOD_NAMES = ['煮鸡蛋', '苹果', '巧克力', '牛肉', '米饭', '青菜', '豆浆', '酸奶', '坚果']
+# 健康记录中的食物名称：能匹配食物库的、只能按关键字估算的和都不匹配的
+HEALTH_FOOD_NAMES = FOOD_NAMES + ['蛋', '香蕉', '饼干', '虾', '面包', '番茄', '咖啡', '未知', None]
+
+
+def _empty_day(day_key):
+    return {"date": day_key, "calories": 0, "protein": 0, "fat": 0, "carbohydrate": 0,
+            "fiber": 0, "sugar": 0, "sodium": 0, "meals": {}}
+
+
+def reference_daily_nutrition(user_id, start_date, end_date):
+    """原 AnalysisService.get_nutrition_analysis 中逐条累加的实现（去掉调试输出）"""
+    daily_nutrition = {}
+    current_date = start_date
+    while current_date <= end_date:
+        daily_nutrition[current_date.isoformat()] = _empty_day(current_date.isoformat())
+        current_date += timedelta(days=1)
+
+    diet_records = DietRecord.query.filter(
+        DietRecord.user_id == user_id,
+        DietRecord.record_date >= start_date,
+        DietRecord.record_date <= end_date
+    ).order_by(DietRecord.record_date, DietRecord.created_at, DietRecord.id).all()
+    for record in diet_records:
+        day = daily_nutrition[record.record_date.isoformat()]
+        meal = day["meals"].setdefault(record.meal_type or "未分类", {"calories": 0, "items": []})
+        if record.total_calories:
+            day["calories"] += record.total_calories
+            meal["calories"] += record.total_calories
+        for item in sorted(record.items, key=lambda item: item.id):
+            amount = item.amount or 0
+            values = dict.fromkeys(NUTRIENTS, 0)
+            food_name = "未知食物"
+            if item.food:
+                for nutrient in NUTRIENTS:
+                    if getattr(item.food, nutrient):
+                        values[nutrient] = getattr(item.food, nutrient) * (amount / 100.0)
+                if item.food.name:
+                    food_name = item.food.name
+            for nutrient in NUTRIENTS:
+                day[nutrient] += values[nutrient]
+            meal["items"].append({"name": food_name, "amount": amount, "calories": item.calories or 0})
+
+    health_records = HealthRecord.query.filter(
+        HealthRecord.user_id == user_id,
+        HealthRecord.record_type == 'diet',
+        HealthRecord.record_date >= start_date,
+        HealthRecord.record_date <= end_date
+    ).order_by(HealthRecord.record_date, HealthRecord.created_at, HealthRecord.id).all()
+    for record in health_records:
+        day = daily_nutrition[record.record_date.isoformat()]
+        meal = day["meals"].setdefault(record.meal_type or "未分类", {"calories": 0, "items": []})
+        food_name = record.food_name or "未知食物"
+        amount = record.food_amount or 0
+        calories = record.calories_burned or 0
+        meal["items"].append({"food_name": food_name, "amount": amount, "calories": calories})
+        if calories > 0:
+            day["calories"] += calories
+            meal["calories"] += calories
+
+        estimate = [0] * len(NUTRIENTS)
+        food = food_catalog.match(food_name)
+        if food and food.calories:
+            calories = food.calories * amount / 100.0
+            estimate = [(getattr(food, nutrient) or 0) * (amount / 100.0) for nutrient in NUTRIENTS]
+        else:
+            for keywords, coefficients in KEYWORD_ESTIMATES:
+                if any(keyword in food_name for keyword in keywords):
+                    estimate = [amount * coefficient for coefficient in coefficients]
+                    break
+            else:
+                if calories > 0:
+                    estimate = [calories * 0.2 / 4, calories * 0.3 / 9, calories * 0.5 / 4,
+                                amount * 0.03, calories * 0.1 / 4, amount * 0.05]
+        for nutrient, value in zip(NUTRIENTS, estimate):
+            day[nutrient] += value
+        if calories <= 0:
+            calculated = estimate[0] * 4 + estimate[1] * 9 + estimate[2] * 4
+            if calculated > 0:
+                day["calories"] += calculated
+                meal["calories"] += calculated
+    return daily_nutrition
+
+
+def _maybe(rng, value, empty=None):
+    return empty if rng.random() < 0.2 else value
+
+
+@pytest.fixture(scope='module')
+def nutrition_users(app):
+    """3 个用户的随机饮食记录：记录项和食物营养素有空值和 0，健康记录的名称、用量和热量也有空值"""
+    rng = random.Random(20240301)
+    with app.app_context():
+        foods = [Food(name=name, calories=_maybe(rng, rng.uniform(20, 600), 0),
+                      **{nutrient: _maybe(rng, round(rng.uniform(0, 30), 3)) for nutrient in NUTRIENTS})
+                 for name in FOOD_NAMES]
+        db.session.add_all(foods)
+        users = [User(username=f'nutrition_user_{i}', password_hash='x') for i in range(3)]
+        db.session.add_all(users)
+        db.session.flush()
+        created = datetime(2024, 3, 1, 7)
+        for user in users:
+            for _ in range(60):
+                created += timedelta(minutes=rng.randint(1, 600))
+                record_date = START + timedelta(days=rng.randint(-1, DAYS))  # 包含范围外的记录
+                meal_type = rng.choice(['早餐', '午餐', '晚餐', '加餐'])
+                if rng.random() < 0.5:
+                    record = DietRecord(user_id=user.id, record_date=record_date, meal_type=meal_type,
+                                        total_calories=_maybe(rng, rng.uniform(100, 900)), created_at=created)
+                    db.session.add(record)
+                    db.session.flush()
+                    db.session.add_all(
+                        DietRecordItem(diet_record_id=record.id, food_id=rng.choice(foods).id,
+                                       amount=rng.choice([0, rng.uniform(10, 400)]),
+                                       calories=_maybe(rng, rng.uniform(10, 500)))
+                        for _ in range(rng.randint(0, 4)))
+                else:
+                    db.session.add(HealthRecord(
+                        user_id=user.id, record_type='diet', record_date=record_date, created_at=created,
+                        meal_type=_maybe(rng, meal_type), food_name=rng.choice(HEALTH_FOOD_NAMES),
+                        food_amount=_maybe(rng, rng.uniform(10, 400)),
+                        calories_burned=_maybe(rng, rng.uniform(50, 800))))
+        db.session.commit()
+        food_catalog.load()
+        return [user.id for user in users]
+
+
+def test_aggregate_matches_reference_loop(app, nutrition_users):
+    end_date = START + timedelta(days=DAYS - 1)
+    with app.app_context():
+        for user_id in nutrition_users:
+            expected = reference_daily_nutrition(user_id, START, end_date)
+            db.session.expire_all()
+            assert NutritionAggregator.aggregate(user_id, START, end_date) == expected
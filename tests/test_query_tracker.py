@@ -0,0 +1,20 @@
+"""执行出错的语句同样计入 SQL 统计"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database import db
+from utils.query_tracker import query_budget
+
+
+def test_failed_statements_are_counted(app):
+    with app.app_context():
+        with query_budget(10) as scope:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    db.session.execute(text('SELECT * FROM no_such_table'))
+                db.session.rollback()
+            db.session.execute(text('SELECT 1'))
+        assert scope.count == 4
+        assert scope.shapes['SELECT * FROM no_such_table'] == 3
+        assert 'query_start' not in db.session.connection().info
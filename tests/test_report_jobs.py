@@ -0,0 +1,55 @@
+"""应用启动时处理上次退出时未完成的报告任务和批次"""
+import uuid
+from datetime import date, datetime, timedelta
+
+from database import db
+from models.health_report import ReportBatch, ReportJob
+from models.user import User
+from services.batch_report_service import init_report_batches
+from services.report_job_service import init_report_jobs
+
+
+def test_stale_running_jobs_are_resubmitted_on_startup(app):
+    with app.app_context():
+        user = User(username='report_job_user', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        now = datetime.utcnow()
+        stale = ReportJob(id=uuid.uuid4().hex, user_id=user.id, report_type='weekly',
+                          status='running', started_at=now - timedelta(hours=1))
+        recent = ReportJob(id=uuid.uuid4().hex, user_id=user.id, report_type='weekly',
+                           status='running', started_at=now - timedelta(seconds=30))
+        db.session.add_all([stale, recent])
+        db.session.commit()
+        stale_id, recent_id = stale.id, recent.id
+
+    # 测试中 REPORT_JOB_WORKERS=0，重新提交的任务在 init_report_jobs 中同步执行
+    init_report_jobs(app)
+
+    with app.app_context():
+        assert db.session.get(ReportJob, stale_id).status == 'succeeded'
+        assert db.session.get(ReportJob, recent_id).status == 'running'
+
+
+def test_stale_batches_are_marked_failed_on_startup(app):
+    now = datetime.utcnow()
+    rows = {
+        'stale_running': ('running', now - timedelta(hours=2)),
+        'recent_running': ('running', now - timedelta(minutes=5)),
+        'stale_pending': ('pending', None),
+    }
+    with app.app_context():
+        batch_ids = {}
+        for name, (status, started_at) in rows.items():
+            batch = ReportBatch(id=uuid.uuid4().hex, report_type='weekly', start_date=date(2024, 1, 1),
+                                end_date=date(2024, 1, 7), status=status, started_at=started_at,
+                                created_at=now - timedelta(hours=2))
+            db.session.add(batch)
+            batch_ids[name] = batch.id
+        db.session.commit()
+
+    assert init_report_batches(app) == 2
+
+    with app.app_context():
+        statuses = {name: db.session.get(ReportBatch, batch_id).status for name, batch_id in batch_ids.items()}
+    assert statuses == {'stale_running': 'failed', 'recent_running': 'running', 'stale_pending': 'failed'}
@@ -0,0 +1,60 @@
+"""分享列表接口的 SQL 语句数与每页条数、点赞数和评论数无关"""
+import pytest
+from flask_jwt_extended import create_access_token
+
+from database import db
+from models.health_record import HealthRecord
+from models.social import Comment, Like, Share
+from models.user import User
+from services.share_validity_service import validity_cache
+from utils.query_tracker import query_budget
+
+SHARES = 40
+LIKES_PER_SHARE = 5
+COMMENTS_PER_SHARE = 8
+
+
+@pytest.fixture(scope='module')
+def viewer_token(app):
+    """6 个用户、40 条分享（含已删除内容的分享和其他用户的私密分享），每条分享 5 个点赞和 8 条评论"""
+    with app.app_context():
+        users = [User(username=f'budget_user_{i}', password_hash='x') for i in range(6)]
+        db.session.add_all(users)
+        db.session.flush()
+        for n in range(SHARES):
+            author = users[n % len(users)]
+            record = HealthRecord(user_id=author.id, record_type='health', weight=60 + n)
+            db.session.add(record)
+            db.session.flush()
+            share = Share(user_id=author.id, content_type='health_record',
+                          # 每 7 条分享一条指向不存在的记录
+                          content_id=record.id if n % 7 else record.id + 100000,
+                          description=f'分享 {n}', visibility='private' if n % 5 == 0 else 'public',
+                          like_count=LIKES_PER_SHARE, comment_count=COMMENTS_PER_SHARE)
+            db.session.add(share)
+            db.session.flush()
+            likers = [users[(n + i + 1) % len(users)] for i in range(LIKES_PER_SHARE)]
+            db.session.add_all(Like(user_id=liker.id, share_id=share.id) for liker in likers)
+            parent = None
+            for c in range(COMMENTS_PER_SHARE):
+                comment = Comment(user_id=users[c % len(users)].id, share_id=share.id,
+                                  content=f'评论 {c}', parent_id=parent.id if parent and c % 2 else None)
+                db.session.add(comment)
+                db.session.flush()
+                parent = parent or comment
+        db.session.commit()
+        return create_access_token(identity=users[0].id)
+
+
+@pytest.mark.parametrize('per_page', [1, 10, 40])
+@pytest.mark.parametrize('query', ['', '&sort=trending', '&hide_invalid=1'])
+def test_share_list_query_budget(client, viewer_token, per_page, query):
+    validity_cache.clear()  # 内容有效性不走缓存，统计最多的情况
+    with query_budget(5):
+        response = client.get(f'/api/social/shares?per_page={per_page}{query}',
+                              headers={'Authorization': f'Bearer {viewer_token}'})
+    assert response.status_code == 200
+    shares = response.get_json()['shares']
+    assert 0 < len(shares) <= per_page
+    assert all(share['likes_count'] == LIKES_PER_SHARE for share in shares)
+    assert all(share['comments_count'] == COMMENTS_PER_SHARE for share in shares)
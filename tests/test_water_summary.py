@@ -0,0 +1,34 @@
+"""当前月/年的饮水摘要只统计到今天"""
+from datetime import date, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from database import db
+from models.user import User
+from models.health_record import HealthRecord
+
+
+@pytest.fixture(scope='module')
+def water_token(app):
+    """今年 1 月 1 日起每天一条 500 毫升的饮水记录"""
+    with app.app_context():
+        user = User(username='water_summary_user', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        today = date.today()
+        day = date(today.year, 1, 1)
+        while day <= today:
+            db.session.add(HealthRecord(user_id=user.id, record_type='water', water_amount=500, record_date=day))
+            day += timedelta(days=1)
+        db.session.commit()
+        return create_access_token(identity=user.id)
+
+
+@pytest.mark.parametrize('path', ['/api/water-intake/summary/monthly', '/api/water-intake/summary/yearly'])
+def test_current_period_averages_elapsed_days(client, water_token, path):
+    response = client.get(path, headers={'Authorization': f'Bearer {water_token}'})
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert summary['end_date'] == date.today().isoformat()
+    assert summary['average_daily_intake'] == 500
@@ -21,7 +21,7 @@ def token_required(f):
             # 将当前用户传递给被装饰的函数
             return f(current_user, *args, **kwargs)
         except Exception as e:
-            logger.error(f"Token validation error: {str(e)}")
+            logger.error("Token validation error: %s", e)
             return jsonify({
                 'status': 'error',
                 'message': '未授权访问，请先登录'
@@ -0,0 +1,78 @@
+"""
+进程内 TTL 缓存
+
+用于缓存按用户计算的只读结果（如仪表盘数据）。每个键带有版本号：invalidate() 会使版本号
+递增，get_or_set() 只有在加载期间版本号未变化时才写入缓存，避免并发请求把写操作提交前
+读到的旧结果放回缓存。缓存值会被多个请求共享，调用方不应修改返回的对象。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """线程安全的 LRU + TTL 缓存"""
+
+    def __init__(self, ttl=60, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (过期时间, 值)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, version=None):
+        """写入缓存；传入 version 时，若期间该键已失效则放弃写入"""
+        with self._lock:
+            if version is not None and self._versions.get(key, 0) != version:
+                return False
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def version(self, key):
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def get_or_set(self, key, loader):
+        """
+        读取缓存，未命中时调用 loader() 计算并写入
+
+        返回:
+            (值, 是否命中缓存)
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value, True
+        version = self.version(key)
+        value = loader()
+        self.set(key, value, version)
+        return value, False
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            for key in self._versions:
+                self._versions[key] += 1
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,92 @@
+"""
+时间序列降采样
+
+两种方法都返回保留的点的下标（升序，包含首尾两点），输入的 x 必须升序：
+- lttb: Largest-Triangle-Three-Buckets，按面积挑选最能保持曲线形状的点，适合折线图
+- minmax: 每个桶保留最小值和最大值，保证峰值不丢失
+
+分桶和桶内计算都用 NumPy 向量化；LTTB 依赖上一个桶选出的点，只有按桶的循环是逐个进行的。
+"""
+import numpy as np
+
+LTTB = 'lttb'
+MINMAX = 'minmax'
+METHODS = (LTTB, MINMAX)
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样
+
+    参数:
+        x: 升序的横坐标数组
+        y: 纵坐标数组
+        threshold: 目标点数（至少 3）
+
+    返回:
+        保留的点的下标数组
+
+    抛出:
+        ValueError: threshold 小于 3
+    """
+    if threshold < 3:
+        raise ValueError("LTTB 的目标点数至少为 3")
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # 首尾两点单独保留，中间 n - 2 个点分成 threshold - 2 个桶；edges[i] 到 edges[i + 1] 为第 i 个桶
+    every = (n - 2) / (threshold - 2)
+    edges = np.append(np.floor(np.arange(threshold - 1) * every).astype(int) + 1, n)
+    # 每个桶（以及最后一点）的平均值，作为上一个桶三角形的第三个顶点
+    sizes = np.diff(edges)
+    avg_x = np.add.reduceat(x, edges[:-1]) / sizes
+    avg_y = np.add.reduceat(y, edges[:-1]) / sizes
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def _first_match(values, targets, bucket_ids):
+    """每个桶中第一个等于该桶目标值的下标"""
+    matches = np.flatnonzero(values == targets[bucket_ids])
+    _, first = np.unique(bucket_ids[matches], return_index=True)
+    return matches[first]
+
+
+def minmax(x, y, threshold):
+    """
+    最小/最大值降采样：分成 (threshold - 2) // 2 个桶，每个桶保留最小值和最大值所在的点
+
+    参数同 lttb，threshold 至少为 4
+    """
+    if threshold < 4:
+        raise ValueError("最小/最大值降采样的目标点数至少为 4")
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+
+    buckets = (threshold - 2) // 2
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(edges))
+    lows = _first_match(y, np.minimum.reduceat(y, edges[:-1]), bucket_ids)
+    highs = _first_match(y, np.maximum.reduceat(y, edges[:-1]), bucket_ids)
+    return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+
+def downsample(x, y, threshold, method=LTTB):
+    """按 method 降采样，返回保留的点的下标"""
+    if method == MINMAX:
+        return minmax(x, y, threshold)
+    return lttb(x, y, threshold)
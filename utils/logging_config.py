@@ -0,0 +1,74 @@
+"""
+日志配置
+
+各模块通过 logging.getLogger(__name__) 获取日志记录器，并使用 %s 占位符传参
+（logger.debug("用户: %s", user_id)），级别未开启时不会格式化消息。
+
+configure_logging() 在根记录器上安装 QueueHandler：请求线程只把日志记录放入内存队列，
+由后台线程（QueueListener）写到标准错误，终端或文件 I/O 不会阻塞请求。默认级别为 INFO，
+调试日志需要设置环境变量 LOG_LEVEL=DEBUG。
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+_handler = None
+_listener = None
+
+
+def _resolve_level(level):
+    if level is None:
+        level = os.environ.get('LOG_LEVEL', 'INFO')
+    if isinstance(level, str):
+        resolved = logging.getLevelName(level.upper())
+        return resolved if isinstance(resolved, int) else logging.INFO
+    return level
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # 输出队列中剩余的日志
+        _listener = None
+
+
+def configure_logging(level=None, stream=None, use_queue=True):
+    """
+    配置根日志记录器，重复调用时替换上一次安装的处理器
+
+    参数:
+        level: 日志级别（名称或数值），默认读取环境变量 LOG_LEVEL，未设置时为 INFO
+        stream: 输出流，默认为标准错误
+        use_queue: 是否经队列由后台线程输出，关闭时在调用线程中同步写出
+
+    返回:
+        根日志记录器
+    """
+    global _handler, _listener
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    _stop_listener()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        _handler = logging.handlers.QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+    else:
+        _handler = output
+
+    root.addHandler(_handler)
+    root.setLevel(_resolve_level(level))
+    return root
+
+
+atexit.register(_stop_listener)
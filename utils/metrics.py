@@ -0,0 +1,109 @@
+"""
+请求指标采集（Prometheus）
+
+init_metrics(app) 为每个请求记录：
+- 按蓝图/端点/方法统计的耗时直方图和按状态码统计的请求数
+- 响应体大小
+- 请求内执行的 SQL 语句数和 SQL 总耗时（由 utils/query_tracker.py 的请求统计范围提供）
+
+指标通过 routes/metrics.py 中的 /metrics 以 Prometheus 文本格式输出。
+
+多进程部署（如 gunicorn 多个 worker）时，在启动前设置环境变量 PROMETHEUS_MULTIPROC_DIR
+指向一个空目录，各进程把指标写入该目录下的内存映射文件，/metrics 汇总所有进程的数据；
+worker 退出时应调用 mark_process_dead(pid) 清理其文件。未设置该变量时使用进程内注册表。
+"""
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+
+from utils.query_tracker import init_query_tracker, request_scope
+
+LABELS = ['blueprint', 'endpoint', 'method']
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', '请求处理耗时（秒）', LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUEST_COUNT = Counter(
+    'http_requests_total', '请求数', LABELS + ['status']
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', '响应体大小（字节）', LABELS,
+    buckets=(100, 1000, 10000, 100000, 1000000, 10000000)
+)
+REQUEST_SQL_QUERIES = Histogram(
+    'http_request_sql_queries', '单个请求执行的 SQL 语句数', LABELS,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+REQUEST_SQL_SECONDS = Histogram(
+    'http_request_sql_duration_seconds', '单个请求的 SQL 总耗时（秒）', LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+# 不统计的端点（指标接口本身和静态文件）
+EXCLUDED_ENDPOINTS = {'metrics.metrics', 'static'}
+
+
+def multiprocess_enabled():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def _labels():
+    endpoint = request.endpoint or 'unmatched'
+    return {
+        'blueprint': request.blueprint or 'app',
+        'endpoint': endpoint,
+        'method': request.method
+    }
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None or request.endpoint in EXCLUDED_ENDPOINTS:
+        return response
+    labels = _labels()
+    REQUEST_LATENCY.labels(**labels).observe(time.perf_counter() - start)
+    REQUEST_COUNT.labels(status=str(response.status_code), **labels).inc()
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(**labels).observe(response.content_length)
+    scope = request_scope()
+    if scope is not None:
+        REQUEST_SQL_QUERIES.labels(**labels).observe(scope.count)
+        REQUEST_SQL_SECONDS.labels(**labels).observe(scope.seconds)
+    return response
+
+
+def init_metrics(app):
+    """为应用注册请求钩子；SQL 统计依赖 query_tracker，未初始化时一并注册"""
+    if not app.extensions.get('query_tracker'):
+        init_query_tracker(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def render_metrics():
+    """
+    生成 Prometheus 文本格式的指标
+
+    返回:
+        (内容, Content-Type)
+    """
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """多进程模式下清理已退出 worker 的指标文件（供 gunicorn 的 child_exit 钩子调用）"""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,93 @@
+"""
+基于游标（keyset）的分页工具
+
+记录按 (record_date DESC, created_at DESC, id DESC) 排序，游标保存上一页最后一条记录的
+这三个值。下一页只需在复合索引上从游标位置继续扫描，不会像 OFFSET 那样随页码增大而变慢，
+翻页过程中有新记录插入也不会出现重复或遗漏。
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values):
+    """将游标值列表编码为不透明字符串"""
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解码游标字符串
+
+    返回:
+        游标值列表（未做类型转换）
+
+    异常:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if not isinstance(values, list):
+        raise ValueError("无效的分页游标")
+    return values
+
+
+def _record_cursor_values(cursor):
+    """将游标解码为 (record_date, created_at, id)"""
+    values = decode_cursor(cursor)
+    try:
+        record_date, created_at, record_id = values
+        return (date.fromisoformat(record_date),
+                datetime.fromisoformat(created_at),
+                int(record_id))
+    except (TypeError, ValueError):
+        raise ValueError("无效的分页游标")
+
+
+def keyset_paginate(query, model, limit=None, cursor=None):
+    """
+    按 (record_date, created_at, id) 倒序对查询分页
+
+    参数:
+        query: 已包含过滤条件的查询
+        model: 具有 record_date、created_at、id 列的模型
+        limit: 每页记录数，为 None 时返回全部记录（保持旧接口行为）
+        cursor: 上一页返回的 next_cursor，可选
+
+    返回:
+        (records, next_cursor)，没有更多记录时 next_cursor 为 None
+
+    异常:
+        ValueError: 游标格式无效
+    """
+    query = query.order_by(model.record_date.desc(), model.created_at.desc(), model.id.desc())
+
+    if cursor:
+        record_date, created_at, record_id = _record_cursor_values(cursor)
+        # 展开写法而不是行值比较，MySQL/SQLite 都能把 record_date <= ? 用作索引范围条件
+        query = query.filter(
+            model.record_date <= record_date,
+            or_(
+                model.record_date < record_date,
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < record_id)
+            )
+        )
+
+    if limit is None:
+        return query.all(), None
+
+    records = query.limit(limit + 1).all()
+    if len(records) <= limit:
+        return records, None
+
+    records = records[:limit]
+    last = records[-1]
+    return records, encode_cursor([last.record_date, last.created_at, last.id])
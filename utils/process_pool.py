@@ -0,0 +1,45 @@
+"""
+后台任务使用的进程池
+
+Web 进程中有多个线程（请求线程、工作池、调度线程），fork 出的子进程只复制调用线程，
+其他线程持有的锁和数据库连接会处于不一致状态，所以进程池一律以 spawn 方式启动子进程。
+
+spawn 的子进程默认会重新导入主模块（以 `python app.py` 启动时即 app.py，会再次建表、
+执行迁移并启动工作池和调度线程）。SpawnProcessPool 在启动子进程期间隐藏主模块的路径，
+子进程只导入提交的函数所在的模块，需要的应用和数据库连接由 initializer 创建。
+提交的函数和 initializer 不能定义在主模块中。
+"""
+import contextlib
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_main_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _main_module_hidden():
+    """临时去掉 __main__ 的 __spec__ 和 __file__，spawn 的子进程不会重新导入主模块"""
+    main = sys.modules['__main__']
+    with _main_lock:
+        saved = {name: main.__dict__[name] for name in ('__spec__', '__file__') if name in main.__dict__}
+        main.__spec__ = None
+        main.__dict__.pop('__file__', None)
+        try:
+            yield
+        finally:
+            main.__dict__.update(saved)
+
+
+class SpawnProcessPool(ProcessPoolExecutor):
+    """以 spawn 方式启动、不导入主模块的进程池"""
+
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        super().__init__(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                         initializer=initializer, initargs=initargs)
+
+    def submit(self, fn, /, *args, **kwargs):
+        # 子进程在 submit 中按需启动
+        with _main_module_hidden():
+            return super().submit(fn, *args, **kwargs)
@@ -0,0 +1,194 @@
+"""
+SQL 语句统计与 N+1 查询检测
+
+通过 SQLAlchemy 引擎事件统计当前线程内执行的每条 SQL。统计范围（scope）可以嵌套：
+- 每个请求是一个范围（init_query_tracker 注册的请求钩子），请求结束时如果同一形状的语句
+  执行次数达到阈值，会以 WARNING 记录端点和语句，作为 N+1 查询的候选
+- query_budget() 在代码块或函数内开启一个范围，超过语句数上限时抛出 QueryBudgetExceeded，
+  可在测试中断言接口的查询次数：
+
+    with query_budget(5):
+        client.get('/api/social/shares?per_page=50')
+
+语句的“形状”是去掉参数值后的 SQL：绑定参数本来就是占位符，IN 列表展开的多个占位符
+和 SQL 中的数字、字符串字面量会被归一化。
+"""
+import contextlib
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 同一请求中同一形状语句执行多少次视为 N+1 候选
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+_local = threading.local()
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """执行的 SQL 语句数超过预算"""
+
+
+class QueryScope:
+    """一个统计范围内的语句数、耗时和各形状语句的执行次数"""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.seconds += elapsed
+        self.shapes[normalize_statement(statement)] += 1
+
+    def repeated(self, threshold=DEFAULT_N_PLUS_ONE_THRESHOLD):
+        """返回执行次数不少于 threshold 的 [(形状, 次数)]，按次数降序"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def normalize_statement(statement):
+    """去掉 SQL 中的参数值，得到语句形状"""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+def _scopes():
+    if not hasattr(_local, 'scopes'):
+        _local.scopes = []
+    return _local.scopes
+
+
+def push_scope(name=None):
+    scope = QueryScope(name)
+    _scopes().append(scope)
+    return scope
+
+
+def pop_scope(scope):
+    scopes = _scopes()
+    if scope in scopes:
+        scopes.remove(scope)
+    return scope
+
+
+def current_scope():
+    """当前线程最内层的统计范围，没有时返回 None"""
+    scopes = _scopes()
+    return scopes[-1] if scopes else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 开始时间保存在本次执行的上下文上：语句出错时不会触发 after_cursor_execute，
+    # 按连接保存的栈会残留在连接池中的连接上
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _record(context, statement):
+    started = getattr(context, '_query_start', None)
+    if started is None:
+        return
+    del context._query_start
+    elapsed = time.perf_counter() - started
+    # 嵌套的范围都计入，外层请求的统计包含 query_budget 代码块内的语句
+    for scope in _scopes():
+        scope.record(statement, elapsed)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(context, statement)
+
+
+def _handle_error(exception_context):
+    """执行出错的语句（如唯一约束冲突）同样计入统计"""
+    if exception_context.execution_context is not None and exception_context.statement is not None:
+        _record(exception_context.execution_context, exception_context.statement)
+
+
+def register_query_listeners():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+
+def report_repeated(scope, threshold=DEFAULT_N_PLUS_ONE_THRESHOLD, endpoint=None):
+    """以 WARNING 记录范围内的 N+1 候选语句"""
+    for shape, count in scope.repeated(threshold):
+        logger.warning("疑似 N+1 查询: 端点 %s 中同一语句执行了 %s 次: %s",
+                       endpoint or scope.name, count, shape[:300])
+
+
+@contextlib.contextmanager
+def query_budget(max_queries, raise_on_exceed=True):
+    """
+    限制代码块内执行的 SQL 语句数
+
+    参数:
+        max_queries: 允许的最大语句数
+        raise_on_exceed: 超出时抛出 QueryBudgetExceeded，为 False 时只记录警告
+
+    返回:
+        QueryScope，代码块结束后可读取 count / shapes
+    """
+    scope = push_scope('query_budget')
+    try:
+        yield scope
+    finally:
+        pop_scope(scope)
+    if scope.count > max_queries:
+        top = '; '.join(f'{count}x {shape[:120]}' for shape, count in scope.shapes.most_common(3))
+        message = f"执行了 {scope.count} 条 SQL，超过预算 {max_queries} 条（最多的语句: {top}）"
+        if raise_on_exceed:
+            raise QueryBudgetExceeded(message)
+        logger.warning("%s", message)
+
+
+def _start_request_scope():
+    request.environ['query_tracker.scope'] = push_scope(request.endpoint)
+
+
+def _finish_request_scope(exc=None):
+    scope = request.environ.pop('query_tracker.scope', None)
+    if scope is None:
+        return
+    pop_scope(scope)
+    report_repeated(scope, request.environ.get('query_tracker.threshold', DEFAULT_N_PLUS_ONE_THRESHOLD),
+                    request.endpoint)
+
+
+def request_scope():
+    """当前请求的统计范围，不在请求中或未启用时返回 None"""
+    if not has_request_context():
+        return None
+    return request.environ.get('query_tracker.scope')
+
+
+def init_query_tracker(app):
+    """为应用注册 SQL 统计事件和请求钩子，阈值可通过配置 QUERY_N_PLUS_ONE_THRESHOLD 调整"""
+    register_query_listeners()
+    app.extensions['query_tracker'] = True
+    threshold = app.config.get('QUERY_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+
+    def start():
+        request.environ['query_tracker.threshold'] = threshold
+        _start_request_scope()
+
+    app.before_request(start)
+    app.teardown_request(_finish_request_scope)
@@ -21,10 +21,10 @@ def validate_params(data, required_params, allow_empty=False):
     
     for param in required_params:
         if param not in data:
-            logger.warning(f"验证参数失败：缺少必需参数 {param}")
+            logger.warning("验证参数失败：缺少必需参数 %s", param)
             return False
         if not allow_empty and data[param] in [None, '', []]:
-            logger.warning(f"验证参数失败：参数 {param} 值为空")
+            logger.warning("验证参数失败：参数 %s 值为空", param)
             return False
     
     return True
@@ -54,5 +54,28 @@ def get_pagination_params(default_page=1, default_per_page=10, max_per_page=100)
         
         return page, per_page, offset, limit
     except Exception as e:
-        logger.error(f"获取分页参数时出错: {str(e)}")
-        return default_page, default_per_page, 0, default_per_page 
\ No newline at end of file
+        logger.error("获取分页参数时出错: %s", e)
+        return default_page, default_per_page, 0, default_per_page
+
+
+def get_cursor_params(default_limit=20, max_limit=100):
+    """
+    从请求参数中获取游标分页参数
+
+    参数:
+        default_limit: 只传了 cursor 时使用的默认每页记录数
+        max_limit: 最大每页记录数
+
+    返回:
+        limit, cursor: 未传 limit 和 cursor 时 limit 为 None，表示不分页
+    """
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit', type=int)
+
+    if limit is None:
+        if cursor is None:
+            return None, None
+        limit = default_limit
+
+    limit = max(1, min(limit, max_limit))
+    return limit, cursor
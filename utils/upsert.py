@@ -0,0 +1,72 @@
+"""
+按主键批量写入（存在则覆盖或跳过）
+
+MySQL 使用 ON DUPLICATE KEY UPDATE / INSERT IGNORE，SQLite / PostgreSQL 使用
+ON CONFLICT DO UPDATE / DO NOTHING，其他数据库退化为先按主键删除再插入（或直接插入）。
+"""
+from sqlalchemy import and_, delete
+
+INSERT_BATCH_SIZE = 1000
+
+
+def upsert_rows(connection, table, rows, key_columns, batch_size=INSERT_BATCH_SIZE):
+    """
+    写入多行，主键冲突时覆盖其余列
+
+    参数:
+        connection: 数据库连接
+        table: sqlalchemy Table
+        rows: 行字典列表，每行包含相同的列
+        key_columns: 主键（或唯一索引）列名列表
+        batch_size: 每批写入的行数
+    """
+    if not rows:
+        return
+    value_columns = [column for column in rows[0] if column not in key_columns]
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        statement = statement.on_duplicate_key_update(
+            {column: statement.inserted[column] for column in value_columns}
+        )
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={column: statement.excluded[column] for column in value_columns}
+        )
+    else:
+        for row in rows:
+            connection.execute(delete(table).where(
+                and_(*[table.c[column] == row[column] for column in key_columns])))
+        statement = table.insert()
+    for i in range(0, len(rows), batch_size):
+        connection.execute(statement, rows[i:i + batch_size])
+
+
+def insert_ignore_rows(connection, table, rows, key_columns, batch_size=INSERT_BATCH_SIZE):
+    """
+    写入多行，与已有行的主键（或唯一索引）冲突的行跳过
+
+    参数同 upsert_rows。其他数据库不支持冲突跳过，直接插入，冲突时抛出 IntegrityError。
+    """
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        statement = table.insert().prefix_with('IGNORE')
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).on_conflict_do_nothing(index_elements=list(key_columns))
+    else:
+        statement = table.insert()
+    for i in range(0, len(rows), batch_size):
+        connection.execute(statement, rows[i:i + batch_size])
@@ -96,7 +96,7 @@ def validate_request_json(data, schema):
     try:
         jsonschema.validate(instance=data, schema=schema)
     except jsonschema.exceptions.ValidationError as e:
-        logger.error(f"JSON验证错误: {str(e)}")
+        logger.error("JSON验证错误: %s", e)
         return f"数据验证失败: {e.message}"
     
     return None 
\ No newline at end of file